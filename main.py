@@ -1,22 +1,26 @@
 import logging
 import os
 import sys
-import tkinter as tk
 
-import ttkbootstrap as tb
-from ttkbootstrap.constants import *
-
-from src.utils.constants import APP_DATA_DIR_NAME, LOG_FILE_NAME
+from src.utils.constants import (APP_DATA_DIR_NAME, LOG_FILE_NAME, NOTIFICATION_SHUTDOWN_FLUSH_SECONDS,
+                                 STARTUP_PROBE_ENV_VAR)
 from src.utils.helpers import (copy_assets_to_app_data, get_app_data_path,
                                setup_logging)
-from src.views.main_window import MainWindow
 
 logger = logging.getLogger(__name__)
 
 
 def main():
     setup_logging()
+    if len(sys.argv) > 1:
+        # Con argumentos se ejecuta la línea de comandos, sin interfaz gráfica
+        from src.cli import run
+        sys.exit(run(sys.argv[1:]))
     logger.info("Iniciando aplicación...")
+    # La interfaz gráfica (tkinter, ttkbootstrap, PyQt5 y todas las vistas) solo se importa si se va a mostrar
+    import ttkbootstrap as tb
+    from ttkbootstrap.constants import BOTH, YES
+    from src.views.main_window import MainWindow
     copy_assets_to_app_data()
 
     app = tb.Window(themename="darkly")  # Tema moderno por defecto
@@ -28,7 +32,18 @@ def main():
     main_window.pack(fill=BOTH, expand=YES)
 
     logger.info("Aplicación iniciada.")
+    if os.environ.get(STARTUP_PROBE_ENV_VAR):
+        app.after_idle(app.destroy) # Medición del arranque: cerrar en cuanto la ventana se dibuja
     app.mainloop()
+    # Al cerrar solo se vacían los servicios que llegaron a usarse (no se construyen para nada)
+    from src.utils.service_registry import service_registry
+    if service_registry.is_loaded("notification_service"):
+        from src.services.notification_service import notification_service
+        if not notification_service.flush(NOTIFICATION_SHUTDOWN_FLUSH_SECONDS):
+            logger.warning("Quedaron notificaciones por correo sin entregar al cerrar la aplicación.")
+    if service_registry.is_loaded("mysql_pool_service"):
+        from src.services.mysql_pool_service import mysql_pool_service
+        mysql_pool_service.close_all()
     logger.info("Aplicación cerrada.")
     sys.exit(0)
 
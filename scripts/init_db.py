@@ -11,6 +11,7 @@ sys.path.insert(0, project_root)
 from src.models.database import database
 from src.services.encryption_service import encryption_service
 from src.repositories.app_settings_repository import app_settings_repository
+from src.utils.service_registry import service_registry
 from src.utils.helpers import setup_logging, get_app_data_path
 from src.utils.constants import DB_FILE, ENCRYPTION_KEY_FILE
 
@@ -28,16 +29,16 @@ def initialize_database():
         # La conexión a la base de datos y la inicialización del esquema
         # se manejan automáticamente al instanciar `database`
         # y al llamar a `_connect` y `_initialize_schema` en su constructor.
-        # Solo necesitamos asegurarnos de que la instancia global esté accesible.
-        _ = database 
+        # Las instancias globales se construyen en su primer uso: hay que pedirlas al registro.
+        service_registry.get("database")
         logger.info(f"Base de datos '{get_app_data_path(DB_FILE)}' verificada/creada.")
 
         # Asegurar que la clave de encriptación exista
-        _ = encryption_service
+        service_registry.get("encryption_service")
         logger.info(f"Clave de encriptación '{get_app_data_path(ENCRYPTION_KEY_FILE)}' verificada/creada.")
 
         # Asegurar que los ajustes por defecto existan
-        _ = app_settings_repository
+        service_registry.get("app_settings_repository")
         logger.info("Ajustes de aplicación por defecto verificados/creados.")
 
         logger.info("Base de datos y servicios iniciales configurados exitosamente.")
@@ -0,0 +1,85 @@
+"""
+Mide el arranque en frío de la aplicación: lanza main.py varias veces en procesos nuevos, informa el
+tiempo total (mediana, mínimo y máximo) y, con los datos de `python -X importtime` de la última
+ejecución, los módulos que más tardan en importarse.
+
+Uso:
+    python scripts/startup_benchmark.py                  # interfaz gráfica (se cierra al mostrarse)
+    python scripts/startup_benchmark.py -- progress      # un comando de la línea de comandos
+    python scripts/startup_benchmark.py --runs 10 --top 25 -- verify
+
+Termina con código 1 si la mediana supera el presupuesto (STARTUP_BUDGET_MS o --budget-ms).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+# Añadir el directorio raíz del proyecto al PYTHONPATH
+# Esto permite importar módulos de src/
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.insert(0, project_root)
+
+from src.utils.constants import STARTUP_BUDGET_MS, STARTUP_PROBE_ENV_VAR
+
+def run_once(app_args: List[str], import_time: bool) -> Tuple[float, str]:
+    """Ejecuta main.py en un proceso nuevo. Retorna (milisegundos, stderr)."""
+    command = [sys.executable]
+    if import_time:
+        command += ["-X", "importtime"]
+    command += [os.path.join(project_root, "main.py")] + app_args
+    env = dict(os.environ, **{STARTUP_PROBE_ENV_VAR: "1"})
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=project_root, env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if result.returncode not in (0, 1): # 1: algunos comandos lo usan para "problemas encontrados"
+        tail = "\n".join(line for line in result.stderr.splitlines() if not line.startswith("import time:"))[-2000:]
+        raise SystemExit(f"main.py terminó con código {result.returncode}:\n{tail}")
+    return elapsed_ms, result.stderr
+
+def parse_import_times(stderr: str) -> List[Tuple[int, int, int, str]]:
+    """Líneas de -X importtime como (propio µs, acumulado µs, profundidad, módulo)."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        entries.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return entries
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Mide el tiempo de arranque en frío de main.py")
+    parser.add_argument("--runs", type=int, default=5, help="Ejecuciones medidas (tras una de calentamiento)")
+    parser.add_argument("--top", type=int, default=15, help="Módulos a mostrar en el desglose de importaciones")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help="Presupuesto para la mediana")
+    parser.add_argument("app_args", nargs=argparse.REMAINDER, help="Argumentos de main.py (tras --); vacío = interfaz gráfica")
+    args = parser.parse_args()
+    app_args = [arg for arg in args.app_args if arg != "--"]
+    label = " ".join(app_args) or "interfaz gráfica"
+
+    run_once(app_args, import_time=False) # Calentamiento: .pyc compilados y caché de disco del sistema
+    timings = [run_once(app_args, import_time=False)[0] for _ in range(args.runs)]
+    _, stderr = run_once(app_args, import_time=True)
+    entries = parse_import_times(stderr)
+
+    median = statistics.median(timings)
+    print(f"Arranque ({label}): mediana {median:.0f} ms, mínimo {min(timings):.0f} ms, "
+          f"máximo {max(timings):.0f} ms en {args.runs} ejecuciones (presupuesto {args.budget_ms:.0f} ms)")
+    print(f"Importaciones: {len(entries)} módulos, {sum(entry[0] for entry in entries) / 1000:.0f} ms en total")
+
+    print("\nImportaciones de primer nivel más lentas (acumulado):")
+    for self_us, cumulative_us, depth, name in sorted((e for e in entries if e[2] == 0), key=lambda e: -e[1])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    print("\nMódulos más lentos (tiempo propio):")
+    for self_us, cumulative_us, depth, name in sorted(entries, key=lambda e: -e[0])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {name}")
+    return 0 if median <= args.budget_ms else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Interfaz de línea de comandos para tareas de mantenimiento sin abrir la interfaz gráfica.
+Uso: python main.py <comando> [opciones]
+"""
+import argparse
+import logging
+import sys
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+def _resolve_config_id(config_name: Optional[str]) -> Optional[int]:
+    if config_name is None:
+        return None
+    from .repositories.backup_config_repository import backup_config_repository
+    config = backup_config_repository.get_by_name(config_name)
+    if config is None:
+        raise SystemExit(f"Configuración no encontrada: {config_name}")
+    return config.id
+
+def _cmd_verify(args: argparse.Namespace) -> int:
+    from .services.verification_service import verification_service
+    report = verification_service.verify(_resolve_config_id(args.config), workers=args.workers)
+    print(report.summary())
+    return 0 if report.is_healthy else 1
+
+def _cmd_restore(args: argparse.Namespace) -> int:
+    from .repositories.backup_config_repository import backup_config_repository
+    from .repositories.backup_history_repository import backup_history_repository
+    from .services.restore_service import restore_service
+    from .utils.helpers import format_bytes
+    config = backup_config_repository.get_by_name(args.config)
+    if config is None:
+        raise SystemExit(f"Configuración no encontrada: {args.config}")
+    artifact_path = args.file
+    if artifact_path is None:
+        history = backup_history_repository.get_by_id(args.history_id)
+        if history is None or not history.file_path:
+            raise SystemExit(f"El registro de historial {args.history_id} no tiene archivo de respaldo.")
+        artifact_path = history.file_path
+
+    def report_progress(raw_bytes: int, tables: int):
+        print(f"\r{format_bytes(raw_bytes)} leídos, {tables} tablas", end="", flush=True)
+
+    success, message = restore_service.restore(config, artifact_path, target_database=args.database,
+                                               parallelism=args.jobs, verify_checksum=not args.no_verify,
+                                               progress=report_progress, tables=args.table)
+    print()
+    print(message)
+    return 0 if success else 1
+
+def _cmd_tables(args: argparse.Namespace) -> int:
+    from .services.encryption_service import encryption_service # noqa: F401 - clave para leer archivos .mbk.enc
+    from .utils.helpers import format_bytes
+    from .utils.table_archive import TableArchiveReader
+    with TableArchiveReader(args.file) as reader:
+        for table in reader.tables():
+            print(f"{table['name']}\t{format_bytes(table['raw_size'])}\t{format_bytes(table['size'])} comprimido")
+    return 0
+
+def _cmd_extract(args: argparse.Namespace) -> int:
+    from .services.encryption_service import encryption_service # noqa: F401 - clave para leer archivos .mbk.enc
+    from .utils.table_archive import TableArchiveReader
+    with TableArchiveReader(args.file) as reader:
+        output = open(args.output, "wb") if args.output else sys.stdout.buffer
+        try:
+            for data in reader.iter_sql(args.table):
+                output.write(data)
+        finally:
+            if args.output:
+                output.close()
+    return 0
+
+def _cmd_progress(args: argparse.Namespace) -> int:
+    import time
+    from .repositories.backup_history_repository import backup_history_repository
+    from .utils.constants import PROGRESS_PERSIST_INTERVAL_SECONDS
+    config_id = _resolve_config_id(args.config)
+    while True:
+        running = [history for history in backup_history_repository.get_running()
+                   if config_id is None or history.config_id == config_id]
+        if not running:
+            print("No hay respaldos en curso.")
+        for history in running:
+            if history.is_queued:
+                summary = "en cola, esperando espacio en disco"
+            else:
+                summary = history.progress.summary() if history.progress else "sin progreso registrado"
+            print(f"[{history.id}] {history.config_name}: {summary}")
+        if not args.watch or not running:
+            return 0
+        time.sleep(PROGRESS_PERSIST_INTERVAL_SECONDS)
+        print()
+
+def _cmd_search(args: argparse.Namespace) -> int:
+    from .repositories.backup_history_repository import backup_history_repository
+    from .utils.helpers import parse_iso_datetime
+    if not backup_history_repository.search_enabled:
+        print("La búsqueda no está disponible: SQLite no incluye FTS5.")
+        return 1
+    results = backup_history_repository.search(args.text, limit=args.limit, raw_query=args.raw)
+    for result in results:
+        start_time = parse_iso_datetime(result["start_time"])
+        print(f"[{result['id']}] {start_time:%Y-%m-%d %H:%M} {result['config_name']} ({result['status']}): {result['snippet']}")
+    if not results:
+        print("Sin resultados.")
+    return 0
+
+def _cmd_retention(args: argparse.Namespace) -> int:
+    from .repositories.backup_config_repository import backup_config_repository
+    from .services.retention_service import retention_service
+    if args.config is None:
+        configs = backup_config_repository.get_all()
+    else:
+        configs = [backup_config_repository.get_by_name(args.config)]
+        if configs[0] is None:
+            raise SystemExit(f"Configuración no encontrada: {args.config}")
+    for config in configs:
+        plan = retention_service.run(config, dry_run=not args.apply)
+        print(plan.report())
+    if not args.apply:
+        print("Simulación: no se eliminó nada. Use --apply para aplicar la retención.")
+    return 0
+
+def _cmd_rotate_key(args: argparse.Namespace) -> int:
+    from .services.key_rotation_service import key_rotation_service
+    success, message = key_rotation_service.rotate()
+    print(message)
+    return 0 if success else 1
+
+def _cmd_retire_key(args: argparse.Namespace) -> int:
+    from .services.key_rotation_service import key_rotation_service
+    success, message = key_rotation_service.retire_key(args.version)
+    print(message)
+    return 0 if success else 1
+
+def build_parser() -> argparse.ArgumentParser:
+    from .utils.constants import VERIFY_WORKERS, RESTORE_PARALLELISM, SEARCH_DEFAULT_LIMIT
+    parser = argparse.ArgumentParser(prog="mysql-backup-manager", description="MySQL Backup Manager (línea de comandos)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    verify_parser = subparsers.add_parser("verify", help="Verifica el SHA-256 de los respaldos catalogados")
+    verify_parser.add_argument("--config", help="Nombre de la configuración (por defecto, todas)")
+    verify_parser.add_argument("--workers", type=int, default=VERIFY_WORKERS, help="Archivos verificados en paralelo")
+    verify_parser.set_defaults(handler=_cmd_verify)
+
+    restore_parser = subparsers.add_parser("restore", help="Restaura un respaldo en el servidor MySQL de una configuración")
+    restore_parser.add_argument("--config", required=True, help="Nombre de la configuración (servidor y credenciales)")
+    source_group = restore_parser.add_mutually_exclusive_group(required=True)
+    source_group.add_argument("--file", help="Archivo de respaldo a restaurar")
+    source_group.add_argument("--history-id", type=int, help="ID del historial cuyo respaldo se restaura")
+    restore_parser.add_argument("--database", help="Base de datos destino (por defecto, la de la configuración)")
+    restore_parser.add_argument("--jobs", type=int, default=RESTORE_PARALLELISM, help="Conexiones que cargan tablas en paralelo")
+    restore_parser.add_argument("--no-verify", action="store_true", help="No verificar el checksum antes de restaurar")
+    restore_parser.add_argument("--table", action="append", help="Restaurar solo esta tabla (repetible, requiere .mbk)")
+    restore_parser.set_defaults(handler=_cmd_restore)
+
+    tables_parser = subparsers.add_parser("tables", help="Lista las tablas de un respaldo .mbk")
+    tables_parser.add_argument("--file", required=True, help="Archivo .mbk (o .mbk.enc)")
+    tables_parser.set_defaults(handler=_cmd_tables)
+
+    extract_parser = subparsers.add_parser("extract", help="Extrae el SQL de tablas de un respaldo .mbk")
+    extract_parser.add_argument("--file", required=True, help="Archivo .mbk (o .mbk.enc)")
+    extract_parser.add_argument("--table", action="append", required=True, help="Tabla a extraer (repetible)")
+    extract_parser.add_argument("--output", help="Archivo de salida (por defecto, la salida estándar)")
+    extract_parser.set_defaults(handler=_cmd_extract)
+
+    progress_parser = subparsers.add_parser("progress", help="Muestra el progreso de los respaldos en curso")
+    progress_parser.add_argument("--config", help="Nombre de la configuración (por defecto, todas)")
+    progress_parser.add_argument("--watch", action="store_true", help="Repetir hasta que no quede ningún respaldo en curso")
+    progress_parser.set_defaults(handler=_cmd_progress)
+
+    search_parser = subparsers.add_parser("search", help="Busca texto en los logs y mensajes del historial")
+    search_parser.add_argument("text", help="Texto a buscar (como frase exacta, salvo con --raw)")
+    search_parser.add_argument("--raw", action="store_true", help="Usar la sintaxis de consulta de FTS5 (OR, NOT, prefijo*)")
+    search_parser.add_argument("--limit", type=int, default=SEARCH_DEFAULT_LIMIT, help="Resultados como máximo")
+    search_parser.set_defaults(handler=_cmd_search)
+
+    retention_parser = subparsers.add_parser("retention", help="Muestra qué respaldos eliminaría la política de retención")
+    retention_parser.add_argument("--config", help="Nombre de la configuración (por defecto, todas)")
+    retention_parser.add_argument("--apply", action="store_true", help="Eliminar los respaldos en lugar de solo simularlo")
+    retention_parser.set_defaults(handler=_cmd_retention)
+
+    rotate_key_parser = subparsers.add_parser("rotate-key", help="Genera una clave de encriptación nueva y vuelve a cifrar los secretos")
+    rotate_key_parser.set_defaults(handler=_cmd_rotate_key)
+
+    retire_key_parser = subparsers.add_parser("retire-key", help="Elimina una clave anterior que ya no cifra ningún secreto ni respaldo")
+    retire_key_parser.add_argument("--version", type=int, required=True, help="Versión de la clave a retirar")
+    retire_key_parser.set_defaults(handler=_cmd_retire_key)
+    return parser
+
+def run(argv: List[str]) -> int:
+    """Ejecuta un comando y retorna el código de salida."""
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(run(sys.argv[1:]))
@@ -1,11 +1,11 @@
 from collections.abc import Mapping
-from typing import Optional, Tuple, Any  # Añadimos Any a la importación
+from typing import Optional, Tuple, Any, List, Dict  # Añadimos Any a la importación
 from datetime import datetime
 
 # Requiere Python 3.5+
-from ..utils.helpers import parse_iso_datetime
+from ..utils.helpers import parse_iso_datetime, to_json_string, from_json_string
 from ..utils.validators import is_valid_port, is_valid_retention_days, is_valid_email
-from ..utils.constants import NOTIFICATION_LEVELS
+from ..utils.constants import NOTIFICATION_LEVELS, NOTIFICATION_SINK_TYPES, SMTP_SECURITY_MODES
 
 class AppSettings:
     def __init__(self,
@@ -25,6 +25,10 @@ class AppSettings:
                  email_username: Optional[str] = None,
                  email_password_encrypted: Optional[str] = None,
                  email_sender_name: Optional[str] = None,
+                 email_smtp_security: str = 'starttls',
+                 max_bandwidth_kbps: int = 0,
+                 notification_digest_minutes: int = 0,
+                 notification_sinks: Optional[List[Dict[str, Any]]] = None,
                  created_at: Optional[datetime] = None,
                  updated_at: Optional[datetime] = None):
         self.id = id
@@ -43,6 +47,10 @@ class AppSettings:
         self.email_username = email_username
         self.email_password_encrypted = email_password_encrypted
         self.email_sender_name = email_sender_name
+        self.email_smtp_security = email_smtp_security
+        self.max_bandwidth_kbps = max_bandwidth_kbps
+        self.notification_digest_minutes = notification_digest_minutes
+        self.notification_sinks = notification_sinks if notification_sinks is not None else []
         self.created_at = created_at if created_at else datetime.now()
         self.updated_at = updated_at if updated_at else datetime.now()
 
@@ -65,6 +73,10 @@ class AppSettings:
             "email_username": self.email_username,
             "email_password_encrypted": self.email_password_encrypted,
             "email_sender_name": self.email_sender_name,
+            "email_smtp_security": self.email_smtp_security,
+            "max_bandwidth_kbps": self.max_bandwidth_kbps,
+            "notification_digest_minutes": self.notification_digest_minutes,
+            "notification_sinks": to_json_string(self.notification_sinks),
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat()
         }
@@ -72,6 +84,10 @@ class AppSettings:
     @classmethod
     def from_dict(cls, data: Mapping[str, Any]) -> "AppSettings":
         """Crea un objeto AppSettings desde un diccionario."""
+        # En la base de datos los canales están en JSON; en una importación pueden venir ya como lista
+        sinks = data.get("notification_sinks")
+        if not isinstance(sinks, list):
+            sinks = from_json_string(sinks)
         return cls(
             id=data.get("id"),
             window_width=data.get("window_width", 1024),
@@ -89,6 +105,10 @@ class AppSettings:
             email_username=data.get("email_username"),
             email_password_encrypted=data.get("email_password_encrypted"),
             email_sender_name=data.get("email_sender_name"),
+            email_smtp_security=data.get("email_smtp_security") or 'starttls',
+            max_bandwidth_kbps=data.get("max_bandwidth_kbps") or 0,
+            notification_digest_minutes=data.get("notification_digest_minutes") or 0,
+            notification_sinks=sinks,
             created_at=parse_iso_datetime(data.get("created_at")),
             updated_at=parse_iso_datetime(data.get("updated_at"))
         )
@@ -99,6 +119,19 @@ class AppSettings:
             return False, "Nivel de notificación inválido."
         if not is_valid_retention_days(str(self.log_retention_days)):
             return False, "Días de retención de logs inválidos (debe ser un número no negativo)."
+        if self.email_smtp_security not in SMTP_SECURITY_MODES:
+            return False, f"Seguridad SMTP inválida (valores admitidos: {', '.join(SMTP_SECURITY_MODES)})."
+        if self.max_bandwidth_kbps < 0:
+            return False, "Límite global de ancho de banda inválido (debe ser un número no negativo)."
+        if self.notification_digest_minutes < 0:
+            return False, "Ventana del resumen de notificaciones inválida (debe ser un número no negativo)."
+        for sink in self.notification_sinks:
+            if not isinstance(sink, dict) or sink.get("type") not in NOTIFICATION_SINK_TYPES:
+                return False, f"Canal de notificación inválido (tipos admitidos: {', '.join(NOTIFICATION_SINK_TYPES)})."
+            if sink.get("min_level", 'info') not in NOTIFICATION_LEVELS:
+                return False, f"Nivel mínimo inválido en el canal de notificación '{sink['type']}'."
+            if sink["type"] == "webhook" and not str(sink.get("url", "")).startswith(("http://", "https://")):
+                return False, "El canal webhook requiere una URL http(s)."
         
         if self.email_notifications_enabled:
             if not self.email_recipient or not is_valid_email(self.email_recipient):
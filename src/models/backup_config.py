@@ -2,11 +2,6 @@ import json
 import logging
 from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
-from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QListWidget, QListWidgetItem,
-    QMessageBox, QLabel, QLineEdit, QFormLayout, QSpacerItem, QSizePolicy
-)
-from PyQt5.QtCore import pyqtSignal, Qt
 
 from ..utils.helpers import to_json_string, from_json_string, get_current_timestamp, parse_iso_datetime
 from ..utils.validators import (
@@ -14,6 +9,7 @@ from ..utils.validators import (
     is_valid_retention_days, is_valid_host
 )
 from ..utils.constants import COMPRESSION_METHODS
+from ..utils.table_rules import validate_rules
 
 
 class BackupConfig:
@@ -27,10 +23,21 @@ class BackupConfig:
         database_name: str = "",
         mysqldump_path: str = "",
         backup_path: str = "",
+        segregated_path: str = "",
         excluded_tables: Optional[List[str]] = None,
+        include_patterns: Optional[List[str]] = None,
+        exclude_patterns: Optional[List[str]] = None,
         compression_method: str = "zip",
         retention_days_main: int = 7,
         retention_days_segregated: int = 30,
+        keep_hourly: int = 0,
+        keep_daily: int = 0,
+        keep_weekly: int = 0,
+        keep_monthly: int = 0,
+        keep_yearly: int = 0,
+        max_bandwidth_kbps: int = 0,
+        low_priority: bool = False,
+        encrypt_artifacts: bool = False,
         is_active: bool = True,
         created_at: Optional[datetime] = None,
         updated_at: Optional[datetime] = None):
@@ -44,10 +51,21 @@ class BackupConfig:
         self.database_name = database_name
         self.mysqldump_path = mysqldump_path
         self.backup_path = backup_path
+        self.segregated_path = segregated_path
         self.excluded_tables = excluded_tables if excluded_tables is not None else []
+        self.include_patterns = include_patterns if include_patterns is not None else []
+        self.exclude_patterns = exclude_patterns if exclude_patterns is not None else []
         self.compression_method = compression_method.lower()
         self.retention_days_main = retention_days_main
         self.retention_days_segregated = retention_days_segregated
+        self.keep_hourly = keep_hourly
+        self.keep_daily = keep_daily
+        self.keep_weekly = keep_weekly
+        self.keep_monthly = keep_monthly
+        self.keep_yearly = keep_yearly
+        self.max_bandwidth_kbps = max_bandwidth_kbps
+        self.low_priority = low_priority
+        self.encrypt_artifacts = encrypt_artifacts
         self.is_active = is_active
         self.created_at = created_at if created_at else datetime.now()
         self.updated_at = updated_at if updated_at else datetime.now()
@@ -64,10 +82,21 @@ class BackupConfig:
             "database_name": self.database_name,
             "mysqldump_path": self.mysqldump_path,
             "backup_path": self.backup_path,
+            "segregated_path": self.segregated_path,
             "excluded_tables": to_json_string(self.excluded_tables),
+            "include_patterns": to_json_string(self.include_patterns),
+            "exclude_patterns": to_json_string(self.exclude_patterns),
             "compression_method": self.compression_method,
             "retention_days_main": self.retention_days_main,
             "retention_days_segregated": self.retention_days_segregated,
+            "keep_hourly": self.keep_hourly,
+            "keep_daily": self.keep_daily,
+            "keep_weekly": self.keep_weekly,
+            "keep_monthly": self.keep_monthly,
+            "keep_yearly": self.keep_yearly,
+            "max_bandwidth_kbps": self.max_bandwidth_kbps,
+            "low_priority": int(self.low_priority),
+            "encrypt_artifacts": int(self.encrypt_artifacts),
             "is_active": int(self.is_active),
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat()
@@ -76,15 +105,10 @@ class BackupConfig:
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "BackupConfig":
         """Crea un objeto BackupConfig desde un diccionario."""
-        # Manejo robusto de excluded_tables
-        raw_excluded = data.get("excluded_tables", "[]")
-        if isinstance(raw_excluded, list):
-            excluded = raw_excluded
-        else:
-            try:
-                excluded = from_json_string(raw_excluded) or []
-            except Exception:
-                excluded = []
+        # Manejo robusto de excluded_tables y de las reglas por patrón (listas guardadas como JSON)
+        excluded = cls._json_list(data.get("excluded_tables", "[]"))
+        include_patterns = cls._json_list(data.get("include_patterns"))
+        exclude_patterns = cls._json_list(data.get("exclude_patterns"))
 
         # Manejo robusto de fechas
         created = parse_iso_datetime(data.get("created_at")) or datetime.now()
@@ -100,18 +124,65 @@ class BackupConfig:
             database_name=data.get("database_name", ""),
             mysqldump_path=data.get("mysqldump_path", ""),
             backup_path=data.get("backup_path", ""),
+            segregated_path=data.get("segregated_path") or "",
             excluded_tables=excluded,
+            include_patterns=include_patterns,
+            exclude_patterns=exclude_patterns,
             compression_method=data.get("compression_method", "zip"),
             retention_days_main=data.get("retention_days_main", 7),
             retention_days_segregated=data.get("retention_days_segregated", 30),
+            keep_hourly=data.get("keep_hourly") or 0,
+            keep_daily=data.get("keep_daily") or 0,
+            keep_weekly=data.get("keep_weekly") or 0,
+            keep_monthly=data.get("keep_monthly") or 0,
+            keep_yearly=data.get("keep_yearly") or 0,
+            max_bandwidth_kbps=data.get("max_bandwidth_kbps") or 0,
+            low_priority=bool(data.get("low_priority", False)),
+            encrypt_artifacts=bool(data.get("encrypt_artifacts", False)),
             is_active=bool(data.get("is_active", True)),
             created_at=created,
             updated_at=updated
         )
 
+    @staticmethod
+    def _json_list(raw_value: Any) -> List[str]:
+        if isinstance(raw_value, list):
+            return raw_value
+        if not raw_value:
+            return []
+        try:
+            return from_json_string(raw_value) or []
+        except Exception:
+            return []
+
     def __repr__(self):
         return f"<BackupConfig(id={self.id}, name='{self.name}', database='{self.database_name}')>"
 
+    @property
+    def gfs_policy(self) -> Dict[str, int]:
+        """Retorna cuántos respaldos conservar por periodo GFS."""
+        return {
+            "hourly": self.keep_hourly,
+            "daily": self.keep_daily,
+            "weekly": self.keep_weekly,
+            "monthly": self.keep_monthly,
+            "yearly": self.keep_yearly
+        }
+
+    @property
+    def max_bandwidth_bytes(self) -> int:
+        """Límite de lectura de mysqldump en bytes por segundo (0 = sin límite)."""
+        return self.max_bandwidth_kbps * 1024
+
+    @property
+    def uses_gfs_retention(self) -> bool:
+        return any(keep > 0 for keep in self.gfs_policy.values())
+
+    @property
+    def has_table_rules(self) -> bool:
+        """Si las tablas a respaldar dependen de reglas por patrón (y no solo de la lista de excluidas)."""
+        return bool(self.include_patterns or self.exclude_patterns)
+
     def validate(self) -> Tuple[bool, str]:
         """Valida los campos de la configuración de respaldo."""
         logging.debug("Validando configuración de respaldo: %s", self.to_dict())
@@ -130,11 +201,22 @@ class BackupConfig:
             return False, "Ruta de mysqldump inválida o el archivo no existe."
         if not self.backup_path.strip() or not is_valid_path(self.backup_path):
             return False, "Ruta de respaldo inválida o el directorio no existe."
+        if self.segregated_path.strip() and not self.segregated_path.startswith("s3://") and not is_valid_path(self.segregated_path):
+            return False, "Ruta segregada inválida: debe ser un directorio existente o una URL s3://bucket/prefijo."
         if self.compression_method.lower() not in [m.lower() for m in COMPRESSION_METHODS]:
             return False, "Método de compresión inválido."
         if not is_valid_retention_days(str(self.retention_days_main)):
             return False, "Días de retención principal inválidos (debe ser un número no negativo)."
         if not is_valid_retention_days(str(self.retention_days_segregated)):
             return False, "Días de retención segregados inválidos (debe ser un número no negativo)."
+        for period, keep in self.gfs_policy.items():
+            if not is_valid_retention_days(str(keep)):
+                return False, f"Retención GFS '{period}' inválida (debe ser un número no negativo)."
+        if self.max_bandwidth_kbps < 0:
+            return False, "Límite de ancho de banda inválido (debe ser un número no negativo)."
+        for rules in (self.include_patterns, self.exclude_patterns):
+            valid_rules, rules_message = validate_rules(rules)
+            if not valid_rules:
+                return False, rules_message
 
         return True, "Validación exitosa."
@@ -0,0 +1,62 @@
+"""
+Modelo de datos para el catálogo de archivos de respaldo
+"""
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+from ..utils.helpers import parse_iso_datetime, format_bytes
+from ..utils.constants import STORAGE_TIER_HOT
+
+class BackupFile:
+    def __init__(self,
+                 id: Optional[int] = None,
+                 config_id: int = 0,
+                 history_id: Optional[int] = None,
+                 file_path: str = "",
+                 created_at: Optional[datetime] = None,
+                 file_size: Optional[int] = None,
+                 checksum: Optional[str] = None,
+                 tier: str = STORAGE_TIER_HOT):
+        self.id = id
+        self.config_id = config_id
+        self.history_id = history_id
+        self.file_path = file_path
+        self.created_at = created_at if created_at else datetime.now()
+        self.file_size = file_size
+        self.checksum = checksum
+        self.tier = tier
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte el objeto BackupFile a un diccionario."""
+        return {
+            "id": self.id,
+            "config_id": self.config_id,
+            "history_id": self.history_id,
+            "file_path": self.file_path,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "file_size": self.file_size,
+            "checksum": self.checksum,
+            "tier": self.tier
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BackupFile":
+        """Crea un objeto BackupFile desde un diccionario."""
+        return cls(
+            id=data.get("id"),
+            config_id=data.get("config_id", 0),
+            history_id=data.get("history_id"),
+            file_path=data.get("file_path", ""),
+            created_at=parse_iso_datetime(data.get("created_at")),
+            file_size=data.get("file_size"),
+            checksum=data.get("checksum"),
+            tier=data.get("tier", STORAGE_TIER_HOT)
+        )
+
+    def __repr__(self):
+        return f"<BackupFile(id={self.id}, config_id={self.config_id}, file_path='{self.file_path}', tier='{self.tier}')>"
+
+    @property
+    def file_size_formatted(self) -> str:
+        """Retorna el tamaño del archivo formateado"""
+        return format_bytes(self.file_size)
@@ -1,14 +1,17 @@
 """
 Modelo de datos para el historial de respaldos
 """
+import json
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from enum import Enum
 
+from .backup_progress import BackupProgress
 from ..utils.helpers import parse_iso_datetime, format_bytes, format_duration
 
 class BackupStatus(Enum):
+    QUEUED = "queued"
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
@@ -25,6 +28,9 @@ class BackupHistory:
                  message: Optional[str] = None,
                  file_path: Optional[str] = None,
                  file_size: Optional[int] = None,
+                 checksum: Optional[str] = None,
+                 raw_size: Optional[int] = None,
+                 progress: Optional[BackupProgress] = None,
                  duration_seconds: Optional[float] = None,
                  log_output: Optional[str] = None,
                  is_manual: bool = False):
@@ -37,6 +43,9 @@ class BackupHistory:
         self.message = message
         self.file_path = file_path
         self.file_size = file_size
+        self.checksum = checksum
+        self.raw_size = raw_size
+        self.progress = progress
         self.duration_seconds = duration_seconds
         self.log_output = log_output
         self.is_manual = is_manual
@@ -53,6 +62,9 @@ class BackupHistory:
             "message": self.message,
             "file_path": self.file_path,
             "file_size": self.file_size,
+            "checksum": self.checksum,
+            "raw_size": self.raw_size,
+            "progress": self.progress.to_dict() if self.progress else None,
             "duration_seconds": self.duration_seconds,
             "log_output": self.log_output,
             "is_manual": int(self.is_manual)
@@ -61,6 +73,9 @@ class BackupHistory:
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "BackupHistory":
         """Crea un objeto BackupHistory desde un diccionario."""
+        progress = data.get("progress")
+        if isinstance(progress, str): # Columna JSON de la base de datos
+            progress = json.loads(progress)
         return cls(
             id=data.get("id"),
             config_id=data.get("config_id", 0),
@@ -71,6 +86,9 @@ class BackupHistory:
             message=data.get("message"),
             file_path=data.get("file_path"),
             file_size=data.get("file_size"),
+            checksum=data.get("checksum"),
+            raw_size=data.get("raw_size"),
+            progress=BackupProgress.from_dict(progress) if progress else None,
             duration_seconds=data.get("duration_seconds"),
             log_output=data.get("log_output"),
             is_manual=bool(data.get("is_manual", False))
@@ -100,3 +118,7 @@ class BackupHistory:
     @property
     def is_running(self) -> bool:
         return self.status == "running"
+
+    @property
+    def is_queued(self) -> bool:
+        return self.status == "queued"
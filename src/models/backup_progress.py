@@ -0,0 +1,105 @@
+"""
+Modelo de datos para el progreso de un respaldo en curso
+"""
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+from ..utils.helpers import parse_iso_datetime, format_bytes, format_duration
+
+class BackupProgress:
+    def __init__(self,
+                 history_id: Optional[int] = None,
+                 config_id: int = 0,
+                 config_name: str = "",
+                 bytes_read: int = 0,
+                 artifact_bytes: int = 0,
+                 rows: int = 0,
+                 tables_done: int = 0,
+                 tables_total: Optional[int] = None,
+                 current_table: Optional[str] = None,
+                 expected_bytes: Optional[int] = None,
+                 throughput: float = 0.0,
+                 eta_seconds: Optional[float] = None,
+                 finished: bool = False,
+                 updated_at: Optional[datetime] = None):
+        self.history_id = history_id
+        self.config_id = config_id
+        self.config_name = config_name
+        self.bytes_read = bytes_read # SQL leído de mysqldump
+        self.artifact_bytes = artifact_bytes # Bytes escritos en disco (comprimidos)
+        self.rows = rows # Aproximado: filas de los INSERT extendidos
+        self.tables_done = tables_done
+        self.tables_total = tables_total
+        self.current_table = current_table
+        self.expected_bytes = expected_bytes # Estimación del SQL total (respaldo anterior o information_schema)
+        self.throughput = throughput # Bytes de SQL por segundo
+        self.eta_seconds = eta_seconds
+        self.finished = finished
+        self.updated_at = updated_at if updated_at else datetime.now()
+
+    @property
+    def percent(self) -> Optional[float]:
+        """Porcentaje estimado completado (None si no hay con qué estimarlo)."""
+        if self.finished:
+            return 100.0
+        if self.expected_bytes:
+            return min(99.0, self.bytes_read * 100.0 / self.expected_bytes)
+        if self.tables_total:
+            return min(99.0, self.tables_done * 100.0 / self.tables_total)
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "history_id": self.history_id,
+            "config_id": self.config_id,
+            "config_name": self.config_name,
+            "bytes_read": self.bytes_read,
+            "artifact_bytes": self.artifact_bytes,
+            "rows": self.rows,
+            "tables_done": self.tables_done,
+            "tables_total": self.tables_total,
+            "current_table": self.current_table,
+            "expected_bytes": self.expected_bytes,
+            "throughput": self.throughput,
+            "eta_seconds": self.eta_seconds,
+            "finished": self.finished,
+            "updated_at": self.updated_at.isoformat()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BackupProgress":
+        return cls(
+            history_id=data.get("history_id"),
+            config_id=data.get("config_id", 0),
+            config_name=data.get("config_name", ""),
+            bytes_read=data.get("bytes_read", 0),
+            artifact_bytes=data.get("artifact_bytes", 0),
+            rows=data.get("rows", 0),
+            tables_done=data.get("tables_done", 0),
+            tables_total=data.get("tables_total"),
+            current_table=data.get("current_table"),
+            expected_bytes=data.get("expected_bytes"),
+            throughput=data.get("throughput", 0.0),
+            eta_seconds=data.get("eta_seconds"),
+            finished=bool(data.get("finished", False)),
+            updated_at=parse_iso_datetime(data.get("updated_at"))
+        )
+
+    def summary(self) -> str:
+        """Texto breve para la UI y la línea de comandos."""
+        parts = []
+        percent = self.percent
+        if percent is not None:
+            parts.append(f"{percent:.0f}%")
+        tables = f"{self.tables_done}/{self.tables_total}" if self.tables_total else str(self.tables_done)
+        parts.append(f"{tables} tablas")
+        if self.current_table and not self.finished:
+            parts.append(f"tabla `{self.current_table}`")
+        parts.append(f"{format_bytes(self.bytes_read)} (~{self.rows} filas)")
+        parts.append(f"{format_bytes(int(self.throughput))}/s")
+        if self.eta_seconds is not None and not self.finished:
+            parts.append(f"ETA {format_duration(self.eta_seconds)}")
+        return " · ".join(parts)
+
+    def __repr__(self):
+        return f"<BackupProgress(history_id={self.history_id}, bytes_read={self.bytes_read})>"
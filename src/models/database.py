@@ -1,10 +1,14 @@
 import sqlite3
 import logging
 import os
-from typing import List, Tuple, Any, Optional, Dict
+import threading
+from contextlib import contextmanager
+from typing import List, Tuple, Any, Optional, Dict, Iterator, Callable
 
 from ..utils.helpers import get_app_data_path
-from ..utils.constants import DB_FILE, DB_SCHEMA
+from ..utils.constants import (DB_FILE, DB_SCHEMA, DB_MIGRATIONS, DB_REQUIRED_TABLES,
+                               DB_BACKUP_PAGES_PER_STEP, DB_BACKUP_STEP_SLEEP)
+from ..utils.service_registry import lazy_service, service_registry
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +17,9 @@ class Database:
         self.db_path = get_app_data_path(DB_FILE)
         self.conn: Optional[sqlite3.Connection] = None
         self.cursor: Optional[sqlite3.Cursor] = None
+        # La conexión se comparte entre la UI y los hilos de respaldo: cada operación toma el lock
+        self._lock = threading.RLock()
+        self._local = threading.local() # lastrowid por hilo
         self._connect()
         self._initialize_schema()
         logger.info(f"Base de datos inicializada en: {self.db_path}")
@@ -20,7 +27,7 @@ class Database:
     def _connect(self):
         """Establece la conexión a la base de datos."""
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
             self.conn.row_factory = sqlite3.Row # Para acceder a las columnas por nombre
             self.cursor = self.conn.cursor()
             logger.debug("Conexión a la base de datos establecida.")
@@ -31,6 +38,8 @@ class Database:
     def _initialize_schema(self):
         """Crea las tablas si no existen."""
         try:
+            # Las migraciones van primero: el esquema puede crear índices sobre columnas nuevas
+            self._apply_migrations()
             self.cursor.executescript(DB_SCHEMA)
             self.conn.commit()
             logger.info("Esquema de la base de datos verificado/creado.")
@@ -38,31 +47,71 @@ class Database:
             logger.critical(f"Error al inicializar el esquema de la base de datos: {e}")
             raise
 
+    def _apply_migrations(self):
+        """Añade a las tablas existentes las columnas que faltan según DB_MIGRATIONS."""
+        for table, column, definition in DB_MIGRATIONS:
+            existing_columns = {row["name"] for row in self.cursor.execute(f"PRAGMA table_info({table})")}
+            if not existing_columns or column in existing_columns:
+                continue # La tabla aún no existe (la crea el esquema) o ya tiene la columna
+            self.cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            logger.info(f"Migración aplicada: columna '{column}' añadida a '{table}'.")
+        self.conn.commit()
+
     def execute_query(self, query: str, params: Tuple[Any, ...] = ()) -> List[sqlite3.Row]:
         """Ejecuta una consulta SELECT y retorna los resultados."""
-        try:
-            self.cursor.execute(query, params)
-            return self.cursor.fetchall()
-        except sqlite3.Error as e:
-            logger.error(f"Error al ejecutar consulta: {query} con params {params}. Error: {e}")
-            return []
+        with self._lock:
+            try:
+                self.cursor.execute(query, params)
+                return self.cursor.fetchall()
+            except sqlite3.Error as e:
+                logger.error(f"Error al ejecutar consulta: {query} con params {params}. Error: {e}")
+                return []
 
     def execute_update(self, query: str, params: Tuple[Any, ...] = ()) -> int:
         """Ejecuta una consulta INSERT, UPDATE o DELETE y retorna el número de filas afectadas."""
-        try:
-            self.cursor.execute(query, params)
-            self.conn.commit()
-            return self.cursor.rowcount
-        except sqlite3.Error as e:
-            logger.error(f"Error al ejecutar actualización: {query} con params {params}. Error: {e}")
-            self.conn.rollback()
-            return -1
+        with self._lock:
+            try:
+                self.cursor.execute(query, params)
+                self.conn.commit()
+                self._local.lastrowid = self.cursor.lastrowid
+                return self.cursor.rowcount
+            except sqlite3.Error as e:
+                logger.error(f"Error al ejecutar actualización: {query} con params {params}. Error: {e}")
+                self.conn.rollback()
+                return -1
+
+    def execute_script(self, script: str) -> bool:
+        """Ejecuta un script SQL (DDL). Retorna False si falla."""
+        with self._lock:
+            try:
+                self.cursor.executescript(script)
+                self.conn.commit()
+                return True
+            except sqlite3.Error as e:
+                logger.error(f"Error al ejecutar script SQL: {e}")
+                self.conn.rollback()
+                return False
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """
+        Ejecuta varias sentencias en una sola transacción sobre la conexión compartida.
+        Confirma al salir del bloque y revierte si se produce una excepción.
+        """
+        with self._lock:
+            cursor = self.conn.cursor()
+            try:
+                yield cursor
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            finally:
+                cursor.close()
 
     def get_last_insert_rowid(self) -> Optional[int]:
-        """Retorna el ID de la última fila insertada."""
-        if self.cursor:
-            return self.cursor.lastrowid
-        return None
+        """Retorna el ID de la última fila insertada por el hilo actual."""
+        return getattr(self._local, "lastrowid", None)
 
     def close(self):
         """Cierra la conexión a la base de datos."""
@@ -70,48 +119,94 @@ class Database:
             self.conn.close()
             logger.debug("Conexión a la base de datos cerrada.")
 
-    def backup_database(self, backup_path: str):
-        """Crea una copia de seguridad de la base de datos actual."""
+    def backup_database(self, backup_path: str, pages_per_step: int = DB_BACKUP_PAGES_PER_STEP,
+                        step_sleep: float = DB_BACKUP_STEP_SLEEP,
+                        progress: Optional[Callable[[int, int, int], None]] = None):
+        """
+        Crea una copia de seguridad en caliente de la base de datos con la API de backup de SQLite.
+        La copia avanza de pages_per_step en pages_per_step páginas desde una conexión de lectura propia,
+        así que los respaldos en curso pueden seguir escribiendo su historial por la conexión compartida
+        (SQLite reinicia la copia si el origen cambia entre pasos). La copia se escribe en un archivo
+        temporal, se verifica y se mueve a su destino de forma atómica.
+        """
+        temp_path = f"{backup_path}.tmp"
         try:
-            # Cerrar la conexión actual para asegurar que el archivo no esté bloqueado
-            self.close()
-            
-            # Copiar el archivo de la base de datos
-            import shutil
-            shutil.copy2(self.db_path, backup_path)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            # La conexión compartida no se usa como origen: la API de backup la ocuparía entre pasos sin
+            # tomar self._lock, a la vez que otros hilos ejecutan consultas por ella
+            source = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            target = sqlite3.connect(temp_path)
+            try:
+                source.backup(target, pages=pages_per_step, progress=progress, sleep=step_sleep)
+                result = target.execute("PRAGMA quick_check").fetchone()
+            finally:
+                target.close()
+                source.close()
+            if not result or result[0] != "ok":
+                raise sqlite3.DatabaseError(f"La copia no superó la verificación de integridad: {result}")
+            os.replace(temp_path, backup_path)
             logger.info(f"Copia de seguridad de la base de datos creada en: {backup_path}")
-            
-            # Volver a conectar
-            self._connect()
         except Exception as e:
             logger.error(f"Error al crear copia de seguridad de la base de datos: {e}")
-            # Intentar reconectar incluso si falla la copia
-            self._connect()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
             raise
 
+    def _validate_backup_file(self, path: str) -> Tuple[bool, str]:
+        """Comprueba que un archivo es una base de datos SQLite íntegra con las tablas de la aplicación."""
+        try:
+            candidate = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                integrity = candidate.execute("PRAGMA integrity_check").fetchone()
+                if not integrity or integrity[0] != "ok":
+                    return False, f"verificación de integridad fallida: {integrity}"
+                tables = {row[0] for row in candidate.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            finally:
+                candidate.close()
+        except sqlite3.Error as e:
+            return False, f"no es una base de datos SQLite válida: {e}"
+        missing = [table for table in DB_REQUIRED_TABLES if table not in tables]
+        if missing:
+            return False, f"faltan tablas: {', '.join(missing)}"
+        return True, "ok"
+
     def restore_database(self, restore_path: str) -> bool:
-        """Restaura la base de datos desde un archivo de copia de seguridad."""
+        """
+        Restaura la base de datos desde un archivo de copia de seguridad.
+        El archivo se valida antes de tocar nada y se copia sobre la conexión abierta en un único paso
+        de la API de backup, de modo que el cambio es atómico y la conexión compartida sigue siendo válida.
+        """
         try:
             if not os.path.exists(restore_path):
                 logger.error(f"Archivo de respaldo para restaurar no encontrado: {restore_path}")
                 return False
-            
-            # Cerrar la conexión actual
-            self.close()
-            
-            # Reemplazar el archivo de la base de datos actual con el de respaldo
-            import shutil
-            shutil.copy2(restore_path, self.db_path)
+
+            is_valid, reason = self._validate_backup_file(restore_path)
+            if not is_valid:
+                logger.error(f"Archivo de respaldo no válido ({restore_path}): {reason}")
+                return False
+
+            # Guardar el estado actual por si hay que deshacer la restauración
+            self.backup_database(f"{self.db_path}.pre-restore")
+
+            source = sqlite3.connect(f"file:{restore_path}?mode=ro", uri=True)
+            try:
+                with self._lock:
+                    source.backup(self.conn)
+                    self._initialize_schema() # Aplicar migraciones si la copia es de una versión anterior
+            finally:
+                source.close()
+            # search_enabled y la tabla FTS dependen del contenido restaurado; si el repositorio aún no
+            # se ha construido, lo hará al construirse
+            if service_registry.is_loaded("backup_history_repository"):
+                from ..repositories.backup_history_repository import backup_history_repository
+                backup_history_repository.reload_search_index()
             logger.info(f"Base de datos restaurada desde: {restore_path}")
-            
-            # Volver a conectar
-            self._connect()
             return True
         except Exception as e:
             logger.error(f"Error al restaurar la base de datos: {e}")
-            # Intentar reconectar incluso si falla la restauración
-            self._connect()
             return False
 
 # Instancia global de la base de datos
-database = Database()
+database = lazy_service("database", Database)
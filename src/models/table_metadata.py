@@ -0,0 +1,65 @@
+"""
+Modelo de datos para los metadatos de una tabla MySQL (caché de information_schema.tables)
+"""
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+from ..utils.helpers import parse_iso_datetime, format_bytes
+
+class TableMetadata:
+    def __init__(self,
+                 table_name: str = "",
+                 table_type: str = "BASE TABLE",
+                 engine: Optional[str] = None,
+                 data_length: int = 0,
+                 index_length: int = 0,
+                 table_rows: int = 0,
+                 update_time: Optional[datetime] = None):
+        self.table_name = table_name
+        self.table_type = table_type
+        self.engine = engine
+        self.data_length = data_length
+        self.index_length = index_length
+        self.table_rows = table_rows # Estimación de InnoDB, no un COUNT(*)
+        self.update_time = update_time
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte el objeto TableMetadata a un diccionario."""
+        return {
+            "table_name": self.table_name,
+            "table_type": self.table_type,
+            "engine": self.engine,
+            "data_length": self.data_length,
+            "index_length": self.index_length,
+            "table_rows": self.table_rows,
+            "update_time": self.update_time.isoformat() if self.update_time else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TableMetadata":
+        """Crea un objeto TableMetadata desde un diccionario."""
+        return cls(
+            table_name=data.get("table_name", ""),
+            table_type=data.get("table_type") or "BASE TABLE",
+            engine=data.get("engine"),
+            data_length=data.get("data_length") or 0,
+            index_length=data.get("index_length") or 0,
+            table_rows=data.get("table_rows") or 0,
+            update_time=parse_iso_datetime(data.get("update_time"))
+        )
+
+    def __repr__(self):
+        return f"<TableMetadata(table_name='{self.table_name}', engine='{self.engine}', total_size={self.total_size})>"
+
+    @property
+    def is_view(self) -> bool:
+        return self.table_type == "VIEW"
+
+    @property
+    def total_size(self) -> int:
+        """Datos más índices en bytes, según information_schema."""
+        return self.data_length + self.index_length
+
+    @property
+    def total_size_formatted(self) -> str:
+        return format_bytes(self.total_size)
@@ -5,7 +5,8 @@ from typing import Optional, Dict, Any
 from ..models.database import database
 from ..models.app_settings import AppSettings
 from ..services.encryption_service import encryption_service
-from ..utils.helpers import get_current_timestamp, parse_iso_datetime
+from ..utils.helpers import get_current_timestamp, parse_iso_datetime, to_json_string
+from ..utils.service_registry import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -32,8 +33,9 @@ class AppSettingsRepository:
                 notification_level, log_retention_days, default_backup_path,
                 default_mysqldump_path, email_notifications_enabled, email_recipient,
                 email_smtp_server, email_smtp_port, email_username,
-                email_password_encrypted, email_sender_name, created_at, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                email_password_encrypted, email_sender_name, email_smtp_security, max_bandwidth_kbps,
+                notification_digest_minutes, notification_sinks, created_at, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """
         encrypted_password = self.encryption_service.encrypt(settings.email_password_encrypted) if settings.email_password_encrypted else None
         
@@ -44,7 +46,8 @@ class AppSettingsRepository:
             settings.default_mysqldump_path, int(settings.email_notifications_enabled),
             settings.email_recipient, settings.email_smtp_server, settings.email_smtp_port,
             settings.email_username, encrypted_password, settings.email_sender_name,
-            get_current_timestamp(), get_current_timestamp()
+            settings.email_smtp_security, settings.max_bandwidth_kbps, settings.notification_digest_minutes,
+            to_json_string(settings.notification_sinks), get_current_timestamp(), get_current_timestamp()
         )
         row_count = self.db.execute_update(query, params)
         if row_count > 0:
@@ -91,7 +94,8 @@ class AppSettingsRepository:
                 notification_level = ?, log_retention_days = ?, default_backup_path = ?,
                 default_mysqldump_path = ?, email_notifications_enabled = ?, email_recipient = ?,
                 email_smtp_server = ?, email_smtp_port = ?, email_username = ?,
-                email_password_encrypted = ?, email_sender_name = ?, updated_at = ?
+                email_password_encrypted = ?, email_sender_name = ?, email_smtp_security = ?, max_bandwidth_kbps = ?,
+                notification_digest_minutes = ?, notification_sinks = ?, updated_at = ?
             WHERE id = ?
         """
         params = (
@@ -101,7 +105,8 @@ class AppSettingsRepository:
             settings.default_mysqldump_path, int(settings.email_notifications_enabled),
             settings.email_recipient, settings.email_smtp_server, settings.email_smtp_port,
             settings.email_username, encrypted_password, settings.email_sender_name,
-            get_current_timestamp(), settings.id
+            settings.email_smtp_security, settings.max_bandwidth_kbps, settings.notification_digest_minutes,
+            to_json_string(settings.notification_sinks), get_current_timestamp(), settings.id
         )
         success = self.db.execute_update(query, params) > 0
         if success:
@@ -111,4 +116,4 @@ class AppSettingsRepository:
         return success
 
 # Instancia global del repositorio
-app_settings_repository = AppSettingsRepository()
+app_settings_repository = lazy_service("app_settings_repository", AppSettingsRepository)
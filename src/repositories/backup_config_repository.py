@@ -6,6 +6,7 @@ from ..models.database import database
 from ..models.backup_config import BackupConfig
 from ..services.encryption_service import encryption_service
 from ..utils.helpers import get_current_timestamp, from_json_string, to_json_string
+from ..utils.service_registry import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -20,20 +21,25 @@ class BackupConfigRepository:
         query = """
             INSERT INTO database_configs (
                 name, host, port, username, password_encrypted, database_name,
-                mysqldump_path, backup_path, excluded_tables, compression_method,
-                retention_days_main, retention_days_segregated, is_active,
-                created_at, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                mysqldump_path, backup_path, segregated_path, excluded_tables, include_patterns, exclude_patterns,
+                compression_method,
+                retention_days_main, retention_days_segregated,
+                keep_hourly, keep_daily, keep_weekly, keep_monthly, keep_yearly,
+                max_bandwidth_kbps, low_priority, encrypt_artifacts, is_active, created_at, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """
         # Encriptar la contraseña antes de guardar
         encrypted_password = self.encryption_service.encrypt(config.password_encrypted)
         
         params = (
             config.name, config.host, config.port, config.username, encrypted_password,
-            config.database_name, config.mysqldump_path, config.backup_path,
-            to_json_string(config.excluded_tables), config.compression_method,
-            config.retention_days_main, config.retention_days_segregated, int(config.is_active),
-            get_current_timestamp(), get_current_timestamp()
+            config.database_name, config.mysqldump_path, config.backup_path, config.segregated_path,
+            to_json_string(config.excluded_tables), to_json_string(config.include_patterns),
+            to_json_string(config.exclude_patterns), config.compression_method,
+            config.retention_days_main, config.retention_days_segregated,
+            config.keep_hourly, config.keep_daily, config.keep_weekly, config.keep_monthly, config.keep_yearly,
+            config.max_bandwidth_kbps, int(config.low_priority), int(config.encrypt_artifacts),
+            int(config.is_active), get_current_timestamp(), get_current_timestamp()
         )
         row_count = self.db.execute_update(query, params)
         if row_count > 0:
@@ -61,18 +67,22 @@ class BackupConfigRepository:
         query = """
             UPDATE database_configs SET
                 name = ?, host = ?, port = ?, username = ?, password_encrypted = ?,
-                database_name = ?, mysqldump_path = ?, backup_path = ?,
-                excluded_tables = ?, compression_method = ?,
-                retention_days_main = ?, retention_days_segregated = ?, is_active = ?,
-                updated_at = ?
+                database_name = ?, mysqldump_path = ?, backup_path = ?, segregated_path = ?,
+                excluded_tables = ?, include_patterns = ?, exclude_patterns = ?, compression_method = ?,
+                retention_days_main = ?, retention_days_segregated = ?,
+                keep_hourly = ?, keep_daily = ?, keep_weekly = ?, keep_monthly = ?, keep_yearly = ?,
+                max_bandwidth_kbps = ?, low_priority = ?, encrypt_artifacts = ?, is_active = ?, updated_at = ?
             WHERE id = ?
         """
         params = (
             config.name, config.host, config.port, config.username, encrypted_password,
-            config.database_name, config.mysqldump_path, config.backup_path,
-            to_json_string(config.excluded_tables), config.compression_method,
-            config.retention_days_main, config.retention_days_segregated, int(config.is_active),
-            get_current_timestamp(), config.id
+            config.database_name, config.mysqldump_path, config.backup_path, config.segregated_path,
+            to_json_string(config.excluded_tables), to_json_string(config.include_patterns),
+            to_json_string(config.exclude_patterns), config.compression_method,
+            config.retention_days_main, config.retention_days_segregated,
+            config.keep_hourly, config.keep_daily, config.keep_weekly, config.keep_monthly, config.keep_yearly,
+            config.max_bandwidth_kbps, int(config.low_priority), int(config.encrypt_artifacts),
+            int(config.is_active), get_current_timestamp(), config.id
         )
         success = self.db.execute_update(query, params) > 0
         if success:
@@ -142,4 +152,4 @@ class BackupConfigRepository:
         return configs
 
 # Instancia global del repositorio
-backup_config_repository = BackupConfigRepository()
+backup_config_repository = lazy_service("backup_config_repository", BackupConfigRepository)
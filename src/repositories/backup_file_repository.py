@@ -0,0 +1,114 @@
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from ..models.database import database
+from ..models.backup_file import BackupFile
+from ..utils.constants import STORAGE_TIER_HOT
+from ..utils.service_registry import lazy_service
+
+logger = logging.getLogger(__name__)
+
+class BackupFileRepository:
+    def __init__(self):
+        self.db = database
+        logger.info("Repositorio del catálogo de archivos de respaldo inicializado.")
+
+    def add(self, backup_file: BackupFile) -> Optional[BackupFile]:
+        """Registra un archivo de respaldo en el catálogo (reemplaza la entrada si la ruta ya existe)."""
+        query = """
+            INSERT OR REPLACE INTO backup_files (
+                config_id, history_id, file_path, created_at, file_size, checksum, tier
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """
+        params = (
+            backup_file.config_id, backup_file.history_id, backup_file.file_path,
+            backup_file.created_at.isoformat(), backup_file.file_size,
+            backup_file.checksum, backup_file.tier
+        )
+        row_count = self.db.execute_update(query, params)
+        if row_count > 0:
+            backup_file.id = self.db.get_last_insert_rowid()
+            logger.debug(f"Archivo catalogado: {backup_file.file_path} (ID: {backup_file.id})")
+            return backup_file
+        logger.error(f"Fallo al catalogar archivo de respaldo: {backup_file.file_path}")
+        return None
+
+    def update(self, backup_file: BackupFile) -> bool:
+        """Actualiza una entrada del catálogo (ej. tras moverla de nivel de almacenamiento)."""
+        if backup_file.id is None:
+            logger.error("No se puede actualizar la entrada del catálogo: ID no proporcionado.")
+            return False
+        query = """
+            UPDATE backup_files SET
+                config_id = ?, history_id = ?, file_path = ?, created_at = ?,
+                file_size = ?, checksum = ?, tier = ?
+            WHERE id = ?
+        """
+        params = (
+            backup_file.config_id, backup_file.history_id, backup_file.file_path,
+            backup_file.created_at.isoformat(), backup_file.file_size,
+            backup_file.checksum, backup_file.tier, backup_file.id
+        )
+        success = self.db.execute_update(query, params) > 0
+        if not success:
+            logger.error(f"Fallo al actualizar entrada del catálogo (ID: {backup_file.id})")
+        return success
+
+    def delete(self, file_id: int) -> bool:
+        """Elimina una entrada del catálogo (no toca el archivo en disco)."""
+        return self.db.execute_update("DELETE FROM backup_files WHERE id = ?", (file_id,)) > 0
+
+    def get_by_id(self, file_id: int) -> Optional[BackupFile]:
+        """Obtiene una entrada del catálogo por su ID."""
+        row = self.db.execute_query("SELECT * FROM backup_files WHERE id = ?", (file_id,))
+        if row:
+            return BackupFile.from_dict(dict(row[0]))
+        return None
+
+    def get_by_path(self, file_path: str) -> Optional[BackupFile]:
+        """Obtiene la entrada del catálogo de una ruta."""
+        row = self.db.execute_query("SELECT * FROM backup_files WHERE file_path = ?", (file_path,))
+        if row:
+            return BackupFile.from_dict(dict(row[0]))
+        return None
+
+    def get_by_config_id(self, config_id: int, tier: Optional[str] = None) -> List[BackupFile]:
+        """Obtiene los archivos de una configuración, del más reciente al más antiguo."""
+        if tier is None:
+            query = "SELECT * FROM backup_files WHERE config_id = ? ORDER BY created_at DESC"
+            params = (config_id,)
+        else:
+            query = "SELECT * FROM backup_files WHERE config_id = ? AND tier = ? ORDER BY created_at DESC"
+            params = (config_id, tier)
+        rows = self.db.execute_query(query, params)
+        return [BackupFile.from_dict(dict(row)) for row in rows]
+
+    def get_all(self) -> List[BackupFile]:
+        """Obtiene todo el catálogo, del archivo más reciente al más antiguo."""
+        rows = self.db.execute_query("SELECT * FROM backup_files ORDER BY created_at DESC")
+        return [BackupFile.from_dict(dict(row)) for row in rows]
+
+    def get_older_than(self, config_id: int, cutoff: datetime, tier: Optional[str] = None) -> List[BackupFile]:
+        """Obtiene los archivos de una configuración creados en o antes de `cutoff` (consulta indexada)."""
+        query = "SELECT * FROM backup_files WHERE config_id = ? AND created_at <= ?"
+        params = [config_id, cutoff.isoformat()]
+        if tier is not None:
+            query += " AND tier = ?"
+            params.append(tier)
+        rows = self.db.execute_query(query + " ORDER BY created_at", tuple(params))
+        return [BackupFile.from_dict(dict(row)) for row in rows]
+
+    def has_entries(self, config_id: int) -> bool:
+        """Indica si el catálogo tiene algún archivo de la configuración."""
+        return bool(self.db.execute_query("SELECT 1 FROM backup_files WHERE config_id = ? LIMIT 1", (config_id,)))
+
+    def get_paths(self, config_id: int, tier: str = STORAGE_TIER_HOT) -> List[str]:
+        """Retorna las rutas catalogadas de una configuración en un nivel de almacenamiento."""
+        rows = self.db.execute_query(
+            "SELECT file_path FROM backup_files WHERE config_id = ? AND tier = ?", (config_id, tier)
+        )
+        return [row[0] for row in rows]
+
+# Instancia global del repositorio
+backup_file_repository = lazy_service("backup_file_repository", BackupFileRepository)
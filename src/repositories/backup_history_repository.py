@@ -1,33 +1,71 @@
 import sqlite3
 import logging
-from typing import List, Optional, Dict, Any
+import gzip
+import json
+import os
+import time
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 
 from ..models.database import database
 from ..models.backup_history import BackupHistory
+from ..models.backup_progress import BackupProgress
+from .backup_log_repository import backup_log_repository
 from ..utils.helpers import get_current_timestamp, parse_iso_datetime
-from ..utils.constants import BACKUP_STATUS_SUCCESS, BACKUP_STATUS_FAILED, BACKUP_STATUS_RUNNING
+from ..utils.constants import (BACKUP_STATUS_SUCCESS, BACKUP_STATUS_FAILED, BACKUP_STATUS_QUEUED, BACKUP_STATUS_RUNNING,
+                               SEARCH_FTS_SCHEMA, SEARCH_DEFAULT_LIMIT, SEARCH_SNIPPET_TOKENS,
+                               HISTORY_PURGE_BATCH_SIZE, HISTORY_PURGE_PAUSE_SECONDS, HISTORY_ARCHIVE_WATERMARK_EXTENSION)
+from ..utils.service_registry import lazy_service
 
 logger = logging.getLogger(__name__)
 
+# Columnas de backup_history que se leen: log_output es obsoleta, los logs están en backup_log_chunks
+HISTORY_LIST_COLUMNS = (
+    "id", "config_id", "config_name", "start_time", "end_time", "status", "message",
+    "file_path", "file_size", "checksum", "raw_size", "progress", "duration_seconds", "is_manual"
+)
+HISTORY_SELECT = f"SELECT {', '.join(HISTORY_LIST_COLUMNS)} FROM backup_history"
+
 class BackupHistoryRepository:
     def __init__(self):
         self.db = database
+        self.log_repo = backup_log_repository
+        self.search_enabled = self._initialize_search_index()
         logger.info("Repositorio de historial de respaldos inicializado.")
 
+    def _initialize_search_index(self) -> bool:
+        """Crea el índice FTS5 si SQLite lo soporta. Si el índice es nuevo, indexa el historial existente."""
+        exists = self.db.execute_query(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'backup_history_fts'"
+        )
+        if not self.db.execute_script(SEARCH_FTS_SCHEMA):
+            logger.warning("SQLite sin soporte FTS5: la búsqueda en el historial no estará disponible.")
+            return False
+        if not exists:
+            self.search_enabled = True
+            self.rebuild_search_index()
+        return True
+
+    def reload_search_index(self):
+        """Vuelve a evaluar el índice de búsqueda después de reemplazar la base de datos (restauración)."""
+        self.search_enabled = self._initialize_search_index()
+        if self.search_enabled:
+            self.rebuild_search_index() # La copia pudo hacerse con ejecuciones aún sin indexar
+
     def add(self, history: BackupHistory) -> Optional[BackupHistory]:
         """Agrega un nuevo registro de historial de respaldo a la base de datos."""
         query = """
             INSERT INTO backup_history (
                 config_id, config_name, start_time, end_time, status, message,
-                file_path, file_size, duration_seconds, log_output, is_manual
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                file_path, file_size, checksum, raw_size, progress, duration_seconds, is_manual
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """
         params = (
             history.config_id, history.config_name, history.start_time.isoformat(),
             history.end_time.isoformat() if history.end_time else None,
             history.status, history.message, history.file_path, history.file_size,
-            history.duration_seconds, history.log_output, int(history.is_manual)
+            history.checksum, history.raw_size, self._progress_json(history),
+            history.duration_seconds, int(history.is_manual)
         )
         row_count = self.db.execute_update(query, params)
         if row_count > 0:
@@ -45,14 +83,16 @@ class BackupHistoryRepository:
         query = """
             UPDATE backup_history SET
                 config_id = ?, config_name = ?, start_time = ?, end_time = ?, status = ?, message = ?,
-                file_path = ?, file_size = ?, duration_seconds = ?, log_output = ?, is_manual = ?
+                file_path = ?, file_size = ?, checksum = ?, raw_size = ?, progress = ?,
+                duration_seconds = ?, is_manual = ?
             WHERE id = ?
         """
         params = (
             history.config_id, history.config_name, history.start_time.isoformat(),
             history.end_time.isoformat() if history.end_time else None,
             history.status, history.message, history.file_path, history.file_size,
-            history.duration_seconds, history.log_output, int(history.is_manual),
+            history.checksum, history.raw_size, self._progress_json(history),
+            history.duration_seconds, int(history.is_manual),
             history.id
         )
         success = self.db.execute_update(query, params) > 0
@@ -62,11 +102,23 @@ class BackupHistoryRepository:
             logger.error(f"Fallo al actualizar registro de historial (ID: {history.id})")
         return success
 
+    @staticmethod
+    def _progress_json(history: BackupHistory) -> Optional[str]:
+        return json.dumps(history.progress.to_dict()) if history.progress else None
+
+    def update_progress(self, history_id: int, progress: BackupProgress) -> bool:
+        """Guarda el último progreso de una ejecución en curso, sin tocar el resto del registro."""
+        query = "UPDATE backup_history SET progress = ? WHERE id = ? AND status = ?"
+        return self.db.execute_update(query, (json.dumps(progress.to_dict()), history_id, BACKUP_STATUS_RUNNING)) > 0
+
     def delete(self, history_id: int) -> bool:
         """Elimina un registro de historial de respaldo por su ID."""
         query = "DELETE FROM backup_history WHERE id = ?"
         success = self.db.execute_update(query, (history_id,)) > 0
         if success:
+            self.log_repo.delete_for_history(history_id)
+            if self.search_enabled:
+                self.db.execute_update("DELETE FROM backup_history_fts WHERE rowid = ?", (history_id,))
             logger.info(f"Registro de historial con ID: {history_id} eliminado.")
         else:
             logger.error(f"Fallo al eliminar registro de historial con ID: {history_id}")
@@ -74,7 +126,7 @@ class BackupHistoryRepository:
 
     def get_by_id(self, history_id: int) -> Optional[BackupHistory]:
         """Obtiene un registro de historial de respaldo por su ID."""
-        query = "SELECT * FROM backup_history WHERE id = ?"
+        query = f"{HISTORY_SELECT} WHERE id = ?"
         row = self.db.execute_query(query, (history_id,))
         if row:
             return BackupHistory.from_dict(dict(row[0]))
@@ -82,16 +134,73 @@ class BackupHistoryRepository:
 
     def get_all(self) -> List[BackupHistory]:
         """Obtiene todos los registros de historial de respaldo, ordenados por fecha de inicio descendente."""
-        query = "SELECT * FROM backup_history ORDER BY start_time DESC"
+        query = f"{HISTORY_SELECT} ORDER BY start_time DESC"
         rows = self.db.execute_query(query)
         return [BackupHistory.from_dict(dict(row)) for row in rows]
 
+    def get_page(self, limit: int, after: Optional[Tuple[str, int]] = None,
+                 columns: Tuple[str, ...] = HISTORY_LIST_COLUMNS) -> List[BackupHistory]:
+        """
+        Obtiene una página del historial ordenada por (start_time, id) descendente.
+        `after` es la clave (start_time, id) de la última fila de la página anterior.
+        """
+        column_list = ", ".join(columns)
+        if after is None:
+            query = f"SELECT {column_list} FROM backup_history ORDER BY start_time DESC, id DESC LIMIT ?"
+            params: Tuple[Any, ...] = (limit,)
+        else:
+            after_start_time, after_id = after
+            query = f"""
+                SELECT {column_list} FROM backup_history
+                WHERE start_time < ? OR (start_time = ? AND id < ?)
+                ORDER BY start_time DESC, id DESC LIMIT ?
+            """
+            params = (after_start_time, after_start_time, after_id, limit)
+        rows = self.db.execute_query(query, params)
+        return [BackupHistory.from_dict(dict(row)) for row in rows]
+
+    @staticmethod
+    def page_key(history: BackupHistory) -> Tuple[str, int]:
+        """Retorna la clave de keyset (start_time, id) de un registro, para pedir la página siguiente."""
+        return history.start_time.isoformat(), history.id
+
+    def count(self) -> int:
+        """Retorna el número total de registros de historial."""
+        result = self.db.execute_query("SELECT COUNT(*) FROM backup_history")
+        return result[0][0] if result else 0
+
     def get_by_config_id(self, config_id: int, limit: int = 100) -> List[BackupHistory]:
         """Obtiene los registros de historial para una configuración específica."""
-        query = "SELECT * FROM backup_history WHERE config_id = ? ORDER BY start_time DESC LIMIT ?"
+        query = f"{HISTORY_SELECT} WHERE config_id = ? ORDER BY start_time DESC LIMIT ?"
         rows = self.db.execute_query(query, (config_id, limit))
         return [BackupHistory.from_dict(dict(row)) for row in rows]
 
+    def get_running(self) -> List[BackupHistory]:
+        """Obtiene las ejecuciones en curso (o en cola) con su último progreso guardado."""
+        query = f"{HISTORY_SELECT} WHERE status IN (?, ?) ORDER BY start_time"
+        rows = self.db.execute_query(query, (BACKUP_STATUS_QUEUED, BACKUP_STATUS_RUNNING))
+        return [BackupHistory.from_dict(dict(row)) for row in rows]
+
+    def get_last_raw_size(self, config_id: int) -> Optional[int]:
+        """Bytes de SQL del último respaldo exitoso de una configuración (base para estimar el ETA)."""
+        query = """
+            SELECT raw_size FROM backup_history
+            WHERE config_id = ? AND status = ? AND raw_size > 0
+            ORDER BY start_time DESC LIMIT 1
+        """
+        rows = self.db.execute_query(query, (config_id, BACKUP_STATUS_SUCCESS))
+        return rows[0][0] if rows else None
+
+    def get_recent_artifact_sizes(self, config_id: int, limit: int) -> List[Tuple[str, int]]:
+        """Retorna (file_path, file_size) de los últimos respaldos exitosos de una configuración."""
+        query = """
+            SELECT file_path, file_size FROM backup_history
+            WHERE config_id = ? AND status = ? AND file_size > 0
+            ORDER BY start_time DESC LIMIT ?
+        """
+        rows = self.db.execute_query(query, (config_id, BACKUP_STATUS_SUCCESS, limit))
+        return [(row[0] or "", row[1]) for row in rows]
+
     def get_total_backups(self) -> int:
         """Retorna el número total de respaldos (exitosos y fallidos)."""
         query = "SELECT COUNT(*) FROM backup_history WHERE status IN (?, ?)"
@@ -130,17 +239,202 @@ class BackupHistoryRepository:
         result = self.db.execute_query(query, (BACKUP_STATUS_SUCCESS,))
         return result[0][0] if result and result[0][0] is not None else 0
 
-    def delete_old_logs(self, retention_days: int):
+    def delete_old_logs(self, retention_days: int, archive_path: Optional[str] = None) -> Dict[str, Any]:
         """Elimina registros de historial más antiguos que los días de retención especificados."""
         if retention_days < 0:
             logger.warning("Días de retención negativos, no se eliminarán logs.")
-            return
-        
+            return {"deleted": 0, "batches": 0, "elapsed_seconds": 0.0, "rows_per_second": 0.0}
+
         cutoff_date = datetime.now() - timedelta(days=retention_days)
-        query = "DELETE FROM backup_history WHERE start_time < ?"
-        params = (cutoff_date.isoformat(),)
-        deleted_count = self.db.execute_update(query, params)
-        logger.info(f"Eliminados {deleted_count} registros de historial más antiguos que {retention_days} días.")
+        stats = self.purge_before(cutoff_date, archive_path=archive_path)
+        logger.info(f"Eliminados {stats['deleted']} registros de historial más antiguos que {retention_days} días.")
+        return stats
+
+    def purge_before(self, cutoff_date: datetime, batch_size: int = HISTORY_PURGE_BATCH_SIZE,
+                     pause_seconds: float = HISTORY_PURGE_PAUSE_SECONDS,
+                     archive_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Elimina por lotes los registros con start_time anterior a cutoff_date, recorriendo el índice
+        (start_time, id). Cada lote es una transacción corta y entre lotes se libera la conexión
+        para que los respaldos en curso puedan registrar su historial.
+        Si se indica archive_path, los registros (con su log) se añaden antes a un archivo JSONL gzip; los
+        que ya estaban archivados (una purga anterior que no llegó a borrarlos) no se repiten: como se
+        recorren en orden (start_time, id), basta con recordar el último archivado (marca de agua).
+        """
+        cutoff = cutoff_date.isoformat()
+        deleted = 0
+        batches = 0
+        started = time.monotonic()
+        watermark = self._read_archive_watermark(archive_path) if archive_path else None
+
+        while True:
+            rows = self.db.execute_query(
+                f"{HISTORY_SELECT} WHERE start_time < ? ORDER BY start_time, id LIMIT ?", (cutoff, batch_size)
+            )
+            if not rows:
+                break
+            ids = [row["id"] for row in rows]
+
+            if archive_path:
+                watermark = self._archive_rows(archive_path, rows, watermark)
+                if watermark is None:
+                    logger.error("Purga de historial detenida: no se pudo archivar el lote.")
+                    break
+
+            placeholders = ", ".join("?" * len(ids))
+            try:
+                with self.db.transaction() as cursor:
+                    cursor.execute(f"DELETE FROM backup_log_chunks WHERE history_id IN ({placeholders})", ids)
+                    if self.search_enabled:
+                        cursor.execute(f"DELETE FROM backup_history_fts WHERE rowid IN ({placeholders})", ids)
+                    cursor.execute(f"DELETE FROM backup_history WHERE id IN ({placeholders})", ids)
+                    deleted += cursor.rowcount
+            except sqlite3.Error as e:
+                logger.error(f"Error al eliminar lote de historial: {e}")
+                break
+            batches += 1
+
+            if len(rows) < batch_size:
+                break
+            time.sleep(pause_seconds) # Ceder la conexión a otros hilos entre lotes
+
+        elapsed = time.monotonic() - started
+        rows_per_second = deleted / elapsed if elapsed > 0 else 0.0
+        if deleted:
+            logger.info(f"Purga de historial: {deleted} registros en {batches} lotes, "
+                        f"{elapsed:.2f} s ({rows_per_second:.0f} filas/s).")
+        return {"deleted": deleted, "batches": batches, "elapsed_seconds": elapsed, "rows_per_second": rows_per_second}
+
+    @staticmethod
+    def _archive_key(record: Dict[str, Any]) -> Tuple[str, int]:
+        # Mismo orden que la purga. El ID solo no basta: tras restaurar una copia antigua de la base de
+        # datos los IDs pueden repetirse, pero los registros nuevos tienen un start_time posterior
+        return record["start_time"], record["id"]
+
+    @staticmethod
+    def _watermark_path(archive_path: str) -> str:
+        return archive_path + HISTORY_ARCHIVE_WATERMARK_EXTENSION
+
+    def _read_archive_watermark(self, archive_path: str) -> Optional[Tuple[str, int]]:
+        """
+        Clave (start_time, id) del último registro archivado. Un archivo creado antes de existir la marca
+        de agua se recorre una sola vez para calcularla (tolera un final truncado por una escritura interrumpida).
+        """
+        try:
+            with open(self._watermark_path(archive_path), "r", encoding="utf-8") as f:
+                return self._archive_key(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Marca de agua del historial archivado ilegible, se recalcula: {e}")
+        if not os.path.exists(archive_path):
+            return None
+        watermark = None
+        try:
+            with gzip.open(archive_path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        key = self._archive_key(json.loads(line))
+                    except (json.JSONDecodeError, KeyError):
+                        continue
+                    watermark = key if watermark is None else max(watermark, key)
+        except (OSError, EOFError) as e:
+            logger.warning(f"Archivo de historial {archive_path} leído parcialmente: {e}")
+        if watermark is not None:
+            self._write_archive_watermark(archive_path, watermark)
+        return watermark
+
+    def _write_archive_watermark(self, archive_path: str, watermark: Tuple[str, int]):
+        """Guarda la marca de agua de forma atómica (archivo temporal + os.replace)."""
+        watermark_path = self._watermark_path(archive_path)
+        temp_path = watermark_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"start_time": watermark[0], "id": watermark[1]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, watermark_path)
+
+    def _archive_rows(self, archive_path: str, rows: List[sqlite3.Row],
+                      watermark: Optional[Tuple[str, int]]) -> Optional[Tuple[str, int]]:
+        """
+        Añade registros de historial, con su log completo, a un archivo JSONL comprimido con gzip, omitiendo
+        los que no pasan de la marca de agua. Retorna la nueva marca de agua, o None si no se pudo archivar.
+        La marca se guarda después de cerrar el archivo: una interrupción entre ambos puede repetir un lote,
+        pero nunca perderlo.
+        """
+        try:
+            with gzip.open(archive_path, "at", encoding="utf-8") as f:
+                for row in rows:
+                    key = self._archive_key(row)
+                    if watermark is not None and key <= watermark:
+                        continue
+                    history = BackupHistory.from_dict(dict(row))
+                    history.log_output = self.log_repo.get_log(history.id)
+                    f.write(json.dumps(history.to_dict(), ensure_ascii=False) + "\n")
+                    watermark = key
+            if watermark is not None:
+                self._write_archive_watermark(archive_path, watermark)
+            return watermark
+        except OSError as e:
+            logger.error(f"Error al archivar registros de historial en {archive_path}: {e}")
+            return None
+
+    def index_run(self, history: BackupHistory) -> bool:
+        """Añade (o reemplaza) una ejecución finalizada en el índice de búsqueda."""
+        if not self.search_enabled or history.id is None:
+            return False
+        log_text = self.log_repo.get_log(history.id) or ""
+        self.db.execute_update("DELETE FROM backup_history_fts WHERE rowid = ?", (history.id,))
+        query = "INSERT INTO backup_history_fts (rowid, config_name, message, log_text) VALUES (?, ?, ?, ?)"
+        success = self.db.execute_update(query, (history.id, history.config_name, history.message or "", log_text)) > 0
+        if not success:
+            logger.error(f"Fallo al indexar la ejecución (ID: {history.id}) para búsqueda.")
+        return success
+
+    def rebuild_search_index(self, batch_size: int = 500) -> int:
+        """Indexa las ejecuciones finalizadas que aún no están en el índice de búsqueda."""
+        if not self.search_enabled:
+            return 0
+        indexed = 0
+        last_id = 0
+        while True:
+            rows = self.db.execute_query(
+                f"""{HISTORY_SELECT} WHERE id > ? AND status NOT IN (?, ?)
+                    AND id NOT IN (SELECT rowid FROM backup_history_fts)
+                    ORDER BY id LIMIT ?""",
+                (last_id, BACKUP_STATUS_QUEUED, BACKUP_STATUS_RUNNING, batch_size)
+            )
+            if not rows:
+                break
+            for row in rows:
+                if self.index_run(BackupHistory.from_dict(dict(row))):
+                    indexed += 1
+                last_id = row["id"]
+        if indexed:
+            logger.info(f"Índice de búsqueda actualizado con {indexed} ejecuciones.")
+        return indexed
+
+    def search(self, text: str, limit: int = SEARCH_DEFAULT_LIMIT, raw_query: bool = False) -> List[Dict[str, Any]]:
+        """
+        Busca en logs, mensajes y nombres de configuración de las ejecuciones.
+        Por defecto el texto se busca como frase exacta; con raw_query=True se usa la sintaxis FTS5
+        (ej: 'timeout OR "Lost connection"'). Los resultados van ordenados por relevancia (bm25).
+        """
+        if not self.search_enabled or not text.strip():
+            return []
+        match = text if raw_query else '"' + text.replace('"', '""') + '"'
+        query = """
+            SELECT h.id, h.config_id, h.config_name, h.start_time, h.status, h.message,
+                   bm25(backup_history_fts, 2.0, 1.0, 1.0) AS rank,
+                   snippet(backup_history_fts, -1, '[', ']', '…', ?) AS snippet
+            FROM backup_history_fts
+            JOIN backup_history h ON h.id = backup_history_fts.rowid
+            WHERE backup_history_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        """
+        rows = self.db.execute_query(query, (SEARCH_SNIPPET_TOKENS, match, limit))
+        return [dict(row) for row in rows]
 
 # Instancia global del repositorio
-backup_history_repository = BackupHistoryRepository()
+backup_history_repository = lazy_service("backup_history_repository", BackupHistoryRepository)
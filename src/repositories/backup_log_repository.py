@@ -0,0 +1,142 @@
+import logging
+import time
+import zlib
+from typing import List, Optional
+
+from ..models.database import database
+from ..utils.constants import LOG_CHUNK_SIZE, LOG_CHUNK_FLUSH_SECONDS, LOG_COMPRESSION_LEVEL
+from ..utils.service_registry import lazy_service
+
+logger = logging.getLogger(__name__)
+
+LOG_CODEC_ZLIB = "zlib"
+
+class BackupLogWriter:
+    """
+    Escritor incremental del log de una ejecución. Acumula texto en memoria y lo guarda
+    en backup_log_chunks como fragmentos comprimidos, sin construir nunca el log completo.
+    """
+    def __init__(self, repository: "BackupLogRepository", history_id: int):
+        self.repository = repository
+        self.history_id = history_id
+        self._buffer: List[str] = []
+        self._buffer_size = 0
+        self._next_seq = repository.get_next_seq(history_id)
+        self._last_flush = time.monotonic()
+        self._closed = False
+
+    def write(self, text: str):
+        """Añade texto al log, guardando un fragmento si se supera el tamaño o el tiempo máximo."""
+        if self._closed:
+            logger.warning(f"Escritura ignorada en log cerrado (historial ID: {self.history_id}).")
+            return
+        if not text:
+            return
+        self._buffer.append(text)
+        self._buffer_size += len(text)
+        if self._buffer_size >= LOG_CHUNK_SIZE or time.monotonic() - self._last_flush >= LOG_CHUNK_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        """Comprime y guarda el texto acumulado como un nuevo fragmento."""
+        if not self._buffer:
+            return
+        text = "".join(self._buffer)
+        if self.repository.add_chunk(self.history_id, self._next_seq, text):
+            self._next_seq += 1
+        self._buffer = []
+        self._buffer_size = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """Guarda el texto pendiente. El escritor no admite más escrituras."""
+        if not self._closed:
+            self.flush()
+            self._closed = True
+
+    def __enter__(self) -> "BackupLogWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class BackupLogRepository:
+    def __init__(self):
+        self.db = database
+        self._migrate_inline_logs()
+        logger.info("Repositorio de logs de respaldo inicializado.")
+
+    def open_writer(self, history_id: int) -> BackupLogWriter:
+        """Abre un escritor incremental para el log de una ejecución."""
+        return BackupLogWriter(self, history_id)
+
+    def get_next_seq(self, history_id: int) -> int:
+        """Retorna el siguiente número de secuencia libre para el log de una ejecución."""
+        result = self.db.execute_query("SELECT MAX(seq) FROM backup_log_chunks WHERE history_id = ?", (history_id,))
+        return result[0][0] + 1 if result and result[0][0] is not None else 0
+
+    def add_chunk(self, history_id: int, seq: int, text: str) -> bool:
+        """Comprime y guarda un fragmento de log."""
+        raw = text.encode("utf-8")
+        query = "INSERT INTO backup_log_chunks (history_id, seq, codec, raw_size, data) VALUES (?, ?, ?, ?, ?)"
+        params = (history_id, seq, LOG_CODEC_ZLIB, len(raw), zlib.compress(raw, LOG_COMPRESSION_LEVEL))
+        success = self.db.execute_update(query, params) > 0
+        if not success:
+            logger.error(f"Fallo al guardar fragmento {seq} del log (historial ID: {history_id}).")
+        return success
+
+    def get_log(self, history_id: int) -> Optional[str]:
+        """Obtiene el log completo de una ejecución, o None si no tiene log."""
+        rows = self.db.execute_query(
+            "SELECT codec, data FROM backup_log_chunks WHERE history_id = ? ORDER BY seq", (history_id,)
+        )
+        if rows:
+            parts = []
+            for row in rows:
+                if row["codec"] != LOG_CODEC_ZLIB:
+                    logger.error(f"Códec de log desconocido '{row['codec']}' (historial ID: {history_id}).")
+                    continue
+                parts.append(zlib.decompress(row["data"]).decode("utf-8", errors="replace"))
+            return "".join(parts)
+
+        # Registros anteriores a la separación de logs que aún no se han migrado
+        legacy = self.db.execute_query("SELECT log_output FROM backup_history WHERE id = ?", (history_id,))
+        if legacy and legacy[0][0]:
+            return legacy[0][0]
+        return None
+
+    def delete_for_history(self, history_id: int) -> int:
+        """Elimina el log de una ejecución."""
+        return self.db.execute_update("DELETE FROM backup_log_chunks WHERE history_id = ?", (history_id,))
+
+    def delete_orphans(self) -> int:
+        """Elimina los fragmentos de log cuyo registro de historial ya no existe."""
+        query = "DELETE FROM backup_log_chunks WHERE history_id NOT IN (SELECT id FROM backup_history)"
+        deleted_count = self.db.execute_update(query)
+        if deleted_count > 0:
+            logger.info(f"Eliminados {deleted_count} fragmentos de log huérfanos.")
+        return deleted_count
+
+    def _migrate_inline_logs(self, batch_size: int = 200):
+        """Mueve a backup_log_chunks los logs guardados en la columna obsoleta backup_history.log_output."""
+        migrated = 0
+        while True:
+            rows = self.db.execute_query(
+                "SELECT id, log_output FROM backup_history WHERE log_output IS NOT NULL LIMIT ?", (batch_size,)
+            )
+            if not rows:
+                break
+            for row in rows:
+                already_migrated = self.get_next_seq(row["id"]) > 0
+                if row["log_output"] and not already_migrated and not self.add_chunk(row["id"], 0, row["log_output"]):
+                    logger.error("Migración de logs interrumpida: no se pudo guardar un fragmento.")
+                    return
+                if self.db.execute_update("UPDATE backup_history SET log_output = NULL WHERE id = ?", (row["id"],)) < 0:
+                    logger.error("Migración de logs interrumpida por un error de escritura.")
+                    return
+                migrated += 1
+        if migrated:
+            logger.info(f"Migrados {migrated} logs de ejecución a almacenamiento comprimido.")
+
+# Instancia global del repositorio
+backup_log_repository = lazy_service("backup_log_repository", BackupLogRepository)
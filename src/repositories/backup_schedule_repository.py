@@ -6,6 +6,7 @@ import logging
 from ..models.database import database
 from ..models.backup_schedule import BackupSchedule
 from ..utils.helpers import from_json_string, to_json_string, get_current_timestamp, parse_iso_datetime
+from ..utils.service_registry import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -123,4 +124,4 @@ class BackupScheduleRepository:
         return None
 
 # Instancia global del repositorio
-backup_schedule_repository = BackupScheduleRepository()
+backup_schedule_repository = lazy_service("backup_schedule_repository", BackupScheduleRepository)
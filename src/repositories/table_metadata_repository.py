@@ -0,0 +1,67 @@
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from ..models.database import database
+from ..models.table_metadata import TableMetadata
+from ..utils.constants import METADATA_INSERT_BATCH_SIZE
+from ..utils.helpers import parse_iso_datetime
+from ..utils.service_registry import lazy_service
+
+logger = logging.getLogger(__name__)
+
+class TableMetadataRepository:
+    def __init__(self):
+        self.db = database
+        logger.info("Repositorio de metadatos de tablas inicializado.")
+
+    def get_refreshed_at(self, schema_key: str) -> Optional[datetime]:
+        """Momento de la última consulta al servidor de una base de datos, o None si no está en caché."""
+        rows = self.db.execute_query("SELECT refreshed_at FROM schema_metadata WHERE schema_key = ?", (schema_key,))
+        return parse_iso_datetime(rows[0]["refreshed_at"]) if rows else None
+
+    def get_tables(self, schema_key: str) -> List[TableMetadata]:
+        """Tablas en caché de una base de datos, ordenadas por nombre."""
+        rows = self.db.execute_query(
+            "SELECT * FROM table_metadata WHERE schema_key = ? ORDER BY table_name", (schema_key,)
+        )
+        return [TableMetadata.from_dict(dict(row)) for row in rows]
+
+    def replace_tables(self, schema_key: str, tables: List[TableMetadata], refreshed_at: datetime) -> bool:
+        """Sustituye la caché de una base de datos en una sola transacción."""
+        params = [
+            (schema_key, table.table_name, table.table_type, table.engine, table.data_length,
+             table.index_length, table.table_rows, table.update_time.isoformat() if table.update_time else None)
+            for table in tables
+        ]
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("DELETE FROM table_metadata WHERE schema_key = ?", (schema_key,))
+                cursor.execute(
+                    "INSERT OR REPLACE INTO schema_metadata (schema_key, refreshed_at, table_count) VALUES (?, ?, ?)",
+                    (schema_key, refreshed_at.isoformat(), len(tables))
+                )
+                for start in range(0, len(params), METADATA_INSERT_BATCH_SIZE):
+                    cursor.executemany(
+                        "INSERT INTO table_metadata (schema_key, table_name, table_type, engine, data_length, "
+                        "index_length, table_rows, update_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        params[start:start + METADATA_INSERT_BATCH_SIZE]
+                    )
+            return True
+        except Exception as e:
+            logger.error(f"Error al guardar los metadatos de {schema_key}: {e}")
+            return False
+
+    def delete(self, schema_key: str) -> bool:
+        """Elimina la caché de una base de datos."""
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("DELETE FROM table_metadata WHERE schema_key = ?", (schema_key,))
+                cursor.execute("DELETE FROM schema_metadata WHERE schema_key = ?", (schema_key,))
+            return True
+        except Exception as e:
+            logger.error(f"Error al eliminar los metadatos de {schema_key}: {e}")
+            return False
+
+# Instancia global del repositorio de metadatos de tablas
+table_metadata_repository = lazy_service("table_metadata_repository", TableMetadataRepository)
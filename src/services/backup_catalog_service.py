@@ -0,0 +1,100 @@
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Optional, Tuple
+
+from ..models.backup_config import BackupConfig
+from ..models.backup_file import BackupFile
+from ..repositories.backup_config_repository import backup_config_repository
+from ..repositories.backup_file_repository import backup_file_repository
+from ..utils.constants import (BACKUP_FILE_TIMESTAMP_FORMAT, STORAGE_TIER_HOT, PARTIAL_ARTIFACT_EXTENSION,
+                               CHECKSUM_MANIFEST_EXTENSION)
+from ..utils.artifacts import read_checksum_manifest
+from ..utils.service_registry import lazy_service
+
+logger = logging.getLogger(__name__)
+
+class BackupCatalogService:
+    """
+    Mantiene el catálogo backup_files. BackupService registra cada archivo que produce y un
+    reconciliador periódico lo sincroniza con el disco (archivos añadidos o borrados a mano).
+    """
+    def __init__(self):
+        self.file_repo = backup_file_repository
+        self.config_repo = backup_config_repository
+        logger.info("Servicio de catálogo de respaldos inicializado.")
+
+    @staticmethod
+    def parse_backup_timestamp(database_name: str, filename: str) -> Optional[datetime]:
+        """Extrae la fecha de un nombre de archivo {database_name}_{YYYYMMDD_HHMMSS}.ext, o None si no coincide."""
+        match = re.match(rf"^{re.escape(database_name)}_(\d{{8}}_\d{{6}})\.", filename)
+        if not match:
+            return None
+        try:
+            return datetime.strptime(match.group(1), BACKUP_FILE_TIMESTAMP_FORMAT)
+        except ValueError:
+            return None
+
+    def register_artifact(self, config: BackupConfig, history_id: Optional[int], file_path: str,
+                          created_at: datetime, file_size: Optional[int],
+                          checksum: Optional[str] = None) -> Optional[BackupFile]:
+        """Registra en el catálogo un archivo de respaldo recién producido."""
+        return self.file_repo.add(BackupFile(
+            config_id=config.id,
+            history_id=history_id,
+            file_path=os.path.abspath(file_path),
+            created_at=created_at,
+            file_size=file_size,
+            checksum=checksum,
+            tier=STORAGE_TIER_HOT
+        ))
+
+    def reconcile(self, config: BackupConfig) -> Tuple[int, int]:
+        """
+        Sincroniza el catálogo con el directorio de respaldo de una configuración.
+        Cataloga los archivos con el formato de nombre de la configuración que no estén registrados
+        y elimina las entradas cuyo archivo ya no existe. Retorna (añadidos, eliminados).
+        """
+        backup_dir = os.path.abspath(config.backup_path)
+        if not os.path.isdir(backup_dir):
+            logger.warning(f"Directorio de respaldo no encontrado para reconciliar: {backup_dir}")
+            return 0, 0
+
+        catalog_paths = {path for path in self.file_repo.get_paths(config.id, STORAGE_TIER_HOT)
+                         if os.path.dirname(path) == backup_dir}
+        disk_paths = set()
+        added = 0
+        with os.scandir(backup_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.endswith((PARTIAL_ARTIFACT_EXTENSION, CHECKSUM_MANIFEST_EXTENSION)):
+                    continue
+                created_at = self.parse_backup_timestamp(config.database_name, entry.name)
+                if created_at is None:
+                    continue
+                disk_paths.add(entry.path)
+                if entry.path not in catalog_paths:
+                    if self.register_artifact(config, None, entry.path, created_at, entry.stat().st_size,
+                                              read_checksum_manifest(entry.path)):
+                        added += 1
+
+        removed = 0
+        for missing_path in catalog_paths - disk_paths:
+            backup_file = self.file_repo.get_by_path(missing_path)
+            if backup_file and self.file_repo.delete(backup_file.id):
+                removed += 1
+
+        if added or removed:
+            logger.info(f"Catálogo de '{config.name}' reconciliado: {added} archivos añadidos, {removed} eliminados.")
+        return added, removed
+
+    def reconcile_all(self):
+        """Reconcilia el catálogo de todas las configuraciones."""
+        for config in self.config_repo.get_all():
+            try:
+                self.reconcile(config)
+            except OSError as e:
+                logger.error(f"Error al reconciliar el catálogo de '{config.name}': {e}")
+
+# Instancia global del servicio de catálogo
+backup_catalog_service = lazy_service("backup_catalog_service", BackupCatalogService)
@@ -1,29 +1,220 @@
 import subprocess
 import os
+import tempfile
 import shutil
+import signal
+import re
 import logging
 import threading
+import time
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
+
+import mysql.connector
 
 from ..models.backup_config import BackupConfig
 from ..models.backup_history import BackupHistory
+from ..repositories.app_settings_repository import app_settings_repository
 from ..repositories.backup_history_repository import backup_history_repository
+from ..repositories.backup_log_repository import backup_log_repository
+from ..services.backup_catalog_service import backup_catalog_service
+from ..services.disk_admission_service import disk_admission_service
 from ..services.notification_service import notification_service
-from ..utils.constants import BACKUP_STATUS_RUNNING, BACKUP_STATUS_SUCCESS, BACKUP_STATUS_FAILED, BACKUP_STATUS_CANCELLED
+from ..services.progress_service import progress_service, ProgressTracker
+from ..services.retention_service import retention_service
+from ..services.schema_metadata_service import schema_metadata_service
+from ..services.tiering_service import tiering_service
+from ..utils.constants import (BACKUP_STATUS_QUEUED, BACKUP_STATUS_RUNNING, BACKUP_STATUS_SUCCESS, BACKUP_STATUS_FAILED, BACKUP_STATUS_CANCELLED,
+                               BACKUP_FILE_TIMESTAMP_FORMAT, DUMP_STREAM_CHUNK_SIZE, PARTIAL_ARTIFACT_EXTENSION,
+                               TABLE_ARCHIVE_EXTENSION, ENCRYPTED_ARTIFACT_EXTENSION, LOW_PRIORITY_NICE,
+                               LOW_PRIORITY_IONICE_ARGS, BACKUP_CANCEL_GRACE_SECONDS, MYSQLDUMP_IGNORE_TABLE_ARGV_LIMIT,
+                               GLOBAL_BANDWIDTH_REFRESH_SECONDS)
+from ..utils.artifacts import ArtifactWriter, strip_artifact_extension, write_checksum_manifest
 from ..utils.helpers import format_bytes, get_current_timestamp
+from ..utils.rate_limiter import TokenBucket
+from ..utils.table_rules import TableRules, ignore_table_options
+from ..utils.service_registry import lazy_service
 
 logger = logging.getLogger(__name__)
 
+class BackupCancelledError(Exception):
+    pass
+
 class BackupService:
     def __init__(self):
         self.history_repo = backup_history_repository
+        self.log_repo = backup_log_repository
         self.notification_service = notification_service
+        self.catalog_service = backup_catalog_service
+        self.retention_service = retention_service
+        self.tiering_service = tiering_service
+        self.disk_admission = disk_admission_service
+        self.progress_service = progress_service
         self.running_backups_threads = {} # {config_id: threading.Thread}
+        self.cancel_events = {} # {config_id: threading.Event}
+        self.running_processes = {} # {config_id: subprocess.Popen} mysqldump en curso
+        # Límites de ancho de banda: uno por respaldo en curso y uno global compartido por todos
+        self.bandwidth_limiters = {} # {config_id: TokenBucket}
+        self.global_limiter = TokenBucket(0)
+        self._global_limit_loaded_at = float("-inf") # time.monotonic() de la última lectura de los ajustes
         logger.info("Servicio de respaldo inicializado.")
 
-    def _run_mysqldump(self, config: BackupConfig, output_file: str) -> Tuple[bool, str]:
-        """Ejecuta el comando mysqldump."""
+    def set_bandwidth_limit(self, config_id: int, max_bandwidth_kbps: int):
+        """Cambia el límite de un respaldo en curso (0 = sin límite). Se aplica al siguiente bloque leído."""
+        limiter = self.bandwidth_limiters.get(config_id)
+        if limiter is not None:
+            limiter.set_rate(max_bandwidth_kbps * 1024)
+            logger.info(f"Límite de ancho de banda del respaldo {config_id}: {max_bandwidth_kbps or 'sin límite'} KB/s.")
+
+    def set_global_bandwidth_limit(self, max_bandwidth_kbps: int):
+        """Cambia el límite global compartido por todos los respaldos (0 = sin límite), también en curso."""
+        self.global_limiter.set_rate(max_bandwidth_kbps * 1024)
+        logger.info(f"Límite global de ancho de banda: {max_bandwidth_kbps or 'sin límite'} KB/s.")
+
+    def _load_global_bandwidth_limit(self, max_age: float = 0.0):
+        """
+        Aplica el límite global guardado en los ajustes. Con `max_age` solo relee los ajustes si la última
+        lectura es más antigua: los respaldos en curso lo llaman mientras escriben, de modo que un cambio
+        hecho desde otra ventana o proceso les llega sin reiniciarlos.
+        """
+        now = time.monotonic()
+        if now - self._global_limit_loaded_at < max_age:
+            return
+        self._global_limit_loaded_at = now
+        settings = app_settings_repository.get_settings()
+        rate = (settings.max_bandwidth_kbps if settings else 0) * 1024
+        if rate != self.global_limiter.rate:
+            self.global_limiter.set_rate(rate)
+
+    @staticmethod
+    def _low_priority_options(command: List[str]) -> Tuple[List[str], dict]:
+        """
+        Prefija ionice (POSIX) o pide la clase de prioridad baja (Windows). El nice se sube después de
+        lanzar el proceso con _lower_cpu_priority(): preexec_fn no es seguro en un proceso con hilos.
+        """
+        if os.name == "nt":
+            return command, {"creationflags": subprocess.BELOW_NORMAL_PRIORITY_CLASS}
+        ionice_path = shutil.which("ionice")
+        if ionice_path:
+            command = [ionice_path] + LOW_PRIORITY_IONICE_ARGS + command
+        return command, {}
+
+    @staticmethod
+    def _lower_cpu_priority(process: subprocess.Popen):
+        """Sube en LOW_PRIORITY_NICE el nice de mysqldump recién lanzado (POSIX)."""
+        if os.name == "nt":
+            return
+        try:
+            niceness = min(os.getpriority(os.PRIO_PROCESS, 0) + LOW_PRIORITY_NICE, 19)
+            os.setpriority(os.PRIO_PROCESS, process.pid, niceness)
+        except OSError as e:
+            logger.warning(f"No se pudo bajar la prioridad de mysqldump (PID {process.pid}): {e}")
+
+    @staticmethod
+    def _process_group_options(popen_options: dict) -> dict:
+        """Lanza mysqldump en su propio grupo de procesos para poder terminarlo junto con sus hijos (ionice, shell...)."""
+        if os.name == "nt":
+            popen_options["creationflags"] = popen_options.get("creationflags", 0) | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            popen_options["start_new_session"] = True
+        return popen_options
+
+    @staticmethod
+    def _terminate_process_group(process: subprocess.Popen):
+        """Termina el grupo de procesos de mysqldump: primero con SIGTERM y, si no sale a tiempo, con SIGKILL."""
+        if process.poll() is not None:
+            return
+        if os.name == "nt":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True)
+            return
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            process.wait(timeout=BACKUP_CANCEL_GRACE_SECONDS)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def cancel_backup(self, config_id: int) -> Tuple[bool, str]:
+        """
+        Cancela un respaldo en curso: termina mysqldump (con todo su grupo de procesos) y la tarea
+        descarta el archivo parcial, libera el espacio reservado y registra el estado 'cancelled'.
+        """
+        cancel_event = self.cancel_events.get(config_id)
+        if cancel_event is None or not self.is_backup_running(config_id):
+            return False, "No hay ningún respaldo en curso para esta configuración."
+        cancel_event.set()
+        process = self.running_processes.get(config_id)
+        if process is not None:
+            # No desde el hilo del respaldo, que puede estar bloqueado leyendo la tubería, ni aquí (hilo de la
+            # UI): un hilo auxiliar envía SIGTERM y, si mysqldump no sale a tiempo, SIGKILL
+            threading.Thread(target=self._terminate_process_group, args=(process,),
+                             name=f"cancel-backup-{config_id}", daemon=True).start()
+        logger.info(f"Cancelación solicitada para el respaldo de la configuración {config_id}.")
+        return True, "Cancelación solicitada."
+
+    @staticmethod
+    def _artifact_path(config: BackupConfig, timestamp: str) -> str:
+        """Ruta final del respaldo según el método de compresión (con .enc si se cifra)."""
+        base_name = os.path.join(config.backup_path, f"{config.database_name}_{timestamp}")
+        if config.compression_method == "zip":
+            path = f"{base_name}.zip"
+        elif config.compression_method == "gzip":
+            path = f"{base_name}.sql.gzip"
+        elif config.compression_method == "mbk":
+            path = base_name + TABLE_ARCHIVE_EXTENSION
+        else:
+            path = f"{base_name}.sql"
+        return path + ENCRYPTED_ARTIFACT_EXTENSION if config.encrypt_artifacts else path
+
+    @staticmethod
+    def _drain_stream(stream, lines: List[str]):
+        """Lee stderr en su propio hilo para que mysqldump no se bloquee con la tubería llena."""
+        for line in iter(stream.readline, b""):
+            lines.append(line.decode("utf-8", errors="replace"))
+        stream.close()
+
+    def _resolve_excluded_tables(self, config: BackupConfig) -> List[str]:
+        """
+        Tablas a excluir en esta ejecución: la lista explícita más las que dejan fuera las reglas por
+        patrón, resueltas contra la caché de metadatos. Una tabla creada después de la última consulta
+        al servidor no se excluye (se respalda de más, nunca de menos). Lanza mysql.connector.Error si
+        hay reglas y no se pueden obtener las tablas, o re.error si las reglas guardadas no compilan.
+        """
+        if not config.has_table_rules:
+            return list(config.excluded_tables)
+        rules = TableRules(config.include_patterns, config.exclude_patterns)
+        table_names = [table.table_name for table in schema_metadata_service.get_tables(config)]
+        excluded = rules.excluded(table_names).union(config.excluded_tables)
+        logger.info(f"Reglas de tablas de {config.name}: {len(table_names) - len(excluded.intersection(table_names))} "
+                    f"de {len(table_names)} tablas a respaldar.")
+        return sorted(excluded)
+
+    @staticmethod
+    def _write_options_file(config: BackupConfig, excluded_tables: List[str]) -> str:
+        """Escribe las --ignore-table en un archivo de opciones temporal (solo legible por el usuario)."""
+        fd, path = tempfile.mkstemp(prefix="mbm_mysqldump_", suffix=".cnf")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("[mysqldump]\n")
+            f.write("\n".join(ignore_table_options(config.database_name, excluded_tables)))
+            f.write("\n")
+        return path
+
+    def _run_mysqldump(self, config: BackupConfig, output_file: str,
+                       tracker: Optional[ProgressTracker] = None,
+                       cancel_event: Optional[threading.Event] = None,
+                       excluded_tables: Optional[List[str]] = None) -> Tuple[bool, str, Optional[str]]:
+        """
+        Ejecuta mysqldump y escribe su salida en streaming: compresión en línea y SHA-256 calculado
+        mientras se escribe. Se escribe en un archivo .part que solo se renombra si todo termina bien.
+        Cada bloque leído se pasa a `tracker` para publicar el progreso. `excluded_tables` es el
+        resultado de _resolve_excluded_tables (por defecto, la lista explícita de la configuración).
+        Retorna (éxito, mensaje, sha256 del archivo final). Lanza BackupCancelledError si se activa `cancel_event`.
+        """
+        cancel_event = cancel_event or threading.Event()
+        partial_file = output_file + PARTIAL_ARTIFACT_EXTENSION
+        excluded_tables = config.excluded_tables if excluded_tables is None else excluded_tables
+        options_file = None
         try:
             # Construir el comando mysqldump
             command = [
@@ -36,137 +227,134 @@ class BackupService:
             if config.password_encrypted: # La contraseña ya viene desencriptada del repo
                 command.append(f"--password={config.password_encrypted}")
             
-            # Excluir tablas si se especifican
-            for table in config.excluded_tables:
-                command.append(f"--ignore-table={config.database_name}.{table}")
+            # Excluir tablas si se especifican. Miles de --ignore-table superan el límite de la línea de
+            # comandos: a partir de cierto número van en un archivo de opciones (debe ser la primera opción)
+            if len(excluded_tables) > MYSQLDUMP_IGNORE_TABLE_ARGV_LIMIT:
+                options_file = self._write_options_file(config, excluded_tables)
+                command.insert(1, f"--defaults-extra-file={options_file}")
+            else:
+                for table in excluded_tables:
+                    command.append(f"--ignore-table={config.database_name}.{table}")
 
             logger.info(f"Ejecutando mysqldump para {config.name}...")
             # Ocultar contraseña en log
             log_command = [cmd if not cmd.startswith("--password=") else "--password=********" for cmd in command]
             logger.debug(f"Comando: {' '.join(log_command)}") 
 
-            # Usar subprocess.Popen para capturar stdout y stderr por separado
-            process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                encoding='utf-8',
-                errors='replace'
-            )
-            stdout, stderr = process.communicate() # Esperar a que termine el proceso
+            popen_options = {}
+            if config.low_priority:
+                command, popen_options = self._low_priority_options(command)
+            popen_options = self._process_group_options(popen_options)
+
+            # Con el límite alcanzado se deja de leer stdout: mysqldump se bloquea en la tubería y deja
+            # de leer del socket, así que el límite frena también el tráfico de red con el servidor
+            limiter = TokenBucket(config.max_bandwidth_bytes)
+            self._load_global_bandwidth_limit()
+
+            if cancel_event.is_set():
+                raise BackupCancelledError()
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **popen_options)
+            if config.low_priority:
+                self._lower_cpu_priority(process)
+            self.running_processes[config.id] = process
+            self.bandwidth_limiters[config.id] = limiter
+            stderr_lines: List[str] = []
+            stderr_thread = threading.Thread(target=self._drain_stream, args=(process.stderr, stderr_lines), daemon=True)
+            stderr_thread.start()
+
+            member_name = f"{strip_artifact_extension(os.path.basename(output_file))}.sql"
+            try:
+                with ArtifactWriter(partial_file, config.compression_method, member_name,
+                                    encrypt=config.encrypt_artifacts) as writer:
+                    while True:
+                        chunk = process.stdout.read(DUMP_STREAM_CHUNK_SIZE)
+                        if cancel_event.is_set():
+                            raise BackupCancelledError()
+                        if not chunk:
+                            break
+                        if not (limiter.consume(len(chunk), cancel_event)
+                                and self.global_limiter.consume(len(chunk), cancel_event)):
+                            raise BackupCancelledError()
+                        writer.write(chunk)
+                        self._load_global_bandwidth_limit(GLOBAL_BANDWIDTH_REFRESH_SECONDS)
+                        # Lo escrito ya no figura como libre en el disco: deja de contar en la reserva
+                        self.disk_admission.record_written(config.id, writer.size)
+                        if tracker is not None:
+                            tracker.feed(chunk, writer.size)
+            except Exception:
+                self._terminate_process_group(process)
+                raise
+            finally:
+                self.bandwidth_limiters.pop(config.id, None)
+                self.running_processes.pop(config.id, None)
+                process.stdout.close()
+                process.wait()
+                stderr_thread.join()
 
             if process.returncode != 0:
-                error_message = stderr.strip()
+                error_message = "".join(stderr_lines).strip()
                 logger.error(f"mysqldump falló para {config.name}: {error_message}")
-                return False, error_message
-            
-            # Escribir la salida de mysqldump al archivo SQL
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(stdout)
+                os.remove(partial_file)
+                return False, error_message, None
 
-            logger.info(f"mysqldump completado exitosamente para {config.name}.")
-            return True, "mysqldump completado."
+            os.replace(partial_file, output_file)
+            write_checksum_manifest(output_file, writer.sha256)
+            logger.info(f"mysqldump completado exitosamente para {config.name} "
+                        f"({format_bytes(writer.raw_bytes)} volcados, {format_bytes(writer.size)} escritos).")
+            return True, f"mysqldump completado. SHA-256: {writer.sha256}", writer.sha256
 
+        except BackupCancelledError:
+            logger.warning(f"mysqldump cancelado para {config.name}.")
+            if os.path.exists(partial_file):
+                os.remove(partial_file)
+            raise
         except FileNotFoundError:
             error_message = f"mysqldump no encontrado en la ruta: {config.mysqldump_path}. Por favor, verifica la configuración."
             logger.error(error_message)
-            return False, error_message
+            return False, error_message, None
         except Exception as e:
             error_message = f"Error inesperado al ejecutar mysqldump para {config.name}: {e}"
             logger.error(error_message)
-            return False, error_message
-
-    def _compress_file(self, input_file: str, compression_method: str) -> Tuple[bool, str, Optional[str]]:
-        """Comprime el archivo de respaldo según el método especificado."""
-        if compression_method == "none":
-            return True, "Sin compresión.", input_file
-        
-        output_file = f"{input_file}.{compression_method}"
-        try:
-            logger.info(f"Comprimiendo archivo con {compression_method}...")
-            if compression_method == "zip":
-                # Crear un archivo zip que contenga el archivo SQL
-                # shutil.make_archive crea un archivo con extensión .zip, no necesitamos añadirla
-                base_name = os.path.splitext(input_file)[0] # Nombre sin extensión .sql
-                archive_name = shutil.make_archive(base_name, 'zip', root_dir=os.path.dirname(input_file), base_dir=os.path.basename(input_file))
-                os.remove(input_file) # Eliminar el archivo .sql original
-                return True, "Archivo comprimido con ZIP.", archive_name
-            elif compression_method == "gzip":
-                import gzip
-                with open(input_file, 'rb') as f_in:
-                    with gzip.open(output_file, 'wb') as f_out:
-                        shutil.copyfileobj(f_in, f_out)
-                os.remove(input_file) # Eliminar el archivo .sql original
-                return True, "Archivo comprimido con GZIP.", output_file
-            else:
-                return False, f"Método de compresión '{compression_method}' no soportado.", None
-        except Exception as e:
-            logger.error(f"Error al comprimir el archivo: {e}")
-            return False, f"Error al comprimir: {e}", None
+            if os.path.exists(partial_file):
+                os.remove(partial_file)
+            return False, error_message, None
+        finally:
+            if options_file is not None:
+                os.remove(options_file)
 
     def _clean_old_backups(self, config: BackupConfig):
-        """Elimina respaldos antiguos según la política de retención."""
+        """Elimina respaldos antiguos según la política de retención, consultando el catálogo de archivos."""
         logger.info(f"Limpiando respaldos antiguos para {config.name}...")
-        backup_dir = config.backup_path
-        
-        if not os.path.exists(backup_dir):
-            logger.warning(f"Directorio de respaldo no encontrado para limpieza: {backup_dir}")
-            return
 
-        now = datetime.now()
-        
-        for filename in os.listdir(backup_dir):
-            file_path = os.path.join(backup_dir, filename)
-            if os.path.isfile(file_path):
-                try:
-                    # Intentar parsear la fecha del nombre del archivo (YYYYMMDD_HHMMSS)
-                    # Asumimos el formato de nombre de archivo: {db_name}_{timestamp}.sql(.zip/.gz)
-                    parts = filename.split('_')
-                    if len(parts) >= 2:
-                        date_part = parts[-2] # YYYYMMDD
-                        time_part = parts[-1].split('.')[0] # HHMMSS
-                        file_datetime_str = f"{date_part}_{time_part}"
-                        file_datetime = datetime.strptime(file_datetime_str, "%Y%m%d_%H%M%S")
-                    else:
-                        # Si el nombre no sigue el formato esperado, usar la fecha de modificación
-                        file_datetime = datetime.fromtimestamp(os.path.getmtime(file_path))
-
-                    age_days = (now - file_datetime).days
-
-                    # Política de retención principal (más reciente)
-                    if age_days >= config.retention_days_main:
-                        # Política de retención segregada (más antigua)
-                        if age_days >= config.retention_days_segregated:
-                            logger.info(f"Eliminando respaldo antiguo (segregado): {filename} ({age_days} días)")
-                            os.remove(file_path)
-                        else:
-                            # Mantener respaldos entre retention_days_main y retention_days_segregated
-                            # Aquí podrías moverlos a un subdirectorio "segregado" si quisieras
-                            pass
-                except Exception as e:
-                    logger.warning(f"No se pudo procesar el archivo {filename} para limpieza: {e}")
+        # Primera limpieza tras actualizar: catalogar los archivos existentes en el directorio
+        if not self.catalog_service.file_repo.has_entries(config.id):
+            self.catalog_service.reconcile(config)
+
+        self.retention_service.run(config)
+        # Los respaldos que salen de la ventana principal se mueven en segundo plano al almacenamiento segregado
+        self.tiering_service.enqueue(config)
         logger.info(f"Limpieza de respaldos para {config.name} completada.")
 
     def _perform_backup_task(self, config: BackupConfig, is_manual: bool = False):
         """Tarea principal que ejecuta el respaldo en un hilo."""
         logger.info(f"Iniciando respaldo para la configuración: {config.name} (Manual: {is_manual})")
         
-        # Crear un registro de historial inicial
+        # Crear un registro de historial inicial; queda en cola hasta que haya espacio en disco
         history = BackupHistory(
             config_id=config.id,
             config_name=config.name,
             start_time=datetime.now(),
-            status=BACKUP_STATUS_RUNNING,
+            status=BACKUP_STATUS_QUEUED,
             is_manual=is_manual
         )
         history = self.history_repo.add(history)
         if not history:
             logger.error(f"No se pudo crear el registro de historial para {config.name}.")
-            self.notification_service.send_email_notification(
+            self.notification_service.notify(
                 f"Error de Respaldo: {config.name}",
                 f"No se pudo crear el registro de historial para el respaldo de {config.name}.",
-                'error'
+                'error',
+                config_name=config.name
             )
             return
 
@@ -175,71 +363,122 @@ class BackupService:
         final_file_path = None
         file_size = 0
         start_time = datetime.now()
-        log_output = ""
+        # El log se guarda por fragmentos comprimidos mientras avanza el respaldo
+        log_writer = self.log_repo.open_writer(history.id)
+        tracker = None
+        cancel_event = self.cancel_events.setdefault(config.id, threading.Event())
 
         try:
             # 1. Crear directorio de respaldo si no existe
             os.makedirs(config.backup_path, exist_ok=True)
 
-            # 2. Generar nombre de archivo temporal y final
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            temp_sql_file = os.path.join(config.backup_path, f"{config.database_name}_{timestamp}.sql")
+            # Comprobar (y reservar) espacio en disco antes de empezar; puede esperar en cola a otros respaldos
+            admitted, admission_message = self.disk_admission.acquire(config, cancel_event=cancel_event)
+            log_writer.write(f"Espacio en disco: {admission_message}\n")
+            if cancel_event.is_set():
+                raise BackupCancelledError()
+            if not admitted:
+                backup_message = admission_message
+                self.notification_service.notify(
+                    f"Respaldo Rechazado: {config.name}",
+                    f"El respaldo de {config.name} no se inició: {admission_message}",
+                    'error',
+                    config_name=config.name
+                )
+                return
+
+            # Admitido: a partir de aquí la ejecución cuenta como en curso
+            start_time = datetime.now()
+            history.start_time = start_time
+            history.status = BACKUP_STATUS_RUNNING
+            self.history_repo.update(history)
+
+            # 2. Generar nombre del archivo final
+            backup_time = datetime.now()
+            timestamp = backup_time.strftime(BACKUP_FILE_TIMESTAMP_FORMAT)
+            final_file_path = self._artifact_path(config, timestamp)
             
-            # 3. Ejecutar mysqldump
-            success, message = self._run_mysqldump(config, temp_sql_file)
-            log_output += f"mysqldump: {message}\n"
+            # 3. Ejecutar mysqldump (la compresión y el checksum se hacen en línea). Las reglas por
+            #    patrón se resuelven una sola vez y sirven también para estimar el progreso
+            try:
+                excluded_tables = self._resolve_excluded_tables(config)
+            except (mysql.connector.Error, re.error) as err:
+                if isinstance(err, re.error):
+                    backup_message = f"Reglas de tablas inválidas en la configuración (corríjalas y guarde de nuevo): {err}"
+                else:
+                    backup_message = f"No se pudieron resolver las reglas de tablas: {err}"
+                log_writer.write(f"{backup_message}\n")
+                self.notification_service.notify(
+                    f"Respaldo Fallido: {config.name}",
+                    f"El respaldo de {config.name} no se inició: {backup_message}",
+                    'error',
+                    config_name=config.name
+                )
+                return
+            if config.has_table_rules:
+                log_writer.write(f"Tablas excluidas (lista y reglas por patrón): {len(excluded_tables)}\n")
+            tracker = self.progress_service.start(history, config, excluded_tables)
+            success, message, checksum = self._run_mysqldump(config, final_file_path, tracker, cancel_event, excluded_tables)
+            tracker.finish(success)
+            history.progress = tracker.progress
+            log_writer.write(f"mysqldump: {message}\n")
 
             if not success:
+                final_file_path = None
                 backup_message = f"mysqldump falló: {message}"
-                self.notification_service.send_email_notification(
+                self.notification_service.notify(
                     f"Respaldo Fallido: {config.name}",
                     f"El respaldo de {config.name} falló durante mysqldump: {message}",
-                    'error'
+                    'error',
+                    config_name=config.name
                 )
                 return # Salir si mysqldump falla
 
-            # 4. Comprimir el archivo si es necesario
-            if config.compression_method != "none":
-                compress_success, compress_message, compressed_file = self._compress_file(temp_sql_file, config.compression_method)
-                log_output += f"Compresión: {compress_message}\n"
-                if not compress_success:
-                    backup_message = f"Compresión fallida: {compress_message}"
-                    self.notification_service.send_email_notification(
-                        f"Respaldo Fallido: {config.name}",
-                        f"El respaldo de {config.name} falló durante la compresión: {compress_message}",
-                        'error'
-                    )
-                    return
-                final_file_path = compressed_file
-            else:
-                final_file_path = temp_sql_file
+            # 4. Registrar el checksum (también queda en el manifiesto .sha256 junto al archivo)
+            #    y el tamaño del SQL, que sirve de estimación para el progreso del próximo respaldo
+            history.checksum = checksum
+            history.raw_size = tracker.progress.bytes_read
             
             # 5. Obtener tamaño del archivo final
             if final_file_path and os.path.exists(final_file_path):
                 file_size = os.path.getsize(final_file_path)
-                log_output += f"Tamaño del archivo: {format_bytes(file_size)}\n"
+                log_writer.write(f"Tamaño del archivo: {format_bytes(file_size)}\n")
             else:
-                log_output += "Advertencia: No se pudo determinar el tamaño del archivo final.\n"
+                log_writer.write("Advertencia: No se pudo determinar el tamaño del archivo final.\n")
+
+            self.catalog_service.register_artifact(config, history.id, final_file_path, backup_time, file_size, checksum)
 
             backup_status = BACKUP_STATUS_SUCCESS
             backup_message = "Respaldo completado exitosamente."
             logger.info(f"Respaldo exitoso para {config.name}. Archivo: {final_file_path}")
-            self.notification_service.send_email_notification(
+            self.notification_service.notify(
                 f"Respaldo Exitoso: {config.name}",
                 f"El respaldo de {config.name} se completó exitosamente. Archivo: {final_file_path} (Tamaño: {format_bytes(file_size)})",
-                'info'
+                'info',
+                config_name=config.name
             )
 
+        except BackupCancelledError:
+            final_file_path = None
+            backup_status = BACKUP_STATUS_CANCELLED
+            backup_message = "Respaldo cancelado por el usuario."
+            log_writer.write(f"{backup_message}\n")
+            logger.warning(f"Respaldo de {config.name} cancelado.")
         except Exception as e:
             backup_status = BACKUP_STATUS_FAILED
             backup_message = f"Error inesperado durante el respaldo: {e}"
             logger.critical(f"Error crítico en el respaldo para {config.name}: {e}", exc_info=True)
-            self.notification_service.send_email_notification(
+            self.notification_service.notify(
                 f"Respaldo Crítico Fallido: {config.name}",
                 f"Un error crítico ocurrió durante el respaldo de {config.name}: {e}",
-                'error'
+                'error',
+                config_name=config.name
             )
         finally:
+            self.disk_admission.release(config.id)
+            if tracker is not None and not tracker.progress.finished:
+                tracker.finish(False)
+                history.progress = tracker.progress
             end_time = datetime.now()
             duration = (end_time - start_time).total_seconds()
             
@@ -250,8 +489,9 @@ class BackupService:
             history.file_path = final_file_path
             history.file_size = file_size
             history.duration_seconds = duration
-            history.log_output = log_output
+            log_writer.close()
             self.history_repo.update(history)
+            self.history_repo.index_run(history)
             
             # Limpiar respaldos antiguos
             if backup_status == BACKUP_STATUS_SUCCESS:
@@ -260,6 +500,7 @@ class BackupService:
             # Eliminar el hilo de la lista de respaldos en ejecución
             if config.id in self.running_backups_threads:
                 del self.running_backups_threads[config.id]
+            self.cancel_events.pop(config.id, None)
             logger.info(f"Tarea de respaldo para {config.name} finalizada.")
 
     def start_backup(self, config: BackupConfig, is_manual: bool = False) -> bool:
@@ -279,6 +520,7 @@ class BackupService:
             args=(config, is_manual),
             daemon=True # Permite que el programa se cierre aunque el hilo esté corriendo
         )
+        self.cancel_events[config.id] = threading.Event()
         self.running_backups_threads[config.id] = thread
         thread.start()
         logger.info(f"Hilo de respaldo iniciado para '{config.name}'.")
@@ -290,4 +532,4 @@ class BackupService:
         return thread is not None and thread.is_alive()
 
 # Instancia global del servicio de respaldo
-backup_service = BackupService()
+backup_service = lazy_service("backup_service", BackupService)
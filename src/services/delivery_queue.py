@@ -0,0 +1,121 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, List, Optional
+
+from ..utils.constants import (NOTIFICATION_QUEUE_MAX_SIZE, NOTIFICATION_SINK_IDLE_SECONDS, NOTIFICATION_MAX_ATTEMPTS,
+                               NOTIFICATION_RETRY_BASE_DELAY_SECONDS, NOTIFICATION_RETRY_MAX_DELAY_SECONDS)
+
+logger = logging.getLogger(__name__)
+
+class DeliveryQueue:
+    """
+    Entrega en segundo plano los envíos de un canal de notificación (correo, webhook, syslog...) para
+    que un destino lento no alargue los respaldos. Un único hilo toma lotes de hasta `sink.batch_size`
+    elementos y los pasa a `sink.send_batch()`; si el envío falla se reintenta el mismo lote con espera
+    exponencial. La cola está acotada y, si se llena, se descartan los elementos más antiguos.
+    Tras un rato sin envíos se llama a `sink.close()` para no mantener conexiones abiertas.
+    Una cola que ya no se usa se cierra con close(): el hilo entrega lo pendiente y termina; un lote que
+    estaba esperando para reintentar se intenta una última vez sin agotar la espera.
+    """
+    def __init__(self, sink, max_size: int = NOTIFICATION_QUEUE_MAX_SIZE):
+        self.sink = sink
+        self.max_size = max_size
+        self._queue: Deque[Any] = deque()
+        self._condition = threading.Condition()
+        self._sending = False
+        self._closed = False
+        self._closed_event = threading.Event() # Interrumpe la espera entre reintentos al cerrar
+        self._worker: Optional[threading.Thread] = None
+        self.sent_count = 0
+        self.dropped_count = 0
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name=f"delivery-{self.sink.name}", daemon=True)
+            self._worker.start()
+
+    def enqueue(self, item: Any):
+        """Encola un envío. No bloquea: con la cola llena se descarta el elemento más antiguo."""
+        with self._condition:
+            if len(self._queue) >= self.max_size:
+                dropped = self._queue.popleft()
+                self.dropped_count += 1
+                logger.warning(f"Cola de '{self.sink.name}' llena ({self.max_size}): descartado {self.sink.describe(dropped)}.")
+            self._queue.append(item)
+            self._ensure_worker()
+            self._condition.notify_all()
+
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._queue) + (1 if self._sending else 0)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que se vacíe la cola. Retorna False si se agotó el tiempo con envíos pendientes."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._queue or self._sending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        Termina el hilo de envío en cuanto entregue lo pendiente, esperando como mucho `timeout` segundos
+        (0 = no esperar). Retorna True si el hilo ya terminó. Lo encolado después todavía se entrega.
+        """
+        with self._condition:
+            self._closed = True
+            self._closed_event.set()
+            self._condition.notify_all()
+            worker = self._worker
+        if worker is None:
+            return True
+        worker.join(timeout)
+        return not worker.is_alive()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._queue:
+                    if not self._closed:
+                        self._condition.wait(NOTIFICATION_SINK_IDLE_SECONDS)
+                    if not self._queue:
+                        self.sink.close() # Sin envíos: no mantener la conexión abierta
+                        if self._closed:
+                            return
+                        continue
+                batch = [self._queue.popleft() for _ in range(min(self.sink.batch_size, len(self._queue)))]
+                self._sending = True
+            try:
+                self._deliver(batch)
+            finally:
+                with self._condition:
+                    self._sending = False
+                    self._condition.notify_all()
+
+    def _deliver(self, batch: List[Any]):
+        attempt = 1
+        while True:
+            try:
+                self.sink.send_batch(batch)
+                self.sent_count += len(batch)
+                return
+            except Exception as e:
+                if self.sink.is_permanent(e) or attempt >= NOTIFICATION_MAX_ATTEMPTS:
+                    logger.error(f"Error al entregar {len(batch)} notificaciones por '{self.sink.name}' "
+                                 f"(intento {attempt}): {e}")
+                    self.sink.close()
+                    return
+                delay = min(NOTIFICATION_RETRY_BASE_DELAY_SECONDS * 2 ** (attempt - 1), NOTIFICATION_RETRY_MAX_DELAY_SECONDS)
+                delay *= random.uniform(0.8, 1.2) # Evitar reintentos sincronizados con otros clientes
+                logger.warning(f"Fallo al entregar por '{self.sink.name}' (intento {attempt}/{NOTIFICATION_MAX_ATTEMPTS}): {e}. "
+                               f"Reintentando en {delay:.0f} s.")
+                if self._closed_event.wait(delay):
+                    attempt = NOTIFICATION_MAX_ATTEMPTS # Cerrando: un último intento sin esperar más
+                else:
+                    attempt += 1
@@ -0,0 +1,112 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from ..models.backup_config import BackupConfig
+from ..repositories.backup_history_repository import backup_history_repository
+from ..utils.artifact_crypto import split_encrypted_extension
+from ..utils.constants import (DISK_ADMISSION_HISTORY_RUNS, DISK_ADMISSION_SAFETY_FACTOR, DISK_MIN_FREE_BYTES,
+                               DISK_ADMISSION_WAIT_SECONDS, COMPRESSION_RATIO_ESTIMATES, TABLE_ARCHIVE_EXTENSION)
+from ..utils.helpers import format_bytes
+from ..utils.service_registry import lazy_service
+
+logger = logging.getLogger(__name__)
+
+def compression_method_of(file_path: str) -> str:
+    """Deduce el método de compresión de un respaldo por su extensión (ignorando .enc)."""
+    lower_path = split_encrypted_extension(file_path)[0].lower()
+    if lower_path.endswith(".zip"):
+        return "zip"
+    if lower_path.endswith((".gzip", ".gz")):
+        return "gzip"
+    if lower_path.endswith(TABLE_ARCHIVE_EXTENSION):
+        return "mbk"
+    if lower_path.endswith(".xz"):
+        return "xz"
+    return "none"
+
+class DiskAdmissionService:
+    """
+    Decide antes de iniciar un respaldo si cabe en el disco. Estima el tamaño a partir de los últimos
+    respaldos de la configuración y descuenta el espacio ya reservado por los respaldos en curso en el
+    mismo dispositivo. Si el espacio existe pero está reservado, el respaldo espera en cola a que se
+    libere; si ni siquiera sin reservas cabría, se rechaza de inmediato.
+
+    Lo que un respaldo en curso ya escribió ha salido del espacio libre que informa el sistema, así que
+    de su reserva solo cuenta lo que le falta por escribir (ver record_written()).
+    """
+    def __init__(self):
+        self.history_repo = backup_history_repository
+        self._condition = threading.Condition()
+        self._reservations: Dict[int, Tuple[int, int]] = {} # config_id -> (dispositivo, bytes)
+        self._written: Dict[int, int] = {} # config_id -> bytes ya escritos por el respaldo en curso
+        logger.info("Servicio de control de espacio en disco inicializado.")
+
+    def estimate_bytes(self, config: BackupConfig) -> int:
+        """Bytes que se espera que ocupe el próximo respaldo (0 si no hay historial)."""
+        target_ratio = COMPRESSION_RATIO_ESTIMATES.get(config.compression_method, 1.0)
+        estimates = []
+        for file_path, file_size in self.history_repo.get_recent_artifact_sizes(config.id, DISK_ADMISSION_HISTORY_RUNS):
+            source_ratio = COMPRESSION_RATIO_ESTIMATES.get(compression_method_of(file_path), 1.0)
+            estimates.append(file_size / source_ratio * target_ratio)
+        if not estimates:
+            return 0
+        return int(max(estimates) * DISK_ADMISSION_SAFETY_FACTOR)
+
+    def reserved_bytes(self, device: int) -> int:
+        """Bytes reservados en `device` que los respaldos en curso aún no han escrito."""
+        with self._condition:
+            return sum(max(size - self._written.get(config_id, 0), 0)
+                       for config_id, (reserved_device, size) in self._reservations.items()
+                       if reserved_device == device)
+
+    def record_written(self, config_id: int, bytes_written: int):
+        """Anota cuántos bytes lleva escritos un respaldo admitido; su reserva se reduce en esa cantidad."""
+        with self._condition:
+            if config_id in self._reservations:
+                self._written[config_id] = bytes_written
+
+    def acquire(self, config: BackupConfig, timeout: float = DISK_ADMISSION_WAIT_SECONDS,
+                cancel_event: Optional[threading.Event] = None) -> Tuple[bool, str]:
+        """
+        Reserva el espacio estimado para un respaldo en el disco de config.backup_path.
+        Retorna (admitido, mensaje). Cada reserva concedida debe liberarse con release().
+        """
+        needed = self.estimate_bytes(config)
+        device = os.stat(config.backup_path).st_dev
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                free = shutil.disk_usage(config.backup_path).free - DISK_MIN_FREE_BYTES
+                reserved = self.reserved_bytes(device)
+                if needed > free:
+                    message = (f"Espacio insuficiente en {config.backup_path}: se estiman {format_bytes(needed)} "
+                               f"y hay {format_bytes(max(free, 0))} disponibles (reservando {format_bytes(DISK_MIN_FREE_BYTES)}).")
+                    logger.error(message)
+                    return False, message
+                if needed <= free - reserved:
+                    self._reservations[config.id] = (device, needed)
+                    return True, f"Espacio reservado: {format_bytes(needed)} (libres {format_bytes(free - reserved)})."
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or (cancel_event is not None and cancel_event.is_set()):
+                    message = (f"Tiempo de espera agotado: {format_bytes(reserved)} de {config.backup_path} "
+                               f"siguen reservados por otros respaldos en curso.")
+                    logger.error(message)
+                    return False, message
+                logger.info(f"Respaldo de '{config.name}' en cola: necesita {format_bytes(needed)}, "
+                            f"{format_bytes(reserved)} reservados por otros respaldos.")
+                self._condition.wait(min(remaining, 5.0))
+
+    def release(self, config_id: int):
+        """Libera la reserva de un respaldo y despierta a los que esperan espacio."""
+        with self._condition:
+            self._written.pop(config_id, None)
+            if self._reservations.pop(config_id, None) is not None:
+                self._condition.notify_all()
+
+# Instancia global del servicio de control de espacio en disco
+disk_admission_service = lazy_service("disk_admission_service", DiskAdmissionService)
@@ -1,18 +1,31 @@
+import json
 import os
-from cryptography.fernet import Fernet
+import threading
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
 import logging
+from typing import Dict, List, Optional, Tuple
 
-from ..utils.helpers import get_app_data_path
-from ..utils.constants import ENCRYPTION_KEY_FILE
+from ..utils.artifact_crypto import register_key_provider
+from ..utils.helpers import get_app_data_path, get_current_timestamp
+from ..utils.constants import ENCRYPTION_KEY_FILE, ENCRYPTION_KEYRING_FILE
+from ..utils.service_registry import lazy_service
 
 logger = logging.getLogger(__name__)
 
 class EncryptionService:
+    """
+    Cifra los secretos de la aplicación con un anillo de claves Fernet versionado: se cifra siempre con
+    la clave principal (la de versión más alta) y se descifra con cualquiera de ellas (MultiFernet), de
+    modo que rotar la clave no interrumpe las lecturas de los valores aún cifrados con las anteriores.
+    """
     def __init__(self):
-        self.key_file = get_app_data_path(ENCRYPTION_KEY_FILE)
-        self._key = self._load_or_generate_key()
-        self.fernet = Fernet(self._key)
-        logger.info("Servicio de encriptación inicializado.")
+        self.key_file = get_app_data_path(ENCRYPTION_KEY_FILE) # Clave única de versiones anteriores
+        self.keyring_file = get_app_data_path(ENCRYPTION_KEYRING_FILE)
+        self._lock = threading.Lock()
+        self._keyring_mtime: Optional[float] = None
+        self._keys: List[Dict] = self._load_or_create_keyring()
+        self.fernet = self._build_fernet(self._keys)
+        logger.info(f"Servicio de encriptación inicializado (clave principal v{self.primary_version}).")
 
     def _load_or_generate_key(self) -> bytes:
         """Carga la clave de encriptación desde un archivo o genera una nueva."""
@@ -22,11 +35,108 @@ class EncryptionService:
             logger.debug(f"Clave de encriptación cargada desde: {self.key_file}")
         else:
             key = Fernet.generate_key()
-            with open(self.key_file, "wb") as f:
-                f.write(key)
-            logger.info(f"Nueva clave de encriptación generada y guardada en: {self.key_file}")
+            logger.info("Nueva clave de encriptación generada.")
         return key
 
+    def _read_keyring(self) -> List[Dict]:
+        with open(self.keyring_file, "r", encoding="utf-8") as f:
+            keys = json.load(f)["keys"]
+        self._keyring_mtime = os.path.getmtime(self.keyring_file)
+        return sorted(keys, key=lambda entry: entry["version"], reverse=True)
+
+    def _write_keyring(self, keys: List[Dict]):
+        """Escribe el anillo de claves de forma atómica (archivo temporal + os.replace)."""
+        temp_path = self.keyring_file + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"keys": keys}, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.keyring_file)
+        self._keyring_mtime = os.path.getmtime(self.keyring_file)
+
+    def _load_or_create_keyring(self) -> List[Dict]:
+        """Carga el anillo de claves; la primera vez lo crea con la clave única existente como versión 1."""
+        if os.path.exists(self.keyring_file):
+            keys = self._read_keyring()
+            logger.debug(f"Anillo de claves cargado desde: {self.keyring_file} ({len(keys)} claves)")
+            return keys
+        keys = [{"version": 1, "key": self._load_or_generate_key().decode(), "created_at": get_current_timestamp()}]
+        self._write_keyring(keys)
+        logger.info(f"Anillo de claves creado en: {self.keyring_file}")
+        return keys
+
+    @staticmethod
+    def _build_fernet(keys: List[Dict]) -> MultiFernet:
+        # MultiFernet cifra con la primera clave y prueba todas al descifrar
+        return MultiFernet([Fernet(entry["key"].encode()) for entry in keys])
+
+    def _reload_if_changed(self) -> bool:
+        """Recarga el anillo si otro proceso (p. ej. la CLI) lo rotó. Retorna True si cambió."""
+        try:
+            mtime = os.path.getmtime(self.keyring_file)
+        except OSError:
+            return False
+        if mtime == self._keyring_mtime:
+            return False
+        with self._lock:
+            self._keys = self._read_keyring()
+            self.fernet = self._build_fernet(self._keys)
+        logger.info(f"Anillo de claves recargado (clave principal v{self.primary_version}).")
+        return True
+
+    @property
+    def primary_version(self) -> int:
+        return self._keys[0]["version"]
+
+    def key_versions(self) -> List[int]:
+        return [entry["version"] for entry in self._keys]
+
+    def add_key(self) -> int:
+        """
+        Genera una clave nueva y la publica como principal. Las anteriores se conservan para descifrar
+        lo que aún esté cifrado con ellas (secretos no reescritos y respaldos cifrados).
+        """
+        with self._lock:
+            keys = self._read_keyring() if os.path.exists(self.keyring_file) else list(self._keys)
+            version = max(entry["version"] for entry in keys) + 1
+            keys.insert(0, {"version": version, "key": Fernet.generate_key().decode(), "created_at": get_current_timestamp()})
+            self._write_keyring(keys)
+            self._keys = keys
+            self.fernet = self._build_fernet(keys)
+        logger.info(f"Nueva clave de encriptación v{version} publicada como principal.")
+        return version
+
+    def remove_key(self, version: int):
+        """
+        Quita una clave anterior del anillo. No comprueba si algo sigue cifrado con ella: eso lo hace
+        KeyRotationService.retire_key. La clave principal no se puede quitar.
+        """
+        with self._lock:
+            keys = self._read_keyring() if os.path.exists(self.keyring_file) else list(self._keys)
+            if keys[0]["version"] == version:
+                raise ValueError(f"La clave v{version} es la principal y no se puede retirar.")
+            remaining = [entry for entry in keys if entry["version"] != version]
+            if len(remaining) == len(keys):
+                raise ValueError(f"No existe la clave v{version} en el anillo.")
+            self._write_keyring(remaining)
+            self._keys = remaining
+            self.fernet = self._build_fernet(remaining)
+        logger.info(f"Clave de encriptación v{version} retirada del anillo.")
+
+    def key_version_of(self, token: bytes) -> Optional[int]:
+        """Versión de la clave del anillo con la que se cifró un token (None si ninguna lo descifra)."""
+        for entry in self._keys:
+            try:
+                Fernet(entry["key"].encode()).decrypt(token)
+                return entry["version"]
+            except InvalidToken:
+                continue
+        return None
+
+    def rotate_token(self, token: str) -> str:
+        """Vuelve a cifrar un valor con la clave principal. Lanza InvalidToken si ninguna clave lo descifra."""
+        return self.fernet.rotate(token.encode()).decode()
+
     def encrypt(self, data: str) -> str:
         """Encripta una cadena de texto."""
         if not data:
@@ -44,12 +154,36 @@ class EncryptionService:
         if not encrypted_data:
             return ""
         try:
-            decrypted_data = self.fernet.decrypt(encrypted_data.encode()).decode()
+            try:
+                decrypted_data = self.fernet.decrypt(encrypted_data.encode()).decode()
+            except InvalidToken:
+                if not self._reload_if_changed():
+                    raise
+                decrypted_data = self.fernet.decrypt(encrypted_data.encode()).decode()
             logger.debug("Datos desencriptados.")
             return decrypted_data
         except Exception as e:
             logger.error(f"Error al desencriptar datos: {e}")
             return ""
 
+    def new_artifact_key(self) -> Tuple[bytes, bytes]:
+        """
+        Genera la clave de datos de un respaldo cifrado y la retorna junto con su versión envuelta
+        (cifrada con la clave maestra), que es la que se guarda en la cabecera del archivo.
+        """
+        key = os.urandom(32)
+        return key, self.fernet.encrypt(key)
+
+    def unwrap_artifact_key(self, wrapped_key: bytes) -> bytes:
+        """Recupera la clave de datos de un respaldo cifrado con cualquier versión del anillo de claves."""
+        try:
+            return self.fernet.decrypt(wrapped_key)
+        except InvalidToken:
+            if not self._reload_if_changed():
+                raise
+            return self.fernet.decrypt(wrapped_key)
+
 # Instancia global del servicio de encriptación
-encryption_service = EncryptionService()
+encryption_service = lazy_service("encryption_service", EncryptionService)
+# Clave de los respaldos cifrados: el anillo se carga al abrir o escribir el primer archivo .enc
+register_key_provider(encryption_service)
@@ -20,6 +20,7 @@ from ..repositories.backup_config_repository import backup_config_repository
 from ..repositories.backup_history_repository import backup_history_repository
 from ..repositories.app_settings_repository import app_settings_repository
 from ..repositories.backup_schedule_repository import backup_schedule_repository
+from ..services.backup_service import backup_service
 from ..services.encryption_service import encryption_service
 from ..utils.helpers import show_message_box, parse_iso_datetime
 
@@ -162,6 +163,8 @@ class ExportImportService:
                 if self.settings_repo.save_settings(settings):
                     settings_updated = True
                     logger.info("Ajustes de aplicación importados/actualizados.")
+                    # El límite global se aplica también a los respaldos en curso
+                    backup_service.set_global_bandwidth_limit(settings.max_bandwidth_kbps)
                 else:
                     logger.warning("No se pudieron importar/actualizar los ajustes de la aplicación.")
 
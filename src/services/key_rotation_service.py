@@ -0,0 +1,130 @@
+import logging
+import os
+import sqlite3
+from typing import Dict, List, Tuple
+
+from cryptography.fernet import InvalidToken
+
+from ..models.database import database
+from ..repositories.backup_file_repository import backup_file_repository
+from ..services.encryption_service import encryption_service
+from ..utils.artifact_crypto import ArtifactDecryptionError, is_encrypted_artifact, read_wrapped_key
+from ..utils.constants import ENCRYPTED_SECRET_COLUMNS, KEY_ROTATION_BATCH_SIZE
+from ..utils.service_registry import lazy_service
+
+logger = logging.getLogger(__name__)
+
+class KeyRotationService:
+    """
+    Rota la clave de encriptación sin interrumpir la aplicación: primero publica la clave nueva como
+    principal (las lecturas siguen funcionando porque el anillo conserva las anteriores) y después
+    reescribe todos los secretos cifrados en una sola transacción. Las claves anteriores solo se retiran
+    a mano (retire_key), cuando ya no queda ningún secreto ni respaldo cifrado que las necesite.
+    """
+    def __init__(self):
+        self.db = database
+        self.encryption_service = encryption_service
+        self.file_repo = backup_file_repository
+        logger.info("Servicio de rotación de claves inicializado.")
+
+    def rotate(self) -> Tuple[bool, str]:
+        """Genera una clave principal nueva y vuelve a cifrar con ella todos los secretos almacenados."""
+        try:
+            version = self.encryption_service.add_key()
+        except OSError as e:
+            logger.error(f"No se pudo guardar la nueva clave de encriptación: {e}")
+            return False, f"No se pudo guardar la nueva clave: {e}"
+        try:
+            rewritten, skipped = self.reencrypt_secrets()
+        except sqlite3.Error as e:
+            # La clave nueva ya es la principal; los secretos siguen legibles con las anteriores
+            logger.error(f"Error al reescribir los secretos con la clave v{version}: {e}")
+            return False, f"Clave v{version} publicada, pero no se pudieron reescribir los secretos: {e}"
+        message = f"Clave v{version} publicada; {rewritten} secretos cifrados de nuevo."
+        if skipped:
+            message += f" {skipped} valores no se pudieron descifrar con ninguna clave y se dejaron sin cambios."
+        logger.info(message)
+        return skipped == 0, message
+
+    def reencrypt_secrets(self, batch_size: int = KEY_ROTATION_BATCH_SIZE) -> Tuple[int, int]:
+        """
+        Vuelve a cifrar con la clave principal cada secreto de ENCRYPTED_SECRET_COLUMNS. El cifrado se
+        hace fuera del lock de la base de datos; la escritura, en una sola transacción con sentencias
+        por lotes. Cada UPDATE exige que el valor no haya cambiado desde que se leyó, así que un secreto
+        editado mientras tanto (ya cifrado con la clave nueva) no se sobrescribe. Retorna (reescritos, omitidos).
+        """
+        updates: Dict[Tuple[str, str], List[Tuple[str, int, str]]] = {}
+        skipped = 0
+        for table, column in ENCRYPTED_SECRET_COLUMNS:
+            rows = self.db.execute_query(f"SELECT id, {column} FROM {table} WHERE {column} IS NOT NULL AND {column} != ''")
+            for row in rows:
+                token = row[column]
+                try:
+                    updates.setdefault((table, column), []).append((self.encryption_service.rotate_token(token), row["id"], token))
+                except InvalidToken:
+                    skipped += 1
+                    logger.warning(f"{table}.{column} (id {row['id']}) no se puede descifrar con ninguna clave: se deja sin cambios.")
+
+        rewritten = 0
+        with self.db.transaction() as cursor:
+            for (table, column), params in updates.items():
+                for start in range(0, len(params), batch_size):
+                    cursor.executemany(f"UPDATE {table} SET {column} = ? WHERE id = ? AND {column} = ?",
+                                       params[start:start + batch_size])
+                    rewritten += cursor.rowcount
+        return rewritten, skipped
+
+    def retire_key(self, version: int) -> Tuple[bool, str]:
+        """
+        Elimina del anillo una clave anterior. Se niega mientras algún secreto o respaldo cifrado del
+        catálogo dependa de ella (sin la clave ya no se podrían descifrar), o si hay respaldos cifrados en
+        almacenamiento remoto, cuya cabecera no se puede comprobar sin descargarlos.
+        """
+        if version not in self.encryption_service.key_versions():
+            return False, f"No existe la clave v{version} en el anillo."
+        if version == self.encryption_service.primary_version:
+            return False, f"La clave v{version} es la principal: rote la clave antes de retirarla."
+
+        secrets = 0
+        for table, column in ENCRYPTED_SECRET_COLUMNS:
+            rows = self.db.execute_query(f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL AND {column} != ''")
+            secrets += sum(1 for row in rows if self.encryption_service.key_version_of(row[column].encode()) == version)
+
+        artifacts = 0
+        unverifiable = 0
+        for backup_file in self.file_repo.get_all():
+            if not is_encrypted_artifact(backup_file.file_path):
+                continue
+            if "://" in backup_file.file_path:
+                unverifiable += 1
+                continue
+            if not os.path.isfile(backup_file.file_path):
+                continue # Un archivo que ya no existe no necesita la clave
+            try:
+                wrapped_key = read_wrapped_key(backup_file.file_path)
+            except (OSError, ArtifactDecryptionError) as e:
+                logger.warning(f"No se pudo leer la cabecera de {backup_file.file_path}: {e}")
+                unverifiable += 1
+                continue
+            if self.encryption_service.key_version_of(wrapped_key) == version:
+                artifacts += 1
+
+        if secrets or artifacts or unverifiable:
+            message = f"La clave v{version} no se retiró:"
+            if secrets:
+                message += f" {secrets} secretos cifrados con ella (ejecute rotate-key para reescribirlos);"
+            if artifacts:
+                message += f" {artifacts} respaldos cifrados con ella;"
+            if unverifiable:
+                message += f" {unverifiable} respaldos cifrados que no se pueden comprobar;"
+            logger.warning(message.rstrip(";"))
+            return False, message.rstrip(";") + "."
+        try:
+            self.encryption_service.remove_key(version)
+        except (OSError, ValueError) as e:
+            logger.error(f"No se pudo retirar la clave v{version}: {e}")
+            return False, f"No se pudo retirar la clave v{version}: {e}"
+        return True, f"Clave v{version} retirada del anillo."
+
+# Instancia global del servicio de rotación de claves
+key_rotation_service = lazy_service("key_rotation_service", KeyRotationService)
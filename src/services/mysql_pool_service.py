@@ -0,0 +1,196 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Optional, Tuple
+
+import mysql.connector
+from mysql.connector.errors import PoolError
+
+from ..models.backup_config import BackupConfig
+from ..utils.constants import (MYSQL_CONNECT_TIMEOUT_SECONDS, MYSQL_POOL_MAX_SIZE, MYSQL_POOL_ACQUIRE_TIMEOUT_SECONDS,
+                               MYSQL_POOL_IDLE_SECONDS, MYSQL_POOL_HEALTH_CHECK_SECONDS, MYSQL_POOL_EVICT_INTERVAL_SECONDS)
+from ..utils.service_registry import lazy_service
+
+logger = logging.getLogger(__name__)
+
+class ConnectionPool:
+    """
+    Conexiones a un mismo servidor, usuario y base de datos. Se reutiliza primero la conexión usada
+    más recientemente; si llevaba más de MYSQL_POOL_HEALTH_CHECK_SECONDS sin usarse se comprueba con
+    un ping antes de entregarla. Como máximo `max_size` conexiones abiertas: si están todas en uso,
+    acquire() espera a que se libere una.
+    """
+    def __init__(self, params: Dict, max_size: int = MYSQL_POOL_MAX_SIZE):
+        self.params = params
+        self.max_size = max_size
+        self._idle: Deque[Tuple[object, float]] = deque() # (conexión, time.monotonic() de su liberación)
+        self._in_use = 0
+        self._condition = threading.Condition()
+        self.created_count = 0
+        self.reused_count = 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.params['user']}@{self.params['host']}:{self.params['port']}/{self.params['database']}"
+
+    def _is_healthy(self, cnx, idle_seconds: float) -> bool:
+        if idle_seconds < MYSQL_POOL_HEALTH_CHECK_SECONDS:
+            return True
+        try:
+            cnx.ping(reconnect=False)
+            return True
+        except mysql.connector.Error:
+            return False
+
+    def acquire(self, timeout: float = MYSQL_POOL_ACQUIRE_TIMEOUT_SECONDS):
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while not self._idle and self._in_use >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolError(f"No hay conexiones libres en el pool de {self.label} ({self.max_size} en uso).")
+                self._condition.wait(remaining)
+            candidate = self._idle.pop() if self._idle else None
+            self._in_use += 1
+        try:
+            # El ping y la conexión nueva se hacen fuera del lock: pueden tardar
+            if candidate is not None:
+                cnx, released_at = candidate
+                if self._is_healthy(cnx, time.monotonic() - released_at):
+                    self.reused_count += 1
+                    return cnx
+                logger.debug(f"Conexión inactiva descartada del pool de {self.label}.")
+                self._close_quietly(cnx)
+            cnx = mysql.connector.connect(connection_timeout=MYSQL_CONNECT_TIMEOUT_SECONDS, **self.params)
+            self.created_count += 1
+            return cnx
+        except Exception:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, cnx, discard: bool = False):
+        """Devuelve una conexión al pool (o la cierra si `discard` o si quedó en mal estado)."""
+        if not discard:
+            try:
+                if cnx.in_transaction:
+                    cnx.rollback()
+            except mysql.connector.Error:
+                discard = True
+        if discard:
+            self._close_quietly(cnx)
+        with self._condition:
+            self._in_use -= 1
+            if not discard:
+                self._idle.append((cnx, time.monotonic()))
+            self._condition.notify()
+
+    def evict_idle(self, max_idle_seconds: float = MYSQL_POOL_IDLE_SECONDS) -> int:
+        """Cierra las conexiones que llevan más de `max_idle_seconds` sin usarse. Retorna cuántas."""
+        now = time.monotonic()
+        with self._condition:
+            expired = [cnx for cnx, released_at in self._idle if now - released_at >= max_idle_seconds]
+            self._idle = deque(item for item in self._idle if now - item[1] < max_idle_seconds)
+        for cnx in expired:
+            self._close_quietly(cnx)
+        return len(expired)
+
+    def close(self):
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+        for cnx, _ in idle:
+            self._close_quietly(cnx)
+
+    @staticmethod
+    def _close_quietly(cnx):
+        try:
+            cnx.close()
+        except Exception:
+            pass
+
+class MySQLPoolService:
+    """
+    Pools de conexiones MySQL compartidos por la interfaz (carga de tablas, prueba de conexión) y los
+    respaldos (consultas a information_schema). Hay un pool por servidor, usuario, contraseña y base
+    de datos, así que una configuración editada en el formulario no reutiliza conexiones con los datos
+    anteriores. Un hilo cierra periódicamente las conexiones inactivas.
+    """
+    def __init__(self):
+        self._pools: Dict[Tuple, ConnectionPool] = {}
+        self._lock = threading.Lock()
+        self._evictor: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        logger.info("Servicio de pools de conexiones MySQL inicializado.")
+
+    @staticmethod
+    def _params(config: BackupConfig) -> Dict:
+        return {
+            "host": config.host,
+            "port": config.port,
+            "user": config.username,
+            "password": config.password_encrypted, # Ya viene desencriptada del repositorio
+            "database": config.database_name
+        }
+
+    def get_pool(self, config: BackupConfig) -> ConnectionPool:
+        params = self._params(config)
+        key = tuple(params.values())
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = ConnectionPool(params)
+                logger.debug(f"Pool de conexiones creado para {pool.label}.")
+            if self._evictor is None or not self._evictor.is_alive():
+                self._evictor = threading.Thread(target=self._evict_loop, name="mysql-pool-evictor", daemon=True)
+                self._evictor.start()
+            return pool
+
+    @contextmanager
+    def connection(self, config: BackupConfig) -> Iterator:
+        """Presta una conexión del pool de la configuración; si el bloque falla con un error de MySQL, se descarta."""
+        pool = self.get_pool(config)
+        cnx = pool.acquire()
+        discard = False
+        try:
+            yield cnx
+        except mysql.connector.Error:
+            discard = True
+            raise
+        finally:
+            pool.release(cnx, discard)
+
+    def test_connection(self, config: BackupConfig) -> Tuple[bool, str]:
+        """Comprueba que el servidor responde con las credenciales de la configuración."""
+        try:
+            with self.connection(config) as cnx:
+                cnx.ping(reconnect=False)
+                version = cnx.get_server_info()
+        except mysql.connector.Error as err:
+            return False, f"Error de conexión: {err}"
+        return True, f"Conexión exitosa (servidor {version})."
+
+    def _evict_loop(self):
+        while not self._stop_event.wait(MYSQL_POOL_EVICT_INTERVAL_SECONDS):
+            self.evict_idle()
+
+    def evict_idle(self) -> int:
+        with self._lock:
+            pools = list(self._pools.values())
+        evicted = sum(pool.evict_idle() for pool in pools)
+        if evicted:
+            logger.debug(f"{evicted} conexiones MySQL inactivas cerradas.")
+        return evicted
+
+    def close_all(self):
+        """Cierra todas las conexiones inactivas (al cerrar la aplicación)."""
+        self._stop_event.set()
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+# Instancia global del servicio de pools de conexiones MySQL
+mysql_pool_service = lazy_service("mysql_pool_service", MySQLPoolService)
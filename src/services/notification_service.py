@@ -1,20 +1,53 @@
 import logging
-import smtplib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Optional
-
-from PyQt5.QtWidgets import QMessageBox
+from typing import Dict, List, Optional, Tuple
 
+from ..models.app_settings import AppSettings
 from ..repositories.app_settings_repository import app_settings_repository
-from ..utils.constants import NOTIFICATION_LEVELS
-from ..utils.helpers import show_message_box
+from ..services.delivery_queue import DeliveryQueue
+from ..services.notification_sinks import (NotificationEvent, NotificationSink, EmailSink, WebhookSink, SyslogSink,
+                                           SpoolSink, build_sink)
+from ..utils.constants import (NOTIFICATION_LEVELS, NOTIFICATION_DIGEST_ERROR_COOLDOWN_SECONDS,
+                               NOTIFICATION_DIGEST_MAX_EVENTS)
+from ..utils.helpers import to_json_string, show_message_box
+from ..utils.service_registry import lazy_service
 
 logger = logging.getLogger(__name__)
 
+class _DigestEntry:
+    """Notificaciones iguales (misma configuración, nivel y asunto) agrupadas dentro de una ventana del resumen."""
+    def __init__(self, config_name: str, message_level: str, subject: str, body: str):
+        self.config_name = config_name
+        self.message_level = message_level
+        self.subject = subject
+        self.body = body
+        self.count = 1
+        self.first_seen = datetime.now()
+        self.last_seen = self.first_seen
+
 class NotificationService:
     def __init__(self):
         self.settings_repo = app_settings_repository
+        self.email_delivery = DeliveryQueue(EmailSink())
+        # Canales adicionales (webhook, syslog, spool), cada uno con su cola. Al cambiar la configuración se
+        # conservan las colas de los canales que no cambiaron y se cierran las demás tras entregar lo pendiente
+        self._sink_queues: List[DeliveryQueue] = []
+        self._sink_keys: List[str] = [] # Configuración (JSON) de cada cola de _sink_queues
+        self._retired_queues: List[DeliveryQueue] = [] # Colas cerradas que aún tienen envíos pendientes
+        self._sinks_config: Optional[str] = None
+        self._sinks_lock = threading.Lock()
+        # Modo resumen: eventos pendientes por destinatario, agrupados por (configuración, nivel, asunto)
+        self._digest_lock = threading.Lock()
+        self._digest: Dict[str, "OrderedDict[Tuple[str, str, str], _DigestEntry]"] = {}
+        self._digest_settings: Dict[str, AppSettings] = {}
+        self._digest_overflow: Dict[str, int] = {}
+        self._digest_timer: Optional[threading.Timer] = None
+        self._last_immediate_error: Dict[str, float] = {} # {config_name: time.monotonic()}
         logger.info("Servicio de notificaciones inicializado.")
 
     def _should_notify(self, message_level: str) -> bool:
@@ -33,27 +66,81 @@ class NotificationService:
 
     def show_info(self, title: str, message: str):
         """Muestra un mensaje informativo en la UI."""
+        from PyQt5.QtWidgets import QMessageBox
         show_message_box(title, message, QMessageBox.Information)
         logger.info(f"INFO - {title}: {message}")
 
     def show_warning(self, title: str, message: str):
         """Muestra un mensaje de advertencia en la UI."""
+        from PyQt5.QtWidgets import QMessageBox
         show_message_box(title, message, QMessageBox.Warning)
         logger.warning(f"WARNING - {title}: {message}")
 
     def show_error(self, title: str, message: str):
         """Muestra un mensaje de error en la UI."""
+        from PyQt5.QtWidgets import QMessageBox
         show_message_box(title, message, QMessageBox.Critical)
         logger.error(f"ERROR - {title}: {message}")
 
     def ask_yes_no(self, title: str, message: str) -> bool:
         """Muestra un diálogo de sí/no y retorna la respuesta booleana."""
+        from PyQt5.QtWidgets import QMessageBox
         reply = show_message_box(title, message, QMessageBox.Question, 
                                  QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         return reply == QMessageBox.Yes
 
-    def send_email_notification(self, subject: str, body: str, message_level: str = 'info'):
-        """Envía una notificación por correo electrónico si las notificaciones están habilitadas y el nivel lo permite."""
+    def _sync_sinks(self, settings: AppSettings) -> List[DeliveryQueue]:
+        """
+        Ajusta las colas a los canales configurados. Los canales sin cambios conservan su cola; las colas
+        de los canales retirados terminan sus envíos pendientes y su hilo (flush() también las espera).
+        """
+        sinks_config = to_json_string(settings.notification_sinks)
+        with self._sinks_lock:
+            if sinks_config != self._sinks_config:
+                previous = list(zip(self._sink_keys, self._sink_queues))
+                keys, queues = [], []
+                for spec in settings.notification_sinks:
+                    key = to_json_string(spec)
+                    reused = next((pair for pair in previous if pair[0] == key), None)
+                    if reused is not None:
+                        previous.remove(reused)
+                        keys.append(key)
+                        queues.append(reused[1])
+                        continue
+                    try:
+                        queues.append(DeliveryQueue(build_sink(spec)))
+                        keys.append(key)
+                    except (KeyError, ValueError) as e:
+                        logger.error(f"Canal de notificación ignorado ({spec.get('type')}): {e}")
+                retired = [delivery_queue for _, delivery_queue in previous]
+                # close(0) no espera: solo avisa al hilo, que termina al vaciar la cola
+                self._retired_queues = [delivery_queue for delivery_queue in self._retired_queues + retired
+                                        if not delivery_queue.close(0)]
+                self._sink_queues = queues
+                self._sink_keys = keys
+                self._sinks_config = sinks_config
+            return self._sink_queues
+
+    def notify(self, subject: str, body: str, message_level: str = 'info', config_name: Optional[str] = None):
+        """
+        Publica una notificación en todos los canales: el correo (según notification_level y el modo
+        resumen) y los canales adicionales cuyo nivel mínimo la admita. Nunca bloquea al llamador.
+        """
+        settings = self.settings_repo.get_settings()
+        event = NotificationEvent(subject, body, message_level, config_name)
+        for delivery_queue in self._sync_sinks(settings):
+            if delivery_queue.sink.accepts(message_level):
+                delivery_queue.enqueue(event)
+        self.send_email_notification(subject, body, message_level, config_name)
+
+    def send_email_notification(self, subject: str, body: str, message_level: str = 'info',
+                                config_name: Optional[str] = None):
+        """
+        Envía una notificación por correo electrónico si las notificaciones están habilitadas y el nivel lo permite.
+        Con el modo resumen activo (notification_digest_minutes > 0) la notificación se acumula y se envía
+        en un único correo al cerrar la ventana; solo el primer error de cada configuración por
+        periodo de enfriamiento se envía al momento.
+        """
         settings = self.settings_repo.get_settings()
 
         if not settings.email_notifications_enabled:
@@ -68,20 +155,110 @@ class NotificationService:
             logger.error("Faltan configuraciones de correo electrónico para enviar la notificación.")
             return
 
-        try:
-            msg = MIMEMultipart()
-            msg['From'] = f"{settings.email_sender_name} <{settings.email_username}>" if settings.email_sender_name else settings.email_username
-            msg['To'] = settings.email_recipient
-            msg['Subject'] = f"[{message_level.upper()}] {subject}"
-            msg.attach(MIMEText(body, 'plain'))
-
-            with smtplib.SMTP(settings.email_smtp_server, settings.email_smtp_port) as server:
-                server.starttls() # Habilitar seguridad TLS
-                server.login(settings.email_username, settings.email_password_encrypted) # password_encrypted ya viene desencriptada del repo
-                server.send_message(msg)
-            logger.info(f"Notificación por correo electrónico enviada a {settings.email_recipient} con asunto: {subject}")
-        except Exception as e:
-            logger.error(f"Error al enviar notificación por correo electrónico: {e}")
+        if settings.notification_digest_minutes <= 0:
+            self._enqueue_email(settings, f"[{message_level.upper()}] {subject}", body)
+        elif message_level == 'error' and self._error_cooldown_elapsed(config_name or ""):
+            self._enqueue_email(settings, f"[{message_level.upper()}] {subject}", body)
+        else:
+            self._add_to_digest(settings, subject, body, message_level, config_name or "")
+
+    def _enqueue_email(self, settings: AppSettings, subject: str, body: str):
+        msg = MIMEMultipart()
+        msg['From'] = f"{settings.email_sender_name} <{settings.email_username}>" if settings.email_sender_name else settings.email_username
+        msg['To'] = settings.email_recipient
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, 'plain'))
+
+        # El envío (con reintentos) se hace en segundo plano para no retrasar el respaldo
+        self.email_delivery.enqueue((msg, settings))
+        logger.debug(f"Notificación por correo electrónico encolada: {subject}")
+
+    def _error_cooldown_elapsed(self, config_name: str) -> bool:
+        """Limita los errores enviados al momento a uno por configuración y periodo de enfriamiento."""
+        now = time.monotonic()
+        with self._digest_lock:
+            last = self._last_immediate_error.get(config_name)
+            if last is not None and now - last < NOTIFICATION_DIGEST_ERROR_COOLDOWN_SECONDS:
+                return False
+            self._last_immediate_error[config_name] = now
+            return True
+
+    def _add_to_digest(self, settings: AppSettings, subject: str, body: str, message_level: str, config_name: str):
+        recipient = settings.email_recipient
+        key = (config_name, message_level, subject)
+        with self._digest_lock:
+            entries = self._digest.setdefault(recipient, OrderedDict())
+            self._digest_settings[recipient] = settings
+            entry = entries.get(key)
+            if entry is not None:
+                entry.count += 1
+                entry.body = body
+                entry.last_seen = datetime.now()
+            elif len(entries) < NOTIFICATION_DIGEST_MAX_EVENTS:
+                entries[key] = _DigestEntry(config_name, message_level, subject, body)
+            else:
+                self._digest_overflow[recipient] = self._digest_overflow.get(recipient, 0) + 1
+            if self._digest_timer is None:
+                self._digest_timer = threading.Timer(settings.notification_digest_minutes * 60, self.flush_digest)
+                self._digest_timer.daemon = True
+                self._digest_timer.start()
+        logger.debug(f"Notificación añadida al resumen: {subject}")
+
+    @staticmethod
+    def _format_digest(entries, overflow: int) -> Tuple[str, str]:
+        """Compone el asunto y el cuerpo de un resumen, con los errores primero."""
+        counts = {level: 0 for level in NOTIFICATION_LEVELS}
+        for entry in entries:
+            counts[entry.message_level] = counts.get(entry.message_level, 0) + entry.count
+        total = sum(counts.values()) + overflow
+        subject = (f"[RESUMEN] {total} notificaciones: {counts.get('error', 0)} errores, "
+                   f"{counts.get('warning', 0)} advertencias, {counts.get('info', 0)} informativas")
+        lines = []
+        titles = {"error": "ERRORES", "warning": "ADVERTENCIAS", "info": "INFORMATIVAS"}
+        for level in reversed(NOTIFICATION_LEVELS):
+            level_entries = [entry for entry in entries if entry.message_level == level]
+            if not level_entries:
+                continue
+            lines.append(f"{titles.get(level, level.upper())} ({counts[level]})")
+            for entry in level_entries:
+                repeated = f" (x{entry.count}, {entry.first_seen:%H:%M}-{entry.last_seen:%H:%M})" if entry.count > 1 else f" ({entry.last_seen:%H:%M})"
+                lines.append(f"- {entry.subject}{repeated}")
+                if level != "info": # Los éxitos solo se listan; los problemas llevan el último detalle
+                    lines.append(f"  {entry.body}")
+            lines.append("")
+        if overflow:
+            lines.append(f"Además, {overflow} notificaciones distintas no se detallan por exceder el límite del resumen.")
+        return subject, "\n".join(lines).rstrip() + "\n"
+
+    def flush_digest(self):
+        """Envía ya el resumen acumulado: un correo por destinatario."""
+        with self._digest_lock:
+            if self._digest_timer is not None:
+                self._digest_timer.cancel()
+                self._digest_timer = None
+            digest, self._digest = self._digest, {}
+            overflow, self._digest_overflow = self._digest_overflow, {}
+            digest_settings, self._digest_settings = self._digest_settings, {}
+        for recipient, entries in digest.items():
+            subject, body = self._format_digest(list(entries.values()), overflow.get(recipient, 0))
+            self._enqueue_email(digest_settings[recipient], subject, body)
+            logger.info(f"Resumen de notificaciones enviado a {recipient}: {len(entries)} eventos distintos.")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Envía el resumen pendiente y espera a que todos los canales entreguen lo encolado (p. ej. antes de cerrar la aplicación)."""
+        self.flush_digest()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delivered = True
+        with self._sinks_lock:
+            queues = [self.email_delivery] + self._sink_queues
+            retired = list(self._retired_queues)
+        for delivery_queue in queues:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            delivered = delivery_queue.flush(remaining) and delivered
+        for delivery_queue in retired:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            delivered = delivery_queue.close(remaining) and delivered
+        return delivered
 
 # Instancia global del servicio de notificaciones
-notification_service = NotificationService()
+notification_service = lazy_service("notification_service", NotificationService)
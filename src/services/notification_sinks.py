@@ -0,0 +1,277 @@
+"""
+Canales de notificación. Cada canal implementa NotificationSink y se entrega a través de una
+DeliveryQueue (hilo propio, lotes, reintentos con espera exponencial y cola acotada).
+"""
+import abc
+import http.client
+import json
+import logging
+import logging.handlers
+import os
+import smtplib
+import socket
+from datetime import datetime
+from email.message import Message
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from ..models.app_settings import AppSettings
+from ..utils.constants import (NOTIFICATION_LEVELS, NOTIFICATION_BATCH_SIZE, NOTIFICATION_SPOOL_FILE_NAME,
+                               NOTIFICATION_SPOOL_MAX_BYTES, SMTP_TIMEOUT_SECONDS, WEBHOOK_TIMEOUT_SECONDS)
+from ..utils.helpers import get_app_data_path
+
+logger = logging.getLogger(__name__)
+
+class NotificationEvent:
+    """Una notificación tal como la reciben los canales distintos del correo."""
+    def __init__(self, subject: str, body: str, message_level: str = 'info',
+                 config_name: Optional[str] = None, timestamp: Optional[datetime] = None):
+        self.subject = subject
+        self.body = body
+        self.message_level = message_level
+        self.config_name = config_name
+        self.timestamp = timestamp if timestamp else datetime.now()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "timestamp": self.timestamp.isoformat(),
+            "level": self.message_level,
+            "config_name": self.config_name,
+            "subject": self.subject,
+            "body": self.body
+        }
+
+class SinkDeliveryError(Exception):
+    """Fallo de entrega de un canal; `permanent` indica que reintentar no servirá."""
+    def __init__(self, message: str, permanent: bool = False):
+        super().__init__(message)
+        self.permanent = permanent
+
+class NotificationSink(abc.ABC):
+    """Interfaz de un canal de notificación."""
+    name = "sink"
+    batch_size = NOTIFICATION_BATCH_SIZE
+
+    def __init__(self, min_level: str = 'info'):
+        self.min_level = min_level if min_level in NOTIFICATION_LEVELS else 'info'
+
+    def accepts(self, message_level: str) -> bool:
+        return NOTIFICATION_LEVELS.index(message_level) >= NOTIFICATION_LEVELS.index(self.min_level)
+
+    @abc.abstractmethod
+    def send_batch(self, items: List[Any]):
+        """Entrega un lote. Lanza una excepción si falla (la cola reintenta salvo que sea permanente)."""
+
+    def is_permanent(self, error: Exception) -> bool:
+        return isinstance(error, SinkDeliveryError) and error.permanent
+
+    def describe(self, item: Any) -> str:
+        return f"'{getattr(item, 'subject', item)}'"
+
+    def close(self):
+        """Libera conexiones abiertas; se vuelven a abrir en el siguiente envío."""
+
+class EmailSink(NotificationSink):
+    """
+    Correo SMTP: una sesión (STARTTLS, TLS implícito o sin cifrar, según email_smtp_security, más el
+    login) que se reutiliza entre mensajes y se reabre si el servidor la cierra.
+    """
+    name = "email"
+    batch_size = 1
+
+    def __init__(self):
+        super().__init__()
+        self.server: Optional[smtplib.SMTP] = None
+        self._key: Optional[Tuple] = None
+
+    @staticmethod
+    def _settings_key(settings: AppSettings) -> Tuple:
+        return (settings.email_smtp_server, settings.email_smtp_port, settings.email_smtp_security,
+                settings.email_username, settings.email_password_encrypted)
+
+    def _is_alive(self) -> bool:
+        try:
+            return self.server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _connect(self, settings: AppSettings):
+        if settings.email_smtp_security == "ssl":
+            server = smtplib.SMTP_SSL(settings.email_smtp_server, settings.email_smtp_port, timeout=SMTP_TIMEOUT_SECONDS)
+        else:
+            server = smtplib.SMTP(settings.email_smtp_server, settings.email_smtp_port, timeout=SMTP_TIMEOUT_SECONDS)
+        try:
+            if settings.email_smtp_security == "starttls":
+                server.starttls() # Habilitar seguridad TLS
+            server.login(settings.email_username, settings.email_password_encrypted) # password_encrypted ya viene desencriptada del repo
+        except Exception:
+            server.close()
+            raise
+        self.server = server
+        self._key = self._settings_key(settings)
+        logger.debug(f"Sesión SMTP abierta con {settings.email_smtp_server}:{settings.email_smtp_port}.")
+
+    def send_batch(self, items: List[Tuple[Message, AppSettings]]):
+        for message, settings in items:
+            if self.server is not None and (self._key != self._settings_key(settings) or not self._is_alive()):
+                self.close() # Cambió la configuración o el servidor cerró la conexión por inactividad
+            if self.server is None:
+                self._connect(settings)
+            try:
+                self.server.send_message(message)
+            except smtplib.SMTPResponseException:
+                raise # El servidor respondió con un error: la conexión sigue siendo utilizable
+            except OSError: # Incluye SMTPServerDisconnected y los errores de socket
+                self.close()
+                raise
+            logger.info(f"Notificación por correo electrónico enviada a {message['To']} con asunto: {message['Subject']}")
+
+    def is_permanent(self, error: Exception) -> bool:
+        """Errores 5xx (remitente, destinatario o credenciales rechazados) o AUTH no disponible: reintentar no servirá."""
+        if isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPNotSupportedError)):
+            return True
+        return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+    def describe(self, item: Tuple[Message, AppSettings]) -> str:
+        return f"'{item[0]['Subject']}'"
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            self.server.close()
+        self.server = None
+        self._key = None
+
+class WebhookSink(NotificationSink):
+    """
+    POST de un JSON {"events": [...]} por lote a una URL http(s). La conexión HTTP se mantiene
+    abierta (keep-alive) y se reutiliza entre lotes. Basta con una: la DeliveryQueue del canal envía
+    desde un solo hilo y un lote a la vez, y agrupa en un POST lo acumulado mientras tanto. Si el
+    servidor cerró la conexión reutilizada, se reabre y se repite el envío una vez sin esperar.
+    """
+    name = "webhook"
+
+    def __init__(self, url: str, min_level: str = 'info', headers: Optional[Dict[str, str]] = None,
+                 timeout: float = WEBHOOK_TIMEOUT_SECONDS):
+        super().__init__(min_level)
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"URL de webhook inválida: {url}")
+        self.url = url
+        self.name = f"webhook {parts.hostname}"
+        self._https = parts.scheme == "https"
+        self._host = parts.hostname
+        self._port = parts.port
+        self._path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.timeout = timeout
+        self._connection: Optional[http.client.HTTPConnection] = None
+
+    def _get_connection(self) -> http.client.HTTPConnection:
+        if self._connection is None:
+            connection_class = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+            self._connection = connection_class(self._host, self._port, timeout=self.timeout)
+        return self._connection
+
+    def _post(self, payload: bytes) -> http.client.HTTPResponse:
+        connection = self._get_connection()
+        try:
+            connection.request("POST", self._path, body=payload, headers=self.headers)
+            response = connection.getresponse()
+            response.read() # Leer la respuesta completa para poder reutilizar la conexión
+            return response
+        except (http.client.HTTPException, OSError):
+            self.close()
+            raise
+
+    def send_batch(self, items: List[NotificationEvent]):
+        payload = json.dumps({"events": [event.to_dict() for event in items]}, ensure_ascii=False).encode("utf-8")
+        reused = self._connection is not None
+        try:
+            response = self._post(payload)
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            if not reused:
+                raise
+            # El servidor cerró la conexión keep-alive mientras estaba inactiva
+            response = self._post(payload)
+        if response.will_close:
+            self.close()
+        if response.status >= 400:
+            # 4xx (salvo 408 y 429) indica una petición que el servidor no aceptará nunca
+            permanent = response.status < 500 and response.status not in (408, 429)
+            raise SinkDeliveryError(f"El webhook respondió {response.status} {response.reason}", permanent)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+class SyslogSink(NotificationSink):
+    """Syslog local (/dev/log, que también recoge journald) o remoto por UDP ("host:puerto")."""
+    name = "syslog"
+    LEVEL_MAP = {"info": logging.INFO, "warning": logging.WARNING, "error": logging.ERROR}
+
+    def __init__(self, address: Optional[str] = None, min_level: str = 'info', facility: str = "user"):
+        super().__init__(min_level)
+        self.address = self._parse_address(address)
+        self.facility = logging.handlers.SysLogHandler.facility_names.get(facility, logging.handlers.SysLogHandler.LOG_USER)
+        self._handler: Optional[logging.handlers.SysLogHandler] = None
+
+    @staticmethod
+    def _parse_address(address: Optional[str]):
+        if not address:
+            return "/dev/log" if os.path.exists("/dev/log") else ("localhost", logging.handlers.SYSLOG_UDP_PORT)
+        if address.startswith("/"):
+            return address
+        host, _, port = address.rpartition(":")
+        if not host:
+            return address, logging.handlers.SYSLOG_UDP_PORT
+        return host, int(port)
+
+    def send_batch(self, items: List[NotificationEvent]):
+        if self._handler is None:
+            self._handler = logging.handlers.SysLogHandler(address=self.address, facility=self.facility,
+                                                           socktype=socket.SOCK_DGRAM)
+            self._handler.setFormatter(logging.Formatter("mysql-backup-manager: %(message)s"))
+        for event in items:
+            source = f"[{event.config_name}] " if event.config_name else ""
+            record = logging.LogRecord("notifications", self.LEVEL_MAP.get(event.message_level, logging.INFO),
+                                       __file__, 0, f"{source}{event.subject}: {event.body}", None, None)
+            self._handler.emit(record)
+
+    def close(self):
+        if self._handler is not None:
+            self._handler.close()
+            self._handler = None
+
+class SpoolSink(NotificationSink):
+    """Archivo JSONL local (una notificación por línea), rotado a .1 al superar NOTIFICATION_SPOOL_MAX_BYTES."""
+    name = "spool"
+
+    def __init__(self, path: Optional[str] = None, min_level: str = 'info',
+                 max_bytes: int = NOTIFICATION_SPOOL_MAX_BYTES):
+        super().__init__(min_level)
+        self.path = path or get_app_data_path(NOTIFICATION_SPOOL_FILE_NAME)
+        self.max_bytes = max_bytes
+
+    def send_batch(self, items: List[NotificationEvent]):
+        lines = "".join(json.dumps(event.to_dict(), ensure_ascii=False) + "\n" for event in items)
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            os.replace(self.path, self.path + ".1")
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines) # Un solo write por lote
+
+def build_sink(spec: Dict[str, Any]) -> NotificationSink:
+    """Crea un canal a partir de su configuración (un elemento de AppSettings.notification_sinks)."""
+    sink_type = spec.get("type")
+    min_level = spec.get("min_level", 'info')
+    if sink_type == "webhook":
+        return WebhookSink(spec["url"], min_level=min_level, headers=spec.get("headers"))
+    if sink_type == "syslog":
+        return SyslogSink(spec.get("address"), min_level=min_level, facility=spec.get("facility", "user"))
+    if sink_type == "spool":
+        return SpoolSink(spec.get("path"), min_level=min_level)
+    raise ValueError(f"Tipo de canal de notificación desconocido: {sink_type}")
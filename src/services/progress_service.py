@@ -0,0 +1,196 @@
+import copy
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+
+import mysql.connector
+
+from ..models.backup_config import BackupConfig
+from ..models.backup_history import BackupHistory
+from ..models.backup_progress import BackupProgress
+from ..repositories.backup_history_repository import backup_history_repository
+from ..services.schema_metadata_service import schema_metadata_service
+from ..utils.constants import (PROGRESS_EVENT_INTERVAL_SECONDS, PROGRESS_PERSIST_INTERVAL_SECONDS,
+                               PROGRESS_THROUGHPUT_SMOOTHING, DUMP_TABLE_MARKER)
+from ..utils.service_registry import lazy_service
+
+logger = logging.getLogger(__name__)
+
+_TABLE_MARKER_PATTERN = re.compile(re.escape(DUMP_TABLE_MARKER) + rb"`((?:[^`]|``)+)`")
+_MARKER_TAIL_BYTES = 512 # Lo que se conserva del bloque anterior por si un marcador queda partido entre dos bloques
+
+ProgressListener = Callable[[BackupProgress], None]
+
+class ProgressTracker:
+    """
+    Sigue un volcado en curso a partir de los bloques que lee el servicio de respaldo: bytes, filas
+    aproximadas (tuplas de los INSERT extendidos), tabla actual, rendimiento y ETA. Los eventos a los
+    suscriptores y la escritura en backup_history se limitan a una frecuencia máxima.
+    """
+    def __init__(self, service: "ProgressService", progress: BackupProgress):
+        self.service = service
+        self.progress = progress
+        self._lock = threading.Lock()
+        self._tail = b""
+        self._started = time.monotonic()
+        self._last_sample = (self._started, 0)
+        self._last_event = 0.0
+        self._last_persist = 0.0
+
+    def feed(self, chunk: bytes, artifact_bytes: int = 0):
+        """Registra un bloque leído de mysqldump; `artifact_bytes` son los bytes escritos en disco hasta ahora."""
+        with self._lock:
+            progress = self.progress
+            progress.bytes_read += len(chunk)
+            progress.artifact_bytes = artifact_bytes
+            progress.rows += chunk.count(b"),(") + chunk.count(b"INSERT INTO ")
+            # Solo se buscan marcadores en los bloques con comentarios de mysqldump (o con uno a medias del anterior)
+            if b"-- " in chunk or b"-- " in self._tail or self._tail.endswith(b"-"):
+                data = self._tail + chunk
+                for match in _TABLE_MARKER_PATTERN.finditer(data):
+                    if match.end() <= len(self._tail):
+                        continue # Ya contado con el bloque anterior
+                    if progress.current_table is not None:
+                        progress.tables_done += 1
+                    progress.current_table = match.group(1).replace(b"``", b"`").decode("utf-8", errors="replace")
+            self._tail = (self._tail + chunk[-_MARKER_TAIL_BYTES:])[-_MARKER_TAIL_BYTES:]
+
+            now = time.monotonic()
+            if now - self._last_event < PROGRESS_EVENT_INTERVAL_SECONDS:
+                return
+            self._update_rates(now)
+            persist = now - self._last_persist >= PROGRESS_PERSIST_INTERVAL_SECONDS
+            self._last_event = now
+            if persist:
+                self._last_persist = now
+            snapshot = copy.copy(progress) # Los suscriptores leen en otro hilo: se les pasa una copia
+        self.service.publish(snapshot, persist)
+
+    def set_totals(self, tables_total: int, expected_bytes: int):
+        """Fija el número de tablas y, si no hay estimación del respaldo anterior, el tamaño total esperado."""
+        with self._lock:
+            self.progress.tables_total = tables_total
+            if not self.progress.expected_bytes and expected_bytes:
+                self.progress.expected_bytes = expected_bytes
+
+    def _update_rates(self, now: float):
+        progress = self.progress
+        sample_time, sample_bytes = self._last_sample
+        if now > sample_time:
+            rate = (progress.bytes_read - sample_bytes) / (now - sample_time)
+            if progress.throughput:
+                rate = PROGRESS_THROUGHPUT_SMOOTHING * rate + (1 - PROGRESS_THROUGHPUT_SMOOTHING) * progress.throughput
+            progress.throughput = rate
+        self._last_sample = (now, progress.bytes_read)
+        progress.eta_seconds = None
+        if progress.throughput > 0:
+            if progress.expected_bytes and progress.expected_bytes > progress.bytes_read:
+                progress.eta_seconds = (progress.expected_bytes - progress.bytes_read) / progress.throughput
+            elif progress.tables_total and progress.tables_done:
+                # Sin tamaños estimados: extrapolar el tiempo medio por tabla
+                elapsed = now - self._started
+                progress.eta_seconds = elapsed / progress.tables_done * max(progress.tables_total - progress.tables_done, 0)
+        progress.updated_at = datetime.now()
+
+    def finish(self, success: bool):
+        """Cierra el seguimiento y publica el último evento (sin persistirlo: lo hace la actualización final del historial)."""
+        with self._lock:
+            progress = self.progress
+            self._update_rates(time.monotonic())
+            elapsed = time.monotonic() - self._started
+            if elapsed > 0:
+                progress.throughput = progress.bytes_read / elapsed
+            if success and progress.current_table is not None:
+                progress.tables_done += 1
+                progress.current_table = None
+                progress.tables_total = max(progress.tables_total or 0, progress.tables_done)
+            progress.eta_seconds = None
+            progress.finished = True
+            snapshot = copy.copy(progress)
+        self.service.publish(snapshot, persist=False)
+        self.service.discard(progress.history_id)
+
+class ProgressService:
+    """
+    Publica el progreso de los respaldos en curso. La UI se suscribe con add_listener(); la línea de
+    comandos (u otro proceso) lee el último progreso guardado en backup_history.
+    """
+    def __init__(self):
+        self.history_repo = backup_history_repository
+        self._listeners: List[ProgressListener] = []
+        self._active: Dict[int, ProgressTracker] = {} # {history_id: ProgressTracker}
+        self._lock = threading.Lock()
+        logger.info("Servicio de progreso de respaldos inicializado.")
+
+    def add_listener(self, listener: ProgressListener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: ProgressListener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def start(self, history: BackupHistory, config: BackupConfig,
+              excluded_tables: Optional[List[str]] = None) -> ProgressTracker:
+        """
+        Empieza a seguir una ejecución. El total se estima con el respaldo anterior o con information_schema,
+        sin contar `excluded_tables` (por defecto, la lista explícita de la configuración).
+        """
+        progress = BackupProgress(
+            history_id=history.id,
+            config_id=config.id,
+            config_name=config.name,
+            expected_bytes=self.history_repo.get_last_raw_size(config.id)
+        )
+        tracker = ProgressTracker(self, progress)
+        with self._lock:
+            self._active[history.id] = tracker
+        # La consulta al servidor no debe retrasar el inicio del volcado
+        excluded = set(config.excluded_tables if excluded_tables is None else excluded_tables)
+        threading.Thread(target=self._estimate_from_schema, args=(config, tracker, excluded), daemon=True).start()
+        self.publish(copy.copy(progress), persist=True)
+        return tracker
+
+    def _estimate_from_schema(self, config: BackupConfig, tracker: ProgressTracker, excluded: Set[str]):
+        """Cuenta las tablas a volcar (caché de metadatos) y, si no hay respaldo anterior, usa su tamaño como estimación del total."""
+        try:
+            tables = schema_metadata_service.get_tables(config)
+        except mysql.connector.Error as err:
+            logger.warning(f"No se pudo consultar information_schema para estimar el progreso de {config.name}: {err}")
+            return
+        sizes = [table.total_size for table in tables if not table.is_view and table.table_name not in excluded]
+        # data_length + index_length sobreestima el SQL (los índices no se vuelcan): mejor un ETA conservador
+        tracker.set_totals(len(sizes), sum(sizes))
+
+    def publish(self, progress: BackupProgress, persist: bool = False):
+        """Notifica a los suscriptores y, si se pide, guarda el progreso en backup_history."""
+        if persist and progress.history_id is not None:
+            self.history_repo.update_progress(progress.history_id, progress)
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(progress)
+            except Exception as e: # Un suscriptor roto (p. ej. un widget destruido) no debe detener el respaldo
+                logger.debug(f"Error en un suscriptor de progreso: {e}")
+
+    def discard(self, history_id: int):
+        with self._lock:
+            self._active.pop(history_id, None)
+
+    def get(self, history_id: int) -> Optional[BackupProgress]:
+        """Progreso en memoria de una ejecución en curso de este proceso."""
+        with self._lock:
+            tracker = self._active.get(history_id)
+        return tracker.progress if tracker else None
+
+    def get_active(self) -> List[BackupProgress]:
+        with self._lock:
+            return [tracker.progress for tracker in self._active.values()]
+
+# Instancia global del servicio de progreso
+progress_service = lazy_service("progress_service", ProgressService)
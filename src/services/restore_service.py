@@ -0,0 +1,274 @@
+import logging
+import lzma
+import os
+import queue
+import subprocess
+import threading
+import zipfile
+import zlib
+from typing import Callable, List, Optional, Tuple
+
+from ..models.backup_config import BackupConfig
+from ..repositories.backup_file_repository import backup_file_repository
+from ..services.verification_service import verification_service, VERIFY_STATUS_OK, VERIFY_STATUS_SKIPPED
+from ..utils.artifact_crypto import ArtifactDecryptionError
+from ..utils.artifacts import open_decompressed
+from ..utils.constants import (RESTORE_PARALLELISM, RESTORE_CHUNK_SIZE, RESTORE_QUEUE_DEPTH, RESTORE_SESSION_SETTINGS,
+                               DUMP_TABLE_MARKER, DUMP_BARRIER_MARKERS, TABLE_ARCHIVE_EXTENSION)
+from ..utils.table_archive import TableArchiveReader, TableArchiveError, is_table_archive
+from ..utils.helpers import format_bytes
+from ..utils.service_registry import lazy_service
+
+logger = logging.getLogger(__name__)
+
+_SECTION_END = object() # Fin de la tabla actual: la conexión queda libre para otra
+_WORKER_STOP = object()
+
+def mysql_client_path(mysqldump_path: str) -> str:
+    """Deriva la ruta del cliente mysql de la de mysqldump (mysqldump.exe -> mysql.exe, mariadb-dump -> mariadb)."""
+    directory, name = os.path.split(mysqldump_path)
+    lower_name = name.lower()
+    if "mysqldump" in lower_name:
+        index = lower_name.index("mysqldump")
+        name = name[:index] + "mysql" + name[index + len("mysqldump"):]
+    elif "mariadb-dump" in lower_name:
+        index = lower_name.index("mariadb-dump")
+        name = name[:index] + "mariadb" + name[index + len("mariadb-dump"):]
+    else:
+        name = "mysql"
+    return os.path.join(directory, name) if directory else name
+
+class RestoreError(Exception):
+    pass
+
+class _LoadWorker:
+    """Una conexión del cliente mysql que ejecuta, una tras otra, las secciones de tabla que recibe por su cola."""
+    def __init__(self, index: int, command: List[str], preamble: bytes, free_workers: "queue.Queue",
+                 abort_event: threading.Event):
+        self.index = index
+        self.free_workers = free_workers
+        self.abort_event = abort_event
+        self.queue: "queue.Queue" = queue.Queue(maxsize=RESTORE_QUEUE_DEPTH)
+        self.error: Optional[str] = None
+        self._stderr_lines: List[str] = []
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                        stderr=subprocess.PIPE)
+        self._stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+        self._stderr_thread.start()
+        session = "".join(f"{statement};\n" for statement in RESTORE_SESSION_SETTINGS).encode("utf-8")
+        self._write(session + preamble)
+        self._thread = threading.Thread(target=self._run, name=f"restore-{index}", daemon=True)
+        self._thread.start()
+
+    def _drain_stderr(self):
+        for line in iter(self.process.stderr.readline, b""):
+            self._stderr_lines.append(line.decode("utf-8", errors="replace"))
+        self.process.stderr.close()
+
+    def _write(self, data: bytes):
+        if self.error is not None:
+            return
+        try:
+            self.process.stdin.write(data)
+        except (BrokenPipeError, OSError) as e:
+            self.error = f"La conexión {self.index} se cerró inesperadamente: {e}"
+            self.abort_event.set()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is _WORKER_STOP:
+                    return
+                if item is _SECTION_END:
+                    self._write(b"COMMIT;\n")
+                    self.free_workers.put(self)
+                elif not self.abort_event.is_set():
+                    self._write(item)
+            finally:
+                self.queue.task_done()
+
+    def put(self, item):
+        """Encola un envío sin bloquearse indefinidamente si la restauración se aborta."""
+        while not self.abort_event.is_set():
+            try:
+                self.queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+        raise RestoreError("Restauración abortada.")
+
+    def finish(self) -> Optional[str]:
+        """Cierra la conexión y retorna el error, si lo hubo."""
+        self.queue.put(_WORKER_STOP)
+        self._thread.join()
+        failed = self.error is not None
+        if self.abort_event.is_set() and not failed:
+            self.process.kill() # Otra conexión falló o se canceló: no dejar cargas a medias en curso
+        else:
+            self._write(b"COMMIT;\n")
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.wait()
+        self._stderr_thread.join()
+        if self.process.returncode != 0 and (failed or not self.abort_event.is_set()):
+            # El mensaje de mysql es más útil que el de la tubería rota
+            self.error = "".join(self._stderr_lines).strip() or self.error or f"mysql terminó con código {self.process.returncode}"
+        return self.error
+
+class RestoreService:
+    """
+    Restaura respaldos de MySQL enviando el SQL descomprimido en streaming al cliente mysql, sin
+    descomprimir a disco. Con paralelismo > 1 el volcado se divide por tablas (marcadores de mysqldump)
+    y cada tabla se carga por una de varias conexiones; vistas, rutinas y eventos se cargan al final,
+    cuando todas las tablas han terminado.
+    """
+    def __init__(self):
+        self.file_repo = backup_file_repository
+        self.verification_service = verification_service
+        logger.info("Servicio de restauración inicializado.")
+
+    @staticmethod
+    def _client_command(config: BackupConfig, database: Optional[str] = None) -> List[str]:
+        command = [
+            mysql_client_path(config.mysqldump_path),
+            f"--host={config.host}",
+            f"--port={config.port}",
+            f"--user={config.username}",
+        ]
+        if config.password_encrypted: # La contraseña ya viene desencriptada del repo
+            command.append(f"--password={config.password_encrypted}")
+        if database:
+            command.append(database)
+        return command
+
+    def _create_database(self, config: BackupConfig, database: str):
+        command = self._client_command(config) + ["-e", f"CREATE DATABASE IF NOT EXISTS `{database.replace('`', '``')}`"]
+        result = subprocess.run(command, capture_output=True)
+        if result.returncode != 0:
+            raise RestoreError(result.stderr.decode("utf-8", errors="replace").strip())
+
+    def _verify_artifact(self, artifact_path: str) -> Tuple[bool, str]:
+        backup_file = self.file_repo.get_by_path(os.path.abspath(artifact_path))
+        if backup_file is None:
+            return True, "Respaldo no catalogado: no se verifica el checksum."
+        result = self.verification_service.verify_file(backup_file)
+        if result.status in (VERIFY_STATUS_OK, VERIFY_STATUS_SKIPPED):
+            return True, f"Checksum: {result.status}."
+        return False, f"El respaldo no superó la verificación de integridad ({result.status})."
+
+    def restore(self, config: BackupConfig, artifact_path: str, target_database: Optional[str] = None,
+                parallelism: int = RESTORE_PARALLELISM, verify_checksum: bool = True,
+                cancel_event: Optional[threading.Event] = None,
+                progress: Optional[Callable[[int, int], None]] = None,
+                tables: Optional[List[str]] = None) -> Tuple[bool, str]:
+        """
+        Restaura un respaldo (.sql, .zip, .gzip, .xz, .mbk, cifrados o no) en `target_database` (por defecto la base de datos
+        de la configuración). `progress(bytes_sql, tablas)` se invoca a medida que avanza la lectura.
+        Con `tables` solo se restauran esas tablas; requiere un archivo .mbk, del que se leen
+        directamente sus frames (cada uno con su propio CRC) sin recorrer el resto del archivo.
+        """
+        database = target_database or config.database_name
+        if not os.path.isfile(artifact_path):
+            return False, f"Archivo de respaldo no encontrado: {artifact_path}"
+        if tables and not is_table_archive(artifact_path):
+            return False, f"La restauración de tablas sueltas requiere un respaldo {TABLE_ARCHIVE_EXTENSION}."
+        if verify_checksum and not tables:
+            verified, message = self._verify_artifact(artifact_path)
+            logger.info(message)
+            if not verified:
+                return False, message
+
+        logger.info(f"Restaurando {artifact_path} en '{database}' con {parallelism} conexiones...")
+        abort_event = cancel_event or threading.Event()
+        free_workers: "queue.Queue[_LoadWorker]" = queue.Queue()
+        workers: List[_LoadWorker] = []
+        command = self._client_command(config, database)
+        raw_bytes = 0
+        tables_loaded = 0
+
+        def start_workers(count: int, preamble: bytes):
+            for index in range(count):
+                worker = _LoadWorker(index, command, preamble, free_workers, abort_event)
+                workers.append(worker)
+                free_workers.put(worker)
+
+        def next_free_worker() -> _LoadWorker:
+            while not abort_event.is_set():
+                try:
+                    return free_workers.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+            raise RestoreError("Restauración abortada.")
+
+        try:
+            self._create_database(config, database)
+            current: Optional[_LoadWorker] = None
+            split_tables = parallelism > 1
+            preamble = bytearray()
+            buffer = bytearray()
+            if not split_tables:
+                start_workers(1, b"")
+                current = next_free_worker()
+
+            source = TableArchiveReader(artifact_path).open_stream(tables) if tables else open_decompressed(artifact_path)
+            with source as stream:
+                for line in stream:
+                    raw_bytes += len(line)
+                    is_table_start = line.startswith(DUMP_TABLE_MARKER)
+                    if is_table_start:
+                        tables_loaded += 1
+                    if split_tables and is_table_start:
+                        if current is None:
+                            start_workers(parallelism, bytes(preamble)) # Cabecera del volcado (SET...) en cada conexión
+                        else:
+                            current.put(bytes(buffer))
+                            current.put(_SECTION_END)
+                        buffer.clear()
+                        current = next_free_worker()
+                    elif split_tables and line.startswith(DUMP_BARRIER_MARKERS) and current is not None:
+                        # Vistas, rutinas y eventos dependen de las tablas: esperar a que todas terminen
+                        current.put(bytes(buffer))
+                        current.put(_SECTION_END)
+                        buffer.clear()
+                        for worker in workers:
+                            worker.queue.join()
+                        current = next_free_worker()
+                        split_tables = False
+
+                    if current is None:
+                        preamble.extend(line)
+                        continue
+                    buffer.extend(line)
+                    if len(buffer) >= RESTORE_CHUNK_SIZE:
+                        current.put(bytes(buffer))
+                        buffer.clear()
+                        if progress:
+                            progress(raw_bytes, tables_loaded)
+
+            if current is None: # Volcado sin marcadores de tabla
+                start_workers(1, bytes(preamble))
+            elif buffer:
+                current.put(bytes(buffer))
+        except (RestoreError, TableArchiveError, ArtifactDecryptionError, OSError, ValueError,
+                EOFError, zlib.error, zipfile.BadZipFile, lzma.LZMAError) as e: # Archivo truncado o dañado
+            abort_event.set()
+            errors = [error for error in (worker.finish() for worker in workers) if error]
+            message = errors[0] if errors else str(e)
+            logger.error(f"Restauración de '{database}' fallida: {message}")
+            return False, f"Restauración fallida: {message}"
+
+        errors = [error for error in (worker.finish() for worker in workers) if error]
+        if errors:
+            logger.error(f"Restauración de '{database}' fallida: {errors[0]}")
+            return False, f"Restauración fallida: {errors[0]}"
+        if progress:
+            progress(raw_bytes, tables_loaded)
+        message = f"Restauración completada: {tables_loaded} tablas, {format_bytes(raw_bytes)} de SQL en '{database}'."
+        logger.info(message)
+        return True, message
+
+# Instancia global del servicio de restauración
+restore_service = lazy_service("restore_service", RestoreService)
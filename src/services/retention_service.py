@@ -0,0 +1,147 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from ..models.backup_config import BackupConfig
+from ..models.backup_file import BackupFile
+from ..repositories.backup_file_repository import backup_file_repository
+from ..services.tiering_service import delete_cold_artifact, tiering_service
+from ..utils.constants import STORAGE_TIER_COLD, GFS_PERIODS, RETENTION_DELETE_WORKERS, RETENTION_DELETE_OPS_PER_SECOND
+from ..utils.artifacts import manifest_path
+from ..utils.helpers import format_bytes
+from ..utils.rate_limiter import TokenBucket
+from ..utils.service_registry import lazy_service
+
+logger = logging.getLogger(__name__)
+
+def _period_key(period: str, moment: datetime) -> Tuple[int, ...]:
+    """Retorna el identificador del periodo GFS al que pertenece una fecha."""
+    if period == "hourly":
+        return moment.year, moment.month, moment.day, moment.hour
+    if period == "daily":
+        return moment.year, moment.month, moment.day
+    if period == "weekly":
+        iso_year, iso_week, _ = moment.isocalendar()
+        return iso_year, iso_week
+    if period == "monthly":
+        return moment.year, moment.month
+    return (moment.year,)
+
+class RetentionPlan:
+    """Resultado de planificar la retención de una configuración: qué archivos se conservan, cuáles se eliminan y por qué."""
+    def __init__(self, config: BackupConfig):
+        self.config = config
+        self.keep: List[BackupFile] = []
+        self.delete: List[BackupFile] = []
+        self.reasons: Dict[str, List[str]] = {} # file_path -> motivos para conservarlo
+
+    @property
+    def bytes_to_free(self) -> int:
+        return sum(backup_file.file_size or 0 for backup_file in self.delete)
+
+    def report(self) -> str:
+        """Informe legible del plan (para simulaciones)."""
+        lines = [
+            f"Plan de retención para '{self.config.name}': "
+            f"{len(self.keep)} se conservan, {len(self.delete)} se eliminan ({format_bytes(self.bytes_to_free)})."
+        ]
+        for backup_file in self.keep:
+            lines.append(f"  CONSERVAR {backup_file.created_at:%Y-%m-%d %H:%M} {backup_file.file_path} "
+                         f"[{', '.join(self.reasons.get(backup_file.file_path, []))}]")
+        for backup_file in self.delete:
+            lines.append(f"  ELIMINAR  {backup_file.created_at:%Y-%m-%d %H:%M} {backup_file.file_path}")
+        return "\n".join(lines)
+
+class RetentionService:
+    def __init__(self):
+        self.file_repo = backup_file_repository
+        self.delete_budget = TokenBucket(RETENTION_DELETE_OPS_PER_SECOND)
+        logger.info("Servicio de retención inicializado.")
+
+    def plan(self, config: BackupConfig, files: List[BackupFile], now: Optional[datetime] = None) -> RetentionPlan:
+        """
+        Calcula en una sola pasada el conjunto de archivos a conservar y a eliminar.
+        Siempre se conservan los respaldos de los últimos retention_days_main días. Con política GFS,
+        además se conserva el respaldo más reciente de cada una de las últimas N horas/días/semanas/meses/años;
+        sin ella se mantiene la política anterior (conservar hasta retention_days_segregated días).
+        """
+        now = now or datetime.now()
+        plan = RetentionPlan(config)
+        policy = config.gfs_policy
+        if config.uses_gfs_retention:
+            recent_cutoff = now - timedelta(days=config.retention_days_main)
+        else:
+            recent_cutoff = now - timedelta(days=max(config.retention_days_main, config.retention_days_segregated))
+
+        seen_periods: Dict[str, set] = {period: set() for period in GFS_PERIODS}
+        for backup_file in sorted(files, key=lambda f: f.created_at, reverse=True):
+            reasons = []
+            if backup_file.created_at > recent_cutoff:
+                reasons.append("reciente")
+            for period in GFS_PERIODS:
+                keep_count = policy[period]
+                if keep_count <= 0:
+                    continue
+                key = _period_key(period, backup_file.created_at)
+                if key not in seen_periods[period] and len(seen_periods[period]) < keep_count:
+                    seen_periods[period].add(key) # El primero visto es el más reciente del periodo
+                    reasons.append(period)
+            if reasons:
+                plan.keep.append(backup_file)
+                plan.reasons[backup_file.file_path] = reasons
+            else:
+                plan.delete.append(backup_file)
+        return plan
+
+    def _delete_file(self, backup_file: BackupFile) -> bool:
+        # Un archivo que el almacenamiento segregado está moviendo no se toca; tras reclamarlo se relee
+        # del catálogo porque pudo pasar a frío (otra ruta) desde que se planificó
+        with tiering_service.claim(backup_file.id) as claimed:
+            if not claimed:
+                logger.info(f"Respaldo en movimiento a almacenamiento segregado, se conserva por ahora: {backup_file.file_path}")
+                return False
+            current = self.file_repo.get_by_id(backup_file.id)
+            if current is None:
+                return False
+            return self._delete_claimed_file(current)
+
+    def _delete_claimed_file(self, backup_file: BackupFile) -> bool:
+        self.delete_budget.consume(1)
+        try:
+            if backup_file.tier == STORAGE_TIER_COLD:
+                delete_cold_artifact(backup_file.file_path)
+            else:
+                for path in (backup_file.file_path, manifest_path(backup_file.file_path)):
+                    if os.path.exists(path):
+                        os.remove(path)
+            self.file_repo.delete(backup_file.id)
+            logger.info(f"Respaldo eliminado por retención: {backup_file.file_path}")
+            return True
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"No se pudo eliminar el archivo {backup_file.file_path} durante la limpieza: {e}")
+            return False
+
+    def apply(self, plan: RetentionPlan, workers: int = RETENTION_DELETE_WORKERS) -> Tuple[int, int]:
+        """Elimina en paralelo los archivos del plan, respetando el presupuesto de E/S. Retorna (eliminados, fallidos)."""
+        if not plan.delete:
+            return 0, 0
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="retention") as executor:
+            results = list(executor.map(self._delete_file, plan.delete))
+        deleted = sum(1 for result in results if result)
+        return deleted, len(results) - deleted
+
+    def run(self, config: BackupConfig, dry_run: bool = False) -> RetentionPlan:
+        """Planifica la retención de una configuración sobre el catálogo y, salvo simulación, la aplica."""
+        plan = self.plan(config, self.file_repo.get_by_config_id(config.id))
+        if dry_run:
+            logger.info(plan.report())
+            return plan
+        deleted, failed = self.apply(plan)
+        logger.info(f"Retención de '{config.name}': {len(plan.keep)} conservados, {deleted} eliminados"
+                    f"{f', {failed} con error' if failed else ''}.")
+        return plan
+
+# Instancia global del servicio de retención
+retention_service = lazy_service("retention_service", RetentionService)
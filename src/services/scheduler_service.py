@@ -1,8 +1,5 @@
 import logging
 from datetime import datetime, timedelta
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
-from apscheduler.jobstores.base import JobLookupError
 from typing import List, Optional, Dict, Any
 
 from PyQt5.QtCore import pyqtSignal, QObject
@@ -10,9 +7,12 @@ from PyQt5.QtCore import pyqtSignal, QObject
 from ..repositories.backup_schedule_repository import backup_schedule_repository
 from ..repositories.backup_config_repository import backup_config_repository
 from ..services.backup_service import backup_service
+from ..services.backup_catalog_service import backup_catalog_service
 from ..models.backup_schedule import BackupSchedule
-from ..utils.constants import SCHEDULE_TYPE_DAILY, SCHEDULE_TYPE_WEEKLY, SCHEDULE_TYPE_MONTHLY, DAYS_OF_WEEK
+from ..utils.constants import (SCHEDULE_TYPE_DAILY, SCHEDULE_TYPE_WEEKLY, SCHEDULE_TYPE_MONTHLY, DAYS_OF_WEEK,
+                               CATALOG_RECONCILE_INTERVAL_MINUTES)
 from ..utils.helpers import parse_iso_datetime
+from ..utils.service_registry import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -24,10 +24,13 @@ class SchedulerService(QObject):
 
     def __init__(self):
         super().__init__()
+        # APScheduler es de las importaciones más lentas: se carga al construir el servicio, no al importar el módulo
+        from apscheduler.schedulers.background import BackgroundScheduler
         self.scheduler = BackgroundScheduler()
         self.schedule_repo = backup_schedule_repository
         self.config_repo = backup_config_repository
         self.backup_service = backup_service
+        self.catalog_service = backup_catalog_service
         self._is_running = False
         logger.info("Servicio de scheduler inicializado.")
 
@@ -64,7 +67,7 @@ class SchedulerService(QObject):
 
     def get_next_run_time(self) -> Optional[datetime]:
         """Retorna la hora de la próxima ejecución programada."""
-        jobs = self.scheduler.get_jobs()
+        jobs = [job for job in self.scheduler.get_jobs() if job.id.startswith("backup_job_")]
         if jobs:
             next_times = [job.next_run_time for job in jobs if job.next_run_time]
             if next_times:
@@ -78,10 +81,23 @@ class SchedulerService(QObject):
         logger.info(f"Cargando {len(active_schedules)} programaciones activas...")
         for schedule_obj in active_schedules:
             self._add_job_to_scheduler(schedule_obj)
+        self._add_maintenance_jobs()
         logger.info("Programaciones cargadas.")
 
+    def _add_maintenance_jobs(self):
+        """Añade los trabajos internos de mantenimiento (no asociados a una programación de usuario)."""
+        from apscheduler.triggers.interval import IntervalTrigger
+        self.scheduler.add_job(
+            func=self.catalog_service.reconcile_all,
+            trigger=IntervalTrigger(minutes=CATALOG_RECONCILE_INTERVAL_MINUTES),
+            id="catalog_reconcile_job",
+            name="Reconciliación del catálogo de respaldos",
+            replace_existing=True
+        )
+
     def _add_job_to_scheduler(self, schedule_obj: BackupSchedule):
         """Añade un trabajo al scheduler basado en un objeto BackupSchedule."""
+        from apscheduler.triggers.cron import CronTrigger
         config = self.config_repo.get_by_id(schedule_obj.config_id)
         if not config or not config.is_active:
             logger.warning(f"Configuración de respaldo (ID: {schedule_obj.config_id}) no encontrada o inactiva para la programación (ID: {schedule_obj.id}). No se añadirá el trabajo.")
@@ -162,6 +178,7 @@ class SchedulerService(QObject):
 
     def update_schedule(self, schedule_obj: BackupSchedule) -> bool:
         """Actualiza una programación existente y la recarga en el scheduler."""
+        from apscheduler.jobstores.base import JobLookupError
         success = self.schedule_repo.update(schedule_obj)
         if success and self._is_running:
             # Eliminar el trabajo antiguo y añadir el nuevo para actualizarlo
@@ -176,6 +193,7 @@ class SchedulerService(QObject):
 
     def delete_schedule(self, schedule_id: int) -> bool:
         """Elimina una programación y la remueve del scheduler."""
+        from apscheduler.jobstores.base import JobLookupError
         success = self.schedule_repo.delete(schedule_id)
         if success and self._is_running:
             job_id = f"backup_job_{schedule_id}"
@@ -218,4 +236,4 @@ class SchedulerService(QObject):
         return True
 
 # Instancia global del servicio
-scheduler_service = SchedulerService()
+scheduler_service = lazy_service("scheduler_service", SchedulerService)
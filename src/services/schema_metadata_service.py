@@ -0,0 +1,116 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import mysql.connector
+
+from ..models.backup_config import BackupConfig
+from ..models.table_metadata import TableMetadata
+from ..repositories.table_metadata_repository import table_metadata_repository
+from ..services.mysql_pool_service import mysql_pool_service
+from ..utils.constants import METADATA_CACHE_TTL_SECONDS
+from ..utils.service_registry import lazy_service
+
+logger = logging.getLogger(__name__)
+
+class SchemaMetadataService:
+    """
+    Caché de las tablas de cada base de datos (motor, tamaños, filas estimadas y última modificación)
+    para no consultar information_schema en cada carga del selector de tablas, prueba de conexión o
+    respaldo. Se guarda en memoria y en SQLite (sobrevive a reinicios) y se vuelve a consultar al
+    servidor cuando supera METADATA_CACHE_TTL_SECONDS. Si el servidor no responde se usa la caché
+    aunque esté vencida. Dos hilos que piden la misma base de datos vencida hacen una sola consulta.
+    """
+    def __init__(self):
+        self.repo = table_metadata_repository
+        self.pool = mysql_pool_service
+        self._cache: Dict[str, Tuple[datetime, List[TableMetadata]]] = {}
+        self._lock = threading.Lock()
+        self._refresh_locks: Dict[str, threading.Lock] = {}
+        logger.info("Servicio de metadatos de bases de datos inicializado.")
+
+    @staticmethod
+    def schema_key(config: BackupConfig) -> str:
+        return f"{config.host}:{config.port}/{config.database_name}"
+
+    def _cached(self, key: str) -> Optional[Tuple[datetime, List[TableMetadata]]]:
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None:
+            return entry
+        refreshed_at = self.repo.get_refreshed_at(key)
+        if refreshed_at is None:
+            return None
+        entry = (refreshed_at, self.repo.get_tables(key))
+        with self._lock:
+            self._cache.setdefault(key, entry)
+        return entry
+
+    @staticmethod
+    def _is_fresh(entry: Optional[Tuple[datetime, List[TableMetadata]]], max_age_seconds: float) -> bool:
+        return entry is not None and (datetime.now() - entry[0]).total_seconds() < max_age_seconds
+
+    def get_refreshed_at(self, config: BackupConfig) -> Optional[datetime]:
+        entry = self._cached(self.schema_key(config))
+        return entry[0] if entry else None
+
+    def get_tables(self, config: BackupConfig, max_age_seconds: float = METADATA_CACHE_TTL_SECONDS,
+                   force_refresh: bool = False) -> List[TableMetadata]:
+        """
+        Tablas de la base de datos de la configuración, de la caché si es reciente o del servidor si no.
+        Lanza mysql.connector.Error solo si el servidor falla y no hay nada en caché.
+        """
+        key = self.schema_key(config)
+        if not force_refresh:
+            entry = self._cached(key)
+            if self._is_fresh(entry, max_age_seconds):
+                return entry[1]
+        with self._lock:
+            refresh_lock = self._refresh_locks.setdefault(key, threading.Lock())
+        with refresh_lock:
+            entry = self._cached(key)
+            # Otro hilo pudo refrescarla mientras se esperaba el lock
+            if not force_refresh and self._is_fresh(entry, max_age_seconds):
+                return entry[1]
+            try:
+                return self.refresh(config)
+            except mysql.connector.Error as err:
+                if entry is None:
+                    raise
+                logger.warning(f"No se pudieron actualizar los metadatos de {key} ({err}); "
+                               f"se usa la caché del {entry[0]:%Y-%m-%d %H:%M}.")
+                return entry[1]
+
+    def refresh(self, config: BackupConfig) -> List[TableMetadata]:
+        """Consulta information_schema y actualiza la caché."""
+        key = self.schema_key(config)
+        with self.pool.connection(config) as cnx:
+            cursor = cnx.cursor()
+            cursor.execute(
+                "SELECT table_name, table_type, engine, data_length, index_length, table_rows, update_time "
+                "FROM information_schema.tables WHERE table_schema = %s ORDER BY table_name",
+                (config.database_name,)
+            )
+            tables = [
+                TableMetadata(table_name=name, table_type=table_type, engine=engine, data_length=data_length or 0,
+                              index_length=index_length or 0, table_rows=table_rows or 0, update_time=update_time)
+                for name, table_type, engine, data_length, index_length, table_rows, update_time in cursor
+            ]
+            cursor.close()
+        refreshed_at = datetime.now()
+        self.repo.replace_tables(key, tables, refreshed_at)
+        with self._lock:
+            self._cache[key] = (refreshed_at, tables)
+        logger.info(f"Metadatos de {key} actualizados: {len(tables)} tablas.")
+        return tables
+
+    def invalidate(self, config: BackupConfig):
+        """Descarta la caché de una base de datos (la próxima consulta irá al servidor)."""
+        key = self.schema_key(config)
+        with self._lock:
+            self._cache.pop(key, None)
+        self.repo.delete(key)
+
+# Instancia global del servicio de metadatos de bases de datos
+schema_metadata_service = lazy_service("schema_metadata_service", SchemaMetadataService)
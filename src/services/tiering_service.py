@@ -0,0 +1,291 @@
+import hashlib
+import io
+import logging
+import lzma
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, Optional, Tuple
+
+from ..models.backup_config import BackupConfig
+from ..models.backup_file import BackupFile
+from ..repositories.backup_file_repository import backup_file_repository
+from ..utils.artifact_crypto import DecryptingReader, EncryptingWriter, is_encrypted_artifact
+from ..utils.artifacts import open_decompressed, file_sha256, strip_artifact_extension, manifest_path
+from ..utils.constants import (STORAGE_TIER_HOT, STORAGE_TIER_COLD, TIERING_BANDWIDTH_BYTES_PER_SECOND,
+                               TIERING_CHUNK_SIZE, TIERING_XZ_PRESET, COLD_ARTIFACT_EXTENSION,
+                               PARTIAL_ARTIFACT_EXTENSION, ENCRYPTED_ARTIFACT_EXTENSION)
+from ..utils.helpers import format_bytes
+from ..utils.rate_limiter import TokenBucket
+from ..utils.table_archive import is_table_archive
+from ..utils.service_registry import lazy_service
+
+logger = logging.getLogger(__name__)
+
+class LocalColdStorage:
+    """Almacenamiento frío en un directorio local (normalmente otro sistema de archivos)."""
+    def __init__(self, base_path: str):
+        self.base_path = base_path
+
+    def put(self, source_path: str, name: str, limiter: TokenBucket) -> str:
+        """Copia un archivo al almacenamiento frío y retorna su ubicación."""
+        os.makedirs(self.base_path, exist_ok=True)
+        destination = os.path.join(self.base_path, name)
+        temp_destination = destination + PARTIAL_ARTIFACT_EXTENSION
+        with open(source_path, "rb") as f_in, open(temp_destination, "wb") as f_out:
+            while True:
+                chunk = f_in.read(TIERING_CHUNK_SIZE)
+                if not chunk:
+                    break
+                limiter.consume(len(chunk))
+                f_out.write(chunk)
+            f_out.flush()
+            os.fsync(f_out.fileno())
+        os.replace(temp_destination, destination)
+        return destination
+
+    def verify(self, location: str, size: int, sha256: str) -> bool:
+        """Comprueba que la copia en frío coincide con el original."""
+        if not os.path.isfile(location) or os.path.getsize(location) != size:
+            return False
+        return file_sha256(location, TIERING_CHUNK_SIZE) == sha256
+
+    def delete(self, location: str):
+        if os.path.exists(location):
+            os.remove(location)
+
+class S3ColdStorage:
+    """
+    Almacenamiento frío en un bucket compatible con S3 (AWS, MinIO...).
+    Requiere boto3; el endpoint y las credenciales se toman de la configuración estándar de AWS
+    (AWS_ENDPOINT_URL, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY...).
+    """
+    def __init__(self, url: str):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("Se requiere el paquete 'boto3' para usar almacenamiento frío s3://")
+        bucket_and_prefix = url[len("s3://"):]
+        self.bucket, _, self.prefix = bucket_and_prefix.partition("/")
+        self.client = boto3.client("s3")
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix.rstrip('/')}/{name}" if self.prefix else name
+
+    @staticmethod
+    def _parse_location(location: str) -> Tuple[str, str]:
+        bucket, _, key = location[len("s3://"):].partition("/")
+        return bucket, key
+
+    def put(self, source_path: str, name: str, limiter: TokenBucket) -> str:
+        key = self._key(name)
+
+        def throttle(bytes_transferred):
+            limiter.consume(bytes_transferred)
+
+        # S3 comprueba el SHA-256 de cada parte al recibirla y rechaza la subida si no coincide
+        self.client.upload_file(source_path, self.bucket, key, Callback=throttle,
+                                ExtraArgs={"ChecksumAlgorithm": "SHA256"})
+        return f"s3://{self.bucket}/{key}"
+
+    def verify(self, location: str, size: int, sha256: str) -> bool:
+        """
+        Descarga el objeto y compara su SHA-256 con el del original. El checksum que guarda S3 no sirve
+        para comparar: en subidas multiparte es un checksum de checksums que depende del tamaño de parte.
+        """
+        bucket, key = self._parse_location(location)
+        body = self.client.get_object(Bucket=bucket, Key=key)["Body"]
+        digest = hashlib.sha256()
+        received = 0
+        try:
+            for chunk in body.iter_chunks(TIERING_CHUNK_SIZE):
+                received += len(chunk)
+                digest.update(chunk)
+        finally:
+            body.close()
+        return received == size and digest.hexdigest() == sha256
+
+    def delete(self, location: str):
+        bucket, key = self._parse_location(location)
+        self.client.delete_object(Bucket=bucket, Key=key)
+
+def open_cold_storage(location: str):
+    """Retorna el backend de almacenamiento frío para una ruta o URL."""
+    if location.startswith("s3://"):
+        return S3ColdStorage(location)
+    return LocalColdStorage(location)
+
+def delete_cold_artifact(location: str):
+    """Elimina un respaldo del almacenamiento frío a partir de su ubicación en el catálogo."""
+    if location.startswith("s3://"):
+        S3ColdStorage(location).delete(location)
+    elif os.path.exists(location):
+        os.remove(location)
+
+class TieringService:
+    """
+    Mueve en segundo plano los respaldos más antiguos que retention_days_main al almacenamiento
+    segregado: recomprime a xz, copia con límite de ancho de banda, verifica la copia y solo
+    entonces elimina el archivo original y actualiza el catálogo. Los contenedores .mbk se copian
+    tal cual: recomprimirlos a .sql.xz perdería el índice por tabla (restore --table, tables, extract).
+    Cada archivo se reclama con claim() mientras se mueve; la retención reclama igual los que elimina,
+    así que un mismo archivo nunca se mueve y se elimina a la vez.
+    """
+    def __init__(self):
+        self.file_repo = backup_file_repository
+        # Se cobra una sola vez por byte, al escribir la copia en frío: la recompresión y las verificaciones
+        # esperan a que termine cada copia, así que el ritmo global queda igualmente acotado
+        self.limiter = TokenBucket(TIERING_BANDWIDTH_BYTES_PER_SECOND, capacity=TIERING_CHUNK_SIZE * 4)
+        self._queue: "queue.Queue[BackupConfig]" = queue.Queue()
+        self._pending_configs = set()
+        self._pending_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._claimed_files = set() # IDs del catálogo que se están moviendo o eliminando
+        self._claimed_lock = threading.Lock()
+        logger.info("Servicio de almacenamiento segregado inicializado.")
+
+    @contextmanager
+    def claim(self, file_id: int) -> Iterator[bool]:
+        """Reserva un archivo del catálogo durante el bloque. Produce False si ya lo tiene reservado otro hilo."""
+        with self._claimed_lock:
+            claimed = file_id not in self._claimed_files
+            self._claimed_files.add(file_id)
+        try:
+            yield claimed
+        finally:
+            if claimed:
+                with self._claimed_lock:
+                    self._claimed_files.discard(file_id)
+
+    def enqueue(self, config: BackupConfig):
+        """Programa el movimiento a frío de los respaldos de una configuración (sin bloquear)."""
+        if not config.segregated_path:
+            return
+        with self._pending_lock:
+            if config.id in self._pending_configs:
+                return
+            self._pending_configs.add(config.id)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._worker_loop, name="tiering", daemon=True)
+                self._worker.start()
+        self._queue.put(config)
+
+    def _worker_loop(self):
+        while True:
+            config = self._queue.get()
+            try:
+                self.tier_config(config)
+            except Exception as e:
+                logger.error(f"Error al mover respaldos de '{config.name}' a almacenamiento segregado: {e}", exc_info=True)
+            finally:
+                with self._pending_lock:
+                    self._pending_configs.discard(config.id)
+                self._queue.task_done()
+
+    def tier_config(self, config: BackupConfig) -> int:
+        """Mueve a frío los respaldos candidatos de una configuración. Retorna cuántos se movieron."""
+        if not config.segregated_path:
+            return 0
+        storage = open_cold_storage(config.segregated_path)
+        cutoff = datetime.now() - timedelta(days=config.retention_days_main)
+        moved = 0
+        for backup_file in self.file_repo.get_older_than(config.id, cutoff, STORAGE_TIER_HOT):
+            with self.claim(backup_file.id) as claimed:
+                # La retención puede haberlo eliminado desde que se listó
+                current = self.file_repo.get_by_id(backup_file.id) if claimed else None
+                if current is not None and current.tier == STORAGE_TIER_HOT and self.move_to_cold(current, storage):
+                    moved += 1
+        if moved:
+            logger.info(f"{moved} respaldos de '{config.name}' movidos a {config.segregated_path}.")
+        return moved
+
+    def _recompress(self, source_path: str, target_path: str, encrypt: bool = False) -> str:
+        """Recomprime un respaldo a xz (cifrado de nuevo si `encrypt`) y retorna el SHA-256 del SQL descomprimido."""
+        raw_digest = hashlib.sha256()
+        with open_decompressed(source_path) as f_in, open(target_path, "wb") as f_raw:
+            encrypting = EncryptingWriter(f_raw) if encrypt else None
+            with lzma.open(encrypting or f_raw, "wb", preset=TIERING_XZ_PRESET) as f_out:
+                while True:
+                    chunk = f_in.read(TIERING_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    raw_digest.update(chunk)
+                    f_out.write(chunk)
+            if encrypting is not None:
+                encrypting.close()
+        return raw_digest.hexdigest()
+
+    def _decompressed_sha256(self, xz_path: str, encrypted: bool = False) -> str:
+        # La copia preparada termina en .part: el formato se indica explícitamente y no por la extensión
+        f_raw = io.BufferedReader(DecryptingReader(xz_path), buffer_size=TIERING_CHUNK_SIZE) if encrypted else open(xz_path, "rb")
+        digest = hashlib.sha256()
+        with f_raw, lzma.open(f_raw, "rb") as f:
+            while True:
+                chunk = f.read(TIERING_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def move_to_cold(self, backup_file: BackupFile, storage) -> bool:
+        """Copia, verifica y elimina: el original solo se borra si la copia en frío es correcta."""
+        if not os.path.isfile(backup_file.file_path):
+            logger.warning(f"Respaldo catalogado no encontrado en disco: {backup_file.file_path}")
+            return False
+
+        keep_format = is_table_archive(backup_file.file_path)
+        if keep_format:
+            name = os.path.basename(backup_file.file_path)
+        else:
+            # Un respaldo cifrado sigue cifrado en frío
+            encrypted = is_encrypted_artifact(backup_file.file_path)
+            name = strip_artifact_extension(os.path.basename(backup_file.file_path)) + COLD_ARTIFACT_EXTENSION
+            if encrypted:
+                name += ENCRYPTED_ARTIFACT_EXTENSION
+        # La recompresión se prepara junto al original, como el .part de los respaldos, y no en el
+        # directorio temporal del sistema (a menudo un tmpfs pequeño)
+        staging_path = os.path.join(os.path.dirname(backup_file.file_path), name + PARTIAL_ARTIFACT_EXTENSION)
+        try:
+            if keep_format:
+                upload_path = backup_file.file_path
+            else:
+                raw_sha256 = self._recompress(backup_file.file_path, staging_path, encrypt=encrypted)
+                if self._decompressed_sha256(staging_path, encrypted) != raw_sha256:
+                    logger.error(f"La recompresión de {backup_file.file_path} no coincide con el original. Se conserva en caliente.")
+                    return False
+                upload_path = staging_path
+
+            size = os.path.getsize(upload_path)
+            sha256 = file_sha256(upload_path, TIERING_CHUNK_SIZE)
+            location = storage.put(upload_path, name, self.limiter)
+            if not storage.verify(location, size, sha256):
+                logger.error(f"La copia en frío {location} no superó la verificación. Se conserva el original.")
+                storage.delete(location)
+                return False
+
+            original_path = backup_file.file_path
+            original_size = backup_file.file_size
+            backup_file.file_path = location
+            backup_file.file_size = size
+            backup_file.checksum = sha256
+            backup_file.tier = STORAGE_TIER_COLD
+            if not self.file_repo.update(backup_file):
+                storage.delete(location)
+                return False
+            os.remove(original_path)
+            if os.path.exists(manifest_path(original_path)):
+                os.remove(manifest_path(original_path))
+            logger.info(f"Respaldo movido a frío: {original_path} -> {location} "
+                        f"({format_bytes(original_size)} -> {format_bytes(size)})")
+            return True
+        except Exception as e:
+            logger.error(f"Error al mover {backup_file.file_path} a almacenamiento frío: {e}")
+            return False
+        finally:
+            if os.path.exists(staging_path):
+                os.remove(staging_path)
+
+# Instancia global del servicio de almacenamiento segregado
+tiering_service = lazy_service("tiering_service", TieringService)
@@ -0,0 +1,142 @@
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from ..models.backup_file import BackupFile
+from ..repositories.backup_file_repository import backup_file_repository
+from ..utils.artifacts import read_checksum_manifest
+from ..utils.constants import VERIFY_WORKERS, VERIFY_CHUNK_SIZE
+from ..utils.helpers import format_bytes
+from ..utils.service_registry import lazy_service
+
+logger = logging.getLogger(__name__)
+
+VERIFY_STATUS_OK = "ok"
+VERIFY_STATUS_CORRUPT = "corrupt"
+VERIFY_STATUS_MISSING = "missing"
+VERIFY_STATUS_SKIPPED = "skipped" # Sin checksum conocido o en almacenamiento remoto
+
+class VerificationResult:
+    def __init__(self, file_path: str, status: str, expected: Optional[str] = None,
+                 actual: Optional[str] = None, bytes_read: int = 0):
+        self.file_path = file_path
+        self.status = status
+        self.expected = expected
+        self.actual = actual
+        self.bytes_read = bytes_read
+
+    def __repr__(self):
+        return f"<VerificationResult(file_path='{self.file_path}', status='{self.status}')>"
+
+class VerificationReport:
+    """Resumen de una verificación: resultados por archivo y rendimiento de lectura."""
+    def __init__(self, results: List[VerificationResult], elapsed_seconds: float):
+        self.results = results
+        self.elapsed_seconds = elapsed_seconds
+
+    def _with_status(self, status: str) -> List[VerificationResult]:
+        return [result for result in self.results if result.status == status]
+
+    @property
+    def ok(self) -> List[VerificationResult]:
+        return self._with_status(VERIFY_STATUS_OK)
+
+    @property
+    def corrupted(self) -> List[VerificationResult]:
+        return self._with_status(VERIFY_STATUS_CORRUPT)
+
+    @property
+    def missing(self) -> List[VerificationResult]:
+        return self._with_status(VERIFY_STATUS_MISSING)
+
+    @property
+    def skipped(self) -> List[VerificationResult]:
+        return self._with_status(VERIFY_STATUS_SKIPPED)
+
+    @property
+    def bytes_read(self) -> int:
+        return sum(result.bytes_read for result in self.results)
+
+    @property
+    def gb_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.bytes_read / self.elapsed_seconds / (1024 ** 3)
+
+    @property
+    def is_healthy(self) -> bool:
+        return not self.corrupted and not self.missing
+
+    def summary(self) -> str:
+        lines = [
+            f"Verificados {len(self.results)} respaldos: {len(self.ok)} correctos, {len(self.corrupted)} corruptos, "
+            f"{len(self.missing)} no encontrados, {len(self.skipped)} omitidos.",
+            f"Leídos {format_bytes(self.bytes_read)} en {self.elapsed_seconds:.1f} s "
+            f"({self.gb_per_second:.2f} GB/s)."
+        ]
+        for result in self.corrupted:
+            lines.append(f"  CORRUPTO {result.file_path} (esperado {result.expected}, obtenido {result.actual})")
+        for result in self.missing:
+            lines.append(f"  NO ENCONTRADO {result.file_path}")
+        return "\n".join(lines)
+
+class VerificationService:
+    """
+    Verifica la integridad de los respaldos catalogados recalculando su SHA-256 y comparándolo con el
+    registrado (catálogo o manifiesto .sha256). Los archivos se verifican en paralelo; cada hilo lee
+    por bloques en un buffer propio, así que la memoria queda acotada a workers * VERIFY_CHUNK_SIZE.
+    """
+    def __init__(self):
+        self.file_repo = backup_file_repository
+        logger.info("Servicio de verificación de respaldos inicializado.")
+
+    @staticmethod
+    def _hash_file(path: str):
+        digest = hashlib.sha256()
+        buffer = bytearray(VERIFY_CHUNK_SIZE)
+        view = memoryview(buffer)
+        total = 0
+        with open(path, "rb", buffering=0) as f:
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                digest.update(view[:read]) # hashlib libera el GIL con bloques grandes
+                total += read
+        return digest.hexdigest(), total
+
+    def verify_file(self, backup_file: BackupFile) -> VerificationResult:
+        """Verifica un archivo del catálogo."""
+        path = backup_file.file_path
+        if "://" in path:
+            return VerificationResult(path, VERIFY_STATUS_SKIPPED)
+        expected = backup_file.checksum or read_checksum_manifest(path)
+        if not os.path.isfile(path):
+            return VerificationResult(path, VERIFY_STATUS_MISSING, expected)
+        if not expected:
+            return VerificationResult(path, VERIFY_STATUS_SKIPPED)
+        try:
+            actual, bytes_read = self._hash_file(path)
+        except OSError as e:
+            logger.error(f"No se pudo leer {path} para verificarlo: {e}")
+            return VerificationResult(path, VERIFY_STATUS_MISSING, expected)
+        status = VERIFY_STATUS_OK if actual == expected.lower() else VERIFY_STATUS_CORRUPT
+        if status == VERIFY_STATUS_CORRUPT:
+            logger.error(f"Respaldo corrupto: {path} (esperado {expected}, obtenido {actual})")
+        return VerificationResult(path, status, expected, actual, bytes_read)
+
+    def verify(self, config_id: Optional[int] = None, workers: int = VERIFY_WORKERS) -> VerificationReport:
+        """Verifica los respaldos de una configuración (o de todas) y retorna el informe."""
+        files = self.file_repo.get_by_config_id(config_id) if config_id is not None else self.file_repo.get_all()
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="verify") as executor:
+            results = list(executor.map(self.verify_file, files))
+        report = VerificationReport(results, time.monotonic() - started)
+        logger.info(report.summary())
+        return report
+
+# Instancia global del servicio de verificación
+verification_service = lazy_service("verification_service", VerificationService)
@@ -0,0 +1,260 @@
+"""
+Cifrado autenticado en streaming de los archivos de respaldo (.enc)
+
+Estructura del archivo:
+    cabecera fija: ENC_MAGIC, versión, algoritmo, tamaño de bloque, prefijo de nonce, longitud de la clave envuelta
+    clave de datos envuelta (la clave AES/ChaCha del archivo, cifrada con la clave maestra de la aplicación)
+    bloque 0 | bloque 1 | ... (cada bloque: texto cifrado de `chunk_size` bytes + etiqueta de 16 bytes)
+
+Cada bloque se cifra de forma independiente con el nonce prefijo || índice y como datos asociados la
+cabecera fija, el índice y si es el último bloque. Así los bloques se cifran en paralelo, cualquier bloque
+se puede descifrar sin leer los anteriores (el archivo admite seek) y se detectan bloques reordenados,
+cambiados de archivo o un archivo truncado. Todos los bloques salvo el último miden lo mismo, por lo que
+la posición de cada uno se calcula sin índice.
+"""
+import io
+import os
+import struct
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Deque, Tuple
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+
+from .constants import (ENCRYPTED_ARTIFACT_EXTENSION, ARTIFACT_ENCRYPTION_ALGORITHM, ARTIFACT_ENCRYPTION_CHUNK_SIZE,
+                        ARTIFACT_ENCRYPTION_WORKERS)
+
+ENC_MAGIC = b"MBE1"
+ENC_VERSION = 1
+ENC_HEADER = struct.Struct(">4sBBI8sH")
+ENC_CHUNK_AAD = struct.Struct(">IB")
+ENC_TAG_SIZE = 16
+ENC_MAX_CHUNKS = 2 ** 32 # El índice del bloque ocupa 4 bytes del nonce
+
+ALGORITHMS = {"aes-256-gcm": (1, AESGCM), "chacha20-poly1305": (2, ChaCha20Poly1305)}
+_ALGORITHMS_BY_ID = {algorithm_id: cipher for algorithm_id, cipher in ALGORITHMS.values()}
+
+class ArtifactDecryptionError(Exception):
+    pass
+
+_key_provider = None
+
+def register_key_provider(provider):
+    """
+    Registra quién genera y desenvuelve las claves de datos de los archivos cifrados. El proveedor
+    implementa new_artifact_key() -> (clave, clave_envuelta) y unwrap_artifact_key(clave_envuelta) -> clave.
+    """
+    global _key_provider
+    _key_provider = provider
+
+def _get_key_provider():
+    if _key_provider is None:
+        raise ArtifactDecryptionError("No hay un proveedor de claves registrado para los respaldos cifrados.")
+    return _key_provider
+
+def is_encrypted_artifact(path: str) -> bool:
+    return path.lower().endswith(ENCRYPTED_ARTIFACT_EXTENSION)
+
+def _nonce(prefix: bytes, index: int) -> bytes:
+    return prefix + index.to_bytes(4, "big")
+
+class EncryptingWriter:
+    """
+    Flujo de solo escritura que cifra por bloques lo que recibe y escribe el resultado en `raw`.
+    Los bloques completos se cifran en un pool de hilos (el orden de escritura se conserva) con a lo
+    sumo 2 * workers bloques en vuelo. No admite seek, igual que el resto de la cadena de escritura.
+    """
+    def __init__(self, raw: BinaryIO, algorithm: str = ARTIFACT_ENCRYPTION_ALGORITHM,
+                 chunk_size: int = ARTIFACT_ENCRYPTION_CHUNK_SIZE, workers: int = ARTIFACT_ENCRYPTION_WORKERS):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Algoritmo de cifrado '{algorithm}' no soportado.")
+        algorithm_id, cipher_class = ALGORITHMS[algorithm]
+        key, wrapped_key = _get_key_provider().new_artifact_key()
+        self.raw = raw
+        self.chunk_size = chunk_size
+        self._cipher = cipher_class(key)
+        self._nonce_prefix = os.urandom(8)
+        self._header = ENC_HEADER.pack(ENC_MAGIC, ENC_VERSION, algorithm_id, chunk_size, self._nonce_prefix, len(wrapped_key))
+        self._buffer = bytearray()
+        self._index = 0
+        self._plain_bytes = 0
+        self._workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(self._workers, thread_name_prefix="artifact-encrypt") if self._workers > 1 else None
+        self._pending: Deque = deque()
+        self._discard = False # Tras abortar, lo que escriban los compresores al cerrarse se descarta
+        self.closed = False
+        self.raw.write(self._header + wrapped_key)
+
+    def _encrypt(self, index: int, data: bytes, final: bool) -> bytes:
+        return self._cipher.encrypt(_nonce(self._nonce_prefix, index), data,
+                                    self._header + ENC_CHUNK_AAD.pack(index, int(final)))
+
+    def _submit(self, data: bytes, final: bool):
+        if self._index >= ENC_MAX_CHUNKS:
+            raise ValueError("El archivo supera el número máximo de bloques cifrados.")
+        if self._executor is None:
+            self.raw.write(self._encrypt(self._index, data, final))
+        else:
+            self._pending.append(self._executor.submit(self._encrypt, self._index, data, final))
+            while len(self._pending) >= 2 * self._workers:
+                self.raw.write(self._pending.popleft().result())
+        self._index += 1
+
+    def write(self, data) -> int:
+        if self._discard:
+            return len(data)
+        self._buffer += data
+        self._plain_bytes += len(data)
+        # Un bloque lleno se retiene hasta saber si le sigue otro: el último se cifra marcado como final
+        while len(self._buffer) > self.chunk_size:
+            chunk = bytes(self._buffer[:self.chunk_size])
+            del self._buffer[:self.chunk_size]
+            self._submit(chunk, final=False)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._plain_bytes
+
+    def flush(self):
+        self.raw.flush()
+
+    def close(self):
+        """Cifra el último bloque (vacío si no se escribió nada) y espera a los bloques en vuelo."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._submit(bytes(self._buffer), final=True)
+            self._buffer.clear()
+            while self._pending:
+                self.raw.write(self._pending.popleft().result())
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+
+    def abort(self):
+        """Descarta los bloques pendientes sin escribirlos."""
+        if self.closed:
+            return
+        self.closed = True
+        self._discard = True
+        self._buffer.clear()
+        # shutdown(cancel_futures=True) requiere Python 3.9: se cancelan a mano los que no empezaron
+        for future in self._pending:
+            future.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        self._pending.clear()
+
+class DecryptingReader(io.RawIOBase):
+    """Lectura con acceso aleatorio de un archivo .enc: cada seek solo descifra el bloque que contiene la posición."""
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            header = self._file.read(ENC_HEADER.size)
+            if len(header) != ENC_HEADER.size:
+                raise ArtifactDecryptionError(f"Archivo cifrado incompleto: {path}")
+            magic, version, algorithm_id, chunk_size, nonce_prefix, key_length = ENC_HEADER.unpack(header)
+            if magic != ENC_MAGIC or version != ENC_VERSION or algorithm_id not in _ALGORITHMS_BY_ID:
+                raise ArtifactDecryptionError(f"No es un respaldo cifrado válido: {path}")
+            wrapped_key = self._file.read(key_length)
+            try:
+                key = _get_key_provider().unwrap_artifact_key(wrapped_key)
+            except ArtifactDecryptionError:
+                raise
+            except Exception as e:
+                raise ArtifactDecryptionError(f"No se pudo obtener la clave de {path}: {e}") from e
+            self._data_offset = ENC_HEADER.size + key_length
+            data_length = os.fstat(self._file.fileno()).st_size - self._data_offset
+            stride = chunk_size + ENC_TAG_SIZE
+            self._chunk_count = max(1, -(-data_length // stride))
+            last_length = data_length - (self._chunk_count - 1) * stride
+            if last_length < ENC_TAG_SIZE:
+                raise ArtifactDecryptionError(f"Archivo cifrado truncado: {path}")
+        except Exception:
+            self._file.close()
+            raise
+        self._header = header
+        self._cipher = _ALGORITHMS_BY_ID[algorithm_id](key)
+        self._nonce_prefix = nonce_prefix
+        self.chunk_size = chunk_size
+        self._stride = stride
+        self.size = (self._chunk_count - 1) * chunk_size + last_length - ENC_TAG_SIZE
+        self._position = 0
+        self._cached_index = -1
+        self._cached = b""
+
+    def _chunk(self, index: int) -> bytes:
+        if index != self._cached_index:
+            self._file.seek(self._data_offset + index * self._stride)
+            data = self._file.read(self._stride)
+            final = index == self._chunk_count - 1
+            try:
+                self._cached = self._cipher.decrypt(_nonce(self._nonce_prefix, index), data,
+                                                    self._header + ENC_CHUNK_AAD.pack(index, int(final)))
+            except InvalidTag:
+                raise ArtifactDecryptionError(f"Bloque {index} de {self.path} dañado, truncado o con clave incorrecta.")
+            self._cached_index = index
+        return self._cached
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("Posición negativa")
+        self._position = offset
+        return offset
+
+    def readinto(self, buffer) -> int:
+        if self._position >= self.size:
+            return 0
+        index, start = divmod(self._position, self.chunk_size)
+        chunk = self._chunk(index)
+        size = min(len(buffer), len(chunk) - start)
+        buffer[:size] = chunk[start:start + size]
+        self._position += size
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+def read_wrapped_key(path: str) -> bytes:
+    """Retorna la clave de datos envuelta de la cabecera de un archivo .enc, sin descifrar nada."""
+    with open(path, "rb") as f:
+        header = f.read(ENC_HEADER.size)
+        if len(header) != ENC_HEADER.size:
+            raise ArtifactDecryptionError(f"Archivo cifrado incompleto: {path}")
+        magic, version, _, _, _, key_length = ENC_HEADER.unpack(header)
+        if magic != ENC_MAGIC or version != ENC_VERSION:
+            raise ArtifactDecryptionError(f"No es un respaldo cifrado válido: {path}")
+        wrapped_key = f.read(key_length)
+    if len(wrapped_key) != key_length:
+        raise ArtifactDecryptionError(f"Archivo cifrado incompleto: {path}")
+    return wrapped_key
+
+def open_artifact(path: str) -> BinaryIO:
+    """Abre un archivo de respaldo para lectura binaria, descifrándolo si tiene extensión .enc."""
+    if is_encrypted_artifact(path):
+        return io.BufferedReader(DecryptingReader(path), buffer_size=ARTIFACT_ENCRYPTION_CHUNK_SIZE)
+    return open(path, "rb")
+
+def split_encrypted_extension(path: str) -> Tuple[str, bool]:
+    """Retorna la ruta sin la extensión .enc y si la tenía."""
+    if is_encrypted_artifact(path):
+        return path[:-len(ENCRYPTED_ARTIFACT_EXTENSION)], True
+    return path, False
@@ -0,0 +1,184 @@
+"""
+Utilidades para leer los archivos de respaldo independientemente de su formato de compresión
+"""
+import gzip
+import hashlib
+import lzma
+import os
+import zipfile
+from typing import BinaryIO, Optional
+
+from .artifact_crypto import EncryptingWriter, open_artifact, split_encrypted_extension
+from .constants import CHECKSUM_MANIFEST_EXTENSION, TABLE_ARCHIVE_EXTENSION, ENCRYPTED_ARTIFACT_EXTENSION
+from .table_archive import TableArchiveReader, TableArchiveWriter
+
+def open_decompressed(path: str) -> BinaryIO:
+    """
+    Abre un archivo de respaldo y retorna un flujo binario con el SQL descomprimido.
+    Soporta .sql, .zip (primer miembro), .gzip/.gz, .xz y .mbk, cifrados o no (.enc). La lectura es en streaming.
+    """
+    inner_path, encrypted = split_encrypted_extension(path)
+    lower_path = inner_path.lower()
+    if lower_path.endswith(TABLE_ARCHIVE_EXTENSION):
+        return TableArchiveReader(path).open_stream()
+    if lower_path.endswith(".zip"):
+        with zipfile.ZipFile(open_artifact(path) if encrypted else path) as archive:
+            members = archive.namelist()
+            if not members:
+                raise ValueError(f"El archivo ZIP está vacío: {path}")
+            # El miembro abierto mantiene su propia referencia al archivo tras cerrar el ZipFile
+            return archive.open(members[0])
+    if lower_path.endswith(".gzip") or lower_path.endswith(".gz"):
+        return gzip.open(open_artifact(path) if encrypted else path, "rb")
+    if lower_path.endswith(".xz"):
+        return lzma.open(open_artifact(path) if encrypted else path, "rb")
+    return open_artifact(path)
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024, limiter=None) -> str:
+    """Calcula el SHA-256 de un archivo leyéndolo por bloques (opcionalmente limitado por un TokenBucket)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            if limiter is not None:
+                limiter.consume(len(chunk))
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def strip_artifact_extension(filename: str) -> str:
+    """Retorna el nombre base de un respaldo sin extensiones (.sql, .zip, .gzip, .xz, .enc...)."""
+    base = filename
+    for extension in (ENCRYPTED_ARTIFACT_EXTENSION, ".xz", ".gzip", ".gz", ".zip", TABLE_ARCHIVE_EXTENSION, ".sql"):
+        if base.lower().endswith(extension):
+            base = base[:-len(extension)]
+    return base
+
+class _HashingWriter:
+    """Flujo de solo escritura que calcula el SHA-256 y el tamaño de lo que escribe. No admite seek."""
+    def __init__(self, raw: BinaryIO):
+        self.raw = raw
+        self.digest = hashlib.sha256()
+        self.bytes_written = 0
+        self.discard = False # Tras abortar, lo que escriban los compresores al cerrarse se descarta
+
+    def write(self, data) -> int:
+        if self.discard:
+            return len(data)
+        self.digest.update(data)
+        self.bytes_written += len(data)
+        return self.raw.write(data)
+
+    def tell(self) -> int:
+        return self.bytes_written
+
+    def flush(self):
+        self.raw.flush()
+
+class ArtifactWriter:
+    """
+    Escribe un respaldo comprimiendo en línea (zip, gzip, mbk o sin compresión), opcionalmente cifrando
+    lo comprimido por bloques (AES-256-GCM, ver artifact_crypto), y calcula el SHA-256 del archivo
+    resultante mientras se escribe, sin releerlo del disco.
+    El ZIP se escribe en modo streaming (descriptores de datos) porque el destino no admite seek.
+    """
+    def __init__(self, path: str, compression_method: str, member_name: str, encrypt: bool = False):
+        self.path = path
+        self.raw_bytes = 0
+        self._raw = open(path, "wb")
+        self._hashing = _HashingWriter(self._raw)
+        self._encrypting = None
+        self._archive = None
+        try:
+            if encrypt:
+                self._encrypting = EncryptingWriter(self._hashing)
+            self._sink = self._encrypting or self._hashing
+            sink = self._sink
+            if compression_method == "zip":
+                self._archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED)
+                self._stream = self._archive.open(member_name, "w", force_zip64=True)
+            elif compression_method == "gzip":
+                self._stream = gzip.GzipFile(filename=member_name, mode="wb", fileobj=sink)
+            elif compression_method == "mbk":
+                self._stream = TableArchiveWriter(sink)
+            elif compression_method == "none":
+                self._stream = sink
+            else:
+                raise ValueError(f"Método de compresión '{compression_method}' no soportado.")
+        except Exception:
+            if self._encrypting is not None:
+                self._encrypting.abort()
+            self._raw.close()
+            raise
+
+    def write(self, data: bytes):
+        self._stream.write(data)
+        self.raw_bytes += len(data)
+
+    def close(self):
+        """Cierra el compresor y sincroniza el archivo en disco."""
+        if self._raw.closed:
+            return
+        try:
+            if self._stream is not self._sink:
+                self._stream.close()
+            if self._archive is not None:
+                self._archive.close()
+            if self._encrypting is not None:
+                self._encrypting.close()
+            self._raw.flush()
+            os.fsync(self._raw.fileno())
+        finally:
+            self._raw.close()
+
+    def abort(self):
+        """Descarta un respaldo a medias: cierra el archivo sin finalizar el compresor ni sincronizar el disco."""
+        if self._raw.closed:
+            return
+        self._hashing.discard = True
+        if self._encrypting is not None:
+            self._encrypting.abort()
+        try:
+            if self._stream is not self._sink:
+                self._stream.close()
+            if self._archive is not None:
+                self._archive.close()
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._raw.close()
+
+    @property
+    def sha256(self) -> str:
+        return self._hashing.digest.hexdigest()
+
+    @property
+    def size(self) -> int:
+        return self._hashing.bytes_written
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+def manifest_path(artifact_path: str) -> str:
+    return artifact_path + CHECKSUM_MANIFEST_EXTENSION
+
+def write_checksum_manifest(artifact_path: str, sha256: str):
+    """Escribe el manifiesto {archivo}.sha256 (compatible con `sha256sum -c`)."""
+    with open(manifest_path(artifact_path), "w", encoding="utf-8") as f:
+        f.write(f"{sha256}  {os.path.basename(artifact_path)}\n")
+
+def read_checksum_manifest(artifact_path: str) -> Optional[str]:
+    """Lee el SHA-256 del manifiesto de un respaldo, o None si no existe o no es válido."""
+    try:
+        with open(manifest_path(artifact_path), "r", encoding="utf-8") as f:
+            checksum = f.read().split(maxsplit=1)[0].lower()
+    except (OSError, IndexError):
+        return None
+    return checksum if len(checksum) == 64 else None
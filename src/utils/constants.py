@@ -5,6 +5,11 @@ APP_NAME = "MySQL Backup Manager"
 APP_VERSION = "1.0.0"
 APP_AUTHOR = "v0"
 
+# Arranque: presupuesto de tiempo (scripts/startup_benchmark.py) y variable de entorno que hace que la
+# interfaz gráfica se cierre en cuanto termina de mostrarse, para medir el arranque en frío
+STARTUP_BUDGET_MS = 300
+STARTUP_PROBE_ENV_VAR = "MBM_STARTUP_PROBE"
+
 # Directorio base para datos de la aplicación (depende del SO)
 # En Windows: C:\Users\<User>\AppData\Local\MySQLBackupManager
 # En Linux: ~/.local/share/MySQLBackupManager
@@ -16,9 +21,14 @@ DB_FILE = "app.db"
 # DB_PATH se construirá dinámicamente usando get_app_data_path
 
 # Archivo de clave de encriptación
-ENCRYPTION_KEY_FILE = "encryption.key"
+ENCRYPTION_KEY_FILE = "encryption.key" # Clave única de versiones anteriores: se importa como v1 del anillo
+ENCRYPTION_KEYRING_FILE = "encryption_keys.json" # Anillo de claves Fernet versionado
 # ENCRYPTION_KEY_PATH se construirá dinámicamente usando get_app_data_path
 
+# Rotación de claves: columnas con secretos cifrados que se reescriben con la nueva clave principal
+ENCRYPTED_SECRET_COLUMNS = [("database_configs", "password_encrypted"), ("app_settings", "email_password_encrypted")]
+KEY_ROTATION_BATCH_SIZE = 500 # Filas por executemany al reescribir los secretos
+
 # Esquema de la base de datos SQLite
 DB_SCHEMA = """
 CREATE TABLE IF NOT EXISTS app_settings (
@@ -38,6 +48,10 @@ CREATE TABLE IF NOT EXISTS app_settings (
     email_username TEXT,
     email_password_encrypted TEXT,
     email_sender_name TEXT,
+    email_smtp_security TEXT DEFAULT 'starttls', -- 'starttls', 'ssl' (SMTPS, puerto 465) o 'none'
+    max_bandwidth_kbps INTEGER DEFAULT 0, -- Límite global de todos los respaldos en curso (0 = sin límite)
+    notification_digest_minutes INTEGER DEFAULT 0, -- Ventana del resumen de notificaciones (0 = envío inmediato)
+    notification_sinks TEXT, -- Canales adicionales (JSON): [{"type": "webhook"|"syslog"|"spool", "min_level": ..., ...}]
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -52,10 +66,21 @@ CREATE TABLE IF NOT EXISTS database_configs (
     database_name TEXT NOT NULL,
     mysqldump_path TEXT NOT NULL,
     backup_path TEXT NOT NULL,
+    segregated_path TEXT, -- Almacenamiento frío: directorio local o s3://bucket/prefijo
     excluded_tables TEXT, -- JSON string of list of tables
+    include_patterns TEXT, -- JSON: reglas glob (o re:regex) de tablas a respaldar; vacío = todas
+    exclude_patterns TEXT, -- JSON: reglas glob (o re:regex) de tablas a excluir
     compression_method TEXT DEFAULT 'zip', -- 'zip', 'gzip', 'none'
     retention_days_main INTEGER DEFAULT 7,
     retention_days_segregated INTEGER DEFAULT 30,
+    keep_hourly INTEGER DEFAULT 0, -- Retención GFS: cuántos respaldos conservar por periodo (0 = no aplica)
+    keep_daily INTEGER DEFAULT 0,
+    keep_weekly INTEGER DEFAULT 0,
+    keep_monthly INTEGER DEFAULT 0,
+    keep_yearly INTEGER DEFAULT 0,
+    max_bandwidth_kbps INTEGER DEFAULT 0, -- Límite de lectura de mysqldump en KB/s (0 = sin límite)
+    low_priority BOOLEAN DEFAULT 0, -- Ejecutar mysqldump con nice/ionice
+    encrypt_artifacts BOOLEAN DEFAULT 0, -- Cifrar los archivos de respaldo (AES-256-GCM por bloques, extensión .enc)
     is_active BOOLEAN DEFAULT 1,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -68,14 +93,68 @@ CREATE TABLE IF NOT EXISTS backup_history (
     start_time TEXT NOT NULL,
     end_time TEXT,
     status TEXT NOT NULL, -- 'running', 'success', 'failed', 'cancelled'
+    message TEXT,
     file_path TEXT,
     file_size INTEGER, -- in bytes
+    checksum TEXT, -- SHA-256 del archivo final
+    raw_size INTEGER, -- Bytes de SQL generados por mysqldump (sin comprimir)
+    progress TEXT, -- Último progreso publicado (JSON), actualizado periódicamente mientras corre
     duration_seconds REAL,
-    log_output TEXT,
+    log_output TEXT, -- Obsoleto: los logs se guardan en backup_log_chunks
     is_manual BOOLEAN DEFAULT 0,
     FOREIGN KEY (config_id) REFERENCES database_configs(id) ON DELETE CASCADE
 );
 
+-- Índice para la paginación por keyset del historial (start_time, id)
+CREATE INDEX IF NOT EXISTS idx_backup_history_start_time_id ON backup_history (start_time DESC, id DESC);
+
+-- Logs de ejecución, fuera de backup_history: fragmentos comprimidos que se escriben durante el respaldo
+CREATE TABLE IF NOT EXISTS backup_log_chunks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    history_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    codec TEXT NOT NULL DEFAULT 'zlib',
+    raw_size INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    UNIQUE (history_id, seq),
+    FOREIGN KEY (history_id) REFERENCES backup_history(id) ON DELETE CASCADE
+);
+
+-- Catálogo de archivos de respaldo producidos (evita recorrer los directorios en cada limpieza)
+CREATE TABLE IF NOT EXISTS backup_files (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    config_id INTEGER NOT NULL,
+    history_id INTEGER,
+    file_path TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL,
+    file_size INTEGER, -- in bytes
+    checksum TEXT,
+    tier TEXT NOT NULL DEFAULT 'hot', -- 'hot', 'cold'
+    FOREIGN KEY (config_id) REFERENCES database_configs(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_backup_files_config_created ON backup_files (config_id, created_at);
+
+-- Caché de metadatos de las bases de datos MySQL (information_schema.tables), por servidor y base de datos
+CREATE TABLE IF NOT EXISTS schema_metadata (
+    schema_key TEXT PRIMARY KEY, -- host:puerto/base_de_datos
+    refreshed_at TEXT NOT NULL,
+    table_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS table_metadata (
+    schema_key TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    table_type TEXT, -- 'BASE TABLE', 'VIEW'
+    engine TEXT,
+    data_length INTEGER DEFAULT 0,
+    index_length INTEGER DEFAULT 0,
+    table_rows INTEGER DEFAULT 0, -- Estimación del servidor
+    update_time TEXT,
+    PRIMARY KEY (schema_key, table_name),
+    FOREIGN KEY (schema_key) REFERENCES schema_metadata(schema_key) ON DELETE CASCADE
+);
+
 CREATE TABLE IF NOT EXISTS backup_schedules (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     config_id INTEGER NOT NULL,
@@ -92,14 +171,117 @@ CREATE TABLE IF NOT EXISTS backup_schedules (
 );
 """
 
+# Columnas añadidas después de la primera versión del esquema.
+# Se aplican con ALTER TABLE sobre bases de datos existentes: (tabla, columna, definición)
+DB_MIGRATIONS = [
+    ("backup_history", "message", "TEXT"),
+    ("database_configs", "keep_hourly", "INTEGER DEFAULT 0"),
+    ("database_configs", "keep_daily", "INTEGER DEFAULT 0"),
+    ("database_configs", "keep_weekly", "INTEGER DEFAULT 0"),
+    ("database_configs", "keep_monthly", "INTEGER DEFAULT 0"),
+    ("database_configs", "keep_yearly", "INTEGER DEFAULT 0"),
+    ("database_configs", "segregated_path", "TEXT"),
+    ("backup_history", "checksum", "TEXT"),
+    ("database_configs", "max_bandwidth_kbps", "INTEGER DEFAULT 0"),
+    ("database_configs", "low_priority", "BOOLEAN DEFAULT 0"),
+    ("app_settings", "max_bandwidth_kbps", "INTEGER DEFAULT 0"),
+    ("app_settings", "notification_digest_minutes", "INTEGER DEFAULT 0"),
+    ("app_settings", "notification_sinks", "TEXT"),
+    ("backup_history", "raw_size", "INTEGER"),
+    ("backup_history", "progress", "TEXT"),
+    ("database_configs", "encrypt_artifacts", "BOOLEAN DEFAULT 0"),
+    ("database_configs", "include_patterns", "TEXT"),
+    ("database_configs", "exclude_patterns", "TEXT"),
+    ("app_settings", "email_smtp_security", "TEXT DEFAULT 'starttls'"),
+]
+
+# Tablas que debe contener un archivo para poder restaurarlo como base de datos de la aplicación
+DB_REQUIRED_TABLES = ["app_settings", "database_configs", "backup_history", "backup_schedules"]
+
+# Copia en caliente de app.db (API de backup de SQLite)
+DB_BACKUP_PAGES_PER_STEP = 256 # Páginas copiadas por paso
+DB_BACKUP_STEP_SLEEP = 0.005 # Pausa entre pasos (segundos)
+
 # Estados de respaldo
+BACKUP_STATUS_QUEUED = "queued" # Esperando espacio en disco para empezar
 BACKUP_STATUS_RUNNING = "running"
 BACKUP_STATUS_SUCCESS = "success"
 BACKUP_STATUS_FAILED = "failed"
 BACKUP_STATUS_CANCELLED = "cancelled"
 
-# Métodos de compresión
-COMPRESSION_METHODS = ["zip", "gzip", "none"]
+# Niveles de almacenamiento de los archivos de respaldo
+STORAGE_TIER_HOT = "hot"
+STORAGE_TIER_COLD = "cold"
+
+# Movimiento de respaldos al almacenamiento frío (segregado)
+TIERING_BANDWIDTH_BYTES_PER_SECOND = 50 * 1024 * 1024 # Límite de escritura en almacenamiento frío (0 = sin límite)
+TIERING_CHUNK_SIZE = 1024 * 1024
+TIERING_XZ_PRESET = 6 # Nivel de compresión xz de los respaldos en frío
+COLD_ARTIFACT_EXTENSION = ".sql.xz"
+
+# Formato del sello de tiempo en los nombres de archivo: {database_name}_{YYYYMMDD_HHMMSS}.sql(.zip/.gzip)
+BACKUP_FILE_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+# Escritura de respaldos en streaming: mysqldump -> compresión -> hash -> archivo .part
+DUMP_STREAM_CHUNK_SIZE = 1024 * 1024
+PARTIAL_ARTIFACT_EXTENSION = ".part"
+LOW_PRIORITY_NICE = 10 # Incremento de nice para mysqldump en configuraciones de baja prioridad
+BACKUP_CANCEL_GRACE_SECONDS = 5 # Espera tras SIGTERM antes de forzar la salida de mysqldump con SIGKILL
+LOW_PRIORITY_IONICE_ARGS = ["-c", "2", "-n", "7"] # ionice: best-effort, prioridad mínima (Linux)
+GLOBAL_BANDWIDTH_REFRESH_SECONDS = 5.0 # Cada cuánto releen los respaldos en curso el límite global de los ajustes
+CHECKSUM_MANIFEST_EXTENSION = ".sha256" # Manifiesto junto a cada respaldo, formato de sha256sum
+
+# Cifrado de respaldos en reposo (etapa tras la compresión: mysqldump -> compresión -> cifrado -> hash -> archivo)
+ENCRYPTED_ARTIFACT_EXTENSION = ".enc"
+ARTIFACT_ENCRYPTION_ALGORITHM = "aes-256-gcm" # o "chacha20-poly1305" (más rápido en CPUs sin AES-NI)
+ARTIFACT_ENCRYPTION_CHUNK_SIZE = 1024 * 1024 # Bytes por bloque cifrado (unidad de paralelismo y de acceso aleatorio)
+ARTIFACT_ENCRYPTION_WORKERS = min(4, os.cpu_count() or 1) # Hilos que cifran bloques en paralelo
+
+# Progreso de los respaldos en curso
+PROGRESS_EVENT_INTERVAL_SECONDS = 1.0 # Frecuencia máxima de eventos a los suscriptores (UI)
+PROGRESS_PERSIST_INTERVAL_SECONDS = 5.0 # Frecuencia máxima de escritura del progreso en backup_history
+PROGRESS_THROUGHPUT_SMOOTHING = 0.3 # Peso de la última medida en la media móvil del rendimiento
+
+# Verificación de integridad de respaldos
+VERIFY_WORKERS = 4 # Archivos verificados en paralelo
+VERIFY_CHUNK_SIZE = 4 * 1024 * 1024 # Lectura adelantada por hilo (memoria acotada a VERIFY_WORKERS * VERIFY_CHUNK_SIZE)
+
+# Control de admisión por espacio en disco antes de iniciar un respaldo
+DISK_ADMISSION_HISTORY_RUNS = 5 # Respaldos recientes usados para estimar el tamaño
+DISK_ADMISSION_SAFETY_FACTOR = 1.25 # Margen sobre el mayor tamaño reciente (crecimiento de la base de datos)
+DISK_MIN_FREE_BYTES = 1024 * 1024 * 1024 # Espacio que siempre debe quedar libre en el disco
+DISK_ADMISSION_WAIT_SECONDS = 30 * 60 # Espera máxima en cola a que otros respaldos liberen su reserva
+# Proporción tamaño comprimido / SQL por método, para estimar si el método cambió respecto al historial
+COMPRESSION_RATIO_ESTIMATES = {"none": 1.0, "zip": 0.18, "gzip": 0.18, "mbk": 0.2, "xz": 0.12}
+
+# Restauración de respaldos MySQL (streaming hacia el cliente mysql)
+RESTORE_PARALLELISM = 4 # Conexiones mysql que cargan tablas en paralelo (1 = restauración secuencial)
+RESTORE_CHUNK_SIZE = 1024 * 1024 # Bytes de SQL por envío a cada conexión
+RESTORE_QUEUE_DEPTH = 8 # Envíos pendientes por conexión (memoria acotada)
+RESTORE_SESSION_SETTINGS = [ # Se ejecutan al abrir cada conexión de carga
+    "SET FOREIGN_KEY_CHECKS=0",
+    "SET UNIQUE_CHECKS=0",
+    "SET autocommit=0",
+    "SET SESSION bulk_insert_buffer_size=268435456",
+]
+# Marcadores de mysqldump: inicio de cada tabla y secciones que deben cargarse al final, tras todas las tablas
+DUMP_TABLE_MARKER = b"-- Table structure for table "
+DUMP_BARRIER_MARKERS = (b"-- Final view structure for view ", b"-- Dumping routines for database ",
+                        b"-- Dumping events for database ")
+
+# Sincronización del catálogo de archivos con el disco
+CATALOG_RECONCILE_INTERVAL_MINUTES = 60
+
+# Retención GFS (abuelo-padre-hijo)
+GFS_PERIODS = ["hourly", "daily", "weekly", "monthly", "yearly"]
+RETENTION_DELETE_WORKERS = 4 # Hilos que eliminan archivos en paralelo
+RETENTION_DELETE_OPS_PER_SECOND = 20 # Presupuesto de E/S: eliminaciones por segundo (0 = sin límite)
+
+# Métodos de compresión ("mbk": contenedor con un frame comprimido por tabla e índice, permite restaurar tablas sueltas)
+COMPRESSION_METHODS = ["zip", "gzip", "mbk", "none"]
+TABLE_ARCHIVE_EXTENSION = ".mbk"
+TABLE_ARCHIVE_FRAME_SIZE = 8 * 1024 * 1024 # Tamaño máximo sin comprimir de cada frame
+TABLE_ARCHIVE_COMPRESSION_LEVEL = 6
 
 # Tipos de programación
 SCHEDULE_TYPE_DAILY = "daily"
@@ -118,9 +300,70 @@ DAYS_OF_WEEK = {
     6: "Sábado"
 }
 
+# Paginación del historial de respaldos
+HISTORY_PAGE_SIZE = 200 # Filas por página (keyset sobre start_time, id)
+HISTORY_MAX_CACHED_PAGES = 10 # Páginas mantenidas en memoria por la tabla de historial
+
+# Purga del historial por retención
+HISTORY_PURGE_BATCH_SIZE = 500 # Registros eliminados por transacción
+HISTORY_PURGE_PAUSE_SECONDS = 0.05 # Pausa entre lotes para no acaparar la conexión
+HISTORY_ARCHIVE_WATERMARK_EXTENSION = ".watermark" # Junto al archivo de historial: último registro archivado
+
+# Almacenamiento de logs de ejecución
+LOG_CHUNK_SIZE = 64 * 1024 # Bytes de texto acumulados antes de comprimir y guardar un fragmento
+LOG_CHUNK_FLUSH_SECONDS = 5 # Tiempo máximo que un fragmento permanece en memoria sin guardarse
+LOG_COMPRESSION_LEVEL = 6 # Nivel de compresión zlib
+
+# Índice de búsqueda de texto completo (SQLite FTS5) sobre el historial
+SEARCH_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS backup_history_fts USING fts5(
+    config_name, message, log_text,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+SEARCH_DEFAULT_LIMIT = 50
+SEARCH_SNIPPET_TOKENS = 12 # Palabras de contexto en cada fragmento de resultado
+
+# Pools de conexiones MySQL (carga de tablas, prueba de conexión, consultas de los respaldos)
+MYSQL_CONNECT_TIMEOUT_SECONDS = 5
+MYSQL_POOL_MAX_SIZE = 4 # Conexiones abiertas por pool como máximo
+MYSQL_POOL_ACQUIRE_TIMEOUT_SECONDS = 10 # Espera por una conexión libre con el pool lleno
+MYSQL_POOL_HEALTH_CHECK_SECONDS = 30 # Una conexión inactiva más tiempo se comprueba con ping antes de reutilizarla
+MYSQL_POOL_IDLE_SECONDS = 300 # Las conexiones inactivas más tiempo se cierran
+MYSQL_POOL_EVICT_INTERVAL_SECONDS = 60
+
+# Caché de metadatos de las bases de datos (tablas, motor, tamaños y filas estimadas)
+METADATA_CACHE_TTL_SECONDS = 15 * 60 # Antigüedad máxima antes de volver a consultar information_schema
+METADATA_INSERT_BATCH_SIZE = 1000 # Filas por executemany al guardar la caché
+TABLE_SELECTOR_FILTER_DEBOUNCE_MS = 200 # Pausa al escribir en la búsqueda del selector antes de filtrar
+
+# Reglas de inclusión/exclusión de tablas por patrón (glob por defecto, expresión regular con el prefijo)
+TABLE_RULE_REGEX_PREFIX = "re:"
+# Con más tablas excluidas, las --ignore-table se pasan en un archivo de opciones y no en la línea de comandos
+MYSQLDUMP_IGNORE_TABLE_ARGV_LIMIT = 100
+
 # Niveles de notificación
 NOTIFICATION_LEVELS = ["info", "warning", "error"]
 
+# Entrega de notificaciones en segundo plano (correo, webhook, syslog, spool)
+NOTIFICATION_QUEUE_MAX_SIZE = 200 # Envíos pendientes por canal como máximo; con la cola llena se descartan los más antiguos
+NOTIFICATION_SHUTDOWN_FLUSH_SECONDS = 10 # Espera al cerrar la aplicación para entregar las notificaciones pendientes
+NOTIFICATION_SINK_IDLE_SECONDS = 60 # Las conexiones (SMTP, HTTP) se cierran tras este tiempo sin envíos
+NOTIFICATION_MAX_ATTEMPTS = 5
+NOTIFICATION_RETRY_BASE_DELAY_SECONDS = 5 # Espera exponencial entre reintentos: 5, 10, 20, 40 s...
+NOTIFICATION_RETRY_MAX_DELAY_SECONDS = 300
+NOTIFICATION_BATCH_SIZE = 100 # Eventos por envío en los canales que admiten lotes (webhook, syslog, spool)
+NOTIFICATION_SINK_TYPES = ["webhook", "syslog", "spool"]
+NOTIFICATION_SPOOL_FILE_NAME = "notifications.jsonl"
+NOTIFICATION_SPOOL_MAX_BYTES = 50 * 1024 * 1024 # Al superarlo, el spool se rota a .1
+SMTP_TIMEOUT_SECONDS = 30
+SMTP_SECURITY_MODES = ["starttls", "ssl", "none"] # Cifrado de la sesión SMTP: STARTTLS, TLS implícito o ninguno
+WEBHOOK_TIMEOUT_SECONDS = 15
+
+# Resumen de notificaciones
+NOTIFICATION_DIGEST_ERROR_COOLDOWN_SECONDS = 3600 # Un error por configuración se envía al momento; los siguientes, en el resumen
+NOTIFICATION_DIGEST_MAX_EVENTS = 1000 # Eventos distintos retenidos por ventana; el resto solo se cuenta
+
 # Configuración de logging
 LOG_FILE_NAME = "app.log"
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -6,9 +6,6 @@ import logging
 from datetime import datetime, timedelta
 from typing import Optional, List, Any
 
-from PyQt5.QtWidgets import QMessageBox
-from PyQt5.QtGui import QIcon
-
 from .constants import APP_DATA_DIR_NAME, LOG_FILE_NAME, LOG_FORMAT, LOG_DATE_FORMAT, APP_NAME, APP_VERSION
 
 logger = logging.getLogger(__name__)
@@ -51,15 +48,18 @@ def get_mysqldump_default_path() -> str:
     else:  # Linux
         return "/usr/bin/mysqldump"
 
-def show_message_box(title: str, message: str, icon: QMessageBox.Icon = QMessageBox.Information,
-                     buttons: QMessageBox.StandardButtons = QMessageBox.Ok, default_button: QMessageBox.StandardButton = QMessageBox.NoButton) -> QMessageBox.StandardButton:
-    """Muestra un cuadro de diálogo de mensaje."""
+def show_message_box(title: str, message: str, icon: Optional["QMessageBox.Icon"] = None,
+                     buttons: Optional["QMessageBox.StandardButtons"] = None,
+                     default_button: Optional["QMessageBox.StandardButton"] = None) -> "QMessageBox.StandardButton":
+    """Muestra un cuadro de diálogo de mensaje (por defecto, informativo y con el botón Aceptar)."""
+    # PyQt5 se importa aquí para que la línea de comandos no lo cargue al importar los helpers
+    from PyQt5.QtWidgets import QMessageBox
     msg_box = QMessageBox()
-    msg_box.setIcon(icon)
+    msg_box.setIcon(QMessageBox.Information if icon is None else icon)
     msg_box.setText(message)
     msg_box.setWindowTitle(title)
-    msg_box.setStandardButtons(buttons)
-    msg_box.setDefaultButton(default_button)
+    msg_box.setStandardButtons(QMessageBox.Ok if buttons is None else buttons)
+    msg_box.setDefaultButton(QMessageBox.NoButton if default_button is None else default_button)
     return msg_box.exec_()
 
 def format_bytes(bytes_value: int) -> str:
@@ -152,8 +152,9 @@ def from_json_string(json_str: Optional[str]) -> List[Any]:
         logger.warning(f"Error al decodificar JSON: {json_str}. Retornando lista vacía.")
         return []
 
-def get_icon(icon_name: str) -> QIcon:
+def get_icon(icon_name: str) -> "QIcon":
     """Carga un icono desde la carpeta de assets."""
+    from PyQt5.QtGui import QIcon
     # Asume que los iconos están en la carpeta 'assets/icons' en la raíz del proyecto
     # y que se han copiado al directorio de datos de la aplicación.
     icon_path = get_app_data_path(os.path.join("icons", f"{icon_name}.png"))
@@ -0,0 +1,60 @@
+import threading
+import time
+from typing import Optional
+
+class TokenBucket:
+    """
+    Limitador de tasa tipo token bucket, seguro entre hilos.
+    `rate` son unidades por segundo (bytes, operaciones...); un rate <= 0 desactiva el límite.
+    Los consumos mayores que la capacidad se permiten dejando el cubo en negativo, y quien
+    consume espera hasta saldar la deuda. El rate puede cambiarse mientras hay hilos esperando.
+    """
+    MAX_WAIT_SLICE = 0.25 # Las esperas se trocean para aplicar cambios de rate en caliente
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self._lock = threading.Lock()
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else max(self.rate, 1.0)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+
+    @property
+    def is_limited(self) -> bool:
+        return self.rate > 0
+
+    def set_rate(self, rate: float, capacity: Optional[float] = None):
+        """Cambia el rate (y opcionalmente la capacidad) del cubo."""
+        with self._lock:
+            self._refill()
+            self.rate = float(rate)
+            self.capacity = float(capacity) if capacity is not None else max(self.rate, 1.0)
+            self._tokens = min(self._tokens, self.capacity)
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate > 0:
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def consume(self, amount: float = 1.0, cancel_event: Optional[threading.Event] = None) -> bool:
+        """
+        Consume `amount` unidades, bloqueando el hilo el tiempo necesario.
+        Retorna False si `cancel_event` se activa durante la espera.
+        """
+        with self._lock:
+            if self.rate <= 0:
+                return True
+            self._refill()
+            self._tokens -= amount
+
+        while True:
+            with self._lock:
+                self._refill()
+                if self.rate <= 0 or self._tokens >= 0:
+                    return True
+                wait = min(-self._tokens / self.rate, self.MAX_WAIT_SLICE)
+            if cancel_event is not None:
+                if cancel_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
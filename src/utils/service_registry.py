@@ -0,0 +1,82 @@
+"""
+Registro de los servicios y repositorios globales de la aplicación
+
+Cada módulo publica su instancia global como un proxy (`lazy_service`): importar el módulo ya no
+construye el servicio, así que ni se abre SQLite ni se lee el anillo de claves hasta que algo los usa.
+El servicio se construye en el primer acceso a uno de sus atributos y a partir de ahí el proxy
+reenvía todo a esa instancia. `from ..services.x import x_service` sigue funcionando igual.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+class ServiceRegistry:
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        # Reentrante: construir un servicio suele pedir otros (p. ej. un repositorio pide la base de datos)
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        with self._lock:
+            self._factories[name] = factory
+
+    def get(self, name: str) -> Any:
+        """Retorna la instancia de un servicio, construyéndola la primera vez (una sola vez aunque haya varios hilos)."""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                if name not in self._factories:
+                    raise KeyError(f"Servicio no registrado: {name}")
+                start = time.perf_counter()
+                instance = self._factories[name]()
+                self._instances[name] = instance
+                logger.debug(f"Servicio '{name}' construido en {(time.perf_counter() - start) * 1000:.1f} ms.")
+            return instance
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def loaded_services(self) -> List[str]:
+        """Servicios ya construidos, en orden de construcción."""
+        return list(self._instances)
+
+# Instancia global del registro de servicios
+service_registry = ServiceRegistry()
+
+class LazyService:
+    """Proxy de un servicio del registro: lo construye en el primer acceso a un atributo."""
+    __slots__ = ("_name", "_instance")
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_instance", None)
+
+    def _resolve(self) -> Any:
+        instance = self._instance
+        if instance is None:
+            instance = service_registry.get(self._name)
+            object.__setattr__(self, "_instance", instance)
+        return instance
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._resolve(), attribute)
+
+    def __setattr__(self, attribute: str, value: Any):
+        setattr(self._resolve(), attribute, value)
+
+    def __repr__(self) -> str:
+        if self._instance is None:
+            return f"<LazyService '{self._name}' (sin construir)>"
+        return repr(self._instance)
+
+def lazy_service(name: str, factory: Callable[[], Any]) -> LazyService:
+    """Registra la fábrica de un servicio global y retorna el proxy que lo representa."""
+    service_registry.register(name, factory)
+    return LazyService(name)
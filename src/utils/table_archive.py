@@ -0,0 +1,253 @@
+"""
+Contenedor de respaldos con acceso aleatorio por tabla (.mbk)
+
+Estructura del archivo:
+    MBK_MAGIC
+    frame 0 | frame 1 | ... (cada frame es un bloque zlib independiente de una sección del volcado)
+    índice (JSON comprimido con zlib: sección -> offset, longitud, tamaño y CRC32 de cada frame)
+    pie de tamaño fijo: offset del índice, longitud del índice, MBK_INDEX_MAGIC
+
+El pie de tamaño fijo permite localizar el índice con un solo seek desde el final, así que leer una
+tabla cuesta lo mismo con independencia del tamaño del archivo.
+"""
+import io
+import json
+import re
+import struct
+import zlib
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+from .artifact_crypto import open_artifact, split_encrypted_extension
+from .constants import (DUMP_TABLE_MARKER, DUMP_BARRIER_MARKERS, TABLE_ARCHIVE_FRAME_SIZE,
+                        TABLE_ARCHIVE_COMPRESSION_LEVEL, TABLE_ARCHIVE_EXTENSION)
+
+MBK_MAGIC = b"MBK1\n"
+MBK_INDEX_MAGIC = b"MBKI"
+MBK_FOOTER = struct.Struct(">QQ4s")
+
+SECTION_HEADER = "header" # Cabecera del volcado (SET ..., variables de sesión)
+SECTION_TABLE = "table"
+SECTION_POST = "post" # Vistas, rutinas y eventos: se cargan tras todas las tablas
+
+_TABLE_NAME_PATTERN = re.compile(rb"`((?:[^`]|``)+)`")
+
+class TableArchiveError(Exception):
+    pass
+
+def is_table_archive(path: str) -> bool:
+    """Indica si la ruta es un contenedor .mbk (cifrado o no)."""
+    return split_encrypted_extension(path)[0].lower().endswith(TABLE_ARCHIVE_EXTENSION)
+
+def _table_name(marker_line: bytes) -> str:
+    match = _TABLE_NAME_PATTERN.search(marker_line)
+    if not match:
+        return marker_line[len(DUMP_TABLE_MARKER):].strip().decode("utf-8", errors="replace")
+    return match.group(1).replace(b"``", b"`").decode("utf-8", errors="replace")
+
+class TableArchiveWriter:
+    """
+    Recibe la salida de mysqldump en bloques arbitrarios y la guarda por secciones: cada tabla se
+    comprime en uno o varios frames independientes (de hasta TABLE_ARCHIVE_FRAME_SIZE bytes sin comprimir).
+    `fileobj` solo necesita write(); el offset se lleva internamente.
+    """
+    def __init__(self, fileobj: BinaryIO, compression_level: int = TABLE_ARCHIVE_COMPRESSION_LEVEL):
+        self.fileobj = fileobj
+        self.compression_level = compression_level
+        self.frames: List[Dict] = []
+        self._offset = 0
+        self._pending = bytearray() # Línea incompleta del último bloque recibido
+        self._section_data = bytearray()
+        self._section_kind = SECTION_HEADER
+        self._section_name = ""
+        self._closed = False
+        self._write_raw(MBK_MAGIC)
+
+    def _write_raw(self, data: bytes):
+        self.fileobj.write(data)
+        self._offset += len(data)
+
+    def _flush_frame(self):
+        if not self._section_data:
+            return
+        raw = bytes(self._section_data)
+        compressed = zlib.compress(raw, self.compression_level)
+        self.frames.append({
+            "kind": self._section_kind,
+            "name": self._section_name,
+            "offset": self._offset,
+            "length": len(compressed),
+            "raw_size": len(raw),
+            "crc32": zlib.crc32(raw),
+        })
+        self._write_raw(compressed)
+        self._section_data.clear()
+
+    def _start_section(self, kind: str, name: str):
+        self._flush_frame()
+        self._section_kind = kind
+        self._section_name = name
+
+    def _append(self, data: bytes):
+        self._section_data.extend(data)
+        if len(self._section_data) >= TABLE_ARCHIVE_FRAME_SIZE:
+            self._flush_frame()
+
+    def _process_lines(self, data: bytes):
+        # Camino rápido: bloques de INSERT sin ningún comentario de mysqldump
+        if b"\n-- " not in data and not data.startswith(b"-- "):
+            self._append(data)
+            return
+        for line in data.splitlines(keepends=True):
+            if self._section_kind != SECTION_POST:
+                if line.startswith(DUMP_TABLE_MARKER):
+                    self._start_section(SECTION_TABLE, _table_name(line))
+                elif line.startswith(DUMP_BARRIER_MARKERS):
+                    self._start_section(SECTION_POST, "")
+            self._append(line)
+
+    def write(self, data: bytes):
+        self._pending.extend(data)
+        last_newline = self._pending.rfind(b"\n")
+        if last_newline < 0:
+            return
+        complete = bytes(self._pending[:last_newline + 1])
+        del self._pending[:last_newline + 1]
+        self._process_lines(complete)
+
+    def close(self):
+        """Escribe los datos pendientes, el índice y el pie. No cierra `fileobj`."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._pending:
+            self._process_lines(bytes(self._pending))
+            self._pending.clear()
+        self._flush_frame()
+        index = zlib.compress(json.dumps({"version": 1, "frames": self.frames}).encode("utf-8"))
+        index_offset = self._offset
+        self._write_raw(index)
+        self._write_raw(MBK_FOOTER.pack(index_offset, len(index), MBK_INDEX_MAGIC))
+
+class _FrameStream(io.RawIOBase):
+    """Flujo de solo lectura que descomprime una secuencia de frames bajo demanda."""
+    def __init__(self, chunks: Iterator[bytes], on_close=None):
+        self._chunks = chunks
+        self._on_close = on_close
+        self._current = b""
+        self._position = 0
+
+    def close(self):
+        if not self.closed and self._on_close is not None:
+            self._on_close()
+        super().close()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while self._position >= len(self._current):
+            self._current = next(self._chunks, None)
+            self._position = 0
+            if self._current is None:
+                self._current = b""
+                return 0
+        size = min(len(buffer), len(self._current) - self._position)
+        buffer[:size] = self._current[self._position:self._position + size]
+        self._position += size
+        return size
+
+class TableArchiveReader:
+    """
+    Lee un archivo .mbk: listar tablas y leer cualquier tabla sin recorrer el resto del archivo.
+    Un .mbk.enc se descifra al vuelo: solo se descifran los bloques que contienen el índice y los frames leídos.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open_artifact(path)
+        try:
+            if self._file.read(len(MBK_MAGIC)) != MBK_MAGIC:
+                raise TableArchiveError(f"No es un archivo .mbk válido: {path}")
+            if self._file.seek(0, io.SEEK_END) < len(MBK_MAGIC) + MBK_FOOTER.size:
+                raise TableArchiveError(f"Archivo .mbk incompleto o dañado (sin índice): {path}")
+            self._file.seek(-MBK_FOOTER.size, io.SEEK_END)
+            index_offset, index_length, magic = MBK_FOOTER.unpack(self._file.read(MBK_FOOTER.size))
+            if magic != MBK_INDEX_MAGIC:
+                raise TableArchiveError(f"Archivo .mbk incompleto o dañado (sin índice): {path}")
+            self._file.seek(index_offset)
+            try:
+                index = json.loads(zlib.decompress(self._file.read(index_length)))
+                self.frames: List[Dict] = index["frames"]
+            except (zlib.error, ValueError, KeyError, TypeError) as e:
+                raise TableArchiveError(f"Índice del archivo .mbk dañado: {path} ({e})") from e
+        except Exception:
+            self._file.close()
+            raise
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def tables(self) -> List[Dict]:
+        """Tablas del archivo en orden de volcado, con sus tamaños comprimido y sin comprimir."""
+        tables: Dict[str, Dict] = {}
+        for frame in self.frames:
+            if frame["kind"] != SECTION_TABLE:
+                continue
+            entry = tables.setdefault(frame["name"], {"name": frame["name"], "frames": 0, "size": 0, "raw_size": 0})
+            entry["frames"] += 1
+            entry["size"] += frame["length"]
+            entry["raw_size"] += frame["raw_size"]
+        return list(tables.values())
+
+    def _read_frame(self, frame: Dict) -> bytes:
+        self._file.seek(frame["offset"])
+        try:
+            data = zlib.decompress(self._file.read(frame["length"]))
+        except zlib.error as e:
+            raise TableArchiveError(f"Frame de '{frame['name'] or frame['kind']}' dañado (offset {frame['offset']}): {e}") from e
+        if zlib.crc32(data) != frame["crc32"]:
+            raise TableArchiveError(f"CRC incorrecto en el frame de '{frame['name'] or frame['kind']}' (offset {frame['offset']})")
+        return data
+
+    def _select(self, tables: Optional[Iterable[str]], include_header: bool, include_post: bool) -> List[Dict]:
+        wanted = set(tables) if tables is not None else None
+        if wanted is not None:
+            missing = wanted - {frame["name"] for frame in self.frames if frame["kind"] == SECTION_TABLE}
+            if missing:
+                raise TableArchiveError(f"Tablas no encontradas en el archivo: {', '.join(sorted(missing))}")
+        selected = []
+        for frame in self.frames:
+            if frame["kind"] == SECTION_HEADER and include_header:
+                selected.append(frame)
+            elif frame["kind"] == SECTION_TABLE and (wanted is None or frame["name"] in wanted):
+                selected.append(frame)
+            elif frame["kind"] == SECTION_POST and include_post:
+                selected.append(frame)
+        return selected
+
+    def iter_sql(self, tables: Optional[Iterable[str]] = None, include_header: bool = True,
+                 include_post: Optional[bool] = None) -> Iterator[bytes]:
+        """Genera el SQL de las tablas pedidas (todas si `tables` es None), precedido de la cabecera del volcado."""
+        if include_post is None:
+            include_post = tables is None
+        for frame in self._select(tables, include_header, include_post):
+            yield self._read_frame(frame)
+
+    def open_stream(self, tables: Optional[Iterable[str]] = None, include_header: bool = True) -> BinaryIO:
+        """Flujo binario con el SQL de las tablas pedidas (o del volcado completo). Cierra el archivo al cerrarse."""
+        try:
+            frames = self._select(tables, include_header, tables is None)
+        except TableArchiveError:
+            self.close()
+            raise
+
+        def chunks():
+            for frame in frames:
+                yield self._read_frame(frame)
+
+        return io.BufferedReader(_FrameStream(chunks(), on_close=self.close))
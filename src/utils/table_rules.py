@@ -0,0 +1,81 @@
+"""
+Reglas de inclusión y exclusión de tablas por patrón
+
+Cada regla es un glob (`tenant_*_log`, `tmp_??`) o, con el prefijo TABLE_RULE_REGEX_PREFIX, una
+expresión regular que debe coincidir con el nombre completo (`re:t_\\d+_archive`). Las mayúsculas se
+distinguen, igual que los nombres de tabla de MySQL en Linux. Se respalda una tabla si coincide con
+alguna regla de inclusión (o no hay ninguna) y con ninguna de exclusión.
+"""
+import fnmatch
+import re
+from typing import Iterable, List, Optional, Pattern, Set, Tuple
+
+from .constants import TABLE_RULE_REGEX_PREFIX
+
+# Banderas globales al inicio de una expresión (`(?i)tmp_.*`): al unir las reglas dejarían de estar al
+# inicio, así que se convierten en banderas de grupo (`(?i:tmp_.*)`), que solo afectan a esa regla
+_LEADING_FLAGS = re.compile(r"^\(\?([aiLmsux]+)\)")
+
+def _rule_regex(rule: str) -> str:
+    if rule.startswith(TABLE_RULE_REGEX_PREFIX):
+        regex = rule[len(TABLE_RULE_REGEX_PREFIX):]
+        match = _LEADING_FLAGS.match(regex)
+        if match:
+            return f"(?{match.group(1)}:{regex[match.end():]})"
+        return regex
+    return fnmatch.translate(rule)
+
+def _rule_parts(rules: Iterable[str]) -> List[Tuple[str, str]]:
+    """(regla, expresión envuelta en su propio grupo) de cada regla no vacía."""
+    return [(rule, f"(?:{_rule_regex(rule)})") for rule in (rule.strip() for rule in rules) if rule]
+
+def compile_rules(rules: Iterable[str]) -> Optional[Pattern]:
+    """Une todas las reglas en una sola expresión (una pasada por tabla). None si no hay reglas."""
+    parts = [part for _, part in _rule_parts(rules)]
+    if not parts:
+        return None
+    return re.compile("|".join(parts))
+
+def validate_rules(rules: Iterable[str]) -> Tuple[bool, str]:
+    """
+    Comprueba que las reglas de una lista (inclusión o exclusión) compilen tal como las une
+    compile_rules: primero cada una por separado, para señalar la regla culpable, y luego todas juntas.
+    """
+    rules = list(rules)
+    for rule, part in _rule_parts(rules):
+        try:
+            re.compile(part)
+        except re.error as e:
+            return False, f"Regla de tablas inválida '{rule}': {e}"
+    try:
+        compile_rules(rules)
+    except re.error as e:
+        return False, f"Las reglas de tablas no se pueden combinar: {e}"
+    return True, "Reglas válidas."
+
+class TableRules:
+    """Reglas de una configuración compiladas una vez para resolverlas contra la lista de tablas."""
+    def __init__(self, include_patterns: Iterable[str] = (), exclude_patterns: Iterable[str] = ()):
+        self._include = compile_rules(include_patterns)
+        self._exclude = compile_rules(exclude_patterns)
+
+    @property
+    def is_empty(self) -> bool:
+        return self._include is None and self._exclude is None
+
+    def includes(self, table_name: str) -> bool:
+        if self._include is not None and not self._include.fullmatch(table_name):
+            return False
+        return self._exclude is None or not self._exclude.fullmatch(table_name)
+
+    def excluded(self, table_names: Iterable[str]) -> Set[str]:
+        """Nombres de `table_names` que las reglas dejan fuera del respaldo."""
+        return {name for name in table_names if not self.includes(name)}
+
+def format_option_value(value: str) -> str:
+    """Entrecomilla un valor para un archivo de opciones de MySQL (admite #, espacios y comillas)."""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def ignore_table_options(database_name: str, tables: Iterable[str]) -> List[str]:
+    """Líneas `ignore-table=` de la sección [mysqldump] de un archivo de opciones."""
+    return [f"ignore-table={format_option_value(f'{database_name}.{table}')}" for table in sorted(tables)]
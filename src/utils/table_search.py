@@ -0,0 +1,63 @@
+"""
+Índice de búsqueda por subcadena sobre nombres de tabla (esquemas con decenas de miles de tablas)
+"""
+from typing import Dict, Iterable, List, Optional, Set
+
+class TableSearchIndex:
+    """
+    Índice de trigramas: cada trigrama del nombre (en minúsculas) apunta a los ids de las tablas que lo
+    contienen. Una búsqueda de 3 o más caracteres intersecta las listas de sus trigramas, empezando por
+    la más corta, y solo comprueba la subcadena en los candidatos que quedan. Las búsquedas de 1 o 2
+    caracteres recorren los nombres (casi todas las tablas coinciden, el índice no ahorraría nada).
+    """
+    def __init__(self, names: Iterable[str] = ()):
+        self._names: List[str] = []
+        self._trigrams: Dict[str, List[int]] = {}
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, name: str) -> int:
+        """Añade un nombre y retorna su id (su posición en el orden de inserción)."""
+        table_id = len(self._names)
+        lower_name = name.lower()
+        self._names.append(lower_name)
+        for trigram in {lower_name[i:i + 3] for i in range(len(lower_name) - 2)}:
+            self._trigrams.setdefault(trigram, []).append(table_id)
+        return table_id
+
+    def truncate(self, size: int):
+        """Quita los nombres añadidos después de los primeros `size` (los últimos ids de cada lista)."""
+        for table_id in range(len(self._names) - 1, size - 1, -1):
+            name = self._names.pop()
+            for trigram in {name[i:i + 3] for i in range(len(name) - 2)}:
+                posting = self._trigrams[trigram]
+                posting.pop() # Los ids se añaden en orden: el de este nombre es el último de la lista
+                if not posting:
+                    del self._trigrams[trigram]
+
+    def search(self, text: str) -> Optional[Set[int]]:
+        """Ids de los nombres que contienen `text` (sin distinguir mayúsculas). None si no hay filtro."""
+        query = text.strip().lower()
+        if not query:
+            return None
+        if len(query) < 3:
+            return {table_id for table_id, name in enumerate(self._names) if query in name}
+        postings = []
+        for trigram in {query[i:i + 3] for i in range(len(query) - 2)}:
+            posting = self._trigrams.get(trigram)
+            if posting is None:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return candidates
+        if len(query) == 3:
+            return candidates
+        # Tener todos los trigramas no garantiza la subcadena ("abcxbcd" contiene los de "abcd")
+        return {table_id for table_id in candidates if query in self._names[table_id]}
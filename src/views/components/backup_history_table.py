@@ -1,19 +1,196 @@
 import logging
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView, QMenu, QAction, QMessageBox
-from PyQt5.QtCore import Qt, QDateTime
+from collections import OrderedDict
+from typing import List, Optional, Tuple, Any
+
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QTableView, QHeaderView, QMenu, QAction, QMessageBox, QAbstractItemView
+from PyQt5.QtCore import Qt, QDateTime, QAbstractTableModel, QModelIndex, pyqtSignal
 from PyQt5.QtGui import QColor
 
+from ...models.backup_history import BackupHistory
+from ...models.backup_progress import BackupProgress
 from ...repositories.backup_history_repository import backup_history_repository
+from ...repositories.backup_log_repository import backup_log_repository
+from ...services.backup_service import backup_service
+from ...services.progress_service import progress_service
+from ...utils.constants import HISTORY_PAGE_SIZE, HISTORY_MAX_CACHED_PAGES
 from ...utils.helpers import format_bytes, format_duration
 
 logger = logging.getLogger(__name__)
 
+STATUS_COLORS = {
+    "success": QColor("green"),
+    "failed": QColor("red"),
+    "queued": QColor("gray"),
+    "running": QColor("blue"),
+    "cancelled": QColor("orange"),
+}
+
+class BackupHistoryTableModel(QAbstractTableModel):
+    """
+    Modelo perezoso del historial: pide páginas al repositorio (keyset sobre start_time, id)
+    a medida que la vista se desplaza y mantiene en memoria solo las páginas más recientes.
+    """
+    HEADERS = [
+        "ID", "Configuración", "Inicio", "Fin", "Duración",
+        "Estado", "Archivo", "Tamaño", "Manual"
+    ]
+
+    def __init__(self, history_repo, page_size: int = HISTORY_PAGE_SIZE,
+                 max_cached_pages: int = HISTORY_MAX_CACHED_PAGES, parent=None):
+        super().__init__(parent)
+        self.history_repo = history_repo
+        self.page_size = page_size
+        self.max_cached_pages = max_cached_pages
+        self._reset_state()
+
+    def _reset_state(self):
+        self._row_count = 0
+        self._page_keys: List[Optional[Tuple[str, int]]] = [] # Clave previa a cada página (None para la primera)
+        self._next_key: Optional[Tuple[str, int]] = None
+        self._pages: "OrderedDict[int, List[BackupHistory]]" = OrderedDict()
+        self._exhausted = False
+
+    def reload(self):
+        """Descarta las páginas cargadas y vuelve a pedir la primera."""
+        self.beginResetModel()
+        self._reset_state()
+        self.endResetModel()
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        """Carga la siguiente página a continuación de la última fila conocida."""
+        if parent.isValid() or self._exhausted:
+            return
+        page_index = len(self._page_keys)
+        items = self.history_repo.get_page(self.page_size, after=self._next_key)
+        if len(items) < self.page_size:
+            self._exhausted = True
+        if not items:
+            return
+
+        self.beginInsertRows(QModelIndex(), self._row_count, self._row_count + len(items) - 1)
+        self._page_keys.append(self._next_key)
+        self._next_key = self.history_repo.page_key(items[-1])
+        self._store_page(page_index, items)
+        self._row_count += len(items)
+        self.endInsertRows()
+        logger.debug(f"Página {page_index} del historial cargada ({len(items)} filas).")
+
+    def _store_page(self, page_index: int, items: List[BackupHistory]):
+        self._pages[page_index] = items
+        self._pages.move_to_end(page_index)
+        while len(self._pages) > self.max_cached_pages:
+            self._pages.popitem(last=False)
+
+    def _page(self, page_index: int) -> List[BackupHistory]:
+        """Retorna una página, recargándola desde la base de datos si fue descartada."""
+        items = self._pages.get(page_index)
+        if items is None:
+            items = self.history_repo.get_page(self.page_size, after=self._page_keys[page_index])
+            self._store_page(page_index, items)
+        else:
+            self._pages.move_to_end(page_index)
+        return items
+
+    def item_at(self, row: int) -> Optional[BackupHistory]:
+        """Retorna el registro de historial de una fila."""
+        if row < 0 or row >= self._row_count:
+            return None
+        items = self._page(row // self.page_size)
+        offset = row % self.page_size
+        return items[offset] if offset < len(items) else None
+
+    def history_id_at(self, row: int) -> Optional[int]:
+        item = self.item_at(row)
+        return item.id if item else None
+
+    def update_progress(self, progress: BackupProgress):
+        """Actualiza el progreso de una ejecución en curso si su fila está en una página cargada."""
+        for page_index, items in self._pages.items():
+            for offset, item in enumerate(items):
+                if item.id == progress.history_id:
+                    item.progress = progress
+                    index = self.index(page_index * self.page_size + offset, 5)
+                    self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.ToolTipRole])
+                    return
+
+    @staticmethod
+    def _status_text(item: BackupHistory) -> str:
+        if not item.is_running or item.progress is None:
+            return item.status
+        parts = [item.status]
+        percent = item.progress.percent
+        if percent is not None:
+            parts.append(f"{percent:.0f}%")
+        if item.progress.eta_seconds is not None:
+            parts.append(f"ETA {format_duration(item.progress.eta_seconds)}")
+        return " · ".join(parts)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        item = self.item_at(index.row())
+        if item is None:
+            return None
+        column = index.column()
+
+        if role == Qt.ForegroundRole and column == 5:
+            return STATUS_COLORS.get(item.status)
+        if role == Qt.ToolTipRole and column == 5 and item.progress is not None:
+            return item.progress.summary()
+        if role != Qt.DisplayRole:
+            return None
+
+        if column == 0:
+            return str(item.id)
+        if column == 1:
+            return item.config_name
+        if column == 2:
+            return item.start_time.strftime("%Y-%m-%d %H:%M:%S") if item.start_time else "N/A"
+        if column == 3:
+            return item.end_time.strftime("%Y-%m-%d %H:%M:%S") if item.end_time else "N/A"
+        if column == 4:
+            return format_duration(item.duration_seconds)
+        if column == 5:
+            return self._status_text(item)
+        if column == 6:
+            return item.file_path if item.file_path else "N/A"
+        if column == 7:
+            return format_bytes(item.file_size) if item.file_size is not None else "N/A"
+        if column == 8:
+            return "Sí" if item.is_manual else "No"
+        return None
+
+    def headerData(self, section: int, orientation: int, role: int = Qt.DisplayRole) -> Any:
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
 class BackupHistoryTable(QWidget):
+    # Los eventos de progreso llegan desde el hilo del respaldo: la señal los pasa al hilo de la UI
+    progress_received = pyqtSignal(object)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.history_repo = backup_history_repository
+        self.log_repo = backup_log_repository
+        self.progress_service = progress_service
         self._init_ui()
         self.load_history()
+        self.progress_received.connect(self.model.update_progress)
+        listener = self.progress_received.emit
+        self.progress_service.add_listener(listener)
+        self.destroyed.connect(lambda: progress_service.remove_listener(listener))
         logger.info("Tabla de historial de respaldos inicializada.")
 
     def _init_ui(self):
@@ -21,50 +198,24 @@ class BackupHistoryTable(QWidget):
         self.main_layout = QVBoxLayout(self)
         self.main_layout.setContentsMargins(0, 0, 0, 0)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(9)
-        self.table.setHorizontalHeaderLabels([
-            "ID", "Configuración", "Inicio", "Fin", "Duración",
-            "Estado", "Archivo", "Tamaño", "Manual"
-        ])
+        self.model = BackupHistoryTableModel(self.history_repo, parent=self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        # Sin redimensionar por contenido: obligaría a leer todas las filas del modelo
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers) # Hacer la tabla de solo lectura
+        self.table.verticalHeader().setVisible(False)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers) # Hacer la tabla de solo lectura
         self.table.setContextMenuPolicy(Qt.CustomContextMenu)
         self.table.customContextMenuRequested.connect(self._show_context_menu)
 
         self.main_layout.addWidget(self.table)
 
     def load_history(self):
-        """Carga los datos del historial de respaldos en la tabla."""
+        """Carga (o recarga) la primera página del historial de respaldos."""
         logger.debug("Cargando historial de respaldos...")
-        history_items = self.history_repo.get_all()
-        self.table.setRowCount(len(history_items))
-
-        for row_idx, item in enumerate(history_items):
-            self.table.setItem(row_idx, 0, QTableWidgetItem(str(item.id)))
-            self.table.setItem(row_idx, 1, QTableWidgetItem(item.config_name))
-            self.table.setItem(row_idx, 2, QTableWidgetItem(item.start_time.strftime("%Y-%m-%d %H:%M:%S") if item.start_time else "N/A"))
-            self.table.setItem(row_idx, 3, QTableWidgetItem(item.end_time.strftime("%Y-%m-%d %H:%M:%S") if item.end_time else "N/A"))
-            self.table.setItem(row_idx, 4, QTableWidgetItem(format_duration(item.duration_seconds)))
-            
-            status_item = QTableWidgetItem(item.status)
-            if item.status == "success":
-                status_item.setForeground(QColor("green"))
-            elif item.status == "failed":
-                status_item.setForeground(QColor("red"))
-            elif item.status == "running":
-                status_item.setForeground(QColor("blue"))
-            elif item.status == "cancelled":
-                status_item.setForeground(QColor("orange"))
-            self.table.setItem(row_idx, 5, status_item)
-
-            self.table.setItem(row_idx, 6, QTableWidgetItem(item.file_path if item.file_path else "N/A"))
-            self.table.setItem(row_idx, 7, QTableWidgetItem(format_bytes(item.file_size) if item.file_size is not None else "N/A"))
-            self.table.setItem(row_idx, 8, QTableWidgetItem("Sí" if item.is_manual else "No"))
-        
-        self.table.resizeColumnsToContents()
-        logger.debug(f"Historial de respaldos cargado: {len(history_items)} elementos.")
+        self.model.reload()
+        logger.debug(f"Historial de respaldos cargado: {self.model.rowCount()} elementos visibles.")
 
     def _show_context_menu(self, pos):
         """Muestra el menú contextual al hacer clic derecho en la tabla."""
@@ -72,30 +223,50 @@ class BackupHistoryTable(QWidget):
         if not index.isValid():
             return
 
-        selected_row = index.row()
-        history_id = int(self.table.item(selected_row, 0).text())
+        item = self.model.item_at(index.row())
+        if item is None:
+            return
+        history_id = item.id
 
         menu = QMenu(self)
         view_log_action = menu.addAction("Ver Log")
+        cancel_action = None
+        if (item.is_running or item.is_queued) and backup_service.is_backup_running(item.config_id):
+            cancel_action = menu.addAction("Cancelar Respaldo")
         delete_action = menu.addAction("Eliminar Registro")
 
         action = menu.exec_(self.table.viewport().mapToGlobal(pos))
 
         if action == view_log_action:
             self._view_log(history_id)
+        elif cancel_action is not None and action == cancel_action:
+            self._cancel_backup(item)
         elif action == delete_action:
             self._delete_history_item(history_id)
 
     def _view_log(self, history_id: int):
         """Muestra el log de un respaldo específico."""
-        item = self.history_repo.get_by_id(history_id)
-        if item and item.log_output:
-            QMessageBox.information(self, f"Log de Respaldo (ID: {history_id})", item.log_output)
+        log_output = self.log_repo.get_log(history_id)
+        if log_output:
+            QMessageBox.information(self, f"Log de Respaldo (ID: {history_id})", log_output)
             logger.info(f"Log de respaldo ID {history_id} visualizado.")
         else:
             QMessageBox.information(self, "Log no disponible", "No hay log disponible para este respaldo.")
             logger.warning(f"Intento de ver log para ID {history_id} sin log disponible.")
 
+    def _cancel_backup(self, item: BackupHistory):
+        """Cancela el respaldo en curso de un registro del historial."""
+        reply = QMessageBox.question(self, "Confirmar Cancelación",
+                                     f"¿Estás seguro de que quieres cancelar el respaldo en curso de '{item.config_name}'?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        success, message = backup_service.cancel_backup(item.config_id)
+        if success:
+            logger.info(f"Cancelación solicitada para el respaldo ID {item.id}.")
+        else:
+            QMessageBox.warning(self, "Cancelación", message)
+
     def _delete_history_item(self, history_id: int):
         """Elimina un registro del historial."""
         reply = QMessageBox.question(self, "Confirmar Eliminación",
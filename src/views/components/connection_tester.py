@@ -13,7 +13,9 @@ from PyQt5.QtGui import QIcon
 
 from ...models.backup_config import BackupConfig
 from ...services.encryption_service import encryption_service
-from ...utils.helpers import get_icon
+from ...services.mysql_pool_service import mysql_pool_service
+from ...services.schema_metadata_service import schema_metadata_service
+from ...utils.helpers import get_icon, format_bytes
 
 logger = logging.getLogger(__name__)
 
@@ -28,22 +30,20 @@ class ConnectionTestThread(QThread):
 
     def run(self):
         try:
-            # Usar la contraseña desencriptada que viene del modelo
-            cnx = mysql.connector.connect(
-                host=self.config.host,
-                port=self.config.port,
-                user=self.config.username,
-                password=self.config.password_encrypted,
-                database=self.config.database_name,
-                connection_timeout=5 # Timeout de 5 segundos
-            )
-            cnx.close()
-            self.test_result.emit(True, "Conexión exitosa.")
-            logger.info(f"Prueba de conexión exitosa para {self.config.name}.")
-        except mysql.connector.Error as err:
-            error_message = f"Error de conexión: {err}"
-            self.test_result.emit(False, error_message)
-            logger.error(f"Prueba de conexión fallida para {self.config.name}: {err}")
+            # Usar la contraseña desencriptada que viene del modelo; la conexión queda en el pool para la carga de tablas
+            success, message = mysql_pool_service.test_connection(self.config)
+            if success:
+                # Con la conexión comprobada, precargar los metadatos que usarán el selector de tablas y los respaldos
+                try:
+                    tables = schema_metadata_service.get_tables(self.config)
+                    message += f" {len(tables)} tablas, {format_bytes(sum(table.total_size for table in tables))}."
+                except mysql.connector.Error as err:
+                    logger.warning(f"No se pudieron leer los metadatos de {self.config.name}: {err}")
+            self.test_result.emit(success, message)
+            if success:
+                logger.info(f"Prueba de conexión exitosa para {self.config.name}.")
+            else:
+                logger.error(f"Prueba de conexión fallida para {self.config.name}: {message}")
         except Exception as e:
             error_message = f"Error inesperado: {e}"
             self.test_result.emit(False, error_message)
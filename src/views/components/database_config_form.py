@@ -3,7 +3,7 @@ import os
 from typing import Optional, List
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QFormLayout, QLineEdit, QPushButton,
-    QCheckBox, QSpinBox, QComboBox, QFileDialog, QLabel, QListWidget, QListWidgetItem
+    QCheckBox, QSpinBox, QComboBox, QFileDialog, QLabel, QListWidget, QListWidgetItem, QPlainTextEdit
 )
 from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QIcon
@@ -87,6 +87,17 @@ class DatabaseConfigForm(QWidget):
         backup_path_layout.addWidget(self.backup_path_browse_button)
         self.form_layout.addRow("Ruta Respaldo:", backup_path_layout)
 
+        # Almacenamiento frío (segregado)
+        segregated_path_layout = QHBoxLayout()
+        self.segregated_path_input = QLineEdit()
+        self.segregated_path_input.setPlaceholderText("Directorio o s3://bucket/prefijo (opcional)")
+        segregated_path_layout.addWidget(self.segregated_path_input)
+        self.segregated_path_browse_button = QPushButton(get_icon("folder"), "")
+        self.segregated_path_browse_button.setFixedSize(30, 30)
+        self.segregated_path_browse_button.clicked.connect(self._browse_segregated_path)
+        segregated_path_layout.addWidget(self.segregated_path_browse_button)
+        self.form_layout.addRow("Ruta Segregada:", segregated_path_layout)
+
         # Connection Tester
         self.connection_tester = ConnectionTester()
         self.form_layout.addRow("Probar Conexión:", self.connection_tester)
@@ -100,6 +111,19 @@ class DatabaseConfigForm(QWidget):
         self.load_tables_button.clicked.connect(self._load_tables_for_selector)
         self.form_layout.addRow("", self.load_tables_button) # Fila sin etiqueta para el botón
 
+        # Reglas por patrón, una por línea: se resuelven contra las tablas del servidor en cada respaldo
+        rules_tooltip = "Una regla por línea: glob (tenant_*_log) o expresión regular con el prefijo re: (re:t_\\d+)."
+        self.include_patterns_input = QPlainTextEdit()
+        self.include_patterns_input.setPlaceholderText("Vacío = todas las tablas")
+        self.include_patterns_input.setToolTip(rules_tooltip)
+        self.include_patterns_input.setMaximumHeight(60)
+        self.form_layout.addRow("Incluir (patrones):", self.include_patterns_input)
+        self.exclude_patterns_input = QPlainTextEdit()
+        self.exclude_patterns_input.setPlaceholderText("p. ej. tmp_*")
+        self.exclude_patterns_input.setToolTip(rules_tooltip)
+        self.exclude_patterns_input.setMaximumHeight(60)
+        self.form_layout.addRow("Excluir (patrones):", self.exclude_patterns_input)
+
         self.compression_method_combo = QComboBox()
         self.compression_method_combo.addItems(COMPRESSION_METHODS)
         self.form_layout.addRow("Compresión:", self.compression_method_combo)
@@ -114,6 +138,33 @@ class DatabaseConfigForm(QWidget):
         self.retention_days_segregated_input.setValue(30)
         self.form_layout.addRow("Retención Segregada (días):", self.retention_days_segregated_input)
 
+        # Retención GFS: respaldos a conservar por hora/día/semana/mes/año (0 = no aplica)
+        gfs_layout = QHBoxLayout()
+        self.gfs_inputs = {}
+        for period, label in [("hourly", "Horas"), ("daily", "Días"), ("weekly", "Semanas"),
+                              ("monthly", "Meses"), ("yearly", "Años")]:
+            spin_box = QSpinBox()
+            spin_box.setRange(0, 1000)
+            spin_box.setPrefix(f"{label}: ")
+            gfs_layout.addWidget(spin_box)
+            self.gfs_inputs[period] = spin_box
+        self.form_layout.addRow("Retención GFS:", gfs_layout)
+
+        # Limitación de ancho de banda y prioridad de mysqldump
+        self.max_bandwidth_input = QSpinBox()
+        self.max_bandwidth_input.setRange(0, 10_000_000)
+        self.max_bandwidth_input.setSingleStep(1024)
+        self.max_bandwidth_input.setSuffix(" KB/s")
+        self.max_bandwidth_input.setSpecialValueText("Sin límite")
+        self.form_layout.addRow("Ancho de Banda Máx.:", self.max_bandwidth_input)
+
+        self.low_priority_checkbox = QCheckBox("Ejecutar mysqldump con baja prioridad de CPU y E/S")
+        self.form_layout.addRow("Prioridad:", self.low_priority_checkbox)
+
+        self.encrypt_artifacts_checkbox = QCheckBox("Cifrar los archivos de respaldo (AES-256-GCM)")
+        self.encrypt_artifacts_checkbox.setToolTip("Solo se pueden descifrar con la clave de esta instalación (encryption.key).")
+        self.form_layout.addRow("Cifrado:", self.encrypt_artifacts_checkbox)
+
         self.is_active_checkbox = QCheckBox("Activa")
         self.is_active_checkbox.setChecked(True)
         self.form_layout.addRow("Estado:", self.is_active_checkbox)
@@ -166,6 +217,13 @@ class DatabaseConfigForm(QWidget):
             self.backup_path_input.setText(dir_path)
             logger.debug(f"Ruta de respaldo seleccionada: {dir_path}")
 
+    def _browse_segregated_path(self):
+        """Abre un diálogo para seleccionar el directorio de almacenamiento frío."""
+        dir_path = QFileDialog.getExistingDirectory(self, "Seleccionar Carpeta Segregada")
+        if dir_path:
+            self.segregated_path_input.setText(dir_path)
+            logger.debug(f"Ruta segregada seleccionada: {dir_path}")
+
     def _load_tables_for_selector(self):
         """Carga las tablas en el TableSelector usando la configuración actual del formulario."""
         temp_config = self._get_config_from_form(is_validation_check=True)
@@ -185,9 +243,17 @@ class DatabaseConfigForm(QWidget):
         self.database_name_input.setText(config.database_name)
         self.mysqldump_path_input.setText(config.mysqldump_path)
         self.backup_path_input.setText(config.backup_path)
+        self.segregated_path_input.setText(config.segregated_path)
         self.compression_method_combo.setCurrentText(config.compression_method)
         self.retention_days_main_input.setValue(config.retention_days_main)
         self.retention_days_segregated_input.setValue(config.retention_days_segregated)
+        for period, keep in config.gfs_policy.items():
+            self.gfs_inputs[period].setValue(keep)
+        self.max_bandwidth_input.setValue(config.max_bandwidth_kbps)
+        self.low_priority_checkbox.setChecked(config.low_priority)
+        self.encrypt_artifacts_checkbox.setChecked(config.encrypt_artifacts)
+        self.include_patterns_input.setPlainText("\n".join(config.include_patterns))
+        self.exclude_patterns_input.setPlainText("\n".join(config.exclude_patterns))
         self.is_active_checkbox.setChecked(config.is_active)
         
         self.delete_button.setEnabled(True)
@@ -208,15 +274,23 @@ class DatabaseConfigForm(QWidget):
         self.database_name_input.clear()
         self.mysqldump_path_input.setText(get_mysqldump_default_path())
         self.backup_path_input.clear()
+        self.segregated_path_input.clear()
         self.compression_method_combo.setCurrentText("zip")
         self.retention_days_main_input.setValue(7)
         self.retention_days_segregated_input.setValue(30)
+        for spin_box in self.gfs_inputs.values():
+            spin_box.setValue(0)
+        self.max_bandwidth_input.setValue(0)
+        self.low_priority_checkbox.setChecked(False)
+        self.encrypt_artifacts_checkbox.setChecked(False)
+        self.include_patterns_input.clear()
+        self.exclude_patterns_input.clear()
         self.is_active_checkbox.setChecked(True)
         
         self.delete_button.setEnabled(False)
         self.connection_tester.set_config(BackupConfig()) # Resetear tester
         self.table_selector.set_config(BackupConfig()) # Resetear selector
-        self.table_selector.available_tables_list.clear() # Limpiar lista de tablas
+        self.table_selector.clear() # Limpiar tablas cargadas y excluidas
         logger.info("Formulario de configuración limpiado.")
 
     def _get_config_from_form(self, is_validation_check: bool = False) -> BackupConfig:
@@ -231,10 +305,21 @@ class DatabaseConfigForm(QWidget):
             database_name=self.database_name_input.text(),
             mysqldump_path=self.mysqldump_path_input.text(),
             backup_path=self.backup_path_input.text(),
+            segregated_path=self.segregated_path_input.text().strip(),
             excluded_tables=self.table_selector.get_selected_tables(),
+            include_patterns=self._patterns_from_input(self.include_patterns_input),
+            exclude_patterns=self._patterns_from_input(self.exclude_patterns_input),
             compression_method=self.compression_method_combo.currentText(),
             retention_days_main=self.retention_days_main_input.value(),
             retention_days_segregated=self.retention_days_segregated_input.value(),
+            keep_hourly=self.gfs_inputs["hourly"].value(),
+            keep_daily=self.gfs_inputs["daily"].value(),
+            keep_weekly=self.gfs_inputs["weekly"].value(),
+            keep_monthly=self.gfs_inputs["monthly"].value(),
+            keep_yearly=self.gfs_inputs["yearly"].value(),
+            max_bandwidth_kbps=self.max_bandwidth_input.value(),
+            low_priority=self.low_priority_checkbox.isChecked(),
+            encrypt_artifacts=self.encrypt_artifacts_checkbox.isChecked(),
             is_active=self.is_active_checkbox.isChecked()
         )
         # Si es solo para validación, no actualizar created_at/updated_at
@@ -243,6 +328,10 @@ class DatabaseConfigForm(QWidget):
             config.updated_at = self.current_config.updated_at
         return config
 
+    @staticmethod
+    def _patterns_from_input(text_edit: QPlainTextEdit) -> List[str]:
+        return [line.strip() for line in text_edit.toPlainText().splitlines() if line.strip()]
+
     def _save_config(self):
         """Guarda la configuración actual (crea o actualiza)."""
         config = self._get_config_from_form()
@@ -268,6 +357,9 @@ class DatabaseConfigForm(QWidget):
         else:
             # Actualizar configuración existente
             if backup_config_repository.update(config):
+                # Si hay un respaldo en curso, aplicar el nuevo límite de ancho de banda sin esperar al siguiente
+                from ...services.backup_service import backup_service
+                backup_service.set_bandwidth_limit(config.id, config.max_bandwidth_kbps)
                 notification_service.show_info("Éxito", f"Configuración '{config.name}' actualizada exitosamente.")
                 self.config_saved.emit(config)
                 logger.info(f"Configuración '{config.name}' (ID: {config.id}) actualizada.")
@@ -1,42 +1,38 @@
 import logging
 import mysql.connector
-from typing import List, Optional
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QListWidget, QListWidgetItem, QLabel, QLineEdit
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
-from PyQt5.QtGui import QIcon
+from typing import Any, Dict, List, Optional, Set
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QLineEdit, QTableView,
+                             QHeaderView, QAbstractItemView)
+from PyQt5.QtCore import Qt, QThread, QTimer, QAbstractTableModel, QModelIndex, QItemSelection, pyqtSignal
 
 from ...models.backup_config import BackupConfig
+from ...models.table_metadata import TableMetadata
 from ...services.encryption_service import encryption_service
-from ...utils.helpers import get_icon
+from ...services.schema_metadata_service import schema_metadata_service
+from ...utils.constants import TABLE_SELECTOR_FILTER_DEBOUNCE_MS
+from ...utils.helpers import get_icon, format_bytes
+from ...utils.table_search import TableSearchIndex
 
 logger = logging.getLogger(__name__)
 
 class TableLoadThread(QThread):
-    """Hilo para cargar las tablas de una base de datos."""
-    tables_loaded = pyqtSignal(list)
+    """Hilo para cargar las tablas de una base de datos y construir su índice de búsqueda."""
+    tables_loaded = pyqtSignal(list, object) # (List[TableMetadata], TableSearchIndex)
     load_error = pyqtSignal(str)
 
-    def __init__(self, config: BackupConfig, parent=None):
+    def __init__(self, config: BackupConfig, force_refresh: bool = False, parent=None):
         super().__init__(parent)
         self.config = config
+        self.force_refresh = force_refresh
         logger.debug(f"Hilo de carga de tablas creado para {config.name}.")
 
     def run(self):
         try:
-            cnx = mysql.connector.connect(
-                host=self.config.host,
-                port=self.config.port,
-                user=self.config.username,
-                password=self.config.password_encrypted,
-                database=self.config.database_name,
-                connection_timeout=5
-            )
-            cursor = cnx.cursor()
-            cursor.execute("SHOW TABLES")
-            tables = [row[0] for row in cursor]
-            cursor.close()
-            cnx.close()
-            self.tables_loaded.emit(tables)
+            # De la caché de metadatos salvo que esté vencida o se pida actualizar desde el servidor
+            tables = sorted(schema_metadata_service.get_tables(self.config, force_refresh=self.force_refresh),
+                            key=lambda table: table.table_name)
+            index = TableSearchIndex(table.table_name for table in tables)
+            self.tables_loaded.emit(tables, index)
             logger.info(f"Tablas cargadas exitosamente para {self.config.name}.")
         except mysql.connector.Error as err:
             self.load_error.emit(f"Error al cargar tablas: {err}")
@@ -45,13 +41,123 @@ class TableLoadThread(QThread):
             self.load_error.emit(f"Error inesperado al cargar tablas: {e}")
             logger.error(f"Error inesperado al cargar tablas para {self.config.name}: {e}")
 
+class TableListModel(QAbstractTableModel):
+    """
+    Una de las dos listas del selector. Las tablas se guardan una sola vez en el selector y el modelo
+    solo tiene los ids que muestra. El orden de la columna elegida se calcula al cargar las tablas o al
+    pulsar la cabecera; filtrar o mover tablas rehace las filas recorriendo ese orden, en O(n).
+    """
+    HEADERS = ["Tabla", "Tamaño", "Filas (aprox.)"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._tables: List[TableMetadata] = []
+        self._order: List[int] = [] # Todos los ids en el orden de la columna elegida
+        self._rows: List[int] = [] # Ids visibles, en ese mismo orden
+        self._sort_column = 0
+        self._sort_order = Qt.AscendingOrder
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def set_tables(self, tables: List[TableMetadata]):
+        """Cambia el conjunto de tablas (las filas quedan vacías hasta el siguiente update_rows())."""
+        self.beginResetModel()
+        self._tables = tables
+        self._order = self._sorted_ids()
+        self._rows = []
+        self.endResetModel()
+
+    def update_rows(self, excluded: Set[int], show_excluded: bool, matches: Optional[Set[int]] = None):
+        """Muestra las tablas excluidas (o las no excluidas), opcionalmente solo las de `matches`."""
+        if show_excluded:
+            rows = [table_id for table_id in self._order if table_id in excluded]
+        else:
+            rows = [table_id for table_id in self._order if table_id not in excluded]
+        if matches is not None:
+            rows = [table_id for table_id in rows if table_id in matches]
+        self.beginResetModel()
+        self._rows = rows
+        self.endResetModel()
+
+    def _sorted_ids(self) -> List[int]:
+        tables = self._tables
+        if self._sort_column == 1:
+            key = lambda table_id: tables[table_id].total_size
+        elif self._sort_column == 2:
+            key = lambda table_id: tables[table_id].table_rows
+        else:
+            key = lambda table_id: tables[table_id].table_name.lower()
+        return sorted(range(len(tables)), key=key, reverse=self._sort_order == Qt.DescendingOrder)
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder):
+        self._sort_column = column
+        self._sort_order = order
+        visible = set(self._rows)
+        self.beginResetModel()
+        self._order = self._sorted_ids()
+        self._rows = [table_id for table_id in self._order if table_id in visible]
+        self.endResetModel()
+
+    def ids_in(self, selection: QItemSelection) -> List[int]:
+        """Ids de las filas seleccionadas, por rangos (sin crear un índice por fila)."""
+        ids = []
+        for selection_range in selection:
+            ids.extend(self._rows[selection_range.top():selection_range.bottom() + 1])
+        return ids
+
+    def visible_ids(self) -> List[int]:
+        return self._rows
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        table = self._tables[self._rows[index.row()]]
+        column = index.column()
+
+        if role == Qt.TextAlignmentRole and column > 0:
+            return Qt.AlignRight | Qt.AlignVCenter
+        if role == Qt.ToolTipRole and table.table_type is None:
+            return "La tabla no aparece en la última consulta al servidor."
+        if role != Qt.DisplayRole:
+            return None
+
+        if column == 0:
+            return table.table_name
+        # table_type None: excluida en la configuración pero sin metadatos (no cargada o ya no existe)
+        if table.table_type is None:
+            return "—"
+        if column == 1:
+            return "Vista" if table.is_view else format_bytes(table.total_size)
+        if column == 2:
+            return "" if table.is_view else f"{table.table_rows:,}"
+        return None
+
+    def headerData(self, section: int, orientation: int, role: int = Qt.DisplayRole) -> Any:
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
 class TableSelector(QWidget):
+    """
+    Selector de las tablas a excluir del respaldo, pensado para esquemas con decenas de miles de
+    tablas: dos vistas sobre modelos propios, búsqueda con índice de trigramas (aplicada tras una pausa
+    al escribir) y movimientos en bloque que no dependen del número de filas seleccionadas.
+    """
     def __init__(self, parent=None):
         super().__init__(parent)
         self.encryption_service = encryption_service
         self.current_config: Optional[BackupConfig] = None
-        self.available_tables = []
-        self.excluded_tables = []
+        self._schema_key: Optional[str] = None
+        self._tables: List[TableMetadata] = []
+        self._loaded_count = 0
+        self._ids_by_name: Dict[str, int] = {}
+        self._index = TableSearchIndex()
+        self._excluded: Set[int] = set()
+        self._matches: Optional[Set[int]] = None
         self._init_ui()
         logger.info("Selector de tablas inicializado.")
 
@@ -60,20 +166,29 @@ class TableSelector(QWidget):
         self.main_layout.setContentsMargins(0, 0, 0, 0)
         self.main_layout.setSpacing(5)
 
-        # Botón para cargar tablas
+        # Botones para cargar tablas (de la caché) o actualizarlas desde el servidor
+        load_layout = QHBoxLayout()
         self.load_tables_button = QPushButton(get_icon("refresh"), "Cargar Tablas")
-        self.load_tables_button.clicked.connect(self._start_load_tables)
-        self.main_layout.addWidget(self.load_tables_button)
+        self.load_tables_button.clicked.connect(lambda: self._start_load_tables())
+        load_layout.addWidget(self.load_tables_button)
+        self.refresh_tables_button = QPushButton("Actualizar desde el servidor")
+        self.refresh_tables_button.clicked.connect(lambda: self._start_load_tables(force_refresh=True))
+        load_layout.addWidget(self.refresh_tables_button)
+        self.main_layout.addLayout(load_layout)
 
         self.status_label = QLabel("Estado: Listo")
         self.status_label.setAlignment(Qt.AlignCenter)
         self.main_layout.addWidget(self.status_label)
 
-        # Búsqueda
+        # Búsqueda: se filtra cuando se deja de escribir, no en cada tecla
         search_layout = QHBoxLayout()
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Buscar tabla...")
-        self.search_input.textChanged.connect(self._filter_available_tables)
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(TABLE_SELECTOR_FILTER_DEBOUNCE_MS)
+        self.filter_timer.timeout.connect(self._filter_available_tables)
+        self.search_input.textChanged.connect(self.filter_timer.start)
         search_layout.addWidget(self.search_input)
         self.main_layout.addLayout(search_layout)
 
@@ -82,9 +197,9 @@ class TableSelector(QWidget):
         lists_layout.setSpacing(10)
 
         # Lista de tablas disponibles
-        self.available_tables_list = QListWidget()
-        self.available_tables_list.setSelectionMode(QListWidget.MultiSelection)
-        lists_layout.addWidget(self.available_tables_list)
+        self.available_model = TableListModel(self)
+        self.available_tables_view = self._create_view(self.available_model)
+        lists_layout.addWidget(self.available_tables_view)
 
         # Botones de transferencia
         button_column_layout = QVBoxLayout()
@@ -99,23 +214,26 @@ class TableSelector(QWidget):
         lists_layout.addLayout(button_column_layout)
 
         # Lista de tablas excluidas
-        self.excluded_tables_list = QListWidget()
-        self.excluded_tables_list.setSelectionMode(QListWidget.MultiSelection)
-        lists_layout.addWidget(self.excluded_tables_list)
+        self.excluded_model = TableListModel(self)
+        self.excluded_tables_view = self._create_view(self.excluded_model)
+        lists_layout.addWidget(self.excluded_tables_view)
 
         self.main_layout.addLayout(lists_layout)
 
+        self.summary_label = QLabel()
+        self.main_layout.addWidget(self.summary_label)
+
         self.setStyleSheet("""
             TableSelector QLabel {
                 font-weight: bold;
                 color: #555555;
             }
-            TableSelector QListWidget {
+            TableSelector QTableView {
                 border: 1px solid #cccccc;
                 border-radius: 4px;
                 min-height: 100px;
             }
-            TableSelector QListWidget::item:selected {
+            TableSelector QTableView::item:selected {
                 background-color: #e0e0e0;
                 color: #333333;
             }
@@ -134,17 +252,43 @@ class TableSelector(QWidget):
                 padding: 5px;
             }
         """)
+        self._refresh_views()
+
+    @staticmethod
+    def _create_view(model: TableListModel) -> QTableView:
+        view = QTableView()
+        view.setModel(model)
+        view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        view.setWordWrap(False)
+        # Alturas y anchos fijos: redimensionar por contenido obligaría a medir todas las filas
+        view.verticalHeader().setVisible(False)
+        view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        view.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        view.setSortingEnabled(True)
+        view.sortByColumn(0, Qt.AscendingOrder)
+        return view
 
     def set_config(self, config: BackupConfig):
-        """Establece la configuración de la base de datos para cargar tablas."""
+        """
+        Establece la configuración de la base de datos para cargar tablas. Si cambia la base de datos
+        se vacían ambas listas: las tablas excluidas de otra base de datos no significan nada en esta.
+        """
         self.current_config = config
         self.status_label.setText("Estado: Listo")
         self.status_label.setStyleSheet("")
-        self.available_tables_list.clear()
-        self.excluded_tables_list.clear()
+        schema_key = schema_metadata_service.schema_key(config)
+        if schema_key != self._schema_key:
+            self._schema_key = schema_key
+            self._set_tables([], TableSearchIndex(), [])
         logger.debug(f"Configuración de tablas establecida para {config.name}.")
 
-    def _start_load_tables(self):
+    def clear(self):
+        """Vacía ambas listas (tablas cargadas y excluidas)."""
+        self._set_tables([], TableSearchIndex(), [])
+
+    def _start_load_tables(self, force_refresh: bool = False):
         """Inicia la carga de tablas en un hilo separado."""
         if not self.current_config:
             self.status_label.setText("Estado: No hay configuración para cargar tablas.")
@@ -155,85 +299,121 @@ class TableSelector(QWidget):
         self.status_label.setText("Estado: Cargando tablas...")
         self.status_label.setStyleSheet("color: blue;")
         self.load_tables_button.setEnabled(False)
-        self.available_tables_list.clear()
-        self.excluded_tables_list.clear()
+        self.refresh_tables_button.setEnabled(False)
 
-        self.load_thread = TableLoadThread(self.current_config)
+        self.load_thread = TableLoadThread(self.current_config, force_refresh)
         self.load_thread.tables_loaded.connect(self._on_tables_loaded)
         self.load_thread.load_error.connect(self._on_load_error)
         self.load_thread.start()
         logger.info(f"Iniciando carga de tablas para {self.current_config.name}.")
 
-    def _on_tables_loaded(self, tables: List[str]):
+    def _on_tables_loaded(self, tables: List[TableMetadata], index: TableSearchIndex):
         """Maneja las tablas cargadas."""
         self.load_tables_button.setEnabled(True)
-        self.status_label.setText("Estado: Tablas cargadas.")
+        self.refresh_tables_button.setEnabled(True)
+        loader = self.sender()
+        if isinstance(loader, TableLoadThread) and schema_metadata_service.schema_key(loader.config) != self._schema_key:
+            logger.debug(f"Tablas de {loader.config.name} descartadas: la base de datos cambió durante la carga.")
+            return
+        refreshed_at = schema_metadata_service.get_refreshed_at(self.current_config)
+        updated = f" (consultadas {refreshed_at:%d/%m %H:%M})" if refreshed_at else ""
+        self.status_label.setText(f"Estado: {len(tables)} tablas cargadas{updated}.")
         self.status_label.setStyleSheet("color: green;")
-        self.available_tables = sorted(tables)
-        self._populate_lists()
+        self._set_tables(tables, index, self.get_selected_tables())
         logger.info(f"Tablas cargadas: {len(tables)}.")
 
     def _on_load_error(self, error_message: str):
         """Maneja errores al cargar tablas."""
         self.load_tables_button.setEnabled(True)
+        self.refresh_tables_button.setEnabled(True)
         self.status_label.setText(f"Estado: {error_message}")
         self.status_label.setStyleSheet("color: red;")
         logger.error(f"Error al cargar tablas: {error_message}")
 
+    def _set_tables(self, tables: List[TableMetadata], index: TableSearchIndex, excluded_tables: List[str]):
+        """Reemplaza las tablas de ambas listas; las excluidas que no están en `tables` se añaden sin metadatos."""
+        self._tables = list(tables)
+        self._loaded_count = len(self._tables) # Las tablas sin metadatos van siempre después de estas
+        self._index = index
+        self._ids_by_name = {table.table_name: table_id for table_id, table in enumerate(self._tables)}
+        self._excluded = set()
+        self._add_excluded_names(excluded_tables)
+        self.available_model.set_tables(self._tables)
+        self.excluded_model.set_tables(self._tables)
+        self._matches = self._index.search(self.search_input.text())
+        self._refresh_views()
+
+    def _add_excluded_names(self, names: List[str]) -> bool:
+        """Marca tablas como excluidas por nombre. Retorna True si hubo que añadir tablas sin metadatos."""
+        added = False
+        for name in names:
+            table_id = self._ids_by_name.get(name)
+            if table_id is None:
+                table_id = self._index.add(name)
+                self._tables.append(TableMetadata(table_name=name, table_type=None))
+                self._ids_by_name[name] = table_id
+                added = True
+            self._excluded.add(table_id)
+        return added
+
     def get_selected_tables(self) -> List[str]:
-        """Retorna las tablas seleccionadas en la lista."""
-        return [item.text() for item in self.available_tables_list.selectedItems()]
+        """Retorna las tablas de la lista de excluidas."""
+        return sorted(self._tables[table_id].table_name for table_id in self._excluded)
 
     def set_selected_tables(self, excluded_tables: List[str]):
-        """Selecciona las tablas en la lista que están en la lista de excluidas."""
-        for i in range(self.available_tables_list.count()):
-            item = self.available_tables_list.item(i)
-            if item.text() in excluded_tables:
-                item.setSelected(True)
-            else:
-                item.setSelected(False)
-        logger.debug(f"Tablas excluidas pre-seleccionadas: {excluded_tables}")
-
-    def _populate_lists(self):
-        """Rellena las listas de disponibles y excluidas."""
-        self.available_tables_list.clear()
-        self.excluded_tables_list.clear()
-
-        current_excluded = set(self.excluded_tables)
-        
-        for table in self.available_tables:
-            if table in current_excluded:
-                self.excluded_tables_list.addItem(table)
-            else:
-                self.available_tables_list.addItem(table)
-        
-        self._filter_available_tables(self.search_input.text()) # Aplicar filtro si hay texto
-        logger.debug("Listas de tablas disponibles y excluidas repobladas.")
-
-    def _filter_available_tables(self, text: str):
+        """
+        Pasa a la lista de excluidas las tablas indicadas (y devuelve las demás a disponibles). Las tablas
+        sin metadatos de la selección anterior se quitan: no existen en la base de datos cargada.
+        """
+        self._excluded = set()
+        stale = self._tables[self._loaded_count:]
+        for table in stale:
+            del self._ids_by_name[table.table_name]
+        del self._tables[self._loaded_count:]
+        self._index.truncate(self._loaded_count)
+        if self._add_excluded_names(excluded_tables) or stale:
+            self.available_model.set_tables(self._tables)
+            self.excluded_model.set_tables(self._tables)
+            self._matches = self._index.search(self.search_input.text())
+        self._refresh_views()
+        logger.debug(f"Tablas excluidas establecidas: {len(self._excluded)}.")
+
+    def _refresh_views(self):
+        """Rehace las filas de ambas listas y el resumen de tamaños."""
+        self.available_model.update_rows(self._excluded, show_excluded=False, matches=self._matches)
+        self.excluded_model.update_rows(self._excluded, show_excluded=True)
+        self._update_summary()
+
+    def _refresh_available(self):
+        self.available_model.update_rows(self._excluded, show_excluded=False, matches=self._matches)
+        self._update_summary()
+
+    def _update_summary(self):
+        excluded_size = sum(self._tables[table_id].total_size for table_id in self._excluded)
+        total_size = sum(table.total_size for table in self._tables)
+        available_count = len(self._tables) - len(self._excluded)
+        shown = len(self.available_model.visible_ids())
+        filtered = f" ({shown} coinciden)" if self._matches is not None else ""
+        self.summary_label.setText(
+            f"Disponibles: {available_count}{filtered}, {format_bytes(total_size - excluded_size)} · "
+            f"Excluidas: {len(self._excluded)}, {format_bytes(excluded_size)}"
+        )
+
+    def _filter_available_tables(self):
         """Filtra la lista de tablas disponibles según el texto de búsqueda."""
-        for i in range(self.available_tables_list.count()):
-            item = self.available_tables_list.item(i)
-            if text.lower() in item.text().lower():
-                item.setHidden(False)
-            else:
-                item.setHidden(True)
+        self._matches = self._index.search(self.search_input.text())
+        self._refresh_available()
 
     def _add_selected_tables(self):
         """Mueve las tablas seleccionadas de 'disponibles' a 'excluidas'."""
-        selected_items = self.available_tables_list.selectedItems()
-        for item in selected_items:
-            self.available_tables_list.takeItem(self.available_tables_list.row(item))
-            self.excluded_tables_list.addItem(item.text())
-        self.excluded_tables_list.sortItems(Qt.AscendingOrder)
-        logger.debug(f"{len(selected_items)} tablas añadidas a la lista de excluidas.")
+        selected_ids = self.available_model.ids_in(self.available_tables_view.selectionModel().selection())
+        self._excluded.update(selected_ids)
+        self._refresh_views()
+        logger.debug(f"{len(selected_ids)} tablas añadidas a la lista de excluidas.")
 
     def _remove_selected_tables(self):
         """Mueve las tablas seleccionadas de 'excluidas' a 'disponibles'."""
-        selected_items = self.excluded_tables_list.selectedItems()
-        for item in selected_items:
-            self.excluded_tables_list.takeItem(self.excluded_tables_list.row(item))
-            self.available_tables_list.addItem(item.text())
-        self.available_tables_list.sortItems(Qt.AscendingOrder)
-        self._filter_available_tables(self.search_input.text()) # Re-aplicar filtro
-        logger.debug(f"{len(selected_items)} tablas removidas de la lista de excluidas.")
+        selected_ids = self.excluded_model.ids_in(self.excluded_tables_view.selectionModel().selection())
+        self._excluded.difference_update(selected_ids)
+        self._refresh_views()
+        logger.debug(f"{len(selected_ids)} tablas removidas de la lista de excluidas.")
@@ -23,12 +23,6 @@ from ..utils.constants import APP_NAME, APP_VERSION
 from ..utils.helpers import (copy_assets_to_app_data, format_bytes,
                              format_duration, get_app_data_path, get_icon,
                              setup_logging)
-from .backup_history import BackupHistoryView
-from .backup_scheduler import BackupSchedulerView
-from .dashboard import DashboardView
-from .database_config import DatabaseConfigView
-from .logs_viewer import LogsViewerView
-from .settings_dialog import SettingsView
 
 ASSETS_PATH = os.path.join(os.path.dirname(
     os.path.dirname(os.path.dirname(__file__))), 'assets', 'icons')
@@ -185,18 +179,25 @@ class MainWindow(ttk.Frame):
             widget.destroy()
 
     def _show_view(self, view_key):
+        # Cada vista (y los servicios que usa) se importa al mostrarla por primera vez, no al arrancar
         self._clear_main_content()
         if view_key == "dashboard":
+            from .dashboard import DashboardView
             self.current_view = DashboardView(self.main_content)
         elif view_key == "databases":
+            from .database_config import DatabaseConfigView
             self.current_view = DatabaseConfigView(self.main_content)
         elif view_key == "history":
+            from .backup_history import BackupHistoryView
             self.current_view = BackupHistoryView(self.main_content)
         elif view_key == "scheduler":
+            from .backup_scheduler import BackupSchedulerView
             self.current_view = BackupSchedulerView(self.main_content)
         elif view_key == "settings":
+            from .settings_dialog import SettingsView
             self.current_view = SettingsView(self.main_content)
         elif view_key == "logs":
+            from .logs_viewer import LogsViewerView
             self.current_view = LogsViewerView(self.main_content)
         else:
             self.current_view = ttk.Label(
@@ -0,0 +1,17 @@
+"""
+Configuración común de las pruebas
+
+Los datos de la aplicación (app.db, anillo de claves, logs) se crean en un directorio temporal y Qt se
+usa sin pantalla. Debe hacerse antes de importar src: los servicios leen HOME al construirse.
+"""
+import os
+import sys
+import tempfile
+
+_app_home = tempfile.mkdtemp(prefix="mbm_tests_")
+os.environ["HOME"] = _app_home
+os.environ["LOCALAPPDATA"] = _app_home
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# Añadir el directorio raíz del proyecto al PYTHONPATH para importar src/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,109 @@
+"""
+Pruebas del cifrado por bloques de los respaldos (.enc)
+
+Se usan bloques pequeños para que un volcado de pocos KB ocupe muchos bloques y se cifre en el pool
+de hilos. La clave maestra es la del anillo de claves de la aplicación (en el directorio temporal).
+"""
+import os
+
+import pytest
+
+from src.services.encryption_service import encryption_service
+from src.utils.artifact_crypto import (ArtifactDecryptionError, EncryptingWriter, ENC_HEADER, ENC_TAG_SIZE,
+                                       open_artifact)
+
+CHUNK_SIZE = 64
+DUMP = b"".join(b"INSERT INTO `t` VALUES (%d);\n" % row for row in range(300))
+
+def write_encrypted(path, data: bytes = DUMP, workers: int = 3) -> str:
+    with open(path, "wb") as f_raw:
+        writer = EncryptingWriter(f_raw, chunk_size=CHUNK_SIZE, workers=workers)
+        writer.write(data)
+        writer.close()
+    return str(path)
+
+def read_encrypted(path: str) -> bytes:
+    with open_artifact(path) as f:
+        return f.read()
+
+def chunk_offsets(path: str):
+    """Posición de cada bloque cifrado (tras la cabecera y la clave envuelta)."""
+    with open(path, "rb") as f:
+        key_length = ENC_HEADER.unpack(f.read(ENC_HEADER.size))[-1]
+    data_offset = ENC_HEADER.size + key_length
+    stride = CHUNK_SIZE + ENC_TAG_SIZE
+    return [offset for offset in range(data_offset, os.path.getsize(path), stride)], stride
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_round_trip_over_many_chunks(tmp_path, workers):
+    path = write_encrypted(tmp_path / "dump.sql.enc", workers=workers)
+
+    assert len(chunk_offsets(path)[0]) == -(-len(DUMP) // CHUNK_SIZE)
+    assert read_encrypted(path) == DUMP
+
+def test_seek_decrypts_only_the_needed_chunk(tmp_path):
+    path = write_encrypted(tmp_path / "dump.sql.enc")
+
+    with open_artifact(path) as f:
+        f.seek(CHUNK_SIZE * 10 + 5)
+        assert f.read(100) == DUMP[CHUNK_SIZE * 10 + 5:CHUNK_SIZE * 10 + 105]
+
+def test_dropped_last_chunk_is_rejected(tmp_path):
+    path = write_encrypted(tmp_path / "dump.sql.enc")
+    offsets, _ = chunk_offsets(path)
+    with open(path, "r+b") as f:
+        f.truncate(offsets[-1])
+
+    # El penúltimo bloque no se cifró como último: el archivo no parece completo aunque mida un número exacto de bloques
+    with pytest.raises(ArtifactDecryptionError):
+        read_encrypted(path)
+
+def test_tampered_chunk_is_rejected(tmp_path):
+    path = write_encrypted(tmp_path / "dump.sql.enc")
+    offsets, _ = chunk_offsets(path)
+    with open(path, "r+b") as f:
+        f.seek(offsets[3] + 10)
+        byte = f.read(1)
+        f.seek(offsets[3] + 10)
+        f.write(bytes([byte[0] ^ 1]))
+
+    with pytest.raises(ArtifactDecryptionError, match="Bloque 3"):
+        read_encrypted(path)
+
+def test_reordered_chunks_are_rejected(tmp_path):
+    path = write_encrypted(tmp_path / "dump.sql.enc")
+    offsets, stride = chunk_offsets(path)
+    with open(path, "r+b") as f:
+        f.seek(offsets[1])
+        first = f.read(stride)
+        second = f.read(stride)
+        f.seek(offsets[1])
+        f.write(second + first)
+
+    with pytest.raises(ArtifactDecryptionError, match="Bloque 1"):
+        read_encrypted(path)
+
+def test_key_rotated_out_of_primary_still_decrypts(tmp_path):
+    path = write_encrypted(tmp_path / "dump.sql.enc")
+    version = encryption_service.primary_version
+
+    assert encryption_service.add_key() > version
+
+    assert encryption_service.primary_version != version
+    assert version in encryption_service.key_versions()
+    assert read_encrypted(path) == DUMP
+
+def test_abort_discards_pending_chunks(tmp_path):
+    path = tmp_path / "dump.sql.enc"
+    with open(path, "wb") as f_raw:
+        writer = EncryptingWriter(f_raw, chunk_size=CHUNK_SIZE, workers=3)
+        header_size = f_raw.tell()
+        writer.write(DUMP)
+        writer.abort()
+        written = f_raw.tell()
+        writer.write(b"tras abortar")
+        writer.close()
+
+        assert f_raw.tell() == written
+    # Solo se escribieron los bloques que ya se habían retirado del pool antes de abortar
+    assert (written - header_size) % (CHUNK_SIZE + ENC_TAG_SIZE) == 0
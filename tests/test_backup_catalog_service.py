@@ -0,0 +1,76 @@
+"""
+Pruebas de la reconciliación del catálogo de respaldos con el disco
+"""
+import os
+from datetime import datetime
+
+import pytest
+
+from src.models.backup_config import BackupConfig
+from src.repositories.backup_config_repository import backup_config_repository
+from src.repositories.backup_file_repository import backup_file_repository
+from src.services.backup_catalog_service import BackupCatalogService, backup_catalog_service
+
+@pytest.fixture
+def config(tmp_path):
+    return backup_config_repository.add(BackupConfig(name=f"catalog_{tmp_path.name}", database_name="shop",
+                                                     backup_path=str(tmp_path)))
+
+def touch(directory, name: str, data: bytes = b"SELECT 1;\n") -> str:
+    path = os.path.join(str(directory), name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+def catalog_paths(config: BackupConfig):
+    return sorted(backup_file.file_path for backup_file in backup_file_repository.get_by_config_id(config.id))
+
+def test_file_on_disk_without_catalog_entry_is_added(config, tmp_path):
+    path = touch(tmp_path, "shop_20260102_030405.sql.gzip")
+    with open(path + ".sha256", "w") as f:
+        f.write("a" * 64 + "  shop_20260102_030405.sql.gzip\n")
+    touch(tmp_path, "shop_20260103_000000.sql.gzip.part") # Respaldo a medio escribir
+    touch(tmp_path, "notas.txt")
+
+    assert backup_catalog_service.reconcile(config) == (1, 0)
+
+    [backup_file] = backup_file_repository.get_by_config_id(config.id)
+    assert backup_file.file_path == path
+    assert backup_file.created_at == datetime(2026, 1, 2, 3, 4, 5)
+    assert backup_file.checksum == "a" * 64
+    assert backup_catalog_service.reconcile(config) == (0, 0) # Ya catalogado
+
+def test_catalog_entry_without_file_is_removed(config, tmp_path):
+    kept = touch(tmp_path, "shop_20260101_000000.sql")
+    deleted = touch(tmp_path, "shop_20260102_000000.sql")
+    assert backup_catalog_service.reconcile(config) == (2, 0)
+    os.remove(deleted)
+
+    assert backup_catalog_service.reconcile(config) == (0, 1)
+
+    assert catalog_paths(config) == [kept]
+
+def test_other_databases_sharing_the_directory_are_ignored(config, tmp_path):
+    own = touch(tmp_path, "shop_20260101_000000.sql")
+    touch(tmp_path, "shop_archive_20260101_000000.sql")
+    touch(tmp_path, "shopping_20260101_000000.sql")
+
+    assert backup_catalog_service.reconcile(config) == (1, 0)
+    assert catalog_paths(config) == [own]
+
+# Cada nombre con el de otra base de datos con la que coincidiría si se usara como expresión regular
+@pytest.mark.parametrize("database_name, lookalike", [("shop.v2", "shopXv2"), ("a+b", "aaab"), ("db(1)", "db1"),
+                                                      ("[x]*", "xxx")])
+def test_timestamp_parsing_escapes_the_database_name(database_name, lookalike):
+    parse = BackupCatalogService.parse_backup_timestamp
+
+    assert parse(database_name, f"{database_name}_20260101_123000.sql.gzip") == datetime(2026, 1, 1, 12, 30)
+    assert parse(database_name, f"{lookalike}_20260101_123000.sql.gzip") is None
+
+def test_timestamp_parsing_rejects_malformed_names():
+    parse = BackupCatalogService.parse_backup_timestamp
+
+    assert parse("ventas", "ventas_2024_20260101_123000.sql") is None
+    assert parse("ventas_2024", "ventas_2024_20260101_123000.sql") == datetime(2026, 1, 1, 12, 30)
+    assert parse("ventas", "ventas_20261399_123000.sql") is None # Fecha imposible
+    assert parse("ventas", "ventas_20260101_123000") is None # Sin extensión
@@ -0,0 +1,175 @@
+"""
+Pruebas de la purga del historial con archivado
+"""
+import gzip
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.cli import run
+from src.models.backup_history import BackupHistory
+from src.models.database import database
+from src.repositories import backup_history_repository as history_module
+from src.repositories.backup_history_repository import backup_history_repository
+from src.utils.constants import BACKUP_STATUS_SUCCESS
+
+def add_old_runs(count: int, days_old: int = 400):
+    old = datetime.now() - timedelta(days=days_old)
+    return [backup_history_repository.add(BackupHistory(config_id=1, config_name="antigua", start_time=old + timedelta(minutes=i),
+                                                        end_time=old, status=BACKUP_STATUS_SUCCESS, message=f"run {i}")).id
+            for i in range(count)]
+
+def test_purge_does_not_archive_twice_after_a_failed_delete(tmp_path, monkeypatch):
+    ids = add_old_runs(5)
+    archive_path = str(tmp_path / "history.jsonl.gz")
+    transaction = database.transaction
+    attempts = []
+
+    @contextmanager
+    def locked_once():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        with transaction() as cursor:
+            yield cursor
+
+    monkeypatch.setattr(database, "transaction", locked_once)
+    cutoff = datetime.now() - timedelta(days=300)
+
+    # El primer lote se archiva pero no se borra; la siguiente purga no debe archivarlo de nuevo
+    assert backup_history_repository.purge_before(cutoff, batch_size=2, archive_path=archive_path)["deleted"] == 0
+    assert backup_history_repository.purge_before(cutoff, batch_size=2, archive_path=archive_path)["deleted"] == 5
+
+    with gzip.open(archive_path, "rt", encoding="utf-8") as f:
+        archived = [json.loads(line)["id"] for line in f]
+    assert archived == ids
+def test_purge_does_not_reread_the_archive(tmp_path, monkeypatch):
+    archive_path = str(tmp_path / "history.jsonl.gz")
+    cutoff = datetime.now() - timedelta(days=300)
+    first = add_old_runs(3, days_old=500)
+    assert backup_history_repository.purge_before(cutoff, archive_path=archive_path)["deleted"] == 3
+    opened = []
+    gzip_open = history_module.gzip.open
+    monkeypatch.setattr(history_module.gzip, "open", lambda path, mode, **kwargs: (opened.append(mode), gzip_open(path, mode, **kwargs))[1])
+    second = add_old_runs(2)
+
+    assert backup_history_repository.purge_before(cutoff, archive_path=archive_path)["deleted"] == 2
+
+    # Con la marca de agua, las purgas siguientes solo añaden al archivo
+    assert opened == ["at"]
+    with gzip.open(archive_path, "rt", encoding="utf-8") as f:
+        assert [json.loads(line)["id"] for line in f] == first + second
+
+def test_watermark_is_rebuilt_from_an_existing_archive(tmp_path):
+    archive_path = str(tmp_path / "history.jsonl.gz")
+    ids = add_old_runs(4)
+    cutoff = datetime.now() - timedelta(days=300)
+    with gzip.open(archive_path, "at", encoding="utf-8") as f: # Archivo de una versión sin marca de agua
+        for row in backup_history_repository.db.execute_query("SELECT * FROM backup_history WHERE id IN (?, ?)", ids[:2]):
+            f.write(json.dumps(BackupHistory.from_dict(dict(row)).to_dict()) + "\n")
+
+    assert backup_history_repository.purge_before(cutoff, archive_path=archive_path)["deleted"] == 4
+
+    with gzip.open(archive_path, "rt", encoding="utf-8") as f:
+        assert [json.loads(line)["id"] for line in f] == ids
+    with open(archive_path + ".watermark", encoding="utf-8") as f:
+        assert json.load(f)["id"] == ids[-1]
+
+@pytest.mark.parametrize("text", ['"Lost connection"', "backup-all", "tablas*", 'Lost connection" OR "x'])
+def test_search_treats_user_input_as_a_phrase(text):
+    history = backup_history_repository.add(BackupHistory(config_id=1, config_name="buscar", start_time=datetime.now(),
+                                                          end_time=datetime.now(), status=BACKUP_STATUS_SUCCESS,
+                                                          message='Error "Lost connection" OR "x" en backup-all tablas*'))
+    backup_history_repository.index_run(history)
+    try:
+        assert history.id in [result["id"] for result in backup_history_repository.search(text)]
+    finally:
+        backup_history_repository.delete(history.id)
+
+def test_search_without_terms_finds_nothing():
+    # Solo puntuación: la frase queda vacía y no coincide con nada (ni produce un error de sintaxis FTS5)
+    assert backup_history_repository.search('-*"') == []
+    assert backup_history_repository.search("   ") == []
+
+def test_cli_search_prints_matches(capsys):
+    history = backup_history_repository.add(BackupHistory(config_id=1, config_name="cli_buscar", start_time=datetime.now(),
+                                                          end_time=datetime.now(), status=BACKUP_STATUS_SUCCESS,
+                                                          message="mysqldump: Got error 2013 al volcar la tabla pedidos"))
+    backup_history_repository.index_run(history)
+
+    assert run(["search", "error 2013"]) == 0
+
+    output = capsys.readouterr().out
+    assert f"[{history.id}]" in output
+    assert "Got [error 2013] al volcar" in output
+    backup_history_repository.delete(history.id)
+
+FUTURE = datetime(2100, 1, 1, 12, 0, 0) # Por delante de cualquier otro registro: las primeras páginas son solo de la prueba
+
+@pytest.fixture
+def paged_runs():
+    """Crea ejecuciones con start_time dado (minutos tras FUTURE) y las elimina al terminar."""
+    created = []
+
+    def add(*minutes):
+        for minute in minutes:
+            created.append(backup_history_repository.add(BackupHistory(
+                config_id=1, config_name="paginas", start_time=FUTURE + timedelta(minutes=minute),
+                end_time=FUTURE, status=BACKUP_STATUS_SUCCESS)).id)
+        return created[-len(minutes):]
+
+    yield add
+    for history_id in created:
+        backup_history_repository.delete(history_id)
+
+def collect_pages(page_size: int, stop_at: int, on_page=None):
+    """IDs del historial recorriendo páginas hasta reunir `stop_at` filas."""
+    ids, after = [], None
+    while len(ids) < stop_at:
+        page = backup_history_repository.get_page(page_size, after=after)
+        if not page:
+            break
+        ids += [history.id for history in page]
+        after = backup_history_repository.page_key(page[-1])
+        if on_page is not None:
+            on_page()
+    return ids
+
+def test_pages_split_ties_on_start_time(paged_runs):
+    later = paged_runs(5)
+    tied = paged_runs(0, 0, 0, 0, 0, 0, 0) # Misma start_time: el id desempata
+
+    ids = collect_pages(page_size=3, stop_at=8)
+
+    assert ids == later + sorted(tied, reverse=True)
+
+def test_rows_inserted_while_paging_are_not_duplicated_or_skipped(paged_runs):
+    existing = paged_runs(0, 0, 0, 0, -1, -2)
+    inserted = []
+
+    def insert_during_paging():
+        if not inserted:
+            # Una ejecución nueva (delante del cursor) y una con la misma start_time y mayor id
+            inserted.extend(paged_runs(10, 0))
+
+    ids = collect_pages(page_size=2, stop_at=6, on_page=insert_during_paging)
+
+    expected = sorted(existing[:4], reverse=True) + existing[4:]
+    assert ids == expected
+    assert not set(inserted) & set(ids) # Quedan antes del cursor: aparecen al recargar desde el principio
+
+def test_model_moves_back_across_evicted_pages(paged_runs):
+    from src.views.components.backup_history_table import BackupHistoryTableModel
+    ids = sorted(paged_runs(0, 0, 0, 0, 0, 0, 0), reverse=True)
+    model = BackupHistoryTableModel(backup_history_repository, page_size=3, max_cached_pages=1)
+    model.reload()
+    model.fetchMore()
+    model.fetchMore()
+
+    # Solo queda en memoria la última página; volver atrás recarga las anteriores por su clave
+    assert list(model._pages) == [2]
+    assert [model.history_id_at(row) for row in (3, 2, 0, 5, 6)] == [ids[3], ids[2], ids[0], ids[5], ids[6]]
+    assert [model.history_id_at(row) for row in range(7)] == ids
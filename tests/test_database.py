@@ -0,0 +1,60 @@
+"""
+Pruebas de la copia de seguridad y la restauración de la base de datos de la aplicación (app.db)
+"""
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from src.models.backup_history import BackupHistory
+from src.models.database import database
+from src.repositories.backup_history_repository import backup_history_repository
+from src.utils.constants import BACKUP_STATUS_SUCCESS
+
+def add_finished_run(config_name: str, message: str) -> BackupHistory:
+    history = backup_history_repository.add(BackupHistory(config_id=1, config_name=config_name, start_time=datetime.now(),
+                                                          end_time=datetime.now(), status=BACKUP_STATUS_SUCCESS,
+                                                          message=message))
+    backup_history_repository.index_run(history)
+    return history
+
+def test_backup_while_other_threads_write(tmp_path):
+    errors = []
+
+    def writer():
+        for number in range(20):
+            try:
+                add_finished_run("concurrente", f"escritura {number} durante la copia")
+            except Exception as e: # pragma: no cover - solo si la conexión compartida se corrompe
+                errors.append(e)
+            time.sleep(0.002)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        database.backup_database(str(tmp_path / "copy.db"), pages_per_step=1, step_sleep=0.001)
+    finally:
+        thread.join()
+
+    assert errors == []
+    copy = sqlite3.connect(str(tmp_path / "copy.db"))
+    try:
+        assert copy.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    finally:
+        copy.close()
+
+def test_restore_reevaluates_the_search_index(tmp_path):
+    history = add_finished_run("restaurada", "ejecución anterior a la copia")
+    backup_path = str(tmp_path / "old.db")
+    database.backup_database(backup_path)
+    # Copia de una versión sin índice de búsqueda
+    old = sqlite3.connect(backup_path)
+    old.execute("DROP TABLE backup_history_fts")
+    old.commit()
+    old.close()
+    backup_history_repository.search_enabled = False
+
+    assert database.restore_database(backup_path)
+
+    assert backup_history_repository.search_enabled
+    assert history.id in [result["id"] for result in backup_history_repository.search("anterior a la copia")]
@@ -0,0 +1,82 @@
+"""
+Pruebas del control de espacio en disco con un disco simulado
+
+El espacio libre del disco simulado baja a medida que los respaldos admitidos escriben, como en el
+disco real, para comprobar que lo ya escrito no se descuenta dos veces (del disco y de la reserva).
+"""
+import os
+import shutil
+
+import pytest
+
+from src.models.backup_config import BackupConfig
+from src.services import disk_admission_service as disk_admission_module
+from src.services.disk_admission_service import DiskAdmissionService
+from src.utils.constants import DISK_MIN_FREE_BYTES
+
+class FakeDisk:
+    def __init__(self, free: int):
+        self.free = free
+
+    def disk_usage(self, path):
+        return shutil._ntuple_diskusage(self.free * 2, self.free, self.free)
+
+@pytest.fixture
+def disk(monkeypatch):
+    fake = FakeDisk(DISK_MIN_FREE_BYTES + 1500)
+    monkeypatch.setattr(disk_admission_module.shutil, "disk_usage", fake.disk_usage)
+    return fake
+
+def make_service(monkeypatch, estimates):
+    service = DiskAdmissionService()
+    monkeypatch.setattr(service, "estimate_bytes", lambda config: estimates[config.id])
+    return service
+
+def make_config(config_id: int, tmp_path) -> BackupConfig:
+    return BackupConfig(id=config_id, name=f"db{config_id}", backup_path=str(tmp_path))
+
+def test_written_bytes_shrink_the_reservation(monkeypatch, tmp_path, disk):
+    service = make_service(monkeypatch, {1: 1000})
+    device = os.stat(tmp_path).st_dev
+
+    admitted, _ = service.acquire(make_config(1, tmp_path))
+
+    assert admitted
+    assert service.reserved_bytes(device) == 1000
+    service.record_written(1, 400)
+    assert service.reserved_bytes(device) == 600
+    service.record_written(1, 1500) # Mayor que la estimación: la reserva no baja de cero
+    assert service.reserved_bytes(device) == 0
+    service.release(1)
+    service.record_written(1, 100) # Tras liberar no se vuelve a reservar
+    assert service.reserved_bytes(device) == 0
+
+def test_running_dump_is_not_counted_twice(monkeypatch, tmp_path, disk):
+    service = make_service(monkeypatch, {1: 1000, 2: 500})
+    assert service.acquire(make_config(1, tmp_path))[0]
+    disk.free -= 600 # El primer respaldo ya escribió 600 bytes
+    service.record_written(1, 600)
+
+    admitted, message = service.acquire(make_config(2, tmp_path), timeout=0)
+
+    assert admitted, message # 900 libres y 400 pendientes de escribir: caben 500
+    service.release(1)
+    service.release(2)
+
+def test_waits_for_reserved_space(monkeypatch, tmp_path, disk):
+    service = make_service(monkeypatch, {1: 1000, 2: 600})
+    assert service.acquire(make_config(1, tmp_path))[0]
+
+    admitted, message = service.acquire(make_config(2, tmp_path), timeout=0)
+
+    assert not admitted
+    assert "reservados" in message
+    service.release(1)
+
+def test_backup_larger_than_free_space_is_rejected(monkeypatch, tmp_path, disk):
+    service = make_service(monkeypatch, {1: 2000})
+
+    admitted, message = service.acquire(make_config(1, tmp_path))
+
+    assert not admitted
+    assert "Espacio insuficiente" in message
@@ -0,0 +1,272 @@
+"""
+Pruebas de la entrega de correo en segundo plano contra un servidor SMTP local (aiosmtpd)
+
+Cubren los tres modos de seguridad (STARTTLS, TLS implícito y sin cifrar), la reutilización de la
+sesión, la reconexión tras perderla, los reintentos con espera ante errores 4xx, el abandono ante
+errores permanentes (5xx, credenciales rechazadas) y el límite de la cola.
+"""
+import asyncio
+import datetime
+import socket
+import ssl
+import time
+from email import message_from_bytes, policy
+from email.mime.text import MIMEText
+
+import pytest
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+from aiosmtpd.smtp import AuthResult
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from src.models.app_settings import AppSettings
+from src.repositories.app_settings_repository import app_settings_repository
+from src.services import delivery_queue as delivery_queue_module
+from src.services.delivery_queue import DeliveryQueue
+from src.services.notification_service import notification_service
+from src.services.notification_sinks import EmailSink
+
+USERNAME = "backups@example.com"
+PASSWORD = "s3cret"
+
+class RecordingHandler:
+    """Guarda los mensajes recibidos; `responses` son respuestas de DATA a devolver antes de aceptar."""
+    def __init__(self):
+        self.messages = []
+        self.responses = []
+        self.data_attempts = 0
+        self.delay = 0.0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.data_attempts += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.responses:
+            return self.responses.pop(0)
+        self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+class Authenticator:
+    """
+    Acepta USERNAME/PASSWORD y anota cada intento: (aceptado, sesión cifrada). Un login rechazado puede
+    anotar varios intentos en la misma conexión (smtplib prueba cada mecanismo AUTH anunciado).
+    """
+    def __init__(self):
+        self.logins = []
+        self.peers = [] # Conexión (dirección del cliente) de cada intento
+
+    @property
+    def connections(self) -> int:
+        return len(set(self.peers))
+
+    def __call__(self, server, session, envelope, mechanism, auth_data):
+        accepted = auth_data.login == USERNAME.encode() and auth_data.password == PASSWORD.encode()
+        self.logins.append((accepted, server.transport.get_extra_info("ssl_object") is not None))
+        self.peers.append(session.peer)
+        return AuthResult(success=accepted, handled=False) # handled=False: aiosmtpd responde 535 al fallar
+
+class SmtpStandin:
+    def __init__(self, security: str, tls_context: ssl.SSLContext):
+        self.security = security
+        self.tls_context = tls_context
+        self.handler = RecordingHandler()
+        self.authenticator = Authenticator()
+        self.port = _free_port()
+        self.controller = None
+
+    def start(self):
+        # Con TLS implícito aiosmtpd no marca la sesión como cifrada para auth_require_tls (toda ella lo está)
+        options = {"authenticator": self.authenticator, "auth_require_tls": self.security == "starttls"}
+        if self.security == "starttls":
+            options.update(tls_context=self.tls_context, require_starttls=True)
+        elif self.security == "ssl":
+            options.update(ssl_context=self.tls_context)
+        self.controller = aiosmtpd_controller.Controller(self.handler, hostname="127.0.0.1", port=self.port, **options)
+        self.controller.start()
+
+    def stop(self):
+        self.controller.stop()
+
+    def settings(self, **overrides) -> AppSettings:
+        values = dict(email_notifications_enabled=True, email_recipient="dba@example.com",
+                      email_smtp_server="127.0.0.1", email_smtp_port=self.port, email_smtp_security=self.security,
+                      email_username=USERNAME, email_password_encrypted=PASSWORD)
+        values.update(overrides)
+        return AppSettings(**values)
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture(scope="module")
+def tls_context(tmp_path_factory):
+    """Contexto de servidor con un certificado autofirmado para 127.0.0.1."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+                   .serial_number(x509.random_serial_number())
+                   .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=1))
+                   .sign(key, hashes.SHA256()))
+    directory = tmp_path_factory.mktemp("tls")
+    cert_path, key_path = directory / "cert.pem", directory / "key.pem"
+    cert_path.write_bytes(certificate.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                           serialization.NoEncryption()))
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(str(cert_path), str(key_path))
+    return context
+
+@pytest.fixture
+def smtp_server(request, tls_context):
+    server = SmtpStandin(getattr(request, "param", "starttls"), tls_context)
+    server.start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(delivery_queue_module, "NOTIFICATION_RETRY_BASE_DELAY_SECONDS", 0.01)
+    monkeypatch.setattr(delivery_queue_module, "NOTIFICATION_MAX_ATTEMPTS", 3)
+
+@pytest.fixture
+def email_queue():
+    delivery_queue = DeliveryQueue(EmailSink())
+    yield delivery_queue
+    delivery_queue.flush(5)
+    delivery_queue.sink.close()
+
+def make_message(subject: str) -> MIMEText:
+    message = MIMEText("Cuerpo de la notificación", "plain")
+    message["From"] = USERNAME
+    message["To"] = "dba@example.com"
+    message["Subject"] = subject
+    return message
+
+def subjects(server: SmtpStandin):
+    return [message_from_bytes(envelope.content, policy=policy.default)["Subject"]
+            for envelope in server.handler.messages]
+
+@pytest.mark.parametrize("smtp_server", ["starttls", "ssl", "none"], indirect=True)
+def test_delivers_with_each_security_mode(smtp_server, email_queue):
+    email_queue.enqueue((make_message("Respaldo Exitoso: shop"), smtp_server.settings()))
+
+    assert email_queue.flush(5)
+    assert subjects(smtp_server) == ["Respaldo Exitoso: shop"]
+    assert email_queue.sent_count == 1
+    encrypted = smtp_server.security != "none"
+    assert smtp_server.authenticator.logins == [(True, encrypted)]
+
+@pytest.mark.parametrize("smtp_server", ["starttls"], indirect=True)
+def test_plain_session_is_refused_when_server_requires_starttls(smtp_server, email_queue, fast_retries):
+    email_queue.enqueue((make_message("Sin cifrar"), smtp_server.settings(email_smtp_security="none")))
+
+    assert email_queue.flush(5)
+    assert smtp_server.handler.messages == []
+    assert email_queue.sent_count == 0
+
+def test_session_is_reused_between_messages(smtp_server, email_queue):
+    settings = smtp_server.settings()
+    for number in range(5):
+        email_queue.enqueue((make_message(f"Mensaje {number}"), settings))
+
+    assert email_queue.flush(5)
+    assert subjects(smtp_server) == [f"Mensaje {number}" for number in range(5)]
+    assert smtp_server.authenticator.logins == [(True, True)]
+
+def test_reconnects_after_server_restart(smtp_server, email_queue):
+    settings = smtp_server.settings()
+    email_queue.enqueue((make_message("Antes"), settings))
+    assert email_queue.flush(5)
+
+    smtp_server.stop()
+    smtp_server.start()
+    email_queue.enqueue((make_message("Después"), settings))
+
+    assert email_queue.flush(5)
+    assert subjects(smtp_server) == ["Antes", "Después"]
+    assert smtp_server.authenticator.connections == 2
+
+def test_changed_settings_open_a_new_session(smtp_server, email_queue):
+    email_queue.enqueue((make_message("Uno"), smtp_server.settings()))
+    email_queue.enqueue((make_message("Dos"), smtp_server.settings(email_sender_name="Respaldos")))
+
+    assert email_queue.flush(5)
+    assert smtp_server.authenticator.connections == 1 # El remitente no forma parte de la sesión
+    email_queue.enqueue((make_message("Tres"), smtp_server.settings(email_username="otro@example.com")))
+
+    assert email_queue.flush(5)
+    assert smtp_server.authenticator.connections == 2
+    assert subjects(smtp_server) == ["Uno", "Dos"]
+
+def test_authentication_failure_is_not_retried(smtp_server, email_queue, fast_retries):
+    email_queue.enqueue((make_message("Credenciales"), smtp_server.settings(email_password_encrypted="wrong")))
+
+    assert email_queue.flush(5)
+    assert smtp_server.authenticator.connections == 1
+    assert not any(accepted for accepted, _ in smtp_server.authenticator.logins)
+    assert smtp_server.handler.messages == []
+    assert email_queue.sent_count == 0
+
+def test_transient_errors_are_retried(smtp_server, email_queue, fast_retries):
+    smtp_server.handler.responses = ["451 4.3.0 Try again later", "421 4.7.0 Busy"]
+    email_queue.enqueue((make_message("Reintento"), smtp_server.settings()))
+
+    assert email_queue.flush(5)
+    assert subjects(smtp_server) == ["Reintento"]
+    assert smtp_server.handler.data_attempts == 3
+    assert email_queue.sent_count == 1
+
+def test_retries_stop_after_max_attempts(smtp_server, email_queue, fast_retries):
+    smtp_server.handler.responses = ["451 4.3.0 Try again later"] * 5
+    email_queue.enqueue((make_message("Sin suerte"), smtp_server.settings()))
+    email_queue.enqueue((make_message("Siguiente"), smtp_server.settings()))
+
+    assert email_queue.flush(5)
+    # El primero se abandona tras 3 intentos; el siguiente entra al tercero
+    assert smtp_server.handler.data_attempts == 6
+    assert subjects(smtp_server) == ["Siguiente"]
+    assert email_queue.sent_count == 1
+
+def test_permanent_rejection_is_not_retried(smtp_server, email_queue, fast_retries):
+    smtp_server.handler.responses = ["550 5.7.1 Message rejected"]
+    email_queue.enqueue((make_message("Rechazado"), smtp_server.settings()))
+    email_queue.enqueue((make_message("Aceptado"), smtp_server.settings()))
+
+    assert email_queue.flush(5)
+    assert smtp_server.handler.data_attempts == 2
+    assert subjects(smtp_server) == ["Aceptado"]
+
+def test_full_queue_drops_oldest(smtp_server):
+    delivery_queue = DeliveryQueue(EmailSink(), max_size=3)
+    smtp_server.handler.delay = 0.2
+    settings = smtp_server.settings()
+    for number in range(10):
+        delivery_queue.enqueue((make_message(f"Mensaje {number}"), settings))
+
+    assert delivery_queue.flush(10)
+    delivery_queue.sink.close()
+    assert delivery_queue.dropped_count > 0
+    assert delivery_queue.sent_count + delivery_queue.dropped_count == 10
+    assert subjects(smtp_server)[-3:] == ["Mensaje 7", "Mensaje 8", "Mensaje 9"]
+
+def test_notification_service_sends_in_background(smtp_server):
+    settings = app_settings_repository.get_settings()
+    for attribute, value in vars(smtp_server.settings(notification_level="info")).items():
+        if attribute not in ("id", "created_at", "updated_at"):
+            setattr(settings, attribute, value)
+    assert app_settings_repository.save_settings(settings)
+    smtp_server.handler.delay = 0.5
+
+    start = time.monotonic()
+    notification_service.send_email_notification("Respaldo Fallido: shop", "mysqldump falló", 'error', config_name="shop")
+    enqueue_seconds = time.monotonic() - start
+
+    assert enqueue_seconds < smtp_server.handler.delay # El respaldo no espera al servidor de correo
+    assert notification_service.flush(5)
+    assert subjects(smtp_server) == ["[ERROR] Respaldo Fallido: shop"]
+    notification_service.email_delivery.sink.close()
@@ -0,0 +1,85 @@
+"""
+Pruebas de la rotación y la retirada de claves del anillo de encriptación
+
+El anillo y la base de datos son los de la aplicación en el directorio temporal de las pruebas, así
+que cada prueba parte de rotar la clave para no depender de lo que hayan cifrado las anteriores.
+"""
+import os
+
+import pytest
+
+from src.models.backup_config import BackupConfig
+from src.models.backup_file import BackupFile
+from src.models.database import database
+from src.repositories.backup_config_repository import backup_config_repository
+from src.repositories.backup_file_repository import backup_file_repository
+from src.services.encryption_service import encryption_service
+from src.services.key_rotation_service import key_rotation_service
+from src.utils.artifacts import ArtifactWriter
+
+def stored_password(config_id: int) -> str:
+    return database.execute_query("SELECT password_encrypted FROM database_configs WHERE id = ?", (config_id,))[0][0]
+
+@pytest.fixture
+def config(tmp_path):
+    return backup_config_repository.add(BackupConfig(name=f"keys_{tmp_path.name}", database_name="shop",
+                                                     password_encrypted="s3cret", backup_path=str(tmp_path)))
+
+def test_rotate_reencrypts_stored_secrets(config):
+    old_version = encryption_service.primary_version
+    old_token = stored_password(config.id)
+
+    success, message = key_rotation_service.rotate()
+
+    assert success, message
+    assert encryption_service.primary_version > old_version
+    new_token = stored_password(config.id)
+    assert new_token != old_token
+    assert encryption_service.key_version_of(new_token.encode()) == encryption_service.primary_version
+    assert backup_config_repository.get_by_id(config.id).password_encrypted == "s3cret"
+
+def test_reencrypt_skips_undecryptable_values(config):
+    database.execute_update("UPDATE database_configs SET password_encrypted = ? WHERE id = ?", ("no-es-fernet", config.id))
+    try:
+        _, skipped = key_rotation_service.reencrypt_secrets(batch_size=1)
+
+        assert skipped == 1
+        assert stored_password(config.id) == "no-es-fernet"
+    finally:
+        database.execute_update("DELETE FROM database_configs WHERE id = ?", (config.id,))
+
+def test_retire_refuses_while_secrets_use_the_key(config):
+    version = encryption_service.primary_version
+    encryption_service.add_key() # Clave nueva sin reescribir los secretos
+
+    success, message = key_rotation_service.retire_key(version)
+
+    assert not success
+    assert "secretos" in message
+    assert version in encryption_service.key_versions()
+    assert key_rotation_service.rotate()[0]
+    assert key_rotation_service.retire_key(version)[0]
+    assert version not in encryption_service.key_versions()
+    assert backup_config_repository.get_by_id(config.id).password_encrypted == "s3cret"
+
+def test_retire_refuses_while_an_artifact_uses_the_key(config, tmp_path):
+    assert key_rotation_service.rotate()[0]
+    version = encryption_service.primary_version
+    path = str(tmp_path / "shop_20260101_000000.sql.gzip.enc")
+    with ArtifactWriter(path, "gzip", "shop.sql", encrypt=True) as writer:
+        writer.write(b"SELECT 1;\n")
+    backup_file = backup_file_repository.add(BackupFile(config_id=config.id, file_path=path, file_size=os.path.getsize(path)))
+    assert key_rotation_service.rotate()[0]
+
+    success, message = key_rotation_service.retire_key(version)
+
+    assert not success
+    assert "1 respaldos cifrados con ella" in message
+    backup_file_repository.delete(backup_file.id)
+    assert key_rotation_service.retire_key(version)[0]
+
+def test_primary_key_cannot_be_retired():
+    success, message = key_rotation_service.retire_key(encryption_service.primary_version)
+
+    assert not success
+    assert "principal" in message
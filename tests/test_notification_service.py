@@ -0,0 +1,173 @@
+"""
+Pruebas de los canales adicionales de notificación (colas por canal y cambios de configuración)
+
+Se usan canales spool (archivo JSONL) en un directorio temporal; un canal lento retrasa sus envíos
+para comprobar que lo pendiente no se pierde al retirarlo.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.models.app_settings import AppSettings
+from src.services.delivery_queue import DeliveryQueue
+from src.services import notification_service as notification_module
+from src.services.notification_service import NotificationService
+from src.services.notification_sinks import NotificationEvent, NotificationSink, WebhookSink
+
+def spool_spec(path) -> dict:
+    return {"type": "spool", "path": str(path)}
+
+def spooled_subjects(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["subject"] for line in f]
+
+class FlakySink(NotificationSink):
+    """Canal cuyo primer envío falla (la cola espera antes de reintentar)."""
+    name = "flaky"
+
+    def __init__(self):
+        super().__init__()
+        self.failed = threading.Event()
+        self.delivered = []
+
+    def send_batch(self, items):
+        if not self.failed.is_set():
+            self.failed.set()
+            raise ConnectionError("destino caído")
+        self.delivered.extend(items)
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Recibe los POST del webhook; con close_idle cierra la conexión keep-alive tras cada respuesta."""
+    protocol_version = "HTTP/1.1"
+    received = []
+    close_idle = False
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.received.append((self.client_address[1], [event["subject"] for event in json.loads(body)["events"]]))
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        self.wfile.flush()
+        if self.close_idle:
+            # Sin "Connection: close": el cliente cree que puede reutilizar la conexión
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def webhook_server():
+    WebhookHandler.received = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), WebhookHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def service():
+    service = NotificationService()
+    yield service
+    assert service.flush(5)
+
+def test_unchanged_sinks_keep_their_queue(service, tmp_path):
+    first = spool_spec(tmp_path / "a.jsonl")
+    second = spool_spec(tmp_path / "b.jsonl")
+    [queue_a] = service._sync_sinks(AppSettings(notification_sinks=[first]))
+
+    queues = service._sync_sinks(AppSettings(notification_sinks=[first, second]))
+
+    assert queues[0] is queue_a
+    assert len(queues) == 2
+
+def test_retired_queue_delivers_pending_events_and_stops(service, tmp_path, monkeypatch):
+    path = tmp_path / "old.jsonl"
+    [old_queue] = service._sync_sinks(AppSettings(notification_sinks=[spool_spec(path)]))
+    send_batch = old_queue.sink.send_batch
+    monkeypatch.setattr(old_queue.sink, "batch_size", 1)
+    monkeypatch.setattr(old_queue.sink, "send_batch", lambda items: (time.sleep(0.05), send_batch(items)))
+    for number in range(5):
+        old_queue.enqueue(NotificationEvent(f"Evento {number}", "", 'info', "shop"))
+
+    service._sync_sinks(AppSettings(notification_sinks=[spool_spec(tmp_path / "new.jsonl")]))
+
+    assert service._retired_queues == [old_queue]
+    assert service.flush(5)
+    assert spooled_subjects(path) == [f"Evento {number}" for number in range(5)]
+    assert not old_queue._worker.is_alive()
+    service._sync_sinks(AppSettings(notification_sinks=[])) # Las colas ya terminadas dejan de seguirse
+    assert old_queue not in service._retired_queues
+
+def test_close_cuts_the_retry_backoff_short():
+    sink = FlakySink()
+    queue = DeliveryQueue(sink)
+    queue.enqueue(NotificationEvent("Respaldo fallido", "", 'error', "shop"))
+    assert sink.failed.wait(5)
+
+    started = time.monotonic()
+    assert queue.close(timeout=2)
+
+    # La espera entre reintentos (varios segundos) se interrumpe y el lote se intenta una última vez
+    assert time.monotonic() - started < 2
+    assert [event.subject for event in sink.delivered] == ["Respaldo fallido"]
+
+def test_sink_interface_requires_send_batch():
+    with pytest.raises(TypeError):
+        NotificationSink()
+
+@pytest.mark.parametrize("close_idle", [False, True], ids=["keep-alive", "server-closes"])
+def test_webhook_reuses_or_reopens_its_connection(webhook_server, monkeypatch, close_idle):
+    monkeypatch.setattr(WebhookHandler, "close_idle", close_idle)
+    sink = WebhookSink(f"http://127.0.0.1:{webhook_server.server_address[1]}/hook")
+
+    sink.send_batch([NotificationEvent("Primero", "", 'info', "shop")])
+    time.sleep(0.05) # Dar tiempo a que el servidor cierre su lado
+    sink.send_batch([NotificationEvent("Segundo", "", 'info', "shop")])
+    sink.close()
+
+    [(first_port, first), (second_port, second)] = WebhookHandler.received
+    assert (first, second) == (["Primero"], ["Segundo"])
+    assert (first_port != second_port) == close_idle
+
+class FixedSettings:
+    def __init__(self, settings: AppSettings):
+        self.settings = settings
+
+    def get_settings(self) -> AppSettings:
+        return self.settings
+
+def test_digest_groups_repeated_notifications(service, monkeypatch):
+    settings = AppSettings(email_notifications_enabled=True, email_recipient="ops@example.com",
+                           email_smtp_server="localhost", email_smtp_port=25, email_username="backup@example.com",
+                           email_password_encrypted="secret", notification_digest_minutes=60)
+    monkeypatch.setattr(service, "settings_repo", FixedSettings(settings))
+    monkeypatch.setattr(notification_module, "NOTIFICATION_DIGEST_MAX_EVENTS", 3)
+    sent = []
+    monkeypatch.setattr(service.email_delivery, "enqueue", lambda item: sent.append(item[0]))
+
+    for _ in range(3):
+        service.send_email_notification("Respaldo completado", "ok", 'info', "shop")
+    service.send_email_notification("Respaldo fallido", "Lost connection", 'error', "shop")
+    service.send_email_notification("Respaldo fallido", "Access denied", 'error', "shop")
+    service.send_email_notification("Respaldo completado", "ok", 'info', "crm")
+    service.send_email_notification("Espacio bajo", "90%", 'warning', "shop") # Supera el límite: solo se cuenta
+
+    # El primer error de la configuración sale al momento; el resto espera al resumen
+    assert [message["Subject"] for message in sent] == ["[ERROR] Respaldo fallido"]
+    service.flush_digest()
+
+    assert len(sent) == 2
+    digest = sent[1]
+    assert digest["Subject"] == "[RESUMEN] 6 notificaciones: 1 errores, 0 advertencias, 4 informativas"
+    body = digest.get_payload()[0].get_payload(decode=True).decode("utf-8")
+    assert body.index("ERRORES (1)") < body.index("INFORMATIVAS (4)")
+    assert "- Respaldo completado (x3," in body
+    assert "  Access denied" in body
+    assert "Además, 1 notificaciones distintas" in body
+    service.flush_digest() # Sin nada pendiente no se envía otro resumen
+    assert len(sent) == 2
@@ -0,0 +1,245 @@
+"""
+Pruebas del servicio de restauración contra un cliente mysql sustituto
+
+El sustituto se instala junto a un `mysqldump` ficticio (restore_service deriva la ruta del cliente de
+la de mysqldump) y se comporta como el cliente real en lo que importa aquí: lee el SQL por stdin, ejecuta
+`-e`, rechaza la contraseña "wrong" (ERROR 1045) y falla con ERROR 1064 al llegar a una sentencia de
+la tabla `broken`. Cada conexión guarda lo que recibió en <base de datos>.<pid>.sql.
+"""
+import glob
+import os
+import sys
+import threading
+
+import pytest
+
+from src.models.backup_config import BackupConfig
+from src.models.backup_file import BackupFile
+from src.repositories.backup_config_repository import backup_config_repository
+from src.repositories.backup_file_repository import backup_file_repository
+from src.services.restore_service import restore_service, mysql_client_path
+from src.utils.artifacts import ArtifactWriter
+from src.utils.constants import RESTORE_SESSION_SETTINGS
+
+STANDIN_CLIENT = """#!{python}
+import os
+import sys
+
+out_dir = {out_dir!r}
+args = sys.argv[1:]
+options = dict(arg[2:].split("=", 1) for arg in args if arg.startswith("--") and "=" in arg)
+if options.get("password") == "wrong":
+    sys.stderr.write("ERROR 1045 (28000): Access denied for user '%s'@'localhost'\\n" % options.get("user"))
+    sys.exit(1)
+if "-e" in args:
+    with open(os.path.join(out_dir, "statements.log"), "a") as f:
+        f.write(args[args.index("-e") + 1] + "\\n")
+    sys.exit(0)
+database = [arg for arg in args if not arg.startswith("-")][-1]
+with open(os.path.join(out_dir, "%s.%d.sql" % (database, os.getpid())), "wb") as f:
+    for number, line in enumerate(sys.stdin.buffer, 1):
+        f.write(line)
+        if b"`broken`" in line and line.startswith(b"INSERT"):
+            sys.stderr.write("ERROR 1064 (42000) at line %d: You have an error in your SQL syntax\\n" % number)
+            sys.exit(1)
+"""
+
+ROWS_PER_TABLE = 200
+
+def make_dump(tables=("a", "b", "c", "d", "e")) -> bytes:
+    """Volcado con la forma de mysqldump: cabecera, una sección por tabla y una vista al final."""
+    lines = ["-- MySQL dump 10.13", "/*!40101 SET NAMES utf8mb4 */;"]
+    for table in tables:
+        lines += ["--", f"-- Table structure for table `{table}`", "--",
+                  f"CREATE TABLE `{table}` (id int);"]
+        lines += [f"INSERT INTO `{table}` VALUES ({row});" for row in range(ROWS_PER_TABLE)]
+    lines += ["--", "-- Final view structure for view `v`", "--", "CREATE VIEW `v` AS SELECT 1;"]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+def write_artifact(directory: str, dump: bytes, compression_method: str, encrypt: bool = False) -> str:
+    extension = {"none": ".sql", "gzip": ".sql.gzip", "zip": ".zip", "mbk": ".mbk"}[compression_method]
+    path = os.path.join(directory, f"db_20260101_000000{extension}" + (".enc" if encrypt else ""))
+    with ArtifactWriter(path, compression_method, "db_20260101_000000.sql", encrypt=encrypt) as writer:
+        writer.write(dump)
+    return path
+
+@pytest.fixture
+def mysql_standin(tmp_path):
+    """Directorio con mysqldump y el cliente mysql sustituto. Retorna (ruta de mysqldump, directorio de salida)."""
+    bin_dir = tmp_path / "bin"
+    out_dir = tmp_path / "out"
+    bin_dir.mkdir()
+    out_dir.mkdir()
+    mysqldump_path = str(bin_dir / "mysqldump")
+    client_path = mysql_client_path(mysqldump_path)
+    with open(client_path, "w") as f:
+        f.write(STANDIN_CLIENT.format(python=sys.executable, out_dir=str(out_dir)))
+    os.chmod(client_path, 0o755)
+    return mysqldump_path, str(out_dir)
+
+@pytest.fixture
+def config(mysql_standin):
+    mysqldump_path, _ = mysql_standin
+    return BackupConfig(name="restore", host="localhost", username="root", password_encrypted="secret",
+                        database_name="shop", mysqldump_path=mysqldump_path)
+
+def restored_sessions(out_dir: str, database: str = "shop"):
+    """Lo recibido por cada conexión de carga de `database`."""
+    sessions = []
+    for path in sorted(glob.glob(os.path.join(out_dir, f"{database}.*.sql"))):
+        with open(path, "rb") as f:
+            sessions.append(f.read().decode("utf-8"))
+    return sessions
+
+def statements(sessions, prefix: str):
+    return [line for session in sessions for line in session.splitlines() if line.startswith(prefix)]
+
+def test_mysql_client_path():
+    assert mysql_client_path("/usr/bin/mysqldump") == os.path.join("/usr/bin", "mysql")
+    assert mysql_client_path("/usr/bin/mariadb-dump") == os.path.join("/usr/bin", "mariadb")
+    assert mysql_client_path("C:/MySQL/bin/mysqldump.exe").endswith("mysql.exe")
+
+def test_sequential_restore_streams_the_whole_dump(config, mysql_standin, tmp_path):
+    _, out_dir = mysql_standin
+    dump = make_dump()
+    artifact = write_artifact(str(tmp_path), dump, "none")
+
+    success, message = restore_service.restore(config, artifact, parallelism=1)
+
+    assert success, message
+    sessions = restored_sessions(out_dir)
+    assert len(sessions) == 1
+    session_settings = "".join(f"{statement};\n" for statement in RESTORE_SESSION_SETTINGS)
+    assert sessions[0] == session_settings + dump.decode("utf-8") + "COMMIT;\n"
+    with open(os.path.join(out_dir, "statements.log")) as f:
+        assert f.read() == "CREATE DATABASE IF NOT EXISTS `shop`\n"
+
+@pytest.mark.parametrize("encrypt", [False, True], ids=["plain", "encrypted"])
+@pytest.mark.parametrize("compression_method", ["none", "gzip", "zip", "mbk"])
+def test_parallel_restore_loads_every_table_once(config, mysql_standin, tmp_path, compression_method, encrypt):
+    _, out_dir = mysql_standin
+    tables = ("a", "b", "c", "d", "e")
+    artifact = write_artifact(str(tmp_path), make_dump(tables), compression_method, encrypt=encrypt)
+    progress_calls = []
+
+    success, message = restore_service.restore(config, artifact, parallelism=3,
+                                               progress=lambda raw, loaded: progress_calls.append((raw, loaded)))
+
+    assert success, message
+    sessions = restored_sessions(out_dir)
+    assert len(sessions) == 3
+    for session in sessions:
+        # Cada conexión abre con los ajustes de sesión y la cabecera del volcado, y confirma al terminar
+        assert session.startswith("SET FOREIGN_KEY_CHECKS=0;\n")
+        assert "/*!40101 SET NAMES utf8mb4 */;" in session
+        assert session.endswith("COMMIT;\n")
+    created = sorted(statements(sessions, "CREATE TABLE"))
+    assert created == [f"CREATE TABLE `{table}` (id int);" for table in tables]
+    assert len(statements(sessions, "INSERT INTO")) == len(tables) * ROWS_PER_TABLE
+    assert len(statements(sessions, "CREATE VIEW")) == 1
+    assert progress_calls[-1][1] == len(tables)
+
+def test_restore_into_another_database(config, mysql_standin, tmp_path):
+    _, out_dir = mysql_standin
+    artifact = write_artifact(str(tmp_path), make_dump(), "gzip")
+
+    success, message = restore_service.restore(config, artifact, target_database="shop_copy", parallelism=2)
+
+    assert success, message
+    assert restored_sessions(out_dir, "shop") == []
+    assert len(statements(restored_sessions(out_dir, "shop_copy"), "CREATE TABLE")) == 5
+    with open(os.path.join(out_dir, "statements.log")) as f:
+        assert "CREATE DATABASE IF NOT EXISTS `shop_copy`" in f.read()
+
+def test_partial_restore_from_table_archive(config, mysql_standin, tmp_path):
+    _, out_dir = mysql_standin
+    artifact = write_artifact(str(tmp_path), make_dump(), "mbk", encrypt=True)
+
+    success, message = restore_service.restore(config, artifact, parallelism=1, tables=["b", "d"])
+
+    assert success, message
+    sessions = restored_sessions(out_dir)
+    assert sorted(statements(sessions, "CREATE TABLE")) == ["CREATE TABLE `b` (id int);", "CREATE TABLE `d` (id int);"]
+    assert len(statements(sessions, "INSERT INTO")) == 2 * ROWS_PER_TABLE
+
+def test_partial_restore_requires_table_archive(config, tmp_path):
+    artifact = write_artifact(str(tmp_path), make_dump(), "gzip")
+
+    success, message = restore_service.restore(config, artifact, tables=["b"])
+
+    assert not success
+    assert ".mbk" in message
+
+def test_missing_artifact_fails(config, tmp_path):
+    success, message = restore_service.restore(config, str(tmp_path / "missing.sql.gzip"))
+
+    assert not success
+    assert "no encontrado" in message
+
+def test_access_denied_is_reported(config, mysql_standin, tmp_path):
+    _, out_dir = mysql_standin
+    config.password_encrypted = "wrong"
+    artifact = write_artifact(str(tmp_path), make_dump(), "gzip")
+
+    success, message = restore_service.restore(config, artifact, parallelism=2)
+
+    assert not success
+    assert "ERROR 1045" in message
+    assert restored_sessions(out_dir) == []
+
+@pytest.mark.parametrize("parallelism", [1, 3])
+def test_sql_error_aborts_the_restore(config, mysql_standin, tmp_path, parallelism):
+    artifact = write_artifact(str(tmp_path), make_dump(("a", "broken", "c", "d")), "gzip")
+
+    success, message = restore_service.restore(config, artifact, parallelism=parallelism)
+
+    assert not success
+    assert "ERROR 1064" in message
+
+@pytest.mark.parametrize("compression_method, encrypt", [("gzip", False), ("zip", False), ("gzip", True)])
+def test_truncated_artifact_fails(config, tmp_path, compression_method, encrypt):
+    artifact = write_artifact(str(tmp_path), make_dump(), compression_method, encrypt=encrypt)
+    with open(artifact, "r+b") as f:
+        f.truncate(os.path.getsize(artifact) // 2)
+
+    success, message = restore_service.restore(config, artifact, parallelism=2, verify_checksum=False)
+
+    assert not success
+    assert message.startswith("Restauración fallida")
+
+def test_tampered_encrypted_artifact_fails(config, tmp_path):
+    artifact = write_artifact(str(tmp_path), make_dump(), "gzip", encrypt=True)
+    with open(artifact, "r+b") as f:
+        f.seek(os.path.getsize(artifact) // 2)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+    success, message = restore_service.restore(config, artifact, parallelism=2, verify_checksum=False)
+
+    assert not success
+    assert message.startswith("Restauración fallida")
+
+def test_checksum_mismatch_stops_before_loading(config, mysql_standin, tmp_path):
+    _, out_dir = mysql_standin
+    config.backup_path = str(tmp_path)
+    saved_config = backup_config_repository.add(config)
+    artifact = write_artifact(str(tmp_path), make_dump(), "gzip")
+    backup_file_repository.add(BackupFile(config_id=saved_config.id, file_path=os.path.abspath(artifact),
+                                          file_size=os.path.getsize(artifact), checksum="0" * 64))
+
+    success, message = restore_service.restore(config, artifact, parallelism=2)
+
+    assert not success
+    assert "verificación de integridad" in message
+    assert restored_sessions(out_dir) == []
+
+def test_cancelled_restore_fails(config, tmp_path):
+    artifact = write_artifact(str(tmp_path), make_dump(), "gzip")
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    success, message = restore_service.restore(config, artifact, parallelism=2, cancel_event=cancel_event)
+
+    assert not success
+    assert "abortada" in message
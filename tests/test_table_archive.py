@@ -0,0 +1,95 @@
+"""
+Pruebas del contenedor por tablas (.mbk): índice, lectura de tablas sueltas y archivos dañados
+"""
+import os
+
+import pytest
+
+from src.utils.table_archive import MBK_FOOTER, TableArchiveError, TableArchiveReader, TableArchiveWriter
+
+# Cada sección empieza en el comentario de mysqldump que la nombra y acaba en el "--" que abre la siguiente
+HEADER = b"-- MySQL dump 10.13\n/*!40101 SET NAMES utf8mb4 */;\n--\n"
+POST = b"-- Final view structure for view `v`\n--\nCREATE VIEW `v` AS SELECT 1;\n"
+
+def table_section(name: str, rows: int = 50) -> bytes:
+    quoted = name.replace("`", "``")
+    lines = [b"-- Table structure for table `%s`" % quoted.encode("utf-8"), b"--",
+             b"CREATE TABLE `%s` (id int);" % quoted.encode("utf-8")]
+    lines += [b"INSERT INTO `%s` VALUES (%d);" % (quoted.encode("utf-8"), row) for row in range(rows)]
+    lines.append(b"--")
+    return b"\n".join(lines) + b"\n"
+
+def write_archive(path, tables, write_size: int = 37) -> str:
+    """Escribe un .mbk en bloques de `write_size` bytes (cortando líneas, como llega la salida de mysqldump)."""
+    dump = HEADER + b"".join(table_section(name) for name in tables) + POST
+    with open(path, "wb") as f:
+        writer = TableArchiveWriter(f)
+        for start in range(0, len(dump), write_size):
+            writer.write(dump[start:start + write_size])
+        writer.close()
+    return str(path)
+
+def test_single_table_is_read_from_the_index(tmp_path):
+    path = write_archive(tmp_path / "shop.mbk", ["a", "b", "c"])
+
+    with TableArchiveReader(path) as reader:
+        assert [table["name"] for table in reader.tables()] == ["a", "b", "c"]
+        assert reader.tables()[1]["raw_size"] == len(table_section("b"))
+        sql = b"".join(reader.iter_sql(["b"]))
+
+    assert sql == HEADER + table_section("b")
+
+def test_full_stream_reproduces_the_dump(tmp_path):
+    tables = ["a", "b"]
+    path = write_archive(tmp_path / "shop.mbk", tables)
+
+    with TableArchiveReader(path).open_stream() as f:
+        assert f.read() == HEADER + b"".join(table_section(name) for name in tables) + POST
+
+def test_table_names_with_backticks(tmp_path):
+    path = write_archive(tmp_path / "shop.mbk", ["weird`name", "plain"])
+
+    with TableArchiveReader(path) as reader:
+        assert [table["name"] for table in reader.tables()] == ["weird`name", "plain"]
+        assert b"".join(reader.iter_sql(["weird`name"], include_header=False)) == table_section("weird`name")
+
+def test_unknown_table_is_rejected(tmp_path):
+    path = write_archive(tmp_path / "shop.mbk", ["a", "b"])
+
+    with TableArchiveReader(path) as reader:
+        with pytest.raises(TableArchiveError, match="missing"):
+            list(reader.iter_sql(["a", "missing"]))
+        with pytest.raises(TableArchiveError, match="missing"):
+            reader.open_stream(["missing"])
+
+def test_truncated_archive_is_rejected(tmp_path):
+    path = write_archive(tmp_path / "shop.mbk", ["a", "b"])
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 1)
+
+    with pytest.raises(TableArchiveError, match="sin índice"):
+        TableArchiveReader(path)
+
+def test_corrupt_index_is_rejected(tmp_path):
+    path = write_archive(tmp_path / "shop.mbk", ["a", "b"])
+    with open(path, "r+b") as f:
+        f.seek(-MBK_FOOTER.size, os.SEEK_END)
+        index_offset, index_length, _ = MBK_FOOTER.unpack(f.read(MBK_FOOTER.size))
+        f.seek(index_offset + index_length // 2)
+        f.write(b"\x00" * 4)
+
+    with pytest.raises(TableArchiveError, match="Índice"):
+        TableArchiveReader(path)
+
+def test_corrupt_frame_is_rejected(tmp_path):
+    path = write_archive(tmp_path / "shop.mbk", ["a", "b"])
+    with TableArchiveReader(path) as reader:
+        frame = next(frame for frame in reader.frames if frame["name"] == "b")
+    with open(path, "r+b") as f:
+        f.seek(frame["offset"] + frame["length"] // 2)
+        f.write(b"\xff" * 4)
+
+    with TableArchiveReader(path) as reader:
+        assert b"".join(reader.iter_sql(["a"], include_header=False)) == table_section("a")
+        with pytest.raises(TableArchiveError, match="'b'"):
+            list(reader.iter_sql(["b"]))
@@ -0,0 +1,196 @@
+"""
+Pruebas de la coordinación entre el almacenamiento segregado y la retención
+
+Los respaldos catalogados se crean en un directorio temporal y el almacenamiento frío es otro
+directorio local.
+"""
+import hashlib
+import io
+import os
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.cli import run
+from src.models.backup_config import BackupConfig
+from src.models.backup_file import BackupFile
+from src.repositories.backup_config_repository import backup_config_repository
+from src.repositories.backup_file_repository import backup_file_repository
+from src.services.restore_service import restore_service
+from src.services.retention_service import retention_service
+from src.services.tiering_service import LocalColdStorage, S3ColdStorage, tiering_service
+from src.utils.artifacts import ArtifactWriter
+from src.utils.constants import STORAGE_TIER_COLD
+from tests.test_restore_service import ROWS_PER_TABLE, make_dump, mysql_standin, restored_sessions, statements
+
+DUMP = b"".join(b"INSERT INTO `t` VALUES (%d);\n" % row for row in range(20000))
+
+class CountingLimiter:
+    def __init__(self):
+        self.consumed = 0
+
+    def consume(self, amount, cancel_event=None):
+        self.consumed += amount
+        return True
+
+@pytest.fixture
+def config(tmp_path):
+    config = BackupConfig(name=f"tiering_{tmp_path.name}", database_name="shop", backup_path=str(tmp_path / "hot"),
+                          segregated_path=str(tmp_path / "cold"), retention_days_main=1, retention_days_segregated=0)
+    os.makedirs(config.backup_path)
+    return backup_config_repository.add(config)
+
+class FakeS3Client:
+    """Bucket en memoria con la parte de la API de boto3 que usa S3ColdStorage."""
+    def __init__(self):
+        self.objects = {}
+        self.upload_args = {}
+
+    def upload_file(self, filename, bucket, key, Callback=None, ExtraArgs=None):
+        with open(filename, "rb") as f:
+            self.objects[(bucket, key)] = f.read()
+        self.upload_args[(bucket, key)] = ExtraArgs
+        if Callback is not None:
+            Callback(len(self.objects[(bucket, key)]))
+
+    def get_object(self, Bucket, Key):
+        body = io.BytesIO(self.objects[(Bucket, Key)])
+        body.iter_chunks = lambda chunk_size: iter(lambda: body.read(chunk_size), b"")
+        return {"Body": body}
+
+def s3_storage(client: FakeS3Client) -> S3ColdStorage:
+    storage = object.__new__(S3ColdStorage)
+    storage.bucket, storage.prefix, storage.client = "archive", "shop", client
+    return storage
+
+def add_backup(config: BackupConfig, days_old: int, compression_method: str = "gzip", dump: bytes = DUMP,
+               encrypt: bool = False) -> BackupFile:
+    created_at = datetime.now() - timedelta(days=days_old)
+    extension = {"gzip": ".sql.gzip", "mbk": ".mbk"}[compression_method] + (".enc" if encrypt else "")
+    path = os.path.join(config.backup_path, f"shop_{created_at:%Y%m%d_%H%M%S}{extension}")
+    with ArtifactWriter(path, compression_method, "shop.sql", encrypt=encrypt) as writer:
+        writer.write(dump)
+    return backup_file_repository.add(BackupFile(config_id=config.id, file_path=path, created_at=created_at,
+                                                 file_size=os.path.getsize(path)))
+
+def test_limiter_is_charged_once_per_written_byte(config, monkeypatch):
+    backup_file = add_backup(config, days_old=3)
+    limiter = CountingLimiter()
+    monkeypatch.setattr(tiering_service, "limiter", limiter)
+
+    assert tiering_service.tier_config(config) == 1
+
+    moved = backup_file_repository.get_by_id(backup_file.id)
+    assert moved.tier == STORAGE_TIER_COLD
+    assert limiter.consumed == moved.file_size
+
+@pytest.mark.parametrize("encrypt", [False, True], ids=["plain", "encrypted"])
+def test_moving_stages_next_to_the_original(config, monkeypatch, encrypt):
+    add_backup(config, days_old=3, encrypt=encrypt)
+    staged = []
+    put = LocalColdStorage.put
+
+    def recording_put(storage, source_path, name, limiter):
+        staged.append(source_path)
+        return put(storage, source_path, name, limiter)
+
+    monkeypatch.setattr(LocalColdStorage, "put", recording_put)
+
+    assert tiering_service.tier_config(config) == 1
+
+    assert [os.path.dirname(path) for path in staged] == [config.backup_path]
+    assert os.listdir(config.backup_path) == []
+
+@pytest.mark.parametrize("encrypt", [False, True], ids=["plain", "encrypted"])
+def test_partial_restore_from_a_tiered_table_archive(config, mysql_standin, encrypt):
+    mysqldump_path, out_dir = mysql_standin
+    backup_file = add_backup(config, days_old=3, compression_method="mbk", dump=make_dump(), encrypt=encrypt)
+
+    assert tiering_service.tier_config(config) == 1
+
+    # El contenedor llega intacto al almacenamiento frío: conserva el índice por tabla
+    cold_location = backup_file_repository.get_by_id(backup_file.id).file_path
+    assert os.path.basename(cold_location) == os.path.basename(backup_file.file_path)
+    restore_config = BackupConfig(name="tiered_restore", host="localhost", username="root",
+                                  password_encrypted="secret", database_name="shop", mysqldump_path=mysqldump_path)
+    success, message = restore_service.restore(restore_config, cold_location, parallelism=1, tables=["c"])
+    assert success, message
+    sessions = restored_sessions(out_dir)
+    assert statements(sessions, "CREATE TABLE") == ["CREATE TABLE `c` (id int);"]
+    assert len(statements(sessions, "INSERT INTO")) == ROWS_PER_TABLE
+
+def test_retention_skips_a_file_being_moved(config):
+    backup_file = add_backup(config, days_old=3)
+
+    with tiering_service.claim(backup_file.id) as claimed:
+        assert claimed
+        plan = retention_service.run(config)
+
+    assert [planned.id for planned in plan.delete] == [backup_file.id]
+    assert os.path.isfile(backup_file.file_path)
+    assert backup_file_repository.get_by_id(backup_file.id) is not None
+
+def test_stale_plan_deletes_the_cold_copy(config):
+    backup_file = add_backup(config, days_old=3)
+    plan = retention_service.plan(config, backup_file_repository.get_by_config_id(config.id))
+    assert tiering_service.move_to_cold(backup_file_repository.get_by_id(backup_file.id),
+                                        LocalColdStorage(config.segregated_path))
+    cold_location = backup_file_repository.get_by_id(backup_file.id).file_path
+
+    assert retention_service.apply(plan) == (1, 0)
+
+    # El plan apuntaba a la ruta en caliente: la copia en frío no queda huérfana fuera del catálogo
+    assert not os.path.exists(cold_location)
+    assert backup_file_repository.get_by_id(backup_file.id) is None
+
+def test_tiering_skips_a_file_being_deleted(config, monkeypatch):
+    backup_file = add_backup(config, days_old=3)
+    deleting = threading.Event()
+    resume = threading.Event()
+    delete_claimed_file = retention_service._delete_claimed_file
+
+    def slow_delete(current):
+        deleting.set()
+        resume.wait(5)
+        return delete_claimed_file(current)
+
+    monkeypatch.setattr(retention_service, "_delete_claimed_file", slow_delete)
+    retention = threading.Thread(target=retention_service.run, args=(config,))
+    retention.start()
+    assert deleting.wait(5)
+
+    moved = tiering_service.tier_config(config)
+    resume.set()
+    retention.join(5)
+
+    assert moved == 0
+    assert not os.path.isdir(config.segregated_path) or not os.listdir(config.segregated_path)
+    assert backup_file_repository.get_by_id(backup_file.id) is None
+
+def test_cli_previews_retention_without_deleting(config, capsys):
+    backup_file = add_backup(config, days_old=3)
+
+    assert run(["retention", "--config", config.name]) == 0
+
+    output = capsys.readouterr().out
+    assert f"ELIMINAR  {backup_file.created_at:%Y-%m-%d %H:%M} {backup_file.file_path}" in output
+    assert os.path.isfile(backup_file.file_path)
+    assert run(["retention", "--config", config.name, "--apply"]) == 0
+    assert not os.path.exists(backup_file.file_path)
+
+def test_s3_verify_hashes_the_stored_object(tmp_path):
+    client = FakeS3Client()
+    storage = s3_storage(client)
+    source = tmp_path / "shop.sql.xz"
+    source.write_bytes(DUMP)
+    sha256 = hashlib.sha256(DUMP).hexdigest()
+
+    location = storage.put(str(source), source.name, CountingLimiter())
+
+    assert location == "s3://archive/shop/shop.sql.xz"
+    assert client.upload_args[("archive", "shop/shop.sql.xz")] == {"ChecksumAlgorithm": "SHA256"}
+    assert storage.verify(location, len(DUMP), sha256)
+    # Un objeto alterado con el mismo tamaño no pasa la verificación
+    client.objects[("archive", "shop/shop.sql.xz")] = DUMP[:-1] + b"X"
+    assert not storage.verify(location, len(DUMP), sha256)